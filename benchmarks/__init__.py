@@ -0,0 +1,6 @@
+"""
+基准测试包
+
+基于仓库中已记录的数据（symbols/raw快照、CMC列表样本、历史建议）回放整条流水线，
+所有外部服务（Binance、CoinMarketCap、DeepSeek、webhook）均由本地桩服务器替代，无需网络。
+"""
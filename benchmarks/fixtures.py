@@ -0,0 +1,268 @@
+"""
+基准测试数据
+提供CMC列表样本的录制/生成、exchangeInfo响应构造以及历史快照和建议的加载
+"""
+
+import os
+import re
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CMC_FIXTURE_PATH = os.path.join(DATA_DIR, 'cmc_listing.json')
+RAW_SYMBOLS_DIR = os.path.join(ROOT_DIR, 'symbols', 'raw')
+ADVICES_DIR = os.path.join(ROOT_DIR, 'advices')
+
+# 与binance_symbols.extract_token_names保持一致的计价货币列表
+QUOTE_CURRENCIES = ['BTC', 'ETH', 'USDT', 'BUSD', 'BNB', 'USDC', 'EUR', 'TRY', 'FDUSD', 'TUSD', 'JPY', 'ARS', 'MXN',
+                    'BRL', 'AEUR', 'PLN', 'RUB', 'RON', 'VAI', 'EURI', 'CZK', 'COP']
+
+# CMC中常见的平台名称及对应的生态标签
+PLATFORMS = [
+    ({"id": 1839, "name": "BNB Smart Chain (BEP20)", "symbol": "BNB", "slug": "bnb"}, "bnb-chain-ecosystem"),
+    ({"id": 5426, "name": "Solana", "symbol": "SOL", "slug": "solana"}, "solana-ecosystem"),
+    ({"id": 1027, "name": "Ethereum", "symbol": "ETH", "slug": "ethereum"}, "ethereum-ecosystem"),
+    ({"id": 27716, "name": "Base", "symbol": "ETH", "slug": "base"}, "base-ecosystem"),
+    ({"id": 20947, "name": "Sui Network", "symbol": "SUI", "slug": "sui"}, "sui-ecosystem"),
+]
+
+EXTRA_TAGS = ["memes", "ai-big-data", "defi", "gaming", "depin", "real-world-assets", "layer-2", "ai-agents",
+              "binance-launchpool", "yield-farming", "dao", "privacy"]
+
+
+def list_raw_snapshots() -> List[str]:
+    """按时间顺序返回symbols/raw下的所有快照路径"""
+    if not os.path.isdir(RAW_SYMBOLS_DIR):
+        return []
+    return [os.path.join(RAW_SYMBOLS_DIR, f) for f in sorted(os.listdir(RAW_SYMBOLS_DIR)) if f.endswith('.json')]
+
+
+def load_raw_snapshot(path: Optional[str] = None) -> List[str]:
+    """加载一份原始交易对快照，默认为最新的一份"""
+    path = path or list_raw_snapshots()[-1]
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _split_symbol(symbol: str):
+    """按计价货币后缀拆分交易对"""
+    for quote in QUOTE_CURRENCIES:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    return symbol, ""
+
+
+def build_exchange_info(symbols: List[str]) -> Dict[str, Any]:
+    """根据交易对列表构造与币安/api/v3/exchangeInfo结构一致的响应
+
+    每个交易对附带真实接口中的filters、orderTypes和permissionSets，使响应体积接近线上（数MB）。
+    """
+    entries = []
+    for symbol in symbols:
+        base, quote = _split_symbol(symbol)
+        entries.append({
+            "symbol": symbol,
+            "status": "TRADING",
+            "baseAsset": base,
+            "baseAssetPrecision": 8,
+            "quoteAsset": quote,
+            "quotePrecision": 8,
+            "quoteAssetPrecision": 8,
+            "baseCommissionPrecision": 8,
+            "quoteCommissionPrecision": 8,
+            "orderTypes": ["LIMIT", "LIMIT_MAKER", "MARKET", "STOP_LOSS", "STOP_LOSS_LIMIT", "TAKE_PROFIT",
+                           "TAKE_PROFIT_LIMIT"],
+            "icebergAllowed": True,
+            "ocoAllowed": True,
+            "otoAllowed": True,
+            "quoteOrderQtyMarketAllowed": True,
+            "allowTrailingStop": True,
+            "cancelReplaceAllowed": True,
+            "isSpotTradingAllowed": True,
+            "isMarginTradingAllowed": False,
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.00000100", "maxPrice": "1000.00000000",
+                 "tickSize": "0.00000100"},
+                {"filterType": "LOT_SIZE", "minQty": "0.10000000", "maxQty": "9000000.00000000",
+                 "stepSize": "0.10000000"},
+                {"filterType": "ICEBERG_PARTS", "limit": 10},
+                {"filterType": "MARKET_LOT_SIZE", "minQty": "0.00000000", "maxQty": "161307.58125000",
+                 "stepSize": "0.00000000"},
+                {"filterType": "TRAILING_DELTA", "minTrailingAboveDelta": 10, "maxTrailingAboveDelta": 2000,
+                 "minTrailingBelowDelta": 10, "maxTrailingBelowDelta": 2000},
+                {"filterType": "PERCENT_PRICE_BY_SIDE", "bidMultiplierUp": "5", "bidMultiplierDown": "0.2",
+                 "askMultiplierUp": "5", "askMultiplierDown": "0.2", "avgPriceMins": 5},
+                {"filterType": "NOTIONAL", "minNotional": "0.00010000", "applyMinToMarket": True,
+                 "maxNotional": "9000000.00000000", "applyMaxToMarket": False, "avgPriceMins": 5},
+                {"filterType": "MAX_NUM_ORDERS", "maxNumOrders": 200},
+                {"filterType": "MAX_NUM_ALGO_ORDERS", "maxNumAlgoOrders": 5},
+            ],
+            "permissions": [],
+            "permissionSets": [["SPOT", "MARGIN", "TRD_GRP_004", "TRD_GRP_005", "TRD_GRP_006", "TRD_GRP_009",
+                                "TRD_GRP_010", "TRD_GRP_011", "TRD_GRP_012", "TRD_GRP_013", "TRD_GRP_014"]],
+            "defaultSelfTradePreventionMode": "EXPIRE_MAKER",
+            "allowedSelfTradePreventionModes": ["EXPIRE_TAKER", "EXPIRE_MAKER", "EXPIRE_BOTH"],
+        })
+
+    return {
+        "timezone": "UTC",
+        "serverTime": int(datetime.now().timestamp() * 1000),
+        "rateLimits": [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": 6000},
+            {"rateLimitType": "ORDERS", "interval": "SECOND", "intervalNum": 10, "limit": 100},
+            {"rateLimitType": "RAW_REQUESTS", "interval": "MINUTE", "intervalNum": 5, "limit": 61000},
+        ],
+        "exchangeFilters": [],
+        "symbols": entries,
+    }
+
+
+def _advice_projects() -> List[tuple]:
+    """从历史建议中收集出现过的(名称, 代码)，使样本中的项目与真实推荐重合"""
+    pattern = re.compile(r'\*\*([^\*\(\n]+?)\s*\(([A-Z0-9]+)\)\*\*')
+    projects = {}
+    if os.path.isdir(ADVICES_DIR):
+        for filename in sorted(os.listdir(ADVICES_DIR)):
+            if filename.endswith('.md'):
+                with open(os.path.join(ADVICES_DIR, filename), 'r', encoding='utf-8') as f:
+                    for name, symbol in pattern.findall(f.read()):
+                        projects.setdefault(symbol, name.strip())
+    return sorted((name, symbol) for symbol, name in projects.items())
+
+
+def synthesize_cmc_listing(count: int = 200, seed: int = 42) -> Dict[str, Any]:
+    """生成与CMC data-api/v3/cryptocurrency/listing响应结构一致的样本（无法访问网络时使用）
+
+    Args:
+        count: 项目数量
+        seed: 随机种子，保证每次生成结果一致
+
+    Returns:
+        Dict[str, Any]: {"data": {"cryptoCurrencyList": [...], "totalCount": ...}, "status": {...}}
+    """
+    rng = random.Random(seed)
+    projects = _advice_projects()
+    while len(projects) < count:
+        symbol = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(rng.randint(3, 6)))
+        projects.append((f"{symbol.title()} Protocol", symbol))
+    rng.shuffle(projects)
+
+    now = datetime(2025, 6, 1, 8, 0, 0)
+    crypto_list = []
+    for idx, (name, symbol) in enumerate(projects[:count]):
+        platform, ecosystem_tag = PLATFORMS[rng.choices(range(len(PLATFORMS)), weights=[40, 25, 25, 6, 4])[0]]
+        market_cap = 10 ** rng.uniform(6.5, 9.8)
+        fdv = market_cap / rng.uniform(0.1, 1.0)
+        price = 10 ** rng.uniform(-5, 1.5)
+        volume_24h = market_cap * 10 ** rng.uniform(-2.5, 0.3)
+
+        def quote(quote_name: str, divisor: float) -> Dict[str, Any]:
+            return {
+                "name": quote_name,
+                "price": price / divisor,
+                "volume24h": volume_24h / divisor,
+                "volume7d": volume_24h * rng.uniform(4, 10) / divisor,
+                "volume30d": volume_24h * rng.uniform(15, 45) / divisor,
+                "marketCap": market_cap / divisor,
+                "selfReportedMarketCap": 0,
+                "percentChange1h": rng.uniform(-3, 3),
+                "percentChange24h": rng.uniform(-20, 20),
+                "percentChange7d": rng.uniform(-40, 40),
+                "percentChange30d": rng.uniform(-60, 120),
+                "percentChange60d": rng.uniform(-80, 200),
+                "percentChange90d": rng.uniform(-90, 300),
+                "fullyDilluttedMarketCap": fdv / divisor,
+                "marketCapByTotalSupply": fdv / divisor,
+                "dominance": rng.uniform(0, 0.05),
+                "turnover": volume_24h / market_cap,
+                "ytdPriceChangePercentage": rng.uniform(-90, 300),
+                "percentChange1y": rng.uniform(-90, 500),
+                "lastUpdated": now.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            }
+
+        tags = ["binance-alpha", ecosystem_tag] + rng.sample(EXTRA_TAGS, rng.randint(0, 4))
+        circulating = market_cap / price
+        crypto_list.append({
+            "id": 30000 + idx,
+            "name": name,
+            "symbol": symbol,
+            "slug": name.lower().replace(' ', '-'),
+            "cmcRank": 50 + idx * 7 + rng.randint(0, 6),
+            "marketPairCount": rng.randint(5, 400),
+            "circulatingSupply": circulating,
+            "selfReportedCirculatingSupply": 0,
+            "totalSupply": fdv / price,
+            "maxSupply": fdv / price,
+            "ath": price * rng.uniform(1, 20),
+            "atl": price * rng.uniform(0.01, 1),
+            "high24h": price * rng.uniform(1, 1.2),
+            "low24h": price * rng.uniform(0.8, 1),
+            "isActive": 1,
+            "lastUpdated": now.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "dateAdded": (now - timedelta(days=rng.randint(30, 1500))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "tags": tags,
+            "platform": {**platform, "token_address": "0x" + ''.join(rng.choice('0123456789abcdef') for _ in range(40))},
+            "quotes": [quote("BTC", 104000.0), quote("ETH", 2500.0), quote("USD", 1.0)],
+            "isAudited": False,
+            "auditInfoList": [],
+            "badges": [1],
+        })
+
+    crypto_list.sort(key=lambda c: c["quotes"][2]["marketCap"], reverse=True)
+    return {
+        "data": {"cryptoCurrencyList": crypto_list, "totalCount": str(len(crypto_list))},
+        "status": {"timestamp": now.strftime('%Y-%m-%dT%H:%M:%S.000Z'), "error_code": "0", "error_message": "SUCCESS",
+                   "elapsed": "12", "credit_count": 0},
+    }
+
+
+async def record_cmc_listing() -> Optional[Dict[str, Any]]:
+    """通过真实接口录制一份CMC列表响应"""
+    import sys
+    sys.path.insert(0, ROOT_DIR)
+    import tempfile
+    from src.collectors import BinanceAlphaCollector
+    from config import PROXY_URL, USE_PROXY
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        collector = BinanceAlphaCollector(tmp_dir, proxy_url=PROXY_URL, use_proxy=USE_PROXY)
+        result = await collector.get_binance_alpha_data()
+    if not result:
+        return None
+    return {"data": result["data"], "status": {"timestamp": datetime.now().isoformat(), "error_code": "0"}}
+
+
+def load_cmc_listing() -> Dict[str, Any]:
+    """加载CMC列表样本"""
+    with open(CMC_FIXTURE_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_advice_samples(limit: int = 12) -> List[str]:
+    """加载最近的若干份历史建议文本，用作DeepSeek桩服务器的响应和消息分割样本"""
+    files = sorted(f for f in os.listdir(ADVICES_DIR) if f.endswith('.md'))[-limit:]
+    samples = []
+    for filename in files:
+        with open(os.path.join(ADVICES_DIR, filename), 'r', encoding='utf-8') as f:
+            samples.append(f.read())
+    return samples
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="录制或生成CMC列表样本")
+    parser.add_argument("mode", choices=["record", "synthesize"], help="record: 通过真实接口录制; synthesize: 离线生成")
+    args = parser.parse_args()
+
+    fixture = asyncio.run(record_cmc_listing()) if args.mode == "record" else synthesize_cmc_listing()
+    if not fixture:
+        raise SystemExit("录制CMC列表样本失败")
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(CMC_FIXTURE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(fixture, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"已保存CMC列表样本({len(fixture['data']['cryptoCurrencyList'])}个项目)到: {CMC_FIXTURE_PATH}")
@@ -0,0 +1,257 @@
+"""
+流水线负载测试
+以N个并发进程运行完整流水线（main.run_pipeline），外部服务由可注入延迟和故障的桩服务器提供，
+统计吞吐量、运行耗时分位数和失败放大系数，用于确定守护进程的并发度、超时和重试策略
+
+用法:
+    python -m benchmarks.load --runs 8 --concurrency 4 \\
+        --deepseek "latency=3000,jitter=2000,dist=lognormal,errors=0.1,statuses=429/503,truncate=0.1" \\
+        --cmc "latency=300,errors=0.05"
+
+失败放大系数 = 负载阶段各接口收到的请求数 / (无故障校准运行的请求数 × 运行次数)，
+反映重试策略在故障下额外产生的上游请求量。
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import warnings
+import contextlib
+import multiprocessing
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Any
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.stubs import StubServers, EndpointBehavior, ENDPOINTS
+
+
+def _init_worker(work_dir: str) -> None:
+    """工作进程初始化：切换到工作目录后再导入流水线，使日志和数据文件写入临时目录"""
+    os.chdir(work_dir)
+    warnings.filterwarnings("ignore", category=UserWarning)
+    import main  # noqa: F401  在工作目录中创建日志文件
+    logging.disable(logging.CRITICAL)
+
+
+def _run_once(run_id: int, work_dir: str, reuse_image: bool) -> Dict[str, Any]:
+    """在工作进程中运行一次完整流水线
+
+    Args:
+        run_id: 运行编号，每次运行使用独立的子目录
+        work_dir: 工作根目录
+        reuse_image: 是否复用已渲染的表格图片（排除matplotlib渲染耗时，只关注网络行为）
+
+    Returns:
+        Dict[str, Any]: 运行编号、退出码、耗时、新建连接数和异常信息
+    """
+    import main
+    from config import DATA_DIRS, VIEWER_BUNDLE
+    from src.utils import advice_index, binance_symbols
+    from src.utils.http_client import close_async_session, connection_stats
+    from src.utils.debug_artifacts import close_debug_artifacts
+    from src.utils.render_service import RenderService
+
+    run_dir = os.path.join(work_dir, f"run_{run_id:03d}")
+    # 汇总建议目录在仓库中已存在，流水线不会自行创建
+    os.makedirs(os.path.join(run_dir, DATA_DIRS['all-platforms']), exist_ok=True)
+    os.chdir(run_dir)
+    # 交易对和建议索引默认写入项目根目录，指向本次运行的子目录
+    shutil.copytree(os.path.join(work_dir, 'symbols'), os.path.join(run_dir, 'symbols'), dirs_exist_ok=True)
+    binance_symbols.DEFAULT_SYMBOLS_DIR = os.path.join(run_dir, 'symbols')
+    advice_index.DEFAULT_DB_PATH = os.path.join(run_dir, 'data', 'analytics', 'advice_index.db')
+    # 查看器数据包写入仓库中的docs-viewer目录，压测时不发布
+    VIEWER_BUNDLE['enabled'] = False
+
+    if reuse_image and not hasattr(RenderService, "_bench_render_rows"):
+        render_rows = RenderService.render_rows
+        cache = {}
+
+        async def cached_render_rows(self, data, max_items=None):
+            # 按表格中的代币复用全局表格和各平台表格
+            key = tuple(row["代码"] for row in data)
+            if key not in cache:
+                cache[key] = await render_rows(self, data, max_items)
+            return cache[key]
+
+        RenderService._bench_render_rows = render_rows
+        RenderService.render_rows = cached_render_rows
+
+    # 每次运行都走完整流程（不因输入未变化跳过AI建议）
+    args = Namespace(debug_only=False, platform=None, force_update=True, skip_tokens_update=False, force_advice=True)
+
+    async def pipeline():
+        try:
+            return await main.run_pipeline(args)
+        finally:
+            await close_async_session()
+            close_debug_artifacts()
+
+    connections_before = connection_stats()
+    start = time.perf_counter()
+    error = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exit_code = asyncio.run(pipeline())
+    except Exception as e:
+        exit_code, error = 1, f"{type(e).__name__}: {str(e)[:200]}"
+    duration = time.perf_counter() - start
+    connections_after = connection_stats()
+    connections = sum(connections_after[k] - connections_before[k] for k in ("async_connections", "sync_connections"))
+
+    advice_dir = os.path.join(run_dir, DATA_DIRS['advices'])
+    advices = len([f for f in os.listdir(advice_dir) if f.endswith('.md')])
+    return {"run_id": run_id, "exit_code": exit_code, "duration": duration, "advices": advices,
+            "connections": connections, "error": error}
+
+
+def run_load(stubs: StubServers, work_dir: str, runs: int, concurrency: int,
+             reuse_image: bool = True) -> List[Dict[str, Any]]:
+    """以给定并发度运行多次流水线"""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=concurrency, mp_context=context,
+                             initializer=_init_worker, initargs=(work_dir,)) as pool:
+        futures = [pool.submit(_run_once, run_id, work_dir, reuse_image) for run_id in range(runs)]
+        for future in as_completed(futures):
+            results.append(future.result())
+            print(f"完成运行 {len(results)}/{runs}", file=sys.stderr)
+    return sorted(results, key=lambda r: r["run_id"])
+
+
+def summarize(results: List[Dict[str, Any]], elapsed: float, calibration: Dict[str, int],
+              load_requests: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    """汇总负载测试结果
+
+    Args:
+        results: 每次运行的结果
+        elapsed: 负载阶段总耗时（秒）
+        calibration: 无故障校准运行中各接口收到的请求数
+        load_requests: 负载阶段各接口的请求、错误、截断统计
+
+    Returns:
+        Dict[str, Any]: 吞吐量、耗时分位数、成功率和各接口的失败放大系数
+    """
+    durations = np.array([r["duration"] for r in results], dtype=np.float64)
+    succeeded = [r for r in results if r["exit_code"] == 0 and r["advices"] > 0]
+    p50, p95, p99 = np.percentile(durations, [50, 95, 99]) if len(durations) else (0, 0, 0)
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        stats = load_requests.get(endpoint, {})
+        expected = calibration.get(endpoint, 0) * len(results)
+        endpoints[endpoint] = {
+            **{k: stats.get(k, 0) for k in ("requests", "errors", "truncated", "streamed")},
+            "expected": expected,
+            "amplification": round(stats.get("requests", 0) / expected, 3) if expected else None,
+        }
+
+    return {
+        "runs": len(results),
+        "succeeded": len(succeeded),
+        "success_rate": round(len(succeeded) / len(results), 3) if results else None,
+        "throughput_runs_per_min": round(len(results) / elapsed * 60, 2) if elapsed else None,
+        "elapsed_seconds": round(elapsed, 2),
+        "duration_p50_s": round(float(p50), 2),
+        "duration_p95_s": round(float(p95), 2),
+        "duration_p99_s": round(float(p99), 2),
+        "duration_max_s": round(float(durations.max()), 2) if len(durations) else 0,
+        "connections_per_run": round(float(np.mean([r["connections"] for r in results])), 2) if results else 0,
+        "endpoints": endpoints,
+        "errors": [r["error"] for r in results if r["error"]],
+    }
+
+
+def format_summary(summary: Dict[str, Any], concurrency: int) -> str:
+    """将汇总结果格式化为文本"""
+    lines = [
+        f"并发度: {concurrency}  运行次数: {summary['runs']}  成功: {summary['succeeded']} ({summary['success_rate']})",
+        f"吞吐量: {summary['throughput_runs_per_min']} 次/分钟  总耗时: {summary['elapsed_seconds']}秒",
+        f"单次运行耗时 p50/p95/p99/max: {summary['duration_p50_s']}/{summary['duration_p95_s']}/"
+        f"{summary['duration_p99_s']}/{summary['duration_max_s']}秒",
+        f"每次运行新建连接数: {summary['connections_per_run']}",
+        "",
+        f"{'endpoint':<16}{'requests':>10}{'expected':>10}{'errors':>8}{'truncated':>11}{'amplification':>15}",
+    ]
+    for endpoint, stats in summary["endpoints"].items():
+        lines.append(f"{endpoint:<16}{stats['requests']:>10}{stats['expected']:>10}{stats['errors']:>8}"
+                     f"{stats['truncated']:>11}{str(stats['amplification']):>15}")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="币安Alpha流水线负载测试")
+    parser.add_argument("--runs", type=int, default=4, help="流水线运行总次数")
+    parser.add_argument("--concurrency", type=int, default=2, help="并发运行的进程数")
+    for endpoint, flag in (("exchange_info", "binance"), ("cmc_listing", "cmc"), ("deepseek", "deepseek"),
+                           ("webhook", "webhook")):
+        parser.add_argument(f"--{flag}", type=str, dest=endpoint, default="",
+                            help=f"{endpoint}接口行为，如 latency=500,jitter=200,dist=lognormal,errors=0.1,statuses=429/503")
+    parser.add_argument("--render-every-run", action="store_true", help="每次运行都重新渲染表格图片")
+    parser.add_argument("--output", type=str, help="将汇总结果保存为JSON文件")
+    args = parser.parse_args()
+
+    behaviors = {endpoint: EndpointBehavior.parse(getattr(args, endpoint))
+                 for endpoint in ENDPOINTS if getattr(args, endpoint)}
+    stubs = StubServers().start()
+
+    # 必须在工作进程导入config之前设置（spawn方式启动的进程继承环境变量）
+    os.environ.update({
+        "USE_PROXY": "false",
+        "TRACE_ENABLED": "false",
+        "BINANCE_EXCHANGE_INFO_URL": stubs.urls["exchange_info"],
+        "CMC_LISTING_URL": stubs.urls["cmc_listing"],
+        "DEEPSEEK_API_URL": stubs.urls["deepseek"],
+        "DEEPSEEK_API_KEY": "benchmark",
+        "WEBHOOK_URL": stubs.urls["webhook"],
+    })
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="alpha-load-") as work_dir:
+            shutil.copytree(os.path.join(ROOT_DIR, 'symbols'), os.path.join(work_dir, 'symbols'))
+
+            # 无故障校准运行，得到单次运行对各接口的理想请求数
+            print("校准运行（无故障注入）...", file=sys.stderr)
+            calibration_dir = os.path.join(work_dir, 'calibration')
+            shutil.copytree(os.path.join(work_dir, 'symbols'), os.path.join(calibration_dir, 'symbols'))
+            run_load(stubs, calibration_dir, runs=1, concurrency=1)
+            calibration = dict(stubs.requests)
+
+            stubs.reset_stats()
+            for endpoint, behavior in behaviors.items():
+                stubs.set_behavior(endpoint, behavior)
+
+            start = time.perf_counter()
+            results = run_load(stubs, work_dir, args.runs, args.concurrency, reuse_image=not args.render_every_run)
+            elapsed = time.perf_counter() - start
+            load_stats = {endpoint: dict(stats) for endpoint, stats in stubs.stats.items()}
+    finally:
+        stubs.stop()
+
+    summary = summarize(results, elapsed, calibration, load_stats)
+    summary.update({"concurrency": args.concurrency, "created_at": datetime.now().isoformat(timespec='seconds'),
+                    "behaviors": {endpoint: vars(behavior) for endpoint, behavior in behaviors.items()}})
+    print(format_summary(summary, args.concurrency))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n汇总结果已保存到: {args.output}")
+    return 0 if summary["succeeded"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
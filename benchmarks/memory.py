@@ -0,0 +1,66 @@
+"""
+项目记录内存基准
+模拟同时持有多份CMC列表快照（如回测和索引重建时），对比原始项目字典与AlphaProject记录常驻的Python堆大小
+
+用法:
+    python -m benchmarks.memory --snapshots 30
+"""
+
+import os
+import sys
+import gc
+import json
+import argparse
+import tracemalloc
+from typing import Callable, Dict, Any, List
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import fixtures
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    """返回build()的结果在Python堆上常驻的字节数（临时对象释放之后）"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return size
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="AlphaProject记录内存基准")
+    parser.add_argument("--snapshots", type=int, default=30, help="同时持有的CMC列表快照份数")
+    args = parser.parse_args()
+
+    from src.utils.alpha_project import parse_projects
+
+    # 每份快照独立解析，和从多个文件读取的情况一致
+    body = json.dumps(fixtures.load_cmc_listing()["data"]["cryptoCurrencyList"])
+    project_count = len(json.loads(body)) * args.snapshots
+
+    def raw_snapshots() -> List[List[Dict[str, Any]]]:
+        return [json.loads(body) for _ in range(args.snapshots)]
+
+    def project_snapshots():
+        return [parse_projects(json.loads(body)) for _ in range(args.snapshots)]
+
+    results = {"raw_dicts": retained_bytes(raw_snapshots), "alpha_projects": retained_bytes(project_snapshots)}
+
+    print(f"{args.snapshots}份快照，共{project_count}个项目")
+    print(f"{'representation':<16} {'heap(MB)':>10} {'bytes/project':>14}")
+    for name, size in results.items():
+        print(f"{name:<16} {size / 1024 / 1024:>10.2f} {size / project_count:>14.0f}")
+    print(f"记录/字典: {results['alpha_projects'] / results['raw_dicts']:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
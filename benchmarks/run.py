@@ -0,0 +1,344 @@
+"""
+流水线基准测试
+使用本地桩服务器和已记录的数据回放流水线各阶段，输出吞吐量、延迟分位数和峰值内存，
+并可与JSON基线对比以发现性能回退
+
+用法:
+    python -m benchmarks.run                     # 运行全部基准并与baseline.json对比
+    python -m benchmarks.run --only split_message --iterations 50
+    python -m benchmarks.run --save-baseline     # 将本次结果写入baseline.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import warnings
+import tracemalloc
+import contextlib
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import fixtures
+from benchmarks.stubs import StubServers
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程峰值常驻内存(MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS单位为字节，Linux为KB
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+class Benchmark:
+    """单个基准测试用例"""
+
+    def __init__(self, name: str, func: Callable, iterations: int, is_async: bool = False):
+        self.name = name
+        self.func = func
+        self.iterations = iterations
+        self.is_async = is_async
+
+
+def measure(bench: Benchmark, loop: asyncio.AbstractEventLoop, iterations: Optional[int] = None,
+            warmup: int = 1, trace_memory: bool = False) -> Dict[str, Any]:
+    """运行基准测试并统计结果
+
+    Args:
+        bench: 基准测试用例
+        loop: 运行异步用例的事件循环
+        iterations: 覆盖默认迭代次数
+        warmup: 预热次数，不计入统计
+        trace_memory: 是否使用tracemalloc统计单次调用的Python堆峰值（会明显拖慢运行）
+
+    Returns:
+        Dict[str, Any]: ops/sec、延迟分位数(毫秒)和内存统计
+    """
+    def call():
+        return loop.run_until_complete(bench.func()) if bench.is_async else bench.func()
+
+    for _ in range(warmup):
+        call()
+
+    iterations = iterations or bench.iterations
+    if trace_memory:
+        tracemalloc.start()
+    heap_peak = 0
+    samples = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        if trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        call()
+        samples[i] = time.perf_counter() - start
+        if trace_memory:
+            heap_peak = max(heap_peak, tracemalloc.get_traced_memory()[1])
+    if trace_memory:
+        tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / samples.sum(), 2),
+        "mean_ms": round(samples.mean() * 1000, 3),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "heap_peak_mb": round(heap_peak / (1024 * 1024), 2) if trace_memory else None,
+    }
+
+
+def build_benchmarks(stubs: StubServers, work_dir: str) -> List[Benchmark]:
+    """构建基准测试用例（需在设置好环境变量并切换到工作目录后调用）"""
+    from config import BLOCKCHAIN_PLATFORMS
+    from main import classify_crypto_projects_by_platform
+    from webhook import split_message, send_message_async
+    from src.ai import AlphaAdvisor
+    from src.collectors import BinanceAlphaCollector
+    from src.utils.binance_symbols import (extract_token_names, fetch_symbols, update_tokens, is_token_listed,
+                                           parse_exchange_symbols, fetch_exchange_info, _exchange_info_cache)
+    from src.utils.http_cache import HttpCache
+    from src.utils.serialization import dump_file, load_file
+    from src.utils.image_generator import create_alpha_table_image, build_table_rows, render_table_png
+    from src.utils.render_service import get_render_service
+    from src.utils.alpha_project import parse_projects
+    from src.utils.project_filters import ProjectFilterPipeline, listed_stage, blocked_stage
+    from src.utils.binance_symbols import load_listed_symbols
+    from config import BLOCK_TOKEN_LIST
+
+    raw_symbols = fixtures.load_raw_snapshot()
+    raw_crypto_list = fixtures.load_cmc_listing()["data"]["cryptoCurrencyList"]
+    crypto_list = parse_projects(raw_crypto_list)
+    advice_text = fixtures.load_advice_samples(limit=1)[0]
+    platforms = list(BLOCKCHAIN_PLATFORMS.keys())
+    date = datetime.now().strftime('%Y-%m-%d')
+
+    symbols_dir = os.path.join(work_dir, 'symbols')
+    update_tokens(symbols_dir=symbols_dir)
+    symbol_list_path = os.path.join(symbols_dir, 'symbol.json')
+    lookup_symbols = [c.symbol for c in crypto_list]
+
+    # 流式解析与完整JSON解析对比（配合--tracemalloc查看堆峰值）；解析的是写入缓存文件的响应体，从磁盘流式读取
+    exchange_info_body = json.dumps(fixtures.build_exchange_info(raw_symbols)).encode('utf-8')
+    exchange_info_writer = HttpCache("benchmark_exchange_info", cache_dir=os.path.join(work_dir, 'http_cache')).writer()
+    exchange_info_writer.write(exchange_info_body)
+    exchange_info = exchange_info_writer.finish()
+
+    def fetch_exchange_info_full():
+        # 删除缓存的响应体，不发送条件请求，每次都完整下载并流式写入缓存文件；
+        # 桩服务器运行在同一进程中，--tracemalloc的堆峰值包含其发送缓冲区（约等于响应体大小）
+        if os.path.exists(_exchange_info_cache.body_path):
+            os.remove(_exchange_info_cache.body_path)
+        return fetch_exchange_info(force_refresh=True)
+
+    # 200个项目的CMC列表：原有的json.dump(indent=2)与serialization模块对比
+    cmc_listing = fixtures.load_cmc_listing()
+    serialize_path = os.path.join(work_dir, 'serialize.json')
+
+    def serialize_stdlib():
+        with open(serialize_path, 'w', encoding='utf-8') as f:
+            json.dump(cmc_listing, f, indent=2)
+
+    def deserialize_stdlib():
+        with open(serialize_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def classify():
+        # 分类函数会逐项打印日志，屏蔽标准输出以免干扰计时
+        with contextlib.redirect_stdout(io.StringIO()):
+            return asyncio.get_event_loop().run_until_complete(
+                classify_crypto_projects_by_platform(crypto_list, BLOCKCHAIN_PLATFORMS, platforms))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        platform_projects, _ = asyncio.get_event_loop().run_until_complete(
+            classify_crypto_projects_by_platform(crypto_list, BLOCKCHAIN_PLATFORMS, platforms))
+    def filter_pipeline():
+        # 已上线过滤、屏蔽代币过滤和平台分类的单次遍历（含读取symbol.json）
+        return ProjectFilterPipeline(BLOCKCHAIN_PLATFORMS, platforms, [
+            listed_stage(load_listed_symbols(symbol_list_path)), blocked_stage(BLOCK_TOKEN_LIST)
+        ]).run(crypto_list)
+
+    largest_platform = max(platform_projects, key=lambda p: len(platform_projects[p]))
+    advisor = AlphaAdvisor()
+    alpha_data = {"data": {"cryptoCurrencyList": platform_projects[largest_platform]}, "date": date,
+                  "platform": largest_platform}
+
+    collector = BinanceAlphaCollector(os.path.join(work_dir, 'data'), use_proxy=False)
+
+    async def cmc_fetch():
+        return await collector.get_binance_alpha_data()
+
+    # 全局表格和各平台表格：进程池并行渲染与当前进程串行渲染对比
+    table_rows = [build_table_rows(projects) for projects in [crypto_list, *platform_projects.values()] if projects]
+    renderer = get_render_service()
+    renderer.prewarm()
+
+    async def render_tables_pool():
+        return await asyncio.gather(*(renderer.render_rows(rows) for rows in table_rows))
+
+    def render_tables_inline():
+        return [render_table_png(rows) for rows in table_rows]
+
+    async def webhook_push():
+        return await send_message_async("基准测试消息")
+
+    return [
+        Benchmark("extract_token_names", lambda: extract_token_names(raw_symbols), 50),
+        Benchmark("parse_exchange_info", lambda: parse_exchange_symbols(exchange_info), 20),
+        Benchmark("parse_exchange_info_json",
+                  lambda: [s["symbol"] for s in json.loads(exchange_info_body)["symbols"]], 20),
+        Benchmark("serialize_json_stdlib", serialize_stdlib, 20),
+        Benchmark("serialize_json", lambda: dump_file(serialize_path, cmc_listing), 20),
+        Benchmark("serialize_json_compact", lambda: dump_file(serialize_path, cmc_listing, pretty=False), 20),
+        Benchmark("deserialize_json_stdlib", deserialize_stdlib, 20),
+        Benchmark("deserialize_json", lambda: load_file(serialize_path), 20),
+        Benchmark("fetch_symbols", fetch_symbols, 20),
+        Benchmark("fetch_exchange_info_full", fetch_exchange_info_full, 20),
+        Benchmark("update_tokens", lambda: update_tokens(symbols_dir=symbols_dir), 10),
+        Benchmark("is_token_listed", lambda: [is_token_listed(s, symbol_list_path) for s in lookup_symbols], 10),
+        Benchmark("cmc_fetch", cmc_fetch, 20, is_async=True),
+        Benchmark("parse_projects", lambda: parse_projects(raw_crypto_list), 50),
+        Benchmark("classify_crypto_projects_by_platform", classify, 50),
+        Benchmark("filter_pipeline", filter_pipeline, 50),
+        Benchmark("create_complete_prompt",
+                  lambda: advisor._create_complete_prompt(largest_platform, date, alpha_data["data"]["cryptoCurrencyList"]), 50),
+        Benchmark("get_investment_advice", lambda: advisor.get_investment_advice(alpha_data, max_retries=1), 10),
+        Benchmark("split_message", lambda: split_message(advice_text), 500),
+        Benchmark("webhook_push", webhook_push, 20, is_async=True),
+        Benchmark("create_alpha_table_image", lambda: create_alpha_table_image(crypto_list, date), 3),
+        Benchmark("render_tables_inline", render_tables_inline, 3),
+        Benchmark("render_tables_pool", render_tables_pool, 3, is_async=True),
+    ]
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """与基线对比，返回p50延迟超过容忍度的用例说明"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: p50 {base['p50_ms']}ms -> {result['p50_ms']}ms (x{ratio:.2f})")
+    return regressions
+
+
+def format_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """将结果格式化为表格"""
+    header = f"{'benchmark':<40}{'iter':>6}{'ops/sec':>12}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}{'rss(MB)':>10}{'heap(MB)':>10}{'vs base':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        base = (baseline or {}).get("results", {}).get(name)
+        delta = f"x{r['p50_ms'] / base['p50_ms']:.2f}" if base and base["p50_ms"] else "-"
+        lines.append(f"{name:<40}{r['iterations']:>6}{r['ops_per_sec']:>12}{r['p50_ms']:>12}{r['p95_ms']:>12}"
+                     f"{r['p99_ms']:>12}{str(r['peak_rss_mb']):>10}{str(r.get('heap_peak_mb') or '-'):>10}{delta:>10}")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="币安Alpha流水线基准测试")
+    parser.add_argument("--only", type=str, nargs="*", help="只运行指定的用例")
+    parser.add_argument("--iterations", type=int, help="覆盖所有用例的迭代次数")
+    parser.add_argument("--tracemalloc", action="store_true", help="统计单次调用的Python堆峰值")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="p50延迟允许超出基线的比例")
+    parser.add_argument("--output", type=str, help="将本次结果保存为JSON文件")
+    args = parser.parse_args()
+
+    stubs = StubServers().start()
+
+    # 必须在导入config之前设置，使所有外部请求指向桩服务器
+    os.environ.update({
+        "USE_PROXY": "false",
+        "TRACE_ENABLED": "false",
+        "BINANCE_EXCHANGE_INFO_URL": stubs.urls["exchange_info"],
+        "CMC_LISTING_URL": stubs.urls["cmc_listing"],
+        "DEEPSEEK_API_URL": stubs.urls["deepseek"],
+        "DEEPSEEK_API_KEY": "benchmark",
+        "WEBHOOK_URL": stubs.urls["webhook"],
+    })
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="alpha-bench-") as work_dir:
+        # 流水线按相对路径写data/目录，切换到临时目录避免污染仓库
+        previous_cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            logging.disable(logging.CRITICAL)
+            # 图片渲染时缺少中文字体会产生大量警告
+            warnings.filterwarnings("ignore", category=UserWarning)
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            benchmarks = build_benchmarks(stubs, work_dir)
+            for bench in benchmarks:
+                if args.only and bench.name not in args.only:
+                    continue
+                results[bench.name] = measure(bench, loop, args.iterations, trace_memory=args.tracemalloc)
+                print(f"完成: {bench.name}", file=sys.stderr)
+            from src.utils.http_client import close_async_session
+            loop.run_until_complete(close_async_session())
+            loop.close()
+        finally:
+            logging.disable(logging.NOTSET)
+            os.chdir(previous_cwd)
+            stubs.stop()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(format_results(results, baseline))
+    print(f"桩服务器请求数: {stubs.requests}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存到: {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\n发现性能回退:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+本地桩服务器
+在后台线程中启动aiohttp服务，模拟币安exchangeInfo、CMC列表、DeepSeek对话补全和webhook接口，
+每个接口的延迟分布、429/5xx注入、推理模型截断响应和SSE流式输出均可配置
+"""
+
+import json
+import math
+import hashlib
+import random
+import asyncio
+import threading
+from itertools import cycle
+from typing import Dict, List, Any, Optional
+
+from aiohttp import web
+
+from benchmarks import fixtures
+
+ENDPOINTS = ("exchange_info", "cmc_listing", "deepseek", "webhook")
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class EndpointBehavior:
+    """单个接口的可控行为"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, distribution: str = "fixed",
+                 error_rate: float = 0.0, error_statuses: Optional[List[int]] = None, retry_after: Optional[int] = None,
+                 truncate_rate: float = 0.0, chunk_delay_ms: float = 0.0):
+        """初始化接口行为
+
+        Args:
+            latency_ms: 响应延迟（毫秒），lognormal/exponential分布下为中位数/均值
+            jitter_ms: uniform分布下的波动范围；lognormal分布下为p95与中位数之差
+            distribution: 延迟分布，fixed/uniform/exponential/lognormal
+            error_rate: 注入错误响应的概率
+            error_statuses: 注入的HTTP状态码，随机选择其一，默认[429, 500, 502, 503]
+            retry_after: 429响应中Retry-After头的秒数
+            truncate_rate: 返回截断推理响应（content为空，仅有reasoning_content）的概率，仅对deepseek生效
+            chunk_delay_ms: SSE流式响应中每个分块之间的间隔（毫秒）
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"不支持的延迟分布: {distribution}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 502, 503]
+        self.retry_after = retry_after
+        self.truncate_rate = truncate_rate
+        self.chunk_delay_ms = chunk_delay_ms
+
+    @classmethod
+    def parse(cls, spec: str) -> "EndpointBehavior":
+        """从命令行格式解析，如"latency=800,jitter=400,dist=lognormal,errors=0.1,statuses=429/503,truncate=0.2"
+
+        Args:
+            spec: 逗号分隔的key=value列表
+
+        Returns:
+            EndpointBehavior: 接口行为
+        """
+        keys = {"latency": ("latency_ms", float), "jitter": ("jitter_ms", float), "dist": ("distribution", str),
+                "errors": ("error_rate", float), "retry_after": ("retry_after", int),
+                "truncate": ("truncate_rate", float), "chunk_delay": ("chunk_delay_ms", float)}
+        kwargs: Dict[str, Any] = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            key, _, value = item.partition('=')
+            if key == "statuses":
+                kwargs["error_statuses"] = [int(s) for s in value.split('/')]
+            elif key in keys:
+                name, cast = keys[key]
+                kwargs[name] = cast(value)
+            else:
+                raise ValueError(f"未知的接口行为参数: {key}")
+        return cls(**kwargs)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """按配置的分布采样一次延迟（秒）"""
+        if self.latency_ms <= 0:
+            return 0.0
+        if self.distribution == "uniform":
+            value = rng.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == "exponential":
+            value = rng.expovariate(1.0 / self.latency_ms)
+        elif self.distribution == "lognormal":
+            # 以latency_ms为中位数，latency_ms + jitter_ms为p95
+            sigma = math.log((self.latency_ms + self.jitter_ms) / self.latency_ms) / 1.645 if self.jitter_ms > 0 else 0
+            value = rng.lognormvariate(math.log(self.latency_ms), sigma)
+        else:
+            value = self.latency_ms
+        return max(value, 0.0) / 1000
+
+
+class StubServers:
+    """所有外部服务的本地替身，启动后通过urls获取各接口地址"""
+
+    def __init__(self, exchange_symbols: Optional[List[str]] = None, cmc_listing: Optional[Dict[str, Any]] = None,
+                 advice_samples: Optional[List[str]] = None, behaviors: Optional[Dict[str, EndpointBehavior]] = None,
+                 seed: int = 42):
+        """初始化桩服务器
+
+        Args:
+            exchange_symbols: exchangeInfo返回的交易对列表，默认为最新的原始快照
+            cmc_listing: CMC列表响应，默认为benchmarks/data/cmc_listing.json
+            advice_samples: DeepSeek返回的建议文本，默认为最近的历史建议
+            behaviors: 各接口的可控行为，键为ENDPOINTS中的名称，未配置的接口立即正常响应
+            seed: 延迟采样和故障注入的随机种子
+        """
+        symbols = exchange_symbols if exchange_symbols is not None else fixtures.load_raw_snapshot()
+        # 响应体预先序列化，避免把桩服务器的序列化开销计入被测代码
+        self._exchange_info = json.dumps(fixtures.build_exchange_info(symbols)).encode('utf-8')
+        self._cmc_listing = json.dumps(cmc_listing or fixtures.load_cmc_listing()).encode('utf-8')
+        self._etags = {
+            "exchange_info": '"%s"' % hashlib.sha1(self._exchange_info).hexdigest(),
+            "cmc_listing": '"%s"' % hashlib.sha1(self._cmc_listing).hexdigest(),
+        }
+        self._advices = cycle(advice_samples or fixtures.load_advice_samples())
+
+        self.behaviors: Dict[str, EndpointBehavior] = dict(behaviors or {})
+        self._rng = random.Random(seed)
+        self.requests: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.base_url = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def urls(self) -> Dict[str, str]:
+        """各接口地址"""
+        return {
+            "exchange_info": f"{self.base_url}/api/v3/exchangeInfo",
+            "cmc_listing": f"{self.base_url}/data-api/v3/cryptocurrency/listing",
+            "deepseek": f"{self.base_url}/v1/chat/completions",
+            "webhook": f"{self.base_url}/webhook",
+        }
+
+    def set_behavior(self, endpoint: str, behavior: Optional[EndpointBehavior]) -> None:
+        """运行中调整接口行为，传入None恢复为正常响应"""
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"未知的接口: {endpoint}")
+        if behavior is None:
+            self.behaviors.pop(endpoint, None)
+        else:
+            self.behaviors[endpoint] = behavior
+
+    def reset_stats(self) -> None:
+        """清空请求统计"""
+        self.requests = {}
+        self.stats = {}
+
+    def _count(self, endpoint: str, field: str = "requests") -> None:
+        stats = self.stats.setdefault(endpoint, {"requests": 0, "errors": 0, "truncated": 0, "streamed": 0,
+                                                  "not_modified": 0})
+        stats[field] += 1
+        if field == "requests":
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    @web.middleware
+    async def _behavior_middleware(self, request: web.Request, handler):
+        """按接口配置注入延迟和错误响应"""
+        endpoint = request.match_info.route.name
+        self._count(endpoint)
+        behavior = self.behaviors.get(endpoint)
+        if behavior is None:
+            return await handler(request)
+
+        delay = behavior.sample_latency(self._rng)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if behavior.error_rate and self._rng.random() < behavior.error_rate:
+            self._count(endpoint, "errors")
+            await request.read()
+            status = self._rng.choice(behavior.error_statuses)
+            headers = {}
+            if status == 429 and behavior.retry_after is not None:
+                headers["Retry-After"] = str(behavior.retry_after)
+            return web.json_response({"error": {"message": f"injected status {status}", "code": status}},
+                                     status=status, headers=headers)
+        return await handler(request)
+
+    def _conditional_response(self, request: web.Request, endpoint: str, body: bytes) -> web.Response:
+        """带ETag的响应，If-None-Match匹配时返回304"""
+        etag = self._etags[endpoint]
+        if request.headers.get("If-None-Match") == etag:
+            self._count(endpoint, "not_modified")
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def _handle_exchange_info(self, request: web.Request) -> web.Response:
+        return self._conditional_response(request, "exchange_info", self._exchange_info)
+
+    async def _handle_cmc_listing(self, request: web.Request) -> web.Response:
+        return self._conditional_response(request, "cmc_listing", self._cmc_listing)
+
+    def _completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """生成一次对话补全结果，按truncate_rate返回推理模型被截断的形态"""
+        behavior = self.behaviors.get("deepseek")
+        prompt = payload["messages"][-1]["content"]
+        content = next(self._advices)
+        reasoning = "基准测试桩服务器的推理过程。"
+        finish_reason = "stop"
+        if behavior and behavior.truncate_rate and self._rng.random() < behavior.truncate_rate:
+            self._count("deepseek", "truncated")
+            # 推理耗尽max_tokens时content为空，只返回reasoning_content
+            reasoning = reasoning * 200
+            content = ""
+            finish_reason = "length"
+        return {
+            "model": payload.get("model", "deepseek-reasoner"),
+            "content": content,
+            "reasoning_content": reasoning,
+            "finish_reason": finish_reason,
+            # 按字符数粗略估算token用量
+            "usage": {"prompt_tokens": len(prompt) // 2, "completion_tokens": (len(content) + len(reasoning)) // 2,
+                      "total_tokens": (len(prompt) + len(content) + len(reasoning)) // 2},
+        }
+
+    async def _handle_chat_completions(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        completion = self._completion(payload)
+        if payload.get("stream"):
+            return await self._stream_completion(request, completion)
+        return web.json_response({
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "model": completion["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": completion["content"],
+                            "reasoning_content": completion["reasoning_content"]},
+                "finish_reason": completion["finish_reason"],
+            }],
+            "usage": completion["usage"],
+        })
+
+    async def _stream_completion(self, request: web.Request, completion: Dict[str, Any]) -> web.StreamResponse:
+        """以SSE格式分块输出，先推理内容后正文，最后一块带finish_reason和usage"""
+        self._count("deepseek", "streamed")
+        behavior = self.behaviors.get("deepseek")
+        chunk_delay = (behavior.chunk_delay_ms / 1000) if behavior else 0
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(delta: Dict[str, Any], finish_reason: Optional[str] = None, usage=None):
+            chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "model": completion["model"],
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            if usage:
+                chunk["usage"] = usage
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+
+        await send({"role": "assistant", "content": "", "reasoning_content": ""})
+        for field in ("reasoning_content", "content"):
+            text = completion[field]
+            for start in range(0, len(text), 200):
+                await send({field: text[start:start + 200]})
+        await send({}, completion["finish_reason"], completion["usage"])
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        await request.read()
+        return web.json_response({"errcode": 0, "errmsg": "ok"})
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024, middlewares=[self._behavior_middleware])
+        app.router.add_get("/api/v3/exchangeInfo", self._handle_exchange_info, name="exchange_info")
+        app.router.add_get("/data-api/v3/cryptocurrency/listing", self._handle_cmc_listing, name="cmc_listing")
+        app.router.add_post("/v1/chat/completions", self._handle_chat_completions, name="deepseek")
+        app.router.add_post("/webhook", self._handle_webhook, name="webhook")
+        return app
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self._build_app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> "StubServers":
+        """在后台线程中启动服务器，返回自身"""
+        self._thread = threading.Thread(target=self._serve, name="bench-stubs", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout=10):
+            raise RuntimeError("桩服务器启动超时")
+        return self
+
+    def stop(self) -> None:
+        """停止服务器"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
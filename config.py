@@ -13,7 +13,7 @@ IS_DOCKER = os.getenv('IS_DOCKER', 'false').lower() == 'true'
 
 # 根据运行环境选择代理地址
 PROXY_URL = 'http://host.docker.internal:7890' if IS_DOCKER else 'http://127.0.0.1:7890'
-USE_PROXY = True
+USE_PROXY = os.getenv('USE_PROXY', 'true').lower() == 'true'
 
 # 文件路径配置
 DATA_DIRS = {
@@ -24,7 +24,14 @@ DATA_DIRS = {
     'records': 'investment_records', # 投资建议记录保存目录
     'debug': 'debug_logs',          # 调试日志保存目录
     'data': 'data',                 # 市场数据保存目录
-    'symbols': 'symbols'            # 符号保存目录
+    'symbols': 'symbols',           # 符号保存目录
+    'analytics': 'data/analytics',  # 分析索引保存目录
+    'traces': 'data/traces',        # 运行追踪保存目录
+    'http_cache': 'data/http_cache', # 条件请求缓存目录
+    'render_cache': 'data/render_cache', # 表格图片渲染缓存目录
+    'viewer_bundle': 'docs-viewer/public/advices', # 文档查看器数据包目录
+    'snapshots': 'data/snapshots',  # 投资建议输入快照目录
+    'advice_store': 'data/advice_store' # 按输入摘要保存的投资建议目录
 }
 
 # 区块链平台配置
@@ -48,7 +55,40 @@ BLOCK_TOKEN_LIST = ["AITECH","BROCCOLI"]
 # 市场情绪指标配置
 MARKET_SENTIMENT = {
     # API端点
-    'binance_alpha_url': 'https://api.coinmarketcap.com/data-api/v3/cryptocurrency/listing',  # 币安Alpha项目列表API
+    'binance_alpha_url': os.getenv('CMC_LISTING_URL', 'https://api.coinmarketcap.com/data-api/v3/cryptocurrency/listing'),  # 币安Alpha项目列表API
+}
+
+# 币安API配置
+BINANCE_API = {
+    'exchange_info_url': os.getenv('BINANCE_EXCHANGE_INFO_URL', 'https://api.binance.com/api/v3/exchangeInfo'),  # 交易对信息API
+}
+
+# 提示词模板版本，写入建议索引用于回测按模板分组
+# v2: templates/v2.txt（仅推荐3个代币的早期提示词）
+# v3: AlphaAdvisor内置的四大因素加权评分提示词（输出TOP3总评分表格）
+# v4: v3附带同平台近期上线币安现货的Alpha项目作为参照
+# v5: v4的每个项目附带由本地历史快照计算的趋势特征和趋势预评分
+PROMPT_TEMPLATE_VERSION = os.getenv('PROMPT_TEMPLATE_VERSION', 'v5')
+
+# 提示词中每个平台包含的项目数量（按市值排序的前N个）
+PROMPT_PROJECT_LIMIT = int(os.getenv('PROMPT_PROJECT_LIMIT', '15'))
+
+# 上币时间线配置（由symbols/raw快照序列构建的token首次/最后出现索引）
+LISTING_TIMELINE = {
+    'recent_days': int(os.getenv('RECENT_LISTING_DAYS', '30')),          # 多少天内首次出现的token视为近期上线
+    'prompt_peers': os.getenv('PROMPT_RECENT_PEERS', 'true').lower() == 'true',  # 提示词中附带同平台近期上线现货的Alpha项目
+    'peer_limit': int(os.getenv('PROMPT_RECENT_PEER_LIMIT', '5'))        # 提示词中附带的近期上线项目数量
+}
+
+# 跨快照趋势特征配置（由本地保存的Alpha历史快照批量计算，写入提示词）
+TREND_FEATURES = {
+    'enabled': os.getenv('TREND_FEATURES_ENABLED', 'true').lower() == 'true',  # 是否记录历史快照并在提示词中附带趋势特征
+    'min_interval': int(os.getenv('TREND_SNAPSHOT_INTERVAL', '3600')),   # 两份历史快照的最小间隔（秒）
+    'max_days': int(os.getenv('TREND_HISTORY_DAYS', '90')),              # 历史快照保留天数
+    'window_days': float(os.getenv('TREND_WINDOW_DAYS', '7')),           # 放量持续性、波动率和排名变化的统计窗口（天）
+    'min_snapshots': int(os.getenv('TREND_MIN_SNAPSHOTS', '3')),         # 窗口内少于该快照数时不计算窗口特征和预评分
+    'persistence_floor': float(os.getenv('TREND_PERSISTENCE_FLOOR', '0.5')),  # 交易量不低于窗口均值的该比例视为持续放量
+    'score_weights': None                                                # 预评分的特征权重，None时使用默认权重
 }
 
 # DeepSeek AI 配置
@@ -62,3 +102,188 @@ DEEPSEEK_AI = {
     'stream': False,
     'timeout': int(os.getenv('DEEPSEEK_API_TIMEOUT', '600'))  # API请求超时时间(秒)
 }
+
+# 模型后端（OpenAI兼容接口），未配置地址、模型或必需密钥的后端不参与路由；
+# endpoint为RESILIENCE['endpoints']中的容错策略名称，input_cost/output_cost为每百万token的价格(美元)，
+# temperature、max_tokens、top_p、stream未指定时使用DEEPSEEK_AI中的值，metered为False的后端不计入每日token上限
+MODEL_BACKENDS = [
+    {'name': 'deepseek', 'api_url': DEEPSEEK_AI['api_url'], 'model': DEEPSEEK_AI['model'],
+     'api_key': DEEPSEEK_AI['api_key'], 'requires_key': True, 'endpoint': 'deepseek',
+     'input_cost': float(os.getenv('DEEPSEEK_INPUT_COST', '0.55')),
+     'output_cost': float(os.getenv('DEEPSEEK_OUTPUT_COST', '2.19'))},
+    # 备用模型，如deepseek-chat，设置DEEPSEEK_FALLBACK_MODEL后启用
+    {'name': 'deepseek_fallback', 'api_url': DEEPSEEK_AI['api_url'], 'model': os.getenv('DEEPSEEK_FALLBACK_MODEL', ''),
+     'api_key': DEEPSEEK_AI['api_key'], 'requires_key': True, 'endpoint': 'deepseek_fallback',
+     'max_tokens': int(os.getenv('DEEPSEEK_FALLBACK_MAX_TOKENS', '8000')),
+     'input_cost': float(os.getenv('DEEPSEEK_FALLBACK_INPUT_COST', '0.27')),
+     'output_cost': float(os.getenv('DEEPSEEK_FALLBACK_OUTPUT_COST', '1.10'))},
+    # 本地llama.cpp/vLLM服务，设置LOCAL_LLM_URL（如http://127.0.0.1:8080/v1/chat/completions）后启用
+    {'name': 'local', 'api_url': os.getenv('LOCAL_LLM_URL', ''), 'model': os.getenv('LOCAL_LLM_MODEL', 'local'),
+     'api_key': os.getenv('LOCAL_LLM_API_KEY', ''), 'requires_key': False, 'endpoint': 'local_llm',
+     'max_tokens': int(os.getenv('LOCAL_LLM_MAX_TOKENS', '8192')), 'input_cost': 0.0, 'output_cost': 0.0,
+     'metered': False},
+]
+
+# 模型路由配置
+MODEL_ROUTING = {
+    'policy': os.getenv('MODEL_ROUTING_POLICY', 'priority'),          # priority / fastest / cost_capped / hedged
+    'cost_cap': float(os.getenv('MODEL_COST_CAP', '0.1')),            # cost_capped策略下单次请求的预估费用上限(美元)
+    'hedge_percentile': 95,                                           # hedged策略按首选后端延迟的该分位数发出对冲请求
+    'hedge_min': 30,                                                  # 对冲等待的下限(秒)
+    'hedge_default': float(os.getenv('MODEL_HEDGE_DEFAULT', '240')),  # 没有延迟样本时的对冲等待(秒)
+    'ewma_alpha': 0.3,                                                # 延迟和错误率EWMA的平滑系数
+    'max_error_rate': 0.5,                                            # 错误率EWMA达到该值的后端视为不健康，排在健康后端之后
+    'error_half_life': float(os.getenv('MODEL_ERROR_HALF_LIFE', '1800')),  # 未尝试期间错误率EWMA的半衰期(秒)，不健康的后端之后恢复尝试
+    'window': 50,                                                     # 每个后端保留的延迟样本数量
+}
+
+# AI调用用量账本和每日预算（data/analytics/usage_ledger.db）
+USAGE_LEDGER = {
+    'enabled': os.getenv('USAGE_LEDGER_ENABLED', 'true').lower() == 'true',
+    'daily_token_cap': int(os.getenv('DAILY_TOKEN_CAP', '0')),      # 每日token上限（metered后端），0表示不限制
+    'daily_cost_cap': float(os.getenv('DAILY_COST_CAP', '0')),      # 每日费用上限(美元)，0表示不限制
+    # 超出上限时依次尝试降级到的后端，都不满足时跳过该平台（沿用上一次的建议）
+    'downgrade_backends': [name for name in os.getenv('BUDGET_DOWNGRADE_BACKENDS', 'deepseek_fallback,local').split(',')
+                           if name],
+    'prompt_tokens_estimate': 6000,                                 # 没有历史记录时预估的提示词token数
+    'history': 10,                                                  # 按最近N次成功调用的平均用量预估
+}
+
+# 截断回答的续写与max_tokens自适应
+CONTINUATION = {
+    'enabled': os.getenv('CONTINUATION_ENABLED', 'true').lower() == 'true',
+    'max_rounds': 2,                                            # 最多续写轮数
+    'backend': os.getenv('CONTINUATION_BACKEND', ''),           # 续写使用的后端（如deepseek_fallback），为空时使用原后端
+    'max_tokens': int(os.getenv('CONTINUATION_MAX_TOKENS', '12000')),  # 续写请求的max_tokens
+    'reasoning_chars': 6000,                                    # 只有推理内容时附带的推理摘要长度（字符）
+    'adaptive_max_tokens': os.getenv('ADAPTIVE_MAX_TOKENS', 'true').lower() == 'true',
+    'min_samples': 3,                                           # 至少观察到N次请求后才调整max_tokens
+    'headroom': 1.3,                                            # max_tokens为最近完成token数p95的倍数
+    'min_max_tokens': 16000,                                    # 调整后max_tokens的下限（后端配置的max_tokens更低时以后者为准）
+    'max_max_tokens': 64000,                                    # 调整后max_tokens的上限，同时不超过后端配置的max_tokens
+    'window': 20,                                               # 每个平台和模型保留的样本数量
+}
+
+# 容错策略配置（重试预算、退避、截止时间、对冲请求和熔断）
+RESILIENCE = {
+    'run_deadline': float(os.getenv('RUN_DEADLINE', '5400')),  # 单次运行的总截止时间(秒)，按阶段向下分配
+    'retry_window': 300,                                         # 重试预算的统计窗口(秒)
+    # max_attempts: 最大尝试次数; base_delay/max_delay: 退避区间(秒); timeout: 单次请求读取超时(秒)
+    # retry_ratio/min_retries: 重试预算，窗口内重试次数不超过 min_retries + retry_ratio × 请求次数
+    # hedge_after: 幂等GET请求超过该秒数未返回时发出对冲请求，None表示不对冲
+    # failure_threshold/reset_timeout: 连续失败多少次后熔断，熔断多少秒后半开试探
+    'endpoints': {
+        'binance': {'max_attempts': 3, 'base_delay': 0.5, 'max_delay': 8, 'timeout': 30, 'retry_ratio': 0.2,
+                    'min_retries': 5, 'hedge_after': 5, 'failure_threshold': 5, 'reset_timeout': 60},
+        'cmc': {'max_attempts': 3, 'base_delay': 1.0, 'max_delay': 10, 'timeout': 30, 'retry_ratio': 0.2,
+                'min_retries': 5, 'hedge_after': 5, 'failure_threshold': 5, 'reset_timeout': 60},
+        'deepseek': {'max_attempts': 3, 'base_delay': 2.0, 'max_delay': 60, 'timeout': DEEPSEEK_AI['timeout'],
+                     'retry_ratio': 0.5, 'min_retries': 3, 'hedge_after': None, 'failure_threshold': 4,
+                     'reset_timeout': 300},
+        'deepseek_fallback': {'max_attempts': 2, 'base_delay': 2.0, 'max_delay': 30,
+                              'timeout': int(os.getenv('DEEPSEEK_FALLBACK_TIMEOUT', '180')), 'retry_ratio': 0.5,
+                              'min_retries': 3, 'hedge_after': None, 'failure_threshold': 4, 'reset_timeout': 300},
+        'local_llm': {'max_attempts': 2, 'base_delay': 1.0, 'max_delay': 10,
+                      'timeout': int(os.getenv('LOCAL_LLM_TIMEOUT', '300')), 'retry_ratio': 0.5, 'min_retries': 3,
+                      'hedge_after': None, 'failure_threshold': 3, 'reset_timeout': 120},
+        'webhook': {'max_attempts': 3, 'base_delay': 0.5, 'max_delay': 5, 'timeout': 10, 'retry_ratio': 0.2,
+                    'min_retries': 5, 'hedge_after': None, 'failure_threshold': 5, 'reset_timeout': 60},
+        'http': {'max_attempts': 2, 'base_delay': 1.0, 'max_delay': 10, 'timeout': 30, 'retry_ratio': 0.2,
+                 'min_retries': 3, 'hedge_after': None, 'failure_threshold': 5, 'reset_timeout': 60},
+    }
+}
+
+# HTTP客户端配置（进程内共享的连接池）
+HTTP_CLIENT = {
+    'pool_size': int(os.getenv('HTTP_POOL_SIZE', '32')),                    # 连接池总连接数
+    'pool_per_host': int(os.getenv('HTTP_POOL_PER_HOST', '8')),             # 每个主机的最大连接数
+    'keepalive_timeout': float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '60')),  # 空闲连接保持时间(秒)
+    'dns_ttl': int(os.getenv('HTTP_DNS_TTL', '300')),                       # DNS缓存有效期(秒)
+    'connect_timeout': float(os.getenv('HTTP_CONNECT_TIMEOUT', '10')),      # 建立连接超时(秒)
+    'read_timeout': float(os.getenv('HTTP_READ_TIMEOUT', '30'))             # 默认读取超时(秒)
+}
+
+# JSON序列化配置
+SERIALIZATION = {
+    'backend': os.getenv('JSON_BACKEND', 'auto'),                     # auto / orjson / ujson / json
+    'compact': os.getenv('JSON_COMPACT', 'false').lower() == 'true'   # 紧凑输出（不缩进），体积更小、写入更快
+}
+
+# 调试产物配置（筛选后的项目列表、各平台项目列表、提示词、表格图片）
+DEBUG_ARTIFACTS = {
+    'level': os.getenv('DEBUG_ARTIFACTS_LEVEL', 'full'),                          # off / summary / full
+    'sample_rate': float(os.getenv('DEBUG_ARTIFACTS_SAMPLE_RATE', '1.0')),        # 按运行采样的比例
+    'compression': os.getenv('DEBUG_ARTIFACTS_COMPRESSION', 'gzip'),              # zstd / gzip / none
+    'max_bytes': int(float(os.getenv('DEBUG_ARTIFACTS_MAX_MB', '200')) * 1024 * 1024),  # 每个目录的总大小上限
+    'max_files': int(os.getenv('DEBUG_ARTIFACTS_MAX_FILES', '500')),              # 每个目录的文件数上限
+    'max_age_days': float(os.getenv('DEBUG_ARTIFACTS_MAX_AGE_DAYS', '14')),       # 保留天数
+    'queue_size': int(os.getenv('DEBUG_ARTIFACTS_QUEUE_SIZE', '64')),             # 后台写入队列长度
+    'flush_timeout': float(os.getenv('DEBUG_ARTIFACTS_FLUSH_TIMEOUT', '30'))      # 运行结束时等待写完的最长时间(秒)
+}
+
+# 表格图片渲染配置（matplotlib渲染在进程池中执行，不阻塞事件循环）
+RENDERING = {
+    'pool_enabled': os.getenv('RENDER_POOL_ENABLED', 'true').lower() == 'true',     # 关闭时在线程中串行渲染
+    'workers': int(os.getenv('RENDER_WORKERS', str(min(4, os.cpu_count() or 1)))),  # 渲染进程数
+    'start_method': os.getenv('RENDER_START_METHOD', 'spawn'),                      # spawn / forkserver / fork
+    'max_items': int(os.getenv('RENDER_MAX_ITEMS', '100')),                          # 每张表格的最大项目数
+    'platform_tables': os.getenv('RENDER_PLATFORM_TABLES', 'true').lower() == 'true' # 同时渲染并推送各平台的项目表格
+}
+
+# 事件循环延迟监控配置（回调阻塞事件循环超过阈值时告警并记录调用栈）
+LOOP_MONITOR = {
+    'enabled': os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true',
+    'threshold': float(os.getenv('LOOP_LAG_THRESHOLD', '0.25')),  # 阻塞告警阈值(秒)
+    'interval': float(os.getenv('LOOP_MONITOR_INTERVAL', '0.05'))  # 心跳间隔(秒)
+}
+
+# 表格图片渲染缓存配置（按单元格内容摘要复用图片）
+RENDER_CACHE = {
+    'enabled': os.getenv('RENDER_CACHE_ENABLED', 'true').lower() == 'true',
+    'unchanged_action': os.getenv('RENDER_UNCHANGED_ACTION', 'skip'),  # 内容与上次推送相同时: skip / notice / push
+    'changed_view': os.getenv('RENDER_CHANGED_VIEW', 'full')           # 内容变化时推送: full完整表格 / diff只含排名变动的行
+}
+
+# 文档查看器数据包配置（清单、预渲染HTML片段和搜索索引）
+VIEWER_BUNDLE = {
+    'enabled': os.getenv('VIEWER_BUNDLE_ENABLED', 'true').lower() == 'true',
+    'compression': [c for c in os.getenv('VIEWER_BUNDLE_COMPRESSION', 'gzip,brotli').split(',') if c],  # 预压缩格式，brotli需安装brotli包
+    'compact_after': int(os.getenv('VIEWER_BUNDLE_COMPACT_AFTER', '100'))  # 清单追加多少行后合并并重建索引
+}
+
+# 输入变化检测配置（与各平台上一次生成建议时的输入快照比较，变化不足时跳过AI建议和推送）
+CHANGE_DETECTION = {
+    'enabled': os.getenv('CHANGE_DETECTION_ENABLED', 'true').lower() == 'true',
+    'min_score': float(os.getenv('CHANGE_MIN_SCORE', '3')),                   # 实质变化评分阈值
+    'membership_weight': float(os.getenv('CHANGE_MEMBERSHIP_WEIGHT', '3')),   # 每个进入或移出前N的项目
+    'rank_threshold': int(os.getenv('CHANGE_RANK_THRESHOLD', '3')),           # 排名变动达到多少位计入
+    'rank_weight': float(os.getenv('CHANGE_RANK_WEIGHT', '1')),               # 每个排名变动的项目
+    'volume_threshold': float(os.getenv('CHANGE_VOLUME_THRESHOLD', '0.5')),   # 24h交易量相对变化达到多少计入
+    'volume_weight': float(os.getenv('CHANGE_VOLUME_WEIGHT', '1')),           # 每个交易量变化的项目
+    'max_age_hours': float(os.getenv('CHANGE_MAX_AGE_HOURS', '24'))           # 快照超过多少小时后无论变化与否都重新生成
+}
+
+# 投资建议产物存储配置（按输入摘要复用建议）
+ADVICE_STORE = {
+    'enabled': os.getenv('ADVICE_STORE_ENABLED', 'true').lower() == 'true',
+    'max_entries': int(os.getenv('ADVICE_STORE_MAX_ENTRIES', '30'))  # 每个平台保留的建议数量
+}
+
+# 条件请求缓存配置（ETag/Last-Modified和内容摘要）
+HTTP_CACHE = {
+    'enabled': os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true',
+    'sources': {
+        # 有效期(秒)内直接使用缓存不发送请求，0表示每次都发送条件请求
+        'binance_exchange_info': {'max_age': int(os.getenv('EXCHANGE_INFO_MAX_AGE', '0'))},
+        'cmc_listing': {'max_age': int(os.getenv('CMC_LISTING_MAX_AGE', '3600'))}
+    }
+}
+
+# 运行追踪配置
+TRACING = {
+    'enabled': os.getenv('TRACE_ENABLED', 'true').lower() == 'true',
+    'trace_dir': DATA_DIRS['traces'],                              # JSONL追踪文件目录
+    'prometheus_file': os.getenv('TRACE_PROMETHEUS_FILE', ''),     # Prometheus文本指标文件，留空不输出
+    'profiler': os.getenv('TRACE_PROFILER', ''),                   # 性能剖析器: cprofile / pyinstrument，留空不剖析
+    'profile_stages': [s for s in os.getenv('TRACE_PROFILE_STAGES', '').split(',') if s]  # 需要剖析的阶段，留空表示全部（嵌套的阶段只剖析最外层）
+}
@@ -15,6 +15,13 @@ if (!fs.existsSync(targetDir)) {
   fs.mkdirSync(targetDir, { recursive: true });
 }
 
+// Python端写入汇总报告时已发布数据包（manifest.jsonl、search.json和预渲染的HTML片段），
+// 查看器直接使用数据包，无需复制markdown文件
+if (fs.existsSync(path.join(targetDir, 'manifest.jsonl'))) {
+  console.log('✅ 已存在查看器数据包（manifest.jsonl），跳过生成 list.json');
+  process.exit(0);
+}
+
 // 读取源目录中的所有 .md 文件
 const files = fs.readdirSync(sourceDir)
   .filter(file => file.endsWith('.md'))
@@ -44,4 +51,5 @@ files.forEach(file => {
   fs.copyFileSync(sourceFile, targetFile);
 });
 
-console.log('✅ list.json 生成完成，MD 文件已复制到 public 目录'); 
\ No newline at end of file
+console.log('✅ list.json 生成完成，MD 文件已复制到 public 目录');
+console.log('提示：运行 python -m src.utils.viewer_bundle 可生成带搜索索引的查看器数据包'); 
\ No newline at end of file
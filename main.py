@@ -13,12 +13,30 @@ src_dir = os.path.join(os.path.dirname(__file__), 'src')
 sys.path.append(src_dir)
 
 # 导入自定义模块
-from config import DATA_DIRS, BLOCKCHAIN_PLATFORMS, PLATFORMS_TO_QUERY
+from config import DATA_DIRS, BLOCKCHAIN_PLATFORMS, PLATFORMS_TO_QUERY, PROMPT_TEMPLATE_VERSION, RESILIENCE, BLOCK_TOKEN_LIST, RENDERING, RENDER_CACHE, LISTING_TIMELINE, TREND_FEATURES
 from src.utils.historical_data import BinanceAlphaDataCollector
-from src.utils.binance_symbols import is_token_listed, update_tokens, check_token_listing_status
-from src.utils.crypto_formatter import format_project_summary, save_crypto_list_by_platform, save_crypto_data
+from src.utils.binance_symbols import load_listed_symbols, update_tokens_async, check_token_listing_status
+from src.utils.crypto_formatter import format_project_summary, save_crypto_list_by_platform
 from src.ai import AlphaAdvisor
-from src.utils.image_generator import create_alpha_table_image
+from src.ai.alpha_advisor import TRUNCATED_MARKER
+from src.ai.model_router import get_model_router
+from src.utils.image_generator import build_table_rows, save_table_image
+from src.utils.render_cache import RenderCache, ACTION_SKIP, ACTION_NOTICE, ACTION_PUSH, VIEW_DIFF
+from src.utils.render_service import get_render_service
+from src.utils.advice_index import index_advice_file, KIND_PLATFORM, KIND_COMBINED
+from src.utils.viewer_bundle import publish_report
+from src.utils.listing_timeline import get_listing_timeline
+from src.utils.trend_features import record_and_compute
+from src.utils.tracing import span, get_tracer
+from src.utils.loop_monitor import LoopLagMonitor
+from src.utils.http_client import close_async_session, connection_stats
+from src.utils.resilience import deadline_scope, current_deadline, resilience_snapshot
+from src.utils.debug_artifacts import get_debug_artifacts, close_debug_artifacts
+from src.utils.alpha_project import parse_projects, summarize_projects
+from src.utils.project_filters import ProjectFilterPipeline, listed_stage, blocked_stage
+from src.utils.change_detection import ChangeDetector
+from src.utils.advice_store import AdviceStore, inputs_digest
+from src.utils.usage_ledger import OUTCOME_REUSED, OUTCOME_BUDGET_SKIPPED, BUDGET_SKIP, BUDGET_DOWNGRADE
 
 # 配置日志
 logging.basicConfig(
@@ -37,7 +55,13 @@ async def get_binance_tokens():
     
     try:
         # 更新token列表
-        result = update_tokens()
+        with span("token_refresh") as stage, deadline_scope(fraction=0.1):
+            result = await update_tokens_async()
+            stage.set("symbols_changed", result["symbols_changed"])
+            stage.set("token_count", len(result["all_tokens"]))
+            # 交易对列表变化时保存了新的原始快照，增量更新上币时间线索引
+            if result["symbols_changed"]:
+                stage.set("timeline_snapshots", await asyncio.to_thread(lambda: get_listing_timeline().refresh()))
         
         if result["symbols_changed"]:
             print(f"交易对列表已更新")
@@ -94,7 +118,18 @@ async def get_binance_tokens():
         print(f"错误详情已记录到日志文件")
         return None
 
-async def get_binance_alpha_list(force_update=False, listed_tokens=None, debug_only=False, as_image=True):
+async def render_alpha_table(render_cache, crypto_list, listed_symbols):
+    """渲染Alpha项目列表表格（在渲染进程中执行，单元格内容与上次相同时复用缓存的图片）
+    
+    Args:
+        render_cache: 渲染缓存
+        crypto_list: 项目列表
+        listed_symbols: 已上线token集合
+    """
+    rows = build_table_rows(crypto_list, max_items=100, listed_symbols=listed_symbols)
+    return await render_cache.render(get_render_service(), "alpha_list", rows, max_items=100)
+
+async def get_binance_alpha_list(force_update=False, listed_tokens=None, debug_only=False, as_image=True, tokens_task=None):
     """获取币安Alpha项目列表数据并推送
     
     Args:
@@ -102,6 +137,7 @@ async def get_binance_alpha_list(force_update=False, listed_tokens=None, debug_o
         listed_tokens: 已上线币安的token列表
         debug_only: 是否仅调试（不推送）
         as_image: 是否以图片形式推送
+        tokens_task: 正在更新交易对列表的任务，与项目列表获取和表格渲染并行执行，完成后作为listed_tokens
     
     Returns:
         获取的Alpha数据或失败时返回False
@@ -117,58 +153,55 @@ async def get_binance_alpha_list(force_update=False, listed_tokens=None, debug_o
     try:
         # 获取币安Alpha项目列表数据
         print("正在获取币安Alpha项目列表数据...")
-        alpha_data = await collector.get_latest_data(force_update=force_update)
+        with span("cmc_fetch", force_update=force_update) as stage, deadline_scope(fraction=0.1):
+            alpha_data = await collector.get_latest_data(force_update=force_update)
+            stage.set("project_count", len(alpha_data.get("data", {}).get("cryptoCurrencyList", [])) if alpha_data else 0)
         
         if not alpha_data:
             logger.error("获取币安Alpha项目列表数据失败")
             print("错误: 获取币安Alpha项目列表数据失败")
             return False
         
-        # 提取数据进行处理和展示
-        crypto_list = alpha_data.get("data", {}).get("cryptoCurrencyList", [])
+        # 提取数据进行处理和展示，项目字典只在这里解析一次为AlphaProject，后续各阶段共享这些记录
+        crypto_list = parse_projects(alpha_data.get("data", {}).get("cryptoCurrencyList", []))
+        alpha_data.setdefault("data", {})["cryptoCurrencyList"] = crypto_list
         total_count = alpha_data.get("total_count", 0)
         
         print(f"获取到{len(crypto_list)}个币安Alpha项目，CoinMarketCap显示总共有{total_count}个项目")
         
-        # 检查币安已上线项目
-        if listed_tokens and listed_tokens.get('all_tokens'):
-            # 统计已上线的项目
-            already_listed_tokens = []
-            
-            for crypto in crypto_list:
-                symbol = crypto.get("symbol", "")
-                if not symbol:
-                    continue
-                
-                if is_token_listed(symbol):
-                    already_listed_tokens.append(symbol)
-
-            # 打印统计信息
-            print(f"已有{len(already_listed_tokens)}个项目上线币安现货")
-          
         if as_image:
-            # 创建图片表格
-            image_path, image_base64 = create_alpha_table_image(
-                crypto_list=crypto_list, 
-                date=alpha_data.get('date', ''),
-                max_items=100
-            )
+            # 创建图片表格（在渲染进程中执行，不阻塞事件循环；单元格内容与上次相同时复用缓存的图片）
+            # 交易对列表仍在更新时先按现有的已上线列表渲染，更新后已上线列表有变化再重新渲染
+            render_cache = RenderCache()
+            with span("image_render") as stage:
+                listed_symbols = await asyncio.to_thread(load_listed_symbols)
+                render_task = asyncio.create_task(render_alpha_table(render_cache, crypto_list, listed_symbols))
+                if tokens_task is not None:
+                    listed_tokens = await tokens_task
+                table = await render_task
+                if listed_tokens and listed_tokens.get("symbols_changed"):
+                    updated_symbols = await asyncio.to_thread(load_listed_symbols)
+                    if updated_symbols != listed_symbols:
+                        table = await render_alpha_table(render_cache, crypto_list, updated_symbols)
+                        stage.set("rerendered", True)
+                image_path, image_base64 = (table.path, table.base64()) if table.cached \
+                    else await asyncio.to_thread(save_table_image, table.image_data)
+                stage.set("bytes_out", len(image_base64))
+                stage.set("cache_hit", table.cached)
+                stage.set("changed", table.changed)
+                stage.set("view", table.view)
             
             # 发送图片消息
             print(f"准备发送表格图片到webhook...")
             
-            if not debug_only:
-                from webhook import send_image_async
-                summary_message = f"📊 币安Alpha项目列表 (更新时间: {alpha_data.get('date')})\n"
-                summary_message += "🔝 Top 100 币安Alpha项目 (按市值排序):"
-                
-                await send_image_async(
-                    image_path=image_path, 
-                    image_base64=image_base64,
-                    title=summary_message
-                )
+            summary_message = f"📊 币安Alpha项目列表 (更新时间: {alpha_data.get('date')})\n"
+            summary_message += "🔝 Top 100 币安Alpha项目 (按市值排序):"
+            if await push_table_image(table, image_path, image_base64, summary_message, debug_only, render_cache):
                 print("表格图片已成功发送到webhook")
         else:
+            if tokens_task is not None:
+                listed_tokens = await tokens_task
+            
             # 原始文本方式
             # 构建消息内容
             message = f"📊 币安Alpha项目列表 (更新时间: {alpha_data.get('date')})\n\n"
@@ -178,7 +211,7 @@ async def get_binance_alpha_list(force_update=False, listed_tokens=None, debug_o
             # 添加前100个项目信息
             for i, crypto in enumerate(crypto_list[:100], 1):
                 # 使用crypto_formatter模块处理加密货币数据
-                status = check_token_listing_status(crypto.get("symbol", ""), listed_tokens) if listed_tokens else None
+                status = check_token_listing_status(crypto.symbol, listed_tokens) if listed_tokens else None
                 message += format_project_summary(crypto, i, status)
             
             # 向webhook发送消息
@@ -200,81 +233,24 @@ async def classify_crypto_projects_by_platform(crypto_list, platforms, platforms
     """将加密货币项目按区块链平台分类
     
     Args:
-        crypto_list: 加密货币项目列表
+        crypto_list: 加密货币项目列表（AlphaProject记录）
         platforms: 平台关键词字典
         platforms_to_process: 要处理的平台列表
         
     Returns:
         Tuple[Dict[str, List], List]: 按平台分类的项目字典和未分类的项目列表
     """
-    # 初始化平台项目字典
-    platform_projects = {platform: [] for platform in platforms_to_process}
-    
-    # 初始化未分类项目列表
-    unclassified_projects = []
-    
-    # 创建平台名称到标准名称的映射
-    platform_mapping = {}
-    for std_name, keywords in platforms.items():
-        for keyword in keywords:
-            platform_mapping[keyword.lower()] = std_name
-    
-    # 添加完整平台名称作为直接映射
-    for platform in platforms.keys():
-        platform_mapping[platform.lower()] = platform
-    
-    # 处理每个加密货币项目
-    for crypto in crypto_list:
-        # 获取项目的平台信息
-        platform_info = crypto.get("platform", {})
-        platform_name = platform_info.get("name", "") if platform_info else ""
-        
-        # 获取标签中的生态系统信息，作为备选分类依据
-        tags = [tag for tag in crypto.get("tags", []) if isinstance(tag, str)]
-        ecosystem_tags = [tag for tag in tags if "ecosystem" in tag.lower()]
-        
-        # 初始化分配标志
-        assigned = False
-        
-        # 通过platform.name直接匹配平台
-        if platform_name and platform_name in platform_mapping:
-            mapped_platform = platform_mapping[platform_name]
-            
-            # 检查映射的平台是否在我们要处理的平台中
-            if mapped_platform in platforms_to_process:
-                platform_projects[mapped_platform].append(crypto)
-                assigned = True
-            # 如果映射到了"Other"类别并且我们在处理该类别
-            elif mapped_platform == "Other" and "Other" in platforms_to_process:
-                platform_projects["Other"].append(crypto)
-                assigned = True
-        
-        # 如果未通过platform.name匹配成功，尝试通过标签匹配
-        if not assigned:
-            for tag in ecosystem_tags:
-                matched = False
-                # 检查标签是否匹配平台
-                for platform in platforms_to_process:
-                    platform_keywords = platforms.get(platform, [])
-                    # 使用简化的关键词匹配逻辑
-                    if any(keyword.lower() in tag.lower() for keyword in platform_keywords):
-                        platform_projects[platform].append(crypto)
-                        assigned = True
-                        matched = True
-                        break
-                
-                if matched:
-                    break
-        
-        # 如果仍然未分类，则添加到未分类列表
-        if not assigned:
-            unclassified_projects.append(crypto)
-    
-    # 如果有"Other"平台并且我们要处理它，将未分类的项目添加到Other类别
-    if "Other" in platforms_to_process:
-        platform_projects["Other"].extend(unclassified_projects)
-        unclassified_projects = []
+    result = ProjectFilterPipeline(platforms, platforms_to_process).run(crypto_list)
+    report_classification(result.platform_projects, result.unclassified)
+    return result.platform_projects, result.unclassified
+
+def report_classification(platform_projects, unclassified_projects):
+    """输出分类统计并保存各平台的项目列表
     
+    Args:
+        platform_projects: 按平台分类的项目字典
+        unclassified_projects: 未分类的项目列表
+    """
     # 输出分类统计
     print("\n按区块链平台分类结果:")
     for platform, projects in platform_projects.items():
@@ -283,11 +259,138 @@ async def classify_crypto_projects_by_platform(crypto_list, platforms, platforms
     if unclassified_projects:
         print(f"未分类: {len(unclassified_projects)}个项目")
     
-    # 使用crypto_formatter模块保存分类结果
+    # 使用crypto_formatter模块保存分类结果（调试产物，后台写入）
     saved_paths = save_crypto_list_by_platform(platform_projects)
-    print(f"\n已保存分类结果到data/platforms目录")
+    if saved_paths:
+        print(f"\n已保存分类结果到data/platforms目录")
+
+async def push_table_image(table, image_path, image_base64, title, debug_only=False, render_cache=None):
+    """按渲染缓存的结果推送表格图片
+    
+    内容与上次推送的相同时，按RENDER_CACHE['unchanged_action']跳过推送、发送"无实质变化"通知或仍然推送
+    
+    Args:
+        table: RenderCache.render()返回的渲染结果
+        image_path: 图片路径
+        image_base64: 图片base64编码
+        title: 图片标题
+        debug_only: 是否仅调试模式（不推送）
+        render_cache: 渲染缓存，推送成功后记录已推送的内容
+        
+    Returns:
+        bool: 是否推送了图片
+    """
+    if debug_only:
+        return False
+    
+    action = RENDER_CACHE.get('unchanged_action', ACTION_SKIP)
+    if not table.changed and action != ACTION_PUSH:
+        if action == ACTION_NOTICE:
+            await send_message_async(f"{title}\n与上次推送相比无实质变化")
+        else:
+            print("表格内容与上次推送相同，跳过推送")
+        return False
+    
+    if table.view == VIEW_DIFF:
+        title += "\n🔀 仅显示相对上次推送排名变动的项目"
+    
+    from webhook import send_image_async
+    success = await send_image_async(image_path=image_path, image_base64=image_base64, title=title)
+    if success and render_cache is not None:
+        await asyncio.to_thread(render_cache.mark_pushed, table)
+    return success
+
+async def send_platform_image(image_task, platform, platform_filename, date, debug_only=False, render_cache=None):
+    """等待平台表格渲染完成，保存并推送到webhook
+    
+    Args:
+        image_task: 渲染平台表格的任务
+        platform: 平台名称
+        platform_filename: 用于文件名的平台名称
+        date: 数据日期
+        debug_only: 是否仅调试模式（不推送）
+        render_cache: 渲染缓存
+    """
+    try:
+        with span("platform_image_render", platform=platform) as stage:
+            table = await image_task
+            if table.cached:
+                image_path, image_base64 = table.path, table.base64()
+            else:
+                image_path, image_base64 = await asyncio.to_thread(save_table_image, table.image_data,
+                                                                   prefix=f"alpha_list_{platform_filename}")
+            stage.set("bytes_out", len(image_base64))
+            stage.set("cache_hit", table.cached)
+            stage.set("changed", table.changed)
+    except Exception as e:
+        logger.warning(f"渲染{platform}平台项目表格失败: {str(e)}")
+        return
+    
+    await push_table_image(table, image_path, image_base64, f"📊 {platform}平台币安Alpha项目 (更新时间: {date})",
+                           debug_only, render_cache)
+
+def save_platform_advice(advice_dir, platform_filename, advice, call_id, ledger, detector=None, change=None):
+    """保存平台建议文件，标记用量账本中的调用已推送，写入分析索引并记录输入快照（在线程中执行）
+    被截断的响应不保存、不记录输入快照，下次运行仍视为有变化并重新请求AI
+    
+    Args:
+        advice_dir: 建议目录
+        platform_filename: 用于文件名的平台名称
+        advice: 建议内容
+        call_id: 用量账本中的调用记录ID
+        ledger: 用量账本
+        detector: 输入变化检测器，为None时不记录输入快照（调试模式）
+        change: 平台的输入变化
+        
+    Returns:
+        Optional[str]: 建议文件路径，响应被截断时为None
+    """
+    if advice.startswith(TRUNCATED_MARKER):
+        return None
+    
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    advice_file = os.path.join(advice_dir, f"advice_{timestamp}_{platform_filename}.md")
+    
+    with open(advice_file, 'w', encoding='utf-8') as f:
+        f.write(advice)
+    ledger.mark_delivered(call_id)
+    
+    # 将TOP3推荐写入分析索引
+    try:
+        index_advice_file(advice_file, KIND_PLATFORM, template=PROMPT_TEMPLATE_VERSION)
+    except Exception as e:
+        logger.warning(f"写入建议索引失败: {str(e)}")
+    
+    # 记录本次建议的输入快照，之后的变化相对这次建议计算
+    if detector is not None:
+        detector.record(change, advice_file)
+    return advice_file
+
+def save_all_advice(all_advice):
+    """保存所有平台的建议汇总，写入分析索引并发布到查看器（在线程中执行）
+    
+    Args:
+        all_advice: 汇总的建议内容
+        
+    Returns:
+        str: 汇总文件路径
+    """
+    timestamp = datetime.now().strftime('%Y%m%d')
+    all_advice_file = os.path.join(DATA_DIRS['all-platforms'], f"advice_{timestamp}.md")
+    
+    with open(all_advice_file, 'w', encoding='utf-8') as f:
+        f.write(all_advice)
     
-    return platform_projects, unclassified_projects
+    try:
+        index_advice_file(all_advice_file, KIND_COMBINED, template=PROMPT_TEMPLATE_VERSION)
+    except Exception as e:
+        logger.warning(f"写入建议索引失败: {str(e)}")
+    
+    try:
+        publish_report(all_advice_file)
+    except Exception as e:
+        logger.warning(f"发布查看器报告失败: {str(e)}")
+    return all_advice_file
 
 def determine_platforms_to_process(platforms, target_platform=None, debug_only=False):
     """
@@ -321,14 +424,18 @@ def determine_platforms_to_process(platforms, target_platform=None, debug_only=F
         
     return platforms_to_process
 
-async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_platform=None, listed_tokens=None):
+async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_platform=None, listed_tokens=None, force=False):
     """获取基于当天币安Alpha数据的AI投资建议，按不同区块链平台分类
     
+    只有输入相对上一次建议发生实质变化的平台才推送建议，其余平台在汇总报告中沿用上一次的建议；
+    需要推送的平台中，输入摘要（提示词中的项目、模板版本和模型配置）与已保存的建议相同时直接复用，不再请求AI
+    
     Args:
         alpha_data: 币安Alpha数据，如果为None则重新获取
         debug_only: 是否仅调试模式（只生成提示词不发送API请求）
         target_platform: 指定要处理的平台（仅在调试模式下有效）
         listed_tokens: 已上线币安的token列表
+        force: 是否忽略变化检测，为所有平台生成建议
         
     Returns:
         bool: 操作是否成功
@@ -348,8 +455,8 @@ async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_
         print("错误: 未提供币安Alpha数据")
         return False
     
-    # 提取项目列表
-    crypto_list = alpha_data.get("data", {}).get("cryptoCurrencyList", [])
+    # 提取项目列表（已是AlphaProject时原样使用）
+    crypto_list = parse_projects(alpha_data.get("data", {}).get("cryptoCurrencyList", []))
     date = alpha_data.get("date", "")
     
     if not crypto_list:
@@ -357,39 +464,6 @@ async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_
         print("错误: 币安Alpha数据中未包含项目列表")
         return False
     
-    # 初始化filtered_crypto_list，默认使用原始crypto_list
-    filtered_crypto_list = crypto_list
-    
-    # 如果提供了已上线Token列表，过滤掉这些token
-    if listed_tokens and listed_tokens.get('all_tokens'):
-        original_count = len(crypto_list)
-        
-        # 过滤标准形式和1000Token形式的token
-        filtered_crypto_list = []
-        
-        for crypto in crypto_list:
-            symbol = crypto.get("symbol", "")
-            if not symbol:
-                filtered_crypto_list.append(crypto)  # 保留没有symbol的项目
-                continue
-            
-            if not is_token_listed(symbol):
-                filtered_crypto_list.append(crypto)
-        
-        # 统计结果
-        removed_count = original_count - len(filtered_crypto_list)
-        
-        # 打印详细过滤信息
-        print(f"已从Alpha项目列表中移除{removed_count}个已上线的Token，剩余{len(filtered_crypto_list)}个项目")
-        
-        # 更新alpha_data中的项目列表
-        alpha_data["data"]["cryptoCurrencyList"] = filtered_crypto_list
-        
-        # 保存过滤后的数据
-        save_crypto_data(filtered_crypto_list, f"filtered_crypto_list_{datetime.now().strftime('%Y%m%d')}.json", "filtered")
-    else:
-        print(f"未提供已上线Token列表或列表为空，将处理所有{len(filtered_crypto_list)}个Alpha项目")
-    
     # 使用配置中的区块链平台定义
     platforms = BLOCKCHAIN_PLATFORMS
     
@@ -397,30 +471,120 @@ async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_
     platforms_to_process = determine_platforms_to_process(platforms, target_platform, debug_only)
     print(f"将处理以下平台: {', '.join(platforms_to_process)}\n")
     
-    # 对项目按区块链平台分类
-    platform_projects, unclassified_projects = await classify_crypto_projects_by_platform(
-        filtered_crypto_list, platforms, platforms_to_process
-    )
+    # 已上线过滤（提供了已上线Token列表时）、屏蔽代币过滤和平台分类在一次遍历中完成
+    pipeline = ProjectFilterPipeline(platforms, platforms_to_process)
+    filter_listed = bool(listed_tokens and listed_tokens.get('all_tokens'))
+    listed_symbols = await asyncio.to_thread(load_listed_symbols)
+    if filter_listed:
+        pipeline.add_stage(listed_stage(listed_symbols))
+    pipeline.add_stage(blocked_stage(BLOCK_TOKEN_LIST))
+    
+    with span("classification") as stage:
+        result = pipeline.run(crypto_list)
+        platform_projects, unclassified_projects = result.platform_projects, result.unclassified
+        stage.set("project_count", result.counts["total"])
+        stage.set("listed_count", result.counts["listed"])
+        stage.set("blocked_count", result.counts["blocked"])
+        stage.set("unclassified_count", len(unclassified_projects))
+    
+    filtered_crypto_list = result.kept
+    if filter_listed:
+        # 打印详细过滤信息
+        print(f"已有{result.counts['listed']}个项目上线币安现货")
+        print(f"已从Alpha项目列表中移除{result.counts['listed']}个已上线的Token，剩余{result.counts['total'] - result.counts['listed']}个项目")
+    else:
+        print(f"未提供已上线Token列表或列表为空，将处理所有{len(crypto_list)}个Alpha项目")
+    if result.counts["blocked"]:
+        logger.info(f"已过滤 {result.counts['blocked']} 个屏蔽代币")
+    
+    # 更新alpha_data中的项目列表
+    alpha_data["data"]["cryptoCurrencyList"] = filtered_crypto_list
+    
+    if filter_listed:
+        # 保存过滤后的数据（调试产物，后台写入）
+        get_debug_artifacts().dump_json(DATA_DIRS['debug'], f"filtered_crypto_list_{datetime.now().strftime('%Y%m%d')}.json",
+                                        filtered_crypto_list, summary=summarize_projects(filtered_crypto_list))
+    
+    report_classification(platform_projects, unclassified_projects)
+    
+    # 同平台近期上线币安现货的Alpha项目（过滤前的列表中按上币时间线查找），作为提示词中的参照
+    recent_listings = {}
+    if LISTING_TIMELINE.get('prompt_peers', True):
+        timeline = await asyncio.to_thread(get_listing_timeline)
+        recent_listings = timeline.recent_peers(crypto_list, pipeline.classifier.classify)
+        for platform, peers in recent_listings.items():
+            print(f"{platform}平台近期上线现货的项目: {', '.join(f'{p.symbol}({since})' for p, since, _ in peers)}")
+    
+    # 追加本次的历史快照，并为所有项目（过滤前）一次性批量计算跨快照趋势特征，预评分的分位数在全部Alpha项目中计算
+    trend_features = {}
+    if TREND_FEATURES.get('enabled', True):
+        with span("trend_features") as stage:
+            trend_features = await asyncio.to_thread(record_and_compute, crypto_list, alpha_data.get("timestamp") or datetime.now().timestamp())
+            stage.set("project_count", len(trend_features))
+            stage.set("scored_count", sum(1 for trend in trend_features.values() if trend.pre_score is not None))
+        for platform, projects in platform_projects.items():
+            scored = sorted((trend.pre_score, p.symbol) for p in projects
+                            if (trend := trend_features.get(p.id)) is not None and trend.pre_score is not None)
+            if scored:
+                print(f"{platform}平台趋势预评分最高的项目: {', '.join(f'{symbol}({score:.1f})' for score, symbol in scored[:-4:-1])}")
+    
+    # 与各平台上一次生成建议时的输入比较，只有发生实质变化的平台请求AI建议并推送（调试模式下只输出检测结果）
+    detector = ChangeDetector()
+    with span("change_detection") as stage:
+        changes = detector.evaluate(platform_projects)
+        stale_platforms = {platform for platform, change in changes.items() if change.material or force or debug_only}
+        stage.set("symbols_changed", bool(listed_tokens and listed_tokens.get("symbols_changed")))
+        stage.set("scores", {platform: change.score for platform, change in changes.items()})
+        stage.set("stale_platforms", sorted(stale_platforms))
+    
+    print("\n输入变化检测:")
+    for platform, change in changes.items():
+        print(f"{platform}: {change.describe()}")
+    
+    # 各平台的项目表格在渲染进程中并行渲染，与投资建议请求重叠
+    platform_images = {}
+    render_cache = RenderCache()
+    if RENDERING.get('platform_tables'):
+        renderer = get_render_service()
+        platform_images = {
+            platform: asyncio.create_task(render_cache.render(
+                renderer, f"alpha_list_{platform.lower().replace(' ', '_')}",
+                build_table_rows(projects, listed_symbols=listed_symbols)
+            ))
+            for platform, projects in platform_projects.items() if platform in stale_platforms
+        }
     
     # 创建建议目录
     advice_dir = DATA_DIRS['advices']
     os.makedirs(advice_dir, exist_ok=True)
     
+    # 按输入摘要保存的建议产物，调试模式下不读写
+    advice_store = AdviceStore(enabled=False) if debug_only else AdviceStore()
+    
     # 按平台获取投资建议
     results = {}
     failed_platforms = []
+    skipped_platforms = []
+    truncated_platforms = []
     all_advice = f"# 币安Alpha项目投资建议 (按区块链平台分类，{date})\n\n"
     
-    # 添加断路器计数
-    consecutive_failures = 0
-    max_consecutive_failures = 3
-    
     # 遍历每个平台，请求投资建议
-    for platform in platforms_to_process:
+    for index, platform in enumerate(platforms_to_process):
         projects = platform_projects.get(platform, [])
         if not projects:
             print(f"平台 {platform} 没有项目，跳过")
             continue
+        
+        if platform not in stale_platforms:
+            print(f"平台 {platform} 的输入无实质变化，跳过AI建议和推送")
+            skipped_platforms.append(platform)
+            continue
+        
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            print(f"已到运行截止时间，跳过平台 {platform} 及后续平台")
+            failed_platforms.extend(p for p in platforms_to_process[index:] if p in stale_platforms)
+            break
             
         print(f"正在为平台 {platform} ({len(projects)}个项目) 获取投资建议...")
         
@@ -431,68 +595,118 @@ async def get_alpha_investment_advice(alpha_data=None, debug_only=False, target_
             },
             "date": date,
             "platform": platform,
-            "total_count": len(projects)
+            "total_count": len(projects),
+            "blocked_filtered": True,  # 屏蔽代币已在过滤流水线中移除
+            "recent_listings": recent_listings.get(platform, []),
+            "trend_features": trend_features
         }
         
-        # 获取投资建议
-        advice = advisor.get_investment_advice(
-            platform_data, 
-            max_retries=max_retries, 
-            retry_delay=retry_delay,
-            debug=True,
-            dry_run=debug_only
-        )
+        # 获取投资建议，剩余时间在尚未处理的平台之间平均分配
+        remaining_platforms = sum(1 for p in platforms_to_process[index:] if p in stale_platforms)
+        with span("platform_advice", platform=platform) as stage, deadline_scope(fraction=1 / remaining_platforms):
+            digest = inputs_digest(platform, projects, recent_listings=recent_listings.get(platform), trend_features=trend_features)
+            advice = await asyncio.to_thread(advice_store.get, platform, digest)
+            stage.set("reused", advice is not None)
+            # 每日预算检查，超出上限时降级到备用后端或跳过；调试模式下不请求AI，不检查
+            budget = None
+            if advice is None and not debug_only:
+                budget = await asyncio.to_thread(advisor.ledger.check_budget, platform, get_model_router())
+            if advice is not None:
+                print(f"平台 {platform} 的输入与已保存的建议相同，复用该建议")
+                call_id = await asyncio.to_thread(advisor.ledger.record, platform, OUTCOME_REUSED)
+            elif budget is not None and budget.action == BUDGET_SKIP:
+                print(f"平台 {platform} {budget.reason}，跳过AI建议")
+                await asyncio.to_thread(advisor.ledger.record, platform, OUTCOME_BUDGET_SKIPPED)
+                call_id = None
+            else:
+                if budget is not None and budget.action == BUDGET_DOWNGRADE:
+                    print(f"平台 {platform} {budget.reason}")
+                # 模型请求（含重试退避）在线程中执行，追踪span和截止时间随上下文传入
+                advice = await asyncio.to_thread(
+                    advisor.get_investment_advice,
+                    platform_data, 
+                    max_retries=max_retries, 
+                    retry_delay=retry_delay,
+                    debug=True,
+                    dry_run=debug_only,
+                    backends=budget.backends if budget is not None else None
+                )
+                call_id = advisor.last_call_id
+                # 被截断的响应不保存，下次仍请求AI
+                if advice and not advice.startswith(TRUNCATED_MARKER):
+                    await asyncio.to_thread(advice_store.put, platform, digest, advice)
+            if budget is not None:
+                stage.set("budget", budget.action)
+            stage.set("project_count", len(projects))
+            stage.set("success", bool(advice))
+        
+        # 超出每日预算的平台与无实质变化的平台一样沿用上一次的建议
+        if budget is not None and budget.action == BUDGET_SKIP:
+            skipped_platforms.append(platform)
+            continue
         
         if advice:
-            await send_message_async(advice)
-
-            # 保存建议到文件
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             platform_filename = platform.lower().replace(' ', '_')
-            advice_file = os.path.join(advice_dir, f"advice_{timestamp}_{platform_filename}.md")
             
-            with open(advice_file, 'w', encoding='utf-8') as f:
-                f.write(advice)
-                
+            # 先推送平台的项目表格，再推送投资建议
+            image_task = platform_images.pop(platform, None)
+            if image_task is not None:
+                await send_platform_image(image_task, platform, platform_filename, date, debug_only, render_cache)
+            
+            await send_message_async(advice)
+
+            # 保存建议到文件（文件、索引和快照的写入在线程中执行）
+            advice_file = await asyncio.to_thread(
+                save_platform_advice, advice_dir, platform_filename, advice, call_id, advisor.ledger,
+                None if debug_only else detector, changes[platform]
+            )
+            if advice_file is None:
+                print(f"{platform}平台投资建议被截断，不保存，下次运行重新请求")
+                truncated_platforms.append(platform)
+                failed_platforms.append(platform)
+                continue
             print(f"已保存{platform}平台投资建议到: {advice_file}")
             
-            # 添加到总建议中
             results[platform] = advice
-            all_advice += f"## {platform}平台投资建议\n\n{advice}\n\n---\n\n"
-            
-            # 重置连续失败计数
-            consecutive_failures = 0
             
         else:
             print(f"获取{platform}平台投资建议失败")
             failed_platforms.append(platform)
             
-            # 增加连续失败计数
-            consecutive_failures += 1
-            
-            # 如果连续失败次数达到阈值，中断后续请求
-            if consecutive_failures >= max_consecutive_failures:
-                print(f"连续{consecutive_failures}次请求失败，中断后续平台处理")
+            # 所有模型后端的熔断器都打开时中断后续请求，等待半开试探
+            if not get_model_router().available():
+                print("所有模型后端连续失败已熔断，中断后续平台处理")
                 break
     
-    # 保存所有平台的建议到一个文件
+    # 未推送的平台表格（建议获取失败或被跳过）不再需要
+    for image_task in platform_images.values():
+        image_task.cancel()
+    
+    # 保存所有平台的建议到一个文件，跳过的平台和建议被截断的平台沿用上一次的建议
     if results:
-        timestamp = datetime.now().strftime('%Y%m%d')
-        all_advice_file = os.path.join(DATA_DIRS['all-platforms'], f"advice_{timestamp}.md")
-        
-        with open(all_advice_file, 'w', encoding='utf-8') as f:
-            f.write(all_advice)
-            
+        sections = dict(results)
+        for platform in skipped_platforms + truncated_platforms:
+            previous_advice = detector.previous_advice(platform)
+            if previous_advice:
+                sections[platform] = previous_advice
+        for platform in platforms_to_process:
+            if platform in sections:
+                all_advice += f"## {platform}平台投资建议\n\n{sections[platform]}\n\n---\n\n"
+        
+        all_advice_file = await asyncio.to_thread(save_all_advice, all_advice)
         print(f"\n已保存所有平台的投资建议到: {all_advice_file}")
     
     # 打印总结
     print("\n投资建议获取总结:")
     print(f"成功: {len(results)}/{len(platforms_to_process)} 个平台")
     
+    if skipped_platforms:
+        print(f"跳过（无实质变化或超出每日预算）: {', '.join(skipped_platforms)}")
+    
     if failed_platforms:
         print(f"失败: {', '.join(failed_platforms)}")
         
-    return len(results) > 0
+    return len(results) > 0 or (bool(skipped_platforms) and not failed_platforms)
 
 async def main():
     """主函数
@@ -515,8 +729,45 @@ async def main():
                        help=f"指定要处理的平台（仅在调试模式下有效）: {', '.join(supported_platforms)}")
     parser.add_argument("--force-update", action="store_true", help="强制更新数据，不使用缓存")
     parser.add_argument("--skip-tokens-update", action="store_true", help="跳过更新Binance交易对列表")
+    parser.add_argument("--force-advice", action="store_true", help="忽略输入变化检测，为所有平台生成投资建议")
     args = parser.parse_args()
     
+    # 监控事件循环的调度延迟，同步调用阻塞事件循环超过阈值时告警
+    loop_monitor = LoopLagMonitor()
+    loop_monitor.start()
+    
+    # 整个运行过程记录为根span，各阶段作为子span写入追踪文件
+    try:
+        with span("run", debug_only=args.debug_only) as stage, deadline_scope(seconds=RESILIENCE['run_deadline']):
+            # 渲染进程的启动和matplotlib导入与交易对、项目列表的获取重叠
+            renderer = get_render_service()
+            renderer.prewarm()
+            exit_code = await run_pipeline(args)
+            stage.set("render", renderer.snapshot())
+            stats = connection_stats()
+            stage.set("http_requests", stats["async_requests"] + stats["sync_requests"])
+            stage.set("connections_opened", stats["async_connections"] + stats["sync_connections"])
+            stage.set("resilience", resilience_snapshot())
+            stage.set("model_routing", get_model_router().snapshot())
+            stage.set("loop_lag", await loop_monitor.stop())
+            # 等待后台写线程写完本次运行的调试产物
+            stage.set("debug_artifacts", await asyncio.to_thread(close_debug_artifacts))
+            return exit_code
+    finally:
+        await loop_monitor.stop()
+        await close_async_session()
+        await asyncio.to_thread(close_debug_artifacts)
+        get_tracer().finish()
+
+async def run_pipeline(args):
+    """按顺序执行各处理阶段
+    
+    Args:
+        args: 命令行参数
+        
+    Returns:
+        int: 进程退出码
+    """
     try:
         print("\n===============================================================")
         print(" 币安Alpha项目分析工具")
@@ -539,20 +790,25 @@ async def main():
         if args.force_update:
             mode_info.append("- 强制更新：不使用缓存数据")
         
+        if args.force_advice:
+            mode_info.append("- 强制生成建议：忽略输入变化检测")
+        
         for info in mode_info:
             print(info)
         print()
         
-        # 获取并更新Binance交易对列表
-        listed_tokens = None
+        # 获取并更新Binance交易对列表，与项目列表获取和表格渲染并行执行
+        tokens_task = None
         if not args.skip_tokens_update:
-            print("步骤1: 获取并更新Binance交易对列表...\n")
-            listed_tokens = await get_binance_tokens()
+            print("步骤1: 获取并更新Binance交易对列表（与步骤2并行）...\n")
+            tokens_task = asyncio.create_task(get_binance_tokens())
         
         # 获取币安Alpha项目列表数据
         step_num = 2 if not args.skip_tokens_update else 1
         print(f"步骤{step_num}: 获取币安Alpha项目列表数据...\n")
-        alpha_data = await get_binance_alpha_list(force_update=args.force_update, listed_tokens=listed_tokens, debug_only=args.debug_only, as_image=True)
+        alpha_data = await get_binance_alpha_list(force_update=args.force_update, debug_only=args.debug_only, as_image=True,
+                                                  tokens_task=tokens_task)
+        listed_tokens = await tokens_task if tokens_task is not None else None
         if not alpha_data:
             logger.error("获取币安Alpha项目列表数据失败，程序退出")
             print("\n错误: 获取币安Alpha项目列表数据失败，程序退出")
@@ -567,7 +823,8 @@ async def main():
                 alpha_data, 
                 debug_only=args.debug_only, 
                 target_platform=args.platform if args.debug_only else None,
-                listed_tokens=listed_tokens
+                listed_tokens=listed_tokens,
+                force=args.force_advice
             )
             
             if success == True:
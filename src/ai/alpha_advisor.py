@@ -2,72 +2,76 @@ import os
 import json
 import logging
 import time
-import random
 from typing import Dict, Any, List, Optional, Tuple
 import requests
 from datetime import datetime
 
-from config import DEEPSEEK_AI, DATA_DIRS, BLOCKCHAIN_PLATFORMS, BLOCK_TOKEN_LIST
-from src.utils.crypto_formatter import format_project_detailed, extract_basic_info, save_crypto_data
+from config import CONTINUATION, DATA_DIRS, BLOCKCHAIN_PLATFORMS, BLOCK_TOKEN_LIST
+from src.utils.crypto_formatter import format_project_detailed, format_recent_listing
+from src.utils.tracing import span
+from src.utils.debug_artifacts import get_debug_artifacts
+from src.utils.alpha_project import AlphaProject, parse_projects, summarize_projects
+from src.utils.trend_features import TrendFeatures
+from src.utils.project_filters import compile_block_list, is_blocked, select_prompt_projects
+from src.utils.resilience import ResilienceError
+from src.ai.model_router import get_model_router, ModelResponse, CallUsage
+from src.ai.continuation import MaxTokensTuner, continuation_prompt, merge_responses
+from src.utils.usage_ledger import UsageLedger, OUTCOME_SUCCESS, OUTCOME_TRUNCATED, OUTCOME_FAILED, OUTCOME_CONTINUED
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 响应被截断时返回的提示开头，这样的结果不作为建议产物保存
+TRUNCATED_MARKER = "⚠️ 检测到响应被截断"
+
 class AlphaAdvisor:
     """币安Alpha项目投资顾问，基于当天数据生成建议"""
     
     def __init__(self):
         """初始化币安Alpha项目投资顾问"""
         """初始化币安Alpha项目投资顾问"""
-        self.api_url = DEEPSEEK_AI.get('api_url')
-        self.model = DEEPSEEK_AI.get('model')
-        self.api_key = DEEPSEEK_AI.get('api_key')
+        self.router = get_model_router()
+        self.ledger = UsageLedger()
+        self.max_tokens_tuner = MaxTokensTuner()
+        # 最近一次AI调用在用量账本中的记录ID，建议推送后由调用方标记
+        self.last_call_id: Optional[int] = None
+        
+        # 屏蔽列表预处理为大写集合
+        self.blocked_tokens = compile_block_list(BLOCK_TOKEN_LIST)
         
-        if not self.api_key:
-            logger.warning("未设置DEEPSEEK_API_KEY环境变量")
+        if not self.router.backends:
+            logger.warning("未配置可用的模型后端（DEEPSEEK_API_KEY或LOCAL_LLM_URL）")
     
-    def _format_project_data(self, crypto: Dict[str, Any]) -> str:
+    def _format_project_data(self, crypto: AlphaProject, trend: Optional[TrendFeatures] = None) -> str:
         """格式化单个项目数据为文本
         
         Args:
-            crypto: 项目数据字典
+            crypto: 项目记录
+            trend: 项目的跨快照趋势特征
             
         Returns:
             str: 格式化后的项目数据文本
         """
         # 使用新的crypto_formatter模块
-        project_text = format_project_detailed(crypto)
+        project_text = format_project_detailed(crypto, trend)
             
         return project_text
 
-    def _filter_blocked_tokens(self, crypto_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _filter_blocked_tokens(self, crypto_list: List[AlphaProject]) -> List[AlphaProject]:
         """过滤掉被屏蔽的代币
         
         Args:
-            crypto_list: 加密货币数据列表
+            crypto_list: 项目记录列表
             
         Returns:
-            List[Dict[str, Any]]: 过滤后的加密货币数据列表
+            List[AlphaProject]: 过滤后的项目记录列表
         """
-        if not BLOCK_TOKEN_LIST or len(BLOCK_TOKEN_LIST) == 0:
+        if not self.blocked_tokens:
             return crypto_list
         
-        filtered_list = []
-        blocked_count = 0
-        
-        for crypto in crypto_list:
-            # 获取代币的标识信息
-            symbol = crypto.get("symbol", "").upper()
-            name = crypto.get("name", "").upper()
-            id_str = str(crypto.get("id", "")).upper()
-            
-            # 检查是否在屏蔽列表中
-            if any(block_item.upper() in [symbol, name, id_str] for block_item in BLOCK_TOKEN_LIST):
-                blocked_count += 1
-                continue
-            
-            filtered_list.append(crypto)
+        filtered_list = [crypto for crypto in crypto_list if not is_blocked(crypto, self.blocked_tokens)]
+        blocked_count = len(crypto_list) - len(filtered_list)
         
         if blocked_count > 0:
             logger.info(f"已过滤 {blocked_count} 个屏蔽代币")
@@ -83,13 +87,14 @@ class AlphaAdvisor:
         Returns:
             Tuple[str, str]: 平台名称和生成的提示词
         """
-        crypto_list = alpha_data.get("data", {}).get("cryptoCurrencyList", [])
+        crypto_list = parse_projects(alpha_data.get("data", {}).get("cryptoCurrencyList", []))
         date = alpha_data.get("date", "")
         platform = alpha_data.get("platform", "") # 从传入的数据中获取平台信息
         prefix = f"alpha_crypto_list_{platform}"
         
-        # 过滤屏蔽代币
-        crypto_list = self._filter_blocked_tokens(crypto_list)
+        # 过滤屏蔽代币（main中的过滤流水线已移除时跳过）
+        if not alpha_data.get("blocked_filtered"):
+            crypto_list = self._filter_blocked_tokens(crypto_list)
         
         # 保存币安Alpha项目列表数据到本地文件以便调试
         self.save_list_data_for_debug(crypto_list, prefix)
@@ -101,10 +106,8 @@ class AlphaAdvisor:
             
             # 尝试从第一个项目信息中识别平台
             first_crypto = crypto_list[0]
-            platform_info = first_crypto.get("platform", {})
-            platform_name = platform_info.get("name", "") if platform_info else ""
-            tags = first_crypto.get("tags", [])
-            platform_tags = [tag for tag in tags if isinstance(tag, str)]
+            platform_name = first_crypto.platform_name
+            platform_tags = first_crypto.tags
             
             # 尝试从平台信息和标签中识别平台
             for p_name, keywords in platform_keywords.items():
@@ -114,17 +117,22 @@ class AlphaAdvisor:
                     break
         
         # 构建全部提示词
-        prompt = self._create_complete_prompt(platform, date, crypto_list)
+        prompt = self._create_complete_prompt(platform, date, crypto_list, alpha_data.get("recent_listings"),
+                                              alpha_data.get("trend_features"))
         
         return platform, prompt
     
-    def _create_complete_prompt(self, platform: str, date: str, crypto_list: List[Dict[str, Any]]) -> str:
+    def _create_complete_prompt(self, platform: str, date: str, crypto_list: List[AlphaProject],
+                                recent_listings: Optional[List[Tuple[AlphaProject, str, List[str]]]] = None,
+                                trend_features: Optional[Dict[int, TrendFeatures]] = None) -> str:
         """创建简化的提示词，聚焦于币安官方上币要求
         
         Args:
             platform: 区块链平台名称
             date: 数据日期
-            crypto_list: 加密货币数据列表
+            crypto_list: 项目记录列表
+            recent_listings: 近期上线现货的同平台项目[(项目, 上线日期, 计价货币列表)]，作为参照附在数据之后
+            trend_features: 由本地历史快照计算的趋势特征，CMC ID -> TrendFeatures
             
         Returns:
             str: 简化的提示词
@@ -198,248 +206,216 @@ class AlphaAdvisor:
 """
 
         # 5. 数据部分
-        data_section = f"以下是当前{f"{platform}平台上的" if platform else ""}币安Alpha已流通项目数据（{date}，按市值排序）：\n"
+        platform_scope = f"{platform}平台上的" if platform else ""
+        data_section = f"以下是当前{platform_scope}币安Alpha已流通项目数据（{date}，按市值排序）：\n"
         
-        # 按市值排序项目列表
-        sorted_crypto_list = sorted(
-            crypto_list,
-            key=lambda x: float(next((q.get("marketCap", 0) for q in x.get("quotes", []) if q.get("name") == "USD"), 0)),
-            reverse=True
-        )
+        trend_features = trend_features or {}
+        if trend_features:
+            data_section += ("（趋势特征由本地保存的历史快照计算：放量持续性为近期24h交易量不低于其均值一半的快照占比，越接近1越稳定；"
+                             "日波动率和最大回撤反映价格稳定性；排名变化为CMC排名每天上升的名次；"
+                             "趋势预评分按以上特征在全部Alpha项目中的分位数加权得出，仅作为交易量和价格稳定性评估的参考）\n")
         
-        # 格式化项目数据 -- 只取前15个
-        for i, crypto in enumerate(sorted_crypto_list[:15], 1):
+        # 格式化项目数据 -- 按市值排序，只取前PROMPT_PROJECT_LIMIT个
+        for i, crypto in enumerate(select_prompt_projects(crypto_list), 1):
             # 使用新的crypto_formatter模块
-            project_text = self._format_project_data(crypto)
+            project_text = self._format_project_data(crypto, trend_features.get(crypto.id))
             data_section += f"{i}. {project_text}\n"
         
+        # 6. 近期上线现货的同平台项目（参照）
+        if recent_listings:
+            peer_scope = f"{platform}平台" if platform else ""
+            data_section += f"\n作为参照，以下是近期已从币安Alpha上线现货的{peer_scope}项目（上线日期、现货交易对及当前数据）：\n"
+            for i, (crypto, listed_since, quotes) in enumerate(recent_listings, 1):
+                data_section += f"{i}. {format_recent_listing(crypto, listed_since, quotes)}\n"
+        
         # 合并所有部分为完整提示词
         complete_prompt = task_intro + background + evaluation_criteria + output_requirements + data_section
         
         return complete_prompt
     
-    def get_investment_advice(self, alpha_data: Dict[str, Any], max_retries=3, retry_delay=2.0, debug=True, dry_run=False) -> Optional[str]:
+    def get_investment_advice(self, alpha_data: Dict[str, Any], max_retries=3, retry_delay=2.0, debug=True, dry_run=False,
+                              backends: Optional[List[str]] = None) -> Optional[str]:
         """获取投资建议
         
         Args:
             alpha_data: 币安Alpha项目数据
-            max_retries: 最大重试次数
-            retry_delay: 重试间隔时间（秒）
+            max_retries: 最大尝试次数
+            retry_delay: 退避的最小间隔（秒）
             debug: 是否启用调试模式，保存数据到文件
             dry_run: 是否仅生成提示词但不发送API请求（调试模式）
+            backends: 只使用这些名称的模型后端（预算不足降级时），默认使用所有后端
             
         Returns:
             生成的投资建议文本，如果生成失败则返回None
         """
-        if not self.api_key and not dry_run:
-            logger.error("未设置DEEPSEEK_API_KEY，无法获取AI建议")
+        self.last_call_id = None
+        if not self.router.backends and not dry_run:
+            logger.error("未配置可用的模型后端（DEEPSEEK_API_KEY或LOCAL_LLM_URL），无法获取AI建议")
             return None
         
         # 准备提示词
-        platform, prompt = self._prepare_prompt(alpha_data)
+        with span("prompt_build") as stage:
+            platform, prompt = self._prepare_prompt(alpha_data)
+            stage.set("platform", platform)
+            stage.set("bytes_out", len(prompt.encode('utf-8')))
         
         # 格式化平台名称用于文件命名
         platform_str = platform.lower().replace(' ', '_') if platform else "general"
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
         
-        # 保存提示词供调试
-        os.makedirs(DATA_DIRS['prompts'], exist_ok=True)
-        prompt_file = os.path.join(DATA_DIRS['prompts'], f"prompt_{timestamp}_{platform_str}.txt")
-        with open(prompt_file, 'w', encoding='utf-8') as f:
-            f.write(prompt)
-        logger.info(f"已保存{platform or '通用'}平台提示词到: {prompt_file}")
+        # 保存提示词供调试，dry_run模式下提示词即为输出，同步写入
+        prompt_filename = f"prompt_{timestamp}_{platform_str}.txt"
+        if dry_run:
+            os.makedirs(DATA_DIRS['prompts'], exist_ok=True)
+            prompt_file = os.path.join(DATA_DIRS['prompts'], prompt_filename)
+            with open(prompt_file, 'w', encoding='utf-8') as f:
+                f.write(prompt)
+        else:
+            prompt_file = get_debug_artifacts().dump_text(DATA_DIRS['prompts'], prompt_filename, prompt)
+        if prompt_file:
+            logger.info(f"已保存{platform or '通用'}平台提示词到: {prompt_file}")
         
         # 如果是dry_run模式，到此为止直接返回
         if dry_run:
             logger.info("调试模式：已生成提示词，跳过API请求")
             return f"## 调试模式 - {platform or '通用'}平台提示词生成\n\n提示词已保存到: {prompt_file}\n\n此为调试模式，未发送API请求。"
         
-        # 准备API请求参数 - 优化超时设置
-        base_timeout = DEEPSEEK_AI.get('timeout', 600)
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": DEEPSEEK_AI.get('temperature', 0),
-            "max_tokens": DEEPSEEK_AI.get('max_tokens', 32000),
-            "top_p": DEEPSEEK_AI.get('top_p', 1.0),
-            "stream": DEEPSEEK_AI.get('stream', False)
-        }
-        
-        # 尝试请求API
-        for attempt in range(max_retries):
-            last_exception = None  # 初始化异常变量
+        # 整个路由过程记录为一个span；后端选择和对冲由模型路由器控制，每个后端的重试预算、退避、熔断和截止时间由其容错策略控制
+        # 用量（包括失败和对冲的请求）按调用写入用量账本
+        usage = CallUsage()
+        start_time = time.perf_counter()
+        with span("ai_request", platform=platform_str) as request_span:
+            request_span.set("bytes_out", len(prompt.encode('utf-8')))
+            
+            # 按该平台最近观察到的完成token数设置各后端的max_tokens
+            platform_key = platform or "general"
+            limits = {backend.name: self.max_tokens_tuner.max_tokens(platform_key, backend)
+                      for backend in self.router.backends}
+            response = None
+            continued = False
             try:
-                # 动态调整超时时间：第一次使用基础超时，后续尝试逐渐增加
-                current_timeout = base_timeout + (attempt * 300)  # 每次重试增加5分钟
-                
-                logger.info(f"正在请求AI建议，尝试 {attempt + 1}/{max_retries}，超时设置: {current_timeout}秒")
-                
-                # 使用计时器测量请求时间
-                def make_request():
-                    return requests.post(
-                        self.api_url, 
-                        headers=headers, 
-                        json=payload, 
-                        timeout=current_timeout
-                    )
-                
-                response, request_time = self._measure_request_time(make_request)
-                
-                logger.info(f"API请求完成，耗时: {request_time:.2f}秒，状态码: {response.status_code}")
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    # 处理deepseek-reasoner模型的特殊响应格式
-                    choice = result.get("choices", [{}])[0]
-                    message_data = choice.get("message", {})
-                    
-                    # 获取主要内容
-                    content = message_data.get("content", "")
-                    
-                    # 检查是否有reasoning_content（deepseek-reasoner模型特有）
-                    reasoning_content = message_data.get("reasoning_content", "")
-                    
-                    # 记录响应详细信息
-                    usage_info = result.get("usage", {})
-                    if usage_info:
-                        logger.info(f"API使用统计 - 输入tokens: {usage_info.get('prompt_tokens', 'N/A')}, "
-                                  f"输出tokens: {usage_info.get('completion_tokens', 'N/A')}, "
-                                  f"总tokens: {usage_info.get('total_tokens', 'N/A')}")
-                    
-                    # 记录推理内容信息（如果存在）
-                    if reasoning_content:
-                        logger.info(f"检测到推理内容，长度: {len(reasoning_content)}字符")
-                        logger.debug(f"推理内容预览: {reasoning_content[:200]}...")
-                    
-                    # 决定使用哪个内容作为最终结果
-                    final_message = content
-                    
-                    # 如果content为空但有reasoning_content，考虑使用reasoning_content
-                    if not content.strip() and reasoning_content.strip():
-                        logger.warning("主要内容为空，但存在推理内容。这可能是因为max_tokens不足导致content被截断")
-                        logger.info("尝试使用推理内容作为备选方案")
-                        
-                        # 可以选择使用推理内容，或者提示用户增加max_tokens
-                        # 这里我们记录详细信息，但不直接使用推理内容，因为它通常不是最终答案
-                        final_message = f"⚠️ 检测到响应被截断\n\n推理过程长度: {len(reasoning_content)}字符\n最终内容长度: {len(content)}字符\n\n建议增加max_tokens配置以获得完整响应。\n\n推理内容摘要:\n{reasoning_content[:500]}..."
-                    
-                    # 如果返回内容有效，保存并返回
-                    if final_message and len(final_message) > 100:
-                        logger.info(f"成功获取AI建议，响应长度: {len(final_message)}字符，总耗时: {request_time:.2f}秒")
-                        
-                        # 如果使用了推理内容作为备选，记录警告
-                        if not content.strip() and reasoning_content.strip():
-                            logger.warning("返回的是基于推理内容的摘要，建议增加max_tokens获得完整响应")
-                        
-                        return final_message
-                    else:
-                        logger.warning(f"API返回内容过短或为空，content长度: {len(content)}字符，reasoning_content长度: {len(reasoning_content)}字符，耗时: {request_time:.2f}秒")
-                        logger.debug(f"返回的content: {content}")
-                        if reasoning_content:
-                            logger.debug(f"推理内容预览: {reasoning_content[:200]}...")
-                        
-                        # 如果返回空内容，可能是模型处理时间过长，尝试增加超时时间
-                        if attempt < max_retries - 1:
-                            logger.info("检测到空响应，将在下次重试时增加超时时间")
-                        # 设置一个标识，表示这是空响应而不是异常
-                        last_exception = "empty_response"
-                else:
-                    logger.error(f"API请求失败，状态码: {response.status_code}, 耗时: {request_time:.2f}秒")
-                    logger.error(f"响应内容: {response.text}")
-                    # 设置一个标识，表示这是HTTP错误
-                    last_exception = f"http_error_{response.status_code}"
-                    
+                response = self.router.complete(prompt, max_attempts=max_retries, base_delay=retry_delay,
+                                                backends=backends, usage=usage, max_tokens=limits)
+                self.max_tokens_tuner.observe(platform_key, response)
+                if response.truncated:
+                    response, continued = self._continue_truncated(prompt, response, usage, request_span)
+            except ResilienceError as e:
+                logger.error(f"放弃获取AI建议: {str(e)}")
             except requests.exceptions.Timeout as e:
-                logger.error(f"API请求超时 (设置: {current_timeout}秒): {str(e)}")
-                if attempt < max_retries - 1:
-                    logger.info(f"将在下次重试时增加超时时间到 {base_timeout + ((attempt + 1) * 300)}秒")
-                last_exception = e
+                logger.error(f"API请求超时: {str(e)}")
             except requests.exceptions.ConnectionError as e:
                 logger.error(f"API连接错误: {str(e)}")
-                last_exception = e
             except Exception as e:
                 logger.error(f"API请求过程中出错: {str(e)}")
-                last_exception = e
             
-            # 如果不是最后一次尝试，等待后重试
-            if attempt < max_retries - 1:
-                # 根据失败原因调整重试延迟
-                if last_exception and (
-                    (isinstance(last_exception, Exception) and "timeout" in str(last_exception).lower()) or
-                    last_exception == "empty_response"
-                ):
-                    delay = retry_delay * 2  # 超时错误或空响应延迟更长
-                else:
-                    delay = retry_delay * (1 + random.random() * 0.5)  # 添加随机抖动
-                
-                logger.info(f"等待 {delay:.2f} 秒后重试...")
-                time.sleep(delay)
-        
-        logger.error(f"在 {max_retries} 次尝试后放弃获取AI建议")
-        return None
+            advice = self._final_message(response, request_span) if response is not None else None
+            if advice is None:
+                request_span.set("outcome", "failed")
+            
+            if response is None:
+                outcome = OUTCOME_FAILED
+            elif response.truncated:
+                outcome = OUTCOME_TRUNCATED
+            else:
+                outcome = OUTCOME_CONTINUED if continued else OUTCOME_SUCCESS
+            self.last_call_id = self.ledger.record(platform_key, outcome, prompt, response, usage,
+                                                   time.perf_counter() - start_time)
+            return advice
+    
+    def _continue_truncated(self, prompt: str, response: ModelResponse, usage: CallUsage,
+                            request_span) -> Tuple[ModelResponse, bool]:
+        """续写被截断的回答，不从头重新生成
+        
+        已有部分回答时带上部分回答请求从中断处继续，只有推理内容时带上压缩的推理摘要请求直接给出最终答案；
+        续写使用CONTINUATION['backend']（未配置时为原后端）和较小的max_tokens，最多CONTINUATION['max_rounds']轮
+        
+        Args:
+            prompt: 原始提示词
+            response: 被截断的响应
+            usage: 本次调用的累计用量，续写的用量计入其中
+            request_span: ai_request阶段的span
+            
+        Returns:
+            Tuple[ModelResponse, bool]: 合并续写后的响应（续写失败时为已有的响应），以及是否进行了续写
+        """
+        if not CONTINUATION.get('enabled', True):
+            return response, False
+        continued = False
+        for round_index in range(CONTINUATION.get('max_rounds', 2)):
+            backend = CONTINUATION.get('backend') or response.backend
+            if self.router.backend(backend) is None:
+                backend = response.backend
+            mode = "部分回答" if response.content.strip() else "推理摘要"
+            logger.info(f"检测到响应被截断（finish_reason: {response.finish_reason}），"
+                        f"第{round_index + 1}次续写，使用{backend}和{mode}")
+            request_span.add("continuations", 1)
+            try:
+                continuation = self.router.complete(continuation_prompt(prompt, response), backends=[backend],
+                                                    usage=usage,
+                                                    max_tokens={backend: CONTINUATION.get('max_tokens', 12000)})
+            except Exception as e:
+                logger.warning(f"续写被截断的回答失败: {str(e)}")
+                break
+            response = merge_responses(response, continuation)
+            continued = True
+            if not response.truncated:
+                break
+        return response, continued
+    
+    def _final_message(self, response: ModelResponse, request_span) -> str:
+        """模型响应转换为建议文本
+        
+        Args:
+            response: 路由器返回的响应
+            request_span: ai_request阶段的span，记录后端、模型和结果
+            
+        Returns:
+            str: 建议文本，截断响应时为以TRUNCATED_MARKER开头的提示
+        """
+        request_span.set("backend", response.backend)
+        request_span.set("model", response.model)
+        
+        # 续写后仍被截断：有部分回答时在提示后附上部分回答；content为空但有reasoning_content时返回提示，
+        # 不直接使用推理内容，因为它通常不是最终答案
+        if response.truncated:
+            request_span.set("outcome", "truncated")
+            if response.content.strip():
+                logger.warning("续写后回答仍不完整，返回部分回答")
+                return f"{TRUNCATED_MARKER}，以下为不完整的回答\n\n{response.content}"
+            logger.warning("主要内容为空，但存在推理内容。这可能是因为max_tokens不足导致content被截断")
+            logger.warning("返回的是基于推理内容的摘要，建议增加max_tokens获得完整响应")
+            reasoning_content = response.reasoning_content
+            return f"{TRUNCATED_MARKER}\n\n推理过程长度: {len(reasoning_content)}字符\n最终内容长度: {len(response.content)}字符\n\n建议增加max_tokens配置以获得完整响应。\n\n推理内容摘要:\n{reasoning_content[:500]}..."
+        
+        logger.info(f"成功获取AI建议（{response.backend}: {response.model}），响应长度: {len(response.content)}字符，"
+                    f"耗时: {response.latency:.2f}秒")
+        request_span.set("outcome", "success")
+        return response.content
         
 
-    def save_list_data_for_debug(self, crypto_list: List[Dict[str, Any]], prefix: str = ""):
+    def save_list_data_for_debug(self, crypto_list: List[AlphaProject], prefix: str = ""):
         """保存币安Alpha项目列表数据到本地文件以便调试
         
         Args:
-            crypto_list: 加密货币数据列表
+            crypto_list: 项目记录列表
             prefix: 文件名前缀，用于区分不同平台的数据
             
         Returns:
-            str: 保存的文件路径，如果保存失败则返回None
+            str: 保存的文件路径（由后台线程写入），未保存时返回None
         """
         try:
-            # 创建调试数据目录
-            os.makedirs(DATA_DIRS['debug'], exist_ok=True)
-            
             # 获取当前时间戳
             timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
             
-            # 保存到文件
+            # 保存到调试数据目录
             filename = f"{prefix}_{timestamp}.json" if prefix else f"crypto_list_{timestamp}.json"
+            file_path = get_debug_artifacts().dump_json(DATA_DIRS['debug'], filename, crypto_list,
+                                                        summary=summarize_projects(crypto_list))
             
-            # 使用crypto_formatter模块保存数据
-            file_path = save_crypto_data(crypto_list, filename, prefix)
-            
-            logger.info(f"已保存币安Alpha项目列表数据到: {file_path}")
+            if file_path:
+                logger.info(f"已保存币安Alpha项目列表数据到: {file_path}")
             return file_path
             
         except Exception as e:
             logger.error(f"保存币安Alpha项目列表数据时出错: {str(e)}")
-            return None
-
-    def _measure_request_time(self, func, *args, **kwargs):
-        """测量请求执行时间的装饰器函数
-        
-        Args:
-            func: 要执行的函数
-            *args: 函数参数
-            **kwargs: 函数关键字参数
-            
-        Returns:
-            tuple: (执行结果, 执行时间(秒))
-        """
-        start_time = time.time()
-        try:
-            result = func(*args, **kwargs)
-            end_time = time.time()
-            execution_time = end_time - start_time
-            return result, execution_time
-        except Exception as e:
-            end_time = time.time()
-            execution_time = end_time - start_time
-            logger.error(f"请求执行失败，耗时: {execution_time:.2f}秒, 错误: {str(e)}")
-            raise e
\ No newline at end of file
+            return None
\ No newline at end of file
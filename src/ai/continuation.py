@@ -0,0 +1,145 @@
+"""
+截断回答的续写与max_tokens自适应
+推理模型耗尽max_tokens时不从头重新生成：已有部分回答时带上部分回答请求模型从中断处继续，
+只有推理内容时带上压缩后的推理摘要请求模型直接给出最终答案；
+同时按平台和模型记录首次请求的完成token数和是否被截断，之后的请求按观察到的分位数调整max_tokens（不超过后端配置的max_tokens）
+"""
+
+import os
+import math
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from config import DATA_DIRS, CONTINUATION
+from src.utils.serialization import dump_file, load_file
+from src.ai.model_router import ModelBackend, ModelResponse, Prompt, as_messages
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 已有部分回答时的续写指令
+CONTINUE_INSTRUCTION = "你的上一条回答因长度限制被截断。请从中断处直接继续输出剩余内容，不要重复已输出的部分，不要添加任何说明。"
+
+# 只有推理内容时的收尾指令
+FINISH_INSTRUCTION = ("以下是你此前针对该任务的推理过程摘要（推理因长度限制未能完成）：\n\n{summary}\n\n"
+                      "请基于以上推理直接给出最终答案，按要求的格式完整输出，无需重复推理过程。")
+
+# max_tokens统计的保存路径
+DEFAULT_TUNER_PATH = os.path.join(DATA_DIRS.get('snapshots', 'data/snapshots'), 'max_tokens.json')
+
+
+def condense_reasoning(reasoning: str, limit: Optional[int] = None) -> str:
+    """压缩推理内容：保留开头（任务理解）和结尾（最新的结论），中间省略
+
+    Args:
+        reasoning: 推理内容
+        limit: 保留的最大字符数，默认读取CONTINUATION['reasoning_chars']
+
+    Returns:
+        str: 压缩后的推理内容
+    """
+    limit = limit or CONTINUATION.get('reasoning_chars', 6000)
+    reasoning = reasoning.strip()
+    if len(reasoning) <= limit:
+        return reasoning
+    head = limit // 4
+    return f"{reasoning[:head]}\n……\n{reasoning[-(limit - head):]}"
+
+
+def continuation_prompt(prompt: str, response: ModelResponse) -> Prompt:
+    """构造续写请求的提示词
+
+    Args:
+        prompt: 原始提示词
+        response: 被截断的响应（已合并此前的续写）
+
+    Returns:
+        Prompt: 有部分回答时为多轮对话，只有推理内容时为附带推理摘要的单条消息
+    """
+    if response.content.strip():
+        return as_messages(prompt) + [{"role": "assistant", "content": response.content},
+                                      {"role": "user", "content": CONTINUE_INSTRUCTION}]
+    summary = condense_reasoning(response.reasoning_content)
+    return f"{prompt}\n\n{FINISH_INSTRUCTION.format(summary=summary)}"
+
+
+def merge_responses(previous: ModelResponse, continuation: ModelResponse) -> ModelResponse:
+    """合并被截断的响应和续写的响应，finish_reason和是否截断以续写为准"""
+    return ModelResponse(continuation.backend, continuation.model, previous.content + continuation.content,
+                         continuation.reasoning_content or previous.reasoning_content,
+                         continuation.usage, previous.latency + continuation.latency, continuation.finish_reason)
+
+
+class MaxTokensTuner:
+    """按平台和模型记录首次请求的完成token数和是否被截断，调整之后请求的max_tokens"""
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            path: 统计文件路径，默认为data/snapshots/max_tokens.json，为空字符串时不保存
+            enabled: 是否启用，默认读取CONTINUATION['adaptive_max_tokens']
+        """
+        self.path = DEFAULT_TUNER_PATH if path is None else path
+        self.enabled = CONTINUATION.get('adaptive_max_tokens', True) if enabled is None else enabled
+        self._lock = threading.Lock()
+        # 平台|模型 -> {"tokens": [实际完成token数], "truncated": [是否被截断]}，两个列表一一对应
+        self.samples: Dict[str, Dict[str, List]] = {}
+        if self.path:
+            try:
+                self.samples = {key: self._normalize(value) for key, value in load_file(self.path).items()}
+            except (OSError, ValueError, AttributeError):
+                self.samples = {}
+
+    @staticmethod
+    def _normalize(value) -> Dict[str, List]:
+        """兼容旧格式（只有完成token数的列表，视为未截断）"""
+        if isinstance(value, list):
+            return {"tokens": [int(v) for v in value], "truncated": [False] * len(value)}
+        tokens = [int(v) for v in value.get("tokens", [])]
+        truncated = [bool(v) for v in value.get("truncated", [])]
+        return {"tokens": tokens, "truncated": (truncated + [False] * len(tokens))[:len(tokens)]}
+
+    @staticmethod
+    def _key(platform: str, model: str) -> str:
+        return f"{platform}|{model}"
+
+    def max_tokens(self, platform: str, backend: ModelBackend) -> int:
+        """平台在该后端上的max_tokens：最近完成token数的p95乘以余量，上限为后端配置的max_tokens（和max_max_tokens），
+        下限为min_max_tokens（不超过上限）；样本不足或最近有请求被截断时使用上限"""
+        configured = backend.generation_config()['max_tokens']
+        if not configured:
+            return configured
+        cap = min(configured, CONTINUATION.get('max_max_tokens', 64000))
+        entry = self.samples.get(self._key(platform, backend.model))
+        if not self.enabled or entry is None or len(entry["tokens"]) < CONTINUATION.get('min_samples', 3):
+            return cap
+        # 被截断时实际需要的token数未知，不按观察值缩小
+        if any(entry["truncated"]):
+            return cap
+        ordered = sorted(entry["tokens"])
+        p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+        target = int(p95 * CONTINUATION.get('headroom', 1.3))
+        return max(min(CONTINUATION.get('min_max_tokens', 16000), cap), min(cap, target))
+
+    def observe(self, platform: str, response: ModelResponse) -> None:
+        """记录首次请求实际的完成token数和是否被截断"""
+        if not self.enabled:
+            return
+        completion_tokens = (response.usage or {}).get('completion_tokens') or 0
+        if not completion_tokens:
+            return
+        window = CONTINUATION.get('window', 20)
+        with self._lock:
+            entry = self.samples.setdefault(self._key(platform, response.model), {"tokens": [], "truncated": []})
+            entry["tokens"].append(int(completion_tokens))
+            entry["truncated"].append(bool(response.truncated))
+            del entry["tokens"][:-window]
+            del entry["truncated"][:-window]
+            data = {key: {"tokens": list(value["tokens"]), "truncated": list(value["truncated"])}
+                    for key, value in self.samples.items()}
+        if self.path:
+            try:
+                dump_file(self.path, data)
+            except OSError as e:
+                logger.warning(f"保存max_tokens统计失败: {str(e)}")
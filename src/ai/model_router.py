@@ -0,0 +1,492 @@
+"""
+多模型后端与延迟感知路由
+每个后端是一个OpenAI兼容的对话接口（DeepSeek、备用模型、本地llama.cpp/vLLM服务），有各自的容错策略和熔断器；
+路由器按后端的延迟和错误率EWMA选择后端：
+- priority：按配置顺序依次尝试健康的后端（首选后端始终优先），失败时转到下一个
+- fastest：按延迟EWMA从快到慢依次尝试健康的后端，失败时转到下一个
+- cost_capped：只使用预估单次费用不超过上限的后端，其余同fastest
+- hedged：首选后端超过其p95延迟仍未返回时再请求下一个后端，取先返回的有效结果
+错误率EWMA在后端未被尝试期间按半衰期衰减，因失败被排到后面的后端一段时间后恢复健康并重新尝试；
+被截断的响应作为有效结果返回，由调用方续写，不在其他后端上重新生成
+"""
+
+import os
+import time
+import math
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Union
+
+from config import DATA_DIRS, DEEPSEEK_AI, MODEL_BACKENDS, MODEL_ROUTING
+from src.utils.tracing import current_span
+from src.utils.serialization import dump_file, load_file
+from src.utils.http_client import sync_request
+from src.utils.resilience import (get_policy, is_retryable_status, parse_retry_after, ResiliencePolicy,
+                                  RetryableError, PermanentError)
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+ROUTE_PRIORITY = "priority"        # 按配置顺序使用健康的后端，失败时依次转移
+ROUTE_FASTEST = "fastest"          # 最快的健康后端优先，失败时依次转移
+ROUTE_COST_CAPPED = "cost_capped"  # 只使用预估费用不超过上限的后端
+ROUTE_HEDGED = "hedged"            # 首选后端超过p95延迟时对冲请求下一个后端
+
+# 影响生成内容的请求参数，未在后端配置中指定时使用DEEPSEEK_AI中的值
+GENERATION_KEYS = ("temperature", "max_tokens", "top_p", "stream")
+
+# 提示词：单条用户消息的文本，或完整的对话消息列表（续写截断的回答时）
+Prompt = Union[str, List[Dict[str, str]]]
+
+# 后端统计的保存路径
+DEFAULT_STATS_PATH = os.path.join(DATA_DIRS.get('snapshots', 'data/snapshots'), 'model_backends.json')
+
+# 后端请求在独立线程中执行，对冲时被放弃的请求在后台完成并计入统计
+_model_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="model")
+
+
+def as_messages(prompt: Prompt) -> List[Dict[str, str]]:
+    """提示词转换为对话消息列表"""
+    return [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+
+
+def prompt_text(prompt: Prompt) -> str:
+    """提示词的全部文本，用于预估token"""
+    return prompt if isinstance(prompt, str) else "\n".join(message["content"] for message in prompt)
+
+
+class ModelResponse:
+    """一次模型请求的结果"""
+
+    __slots__ = ("backend", "model", "content", "reasoning_content", "usage", "latency", "finish_reason")
+
+    def __init__(self, backend: str, model: str, content: str, reasoning_content: str,
+                 usage: Dict[str, Any], latency: float, finish_reason: Optional[str] = None):
+        self.backend = backend
+        self.model = model
+        self.content = content
+        self.reasoning_content = reasoning_content
+        self.usage = usage
+        self.latency = latency
+        self.finish_reason = finish_reason
+
+    @property
+    def truncated(self) -> bool:
+        """回答因max_tokens耗尽而不完整：finish_reason为length，或content为空、只有推理内容"""
+        return self.finish_reason == "length" or (not self.content.strip() and bool(self.reasoning_content.strip()))
+
+
+class CallUsage:
+    """一次路由调用中所有请求尝试的累计用量，包括失败、空响应和对冲的请求（可能来自多个线程）"""
+
+    __slots__ = ("attempts", "prompt_tokens", "completion_tokens", "metered_tokens", "cost", "_lock")
+
+    def __init__(self):
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.metered_tokens = 0  # 计入每日token上限的用量（metered后端）
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    def add_attempt(self) -> None:
+        with self._lock:
+            self.attempts += 1
+
+    def add_tokens(self, backend: "ModelBackend", prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            if backend.metered:
+                self.metered_tokens += prompt_tokens + completion_tokens
+            self.cost += backend.cost(prompt_tokens, completion_tokens)
+
+
+class BackendStats:
+    """后端的延迟、错误率EWMA和最近的成功延迟样本"""
+
+    __slots__ = ("latency_ewma", "error_ewma", "completion_tokens_ewma", "samples", "requests", "failures",
+                 "last_attempt")
+
+    def __init__(self, window: int = 50):
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.completion_tokens_ewma: Optional[float] = None
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.last_attempt: Optional[float] = None  # 最近一次尝试的时间（time.time()），用于错误率衰减
+
+    def error_rate(self, now: Optional[float] = None) -> float:
+        """按距最近一次尝试的时间衰减后的错误率EWMA，半衰期为MODEL_ROUTING['error_half_life']"""
+        half_life = MODEL_ROUTING.get('error_half_life', 1800)
+        if self.last_attempt is None or not half_life:
+            return self.error_ewma
+        elapsed = max(0.0, (time.time() if now is None else now) - self.last_attempt)
+        return self.error_ewma * 0.5 ** (elapsed / half_life)
+
+    def observe(self, latency: float, ok: bool, alpha: float, completion_tokens: Optional[int] = None,
+                now: Optional[float] = None) -> None:
+        """记录一次请求尝试的结果，错误率从衰减后的值继续更新，延迟EWMA和分位数只使用成功的请求"""
+        now = time.time() if now is None else now
+        self.requests += 1
+        self.error_ewma = self.error_rate(now)
+        self.error_ewma += alpha * ((0.0 if ok else 1.0) - self.error_ewma)
+        self.last_attempt = now
+        if not ok:
+            self.failures += 1
+            return
+        self.samples.append(latency)
+        self.latency_ewma = latency if self.latency_ewma is None else \
+            self.latency_ewma + alpha * (latency - self.latency_ewma)
+        if completion_tokens:
+            self.completion_tokens_ewma = completion_tokens if self.completion_tokens_ewma is None else \
+                self.completion_tokens_ewma + alpha * (completion_tokens - self.completion_tokens_ewma)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """最近成功请求延迟的分位数（最近邻法），没有样本时返回None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"latency_ewma": self.latency_ewma, "error_ewma": round(self.error_ewma, 4),
+                "completion_tokens_ewma": self.completion_tokens_ewma, "samples": list(self.samples),
+                "requests": self.requests, "failures": self.failures, "last_attempt": self.last_attempt}
+
+    def load(self, data: Dict[str, Any]) -> None:
+        self.latency_ewma = data.get("latency_ewma")
+        self.error_ewma = data.get("error_ewma", 0.0)
+        self.completion_tokens_ewma = data.get("completion_tokens_ewma")
+        self.samples.extend(data.get("samples", []))
+        self.requests = data.get("requests", 0)
+        self.failures = data.get("failures", 0)
+        self.last_attempt = data.get("last_attempt")
+
+
+class ModelBackend:
+    """OpenAI兼容的对话接口"""
+
+    def __init__(self, settings: Dict[str, Any], window: Optional[int] = None):
+        """
+        Args:
+            settings: MODEL_BACKENDS中的一项，包含name、api_url、model、api_key、endpoint、input_cost、output_cost，
+                      以及可选的temperature、max_tokens、top_p、stream
+            window: 保留的延迟样本数量，默认读取MODEL_ROUTING['window']
+        """
+        self.settings = settings
+        self.name = settings['name']
+        self.api_url = settings.get('api_url')
+        self.model = settings.get('model')
+        self.api_key = settings.get('api_key', '')
+        self.endpoint = settings.get('endpoint', self.name)
+        self.stats = BackendStats(window or MODEL_ROUTING.get('window', 50))
+
+    @property
+    def configured(self) -> bool:
+        """是否已配置地址和模型（需要密钥的后端还需配置密钥）"""
+        return bool(self.api_url and self.model and (self.api_key or not self.settings.get('requires_key')))
+
+    @property
+    def metered(self) -> bool:
+        """用量是否计入每日token上限，本地服务设置为False"""
+        return self.settings.get('metered', True)
+
+    @property
+    def policy(self) -> ResiliencePolicy:
+        return get_policy(self.endpoint)
+
+    def generation_config(self) -> Dict[str, Any]:
+        """请求参数，影响生成内容"""
+        config = {"model": self.model}
+        for key in GENERATION_KEYS:
+            config[key] = self.settings.get(key, DEEPSEEK_AI.get(key))
+        return config
+
+    def healthy(self) -> bool:
+        """熔断器未打开且衰减后的错误率EWMA低于MODEL_ROUTING['max_error_rate']"""
+        return not self.policy.breaker.is_open() and \
+            self.stats.error_rate() < MODEL_ROUTING.get('max_error_rate', 0.5)
+
+    def estimate_cost(self, prompt: Prompt) -> float:
+        """预估单次请求费用（美元），输入按UTF-8字节数/3估算token，输出按完成token的EWMA（没有时为max_tokens）"""
+        prompt_tokens = len(prompt_text(prompt).encode('utf-8')) / 3
+        completion_tokens = self.stats.completion_tokens_ewma or self.generation_config()['max_tokens'] or 0
+        return self.cost(prompt_tokens, completion_tokens)
+
+    def cost(self, prompt_tokens: float, completion_tokens: float) -> float:
+        """按input_cost/output_cost（每百万token的价格）计算费用（美元）"""
+        return (prompt_tokens * self.settings.get('input_cost', 0.0)
+                + completion_tokens * self.settings.get('output_cost', 0.0)) / 1_000_000
+
+    def request(self, prompt: Prompt, timeout: float, usage: Optional[CallUsage] = None,
+                max_tokens: Optional[int] = None) -> ModelResponse:
+        """发送一次请求，失败或返回内容为空时抛出异常，由容错策略决定是否重试
+
+        Args:
+            prompt: 提示词或对话消息列表
+            timeout: 本次尝试的超时（秒）
+            usage: 累计本次路由调用的用量
+            max_tokens: 覆盖配置的max_tokens
+
+        Returns:
+            ModelResponse: 有效的响应（可能是只有推理内容的截断响应）
+        """
+        headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        payload = {**self.generation_config(), "messages": as_messages(prompt)}
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+
+        logger.info(f"正在请求{self.name}({self.model})，超时设置: {timeout:.0f}秒")
+        stage = current_span()
+        start = time.perf_counter()
+        try:
+            response = sync_request('POST', self.api_url, headers=headers, json=payload, timeout=timeout)
+        except Exception:
+            self._observe(time.perf_counter() - start, False)
+            raise
+        latency = time.perf_counter() - start
+
+        logger.info(f"{self.name}请求完成，耗时: {latency:.2f}秒，状态码: {response.status_code}")
+        stage.add("bytes_in", len(response.content))
+        stage.set("status_code", response.status_code)
+
+        if response.status_code != 200:
+            self._observe(latency, False)
+            logger.error(f"{self.name}请求失败，状态码: {response.status_code}, 耗时: {latency:.2f}秒")
+            logger.error(f"响应内容: {response.text}")
+            message = f"http_error_{response.status_code}"
+            if is_retryable_status(response.status_code):
+                raise RetryableError(message, parse_retry_after(response.headers.get("Retry-After")))
+            raise PermanentError(message)
+
+        result = response.json()
+
+        # deepseek-reasoner的推理内容在reasoning_content中，最终答案在content中
+        choice = result.get("choices", [{}])[0]
+        message_data = choice.get("message", {})
+        content = message_data.get("content") or ""
+        reasoning_content = message_data.get("reasoning_content") or ""
+
+        token_usage = result.get("usage") or {}
+        if token_usage:
+            prompt_tokens = token_usage.get('prompt_tokens', 0) or 0
+            completion_tokens = token_usage.get('completion_tokens', 0) or 0
+            stage.add("prompt_tokens", prompt_tokens)
+            stage.add("completion_tokens", completion_tokens)
+            if usage is not None:
+                usage.add_tokens(self, prompt_tokens, completion_tokens)
+            logger.info(f"API使用统计 - 输入tokens: {token_usage.get('prompt_tokens', 'N/A')}, "
+                        f"输出tokens: {token_usage.get('completion_tokens', 'N/A')}, "
+                        f"总tokens: {token_usage.get('total_tokens', 'N/A')}")
+
+        if reasoning_content:
+            stage.set("reasoning_chars", len(reasoning_content))
+            logger.info(f"检测到推理内容，长度: {len(reasoning_content)}字符")
+            logger.debug(f"推理内容预览: {reasoning_content[:200]}...")
+
+        model_response = ModelResponse(self.name, self.model, content, reasoning_content, token_usage, latency,
+                                       choice.get("finish_reason"))
+        if len(content) > 100 or model_response.truncated:
+            self._observe(latency, True, token_usage.get('completion_tokens'))
+            return model_response
+
+        self._observe(latency, False)
+        logger.warning(f"{self.name}返回内容过短或为空，content长度: {len(content)}字符，"
+                       f"reasoning_content长度: {len(reasoning_content)}字符，耗时: {latency:.2f}秒")
+        logger.debug(f"返回的content: {content}")
+        # 空响应视为可重试的失败
+        raise RetryableError("empty_response")
+
+    def _observe(self, latency: float, ok: bool, completion_tokens: Optional[int] = None) -> None:
+        self.stats.observe(latency, ok, MODEL_ROUTING.get('ewma_alpha', 0.3), completion_tokens)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """后端状态，用于写入追踪文件"""
+        return {"model": self.model, "healthy": self.healthy(),
+                "latency_ewma": round(self.stats.latency_ewma, 3) if self.stats.latency_ewma is not None else None,
+                "p95": self.stats.percentile(95), "error_ewma": round(self.stats.error_rate(), 4),
+                "requests": self.stats.requests, "failures": self.stats.failures}
+
+
+class ModelRouter:
+    """按路由策略在多个模型后端之间选择和对冲"""
+
+    def __init__(self, backends: Optional[List[Dict[str, Any]]] = None, policy: Optional[str] = None,
+                 stats_path: Optional[str] = None):
+        """
+        Args:
+            backends: 后端配置，默认为MODEL_BACKENDS，未配置地址、模型或必需密钥的后端被忽略
+            policy: 路由策略，priority / fastest / cost_capped / hedged，默认读取MODEL_ROUTING['policy']
+            stats_path: 后端统计的保存路径，为空字符串时不保存
+        """
+        configured = [ModelBackend(settings) for settings in (backends if backends is not None else MODEL_BACKENDS)]
+        self.backends = [backend for backend in configured if backend.configured]
+        self.policy = policy or MODEL_ROUTING.get('policy', ROUTE_PRIORITY)
+        self.stats_path = DEFAULT_STATS_PATH if stats_path is None else stats_path
+        self._lock = threading.Lock()
+        self._load_stats()
+
+    def _load_stats(self) -> None:
+        """读取上一次运行保存的后端统计，首次路由即可按历史延迟排序和设置对冲时机"""
+        if not self.stats_path:
+            return
+        try:
+            saved = load_file(self.stats_path)
+        except (OSError, ValueError):
+            return
+        for backend in self.backends:
+            data = saved.get(backend.name)
+            if data and data.get("model") == backend.model:
+                backend.stats.load(data)
+
+    def save_stats(self) -> None:
+        if not self.stats_path:
+            return
+        with self._lock:
+            data = {backend.name: {"model": backend.model, **backend.stats.to_dict()} for backend in self.backends}
+        try:
+            dump_file(self.stats_path, data)
+        except OSError as e:
+            logger.warning(f"保存模型后端统计失败: {str(e)}")
+
+    def available(self) -> bool:
+        """是否还有熔断器未打开的后端"""
+        return any(not backend.policy.breaker.is_open() for backend in self.backends)
+
+    def signature(self) -> List[Dict[str, Any]]:
+        """路由策略和各后端的请求参数，用于建议产物的输入摘要"""
+        return [{"policy": self.policy}] + [{"backend": b.name, **b.generation_config()} for b in self.backends]
+
+    def backend(self, name: str) -> Optional[ModelBackend]:
+        return next((backend for backend in self.backends if backend.name == name), None)
+
+    def ranked(self, prompt: Prompt, backends: Optional[List[str]] = None) -> List[ModelBackend]:
+        """按路由策略排列候选后端：健康的在前；priority策略再按配置顺序，其他策略再按延迟EWMA从快到慢，
+        没有统计的后端按配置顺序排在有统计的之后
+
+        Args:
+            prompt: 提示词，用于预估费用
+            backends: 只使用这些名称的后端（如预算不足时降级），默认使用所有后端
+        """
+        order = {backend.name: index for index, backend in enumerate(self.backends)}
+        allowed = [b for b in self.backends if backends is None or b.name in backends]
+        if self.policy == ROUTE_PRIORITY:
+            candidates = sorted(allowed, key=lambda b: (not b.healthy(), order[b.name]))
+        else:
+            candidates = sorted(allowed, key=lambda b: (not b.healthy(),
+                                                        b.stats.latency_ewma if b.stats.latency_ewma is not None
+                                                        else math.inf, order[b.name]))
+        if self.policy == ROUTE_COST_CAPPED and candidates:
+            cap = MODEL_ROUTING.get('cost_cap', 0.1)
+            affordable = [b for b in candidates if b.estimate_cost(prompt) <= cap]
+            # 所有后端都超过上限时只使用最便宜的
+            candidates = affordable or [min(candidates, key=lambda b: b.estimate_cost(prompt))]
+        return candidates
+
+    def hedge_delay(self, backend: ModelBackend) -> float:
+        """后端的对冲时机：最近成功延迟的p95（可配置分位数），不低于hedge_min，没有样本时为hedge_default"""
+        latency = backend.stats.percentile(MODEL_ROUTING.get('hedge_percentile', 95))
+        if latency is None:
+            return MODEL_ROUTING.get('hedge_default', 240)
+        return max(latency, MODEL_ROUTING.get('hedge_min', 30))
+
+    def complete(self, prompt: Prompt, max_attempts: Optional[int] = None, base_delay: Optional[float] = None,
+                 backends: Optional[List[str]] = None, usage: Optional[CallUsage] = None,
+                 max_tokens: Optional[Dict[str, int]] = None) -> ModelResponse:
+        """按路由策略请求模型
+
+        Args:
+            prompt: 提示词或对话消息列表
+            max_attempts: 每个后端的最大尝试次数，默认使用后端容错策略的配置
+            base_delay: 退避的最小间隔
+            backends: 只使用这些名称的后端，默认使用所有后端
+            usage: 累计本次调用所有请求尝试的次数、token和费用
+            max_tokens: 按后端名称覆盖配置的max_tokens
+
+        Returns:
+            ModelResponse: 首个有效的响应，可能是被截断的响应（由调用方续写，不在其他后端上重新生成）
+
+        Raises:
+            RuntimeError: 没有可用的后端
+            Exception: 所有后端都失败时为最后一个后端的异常
+        """
+        queue = self.ranked(prompt, backends)
+        usage = usage if usage is not None else CallUsage()
+        if not queue:
+            raise RuntimeError("没有可用的模型后端")
+        stage = current_span()
+        stage.set("route_policy", self.policy)
+
+        def launch() -> Future:
+            backend = queue.pop(0)
+            stage.add("backends_tried", 1)
+
+            def attempt(timeout: float) -> ModelResponse:
+                usage.add_attempt()
+                return backend.request(prompt, timeout, usage, (max_tokens or {}).get(backend.name))
+
+            future = _model_executor.submit(contextvars.copy_context().run, backend.policy.call, attempt,
+                                            max_attempts=max_attempts, base_delay=base_delay)
+            launched[future] = backend
+            return future
+
+        launched: Dict[Future, ModelBackend] = {}
+        pending = {launch()}
+        latest = next(iter(pending))
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                hedge_after = self.hedge_delay(launched[latest]) \
+                    if self.policy == ROUTE_HEDGED and queue else None
+                done, pending = wait_futures(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+                if not done:
+                    # 当前后端超过对冲时机仍未返回，请求下一个后端，两者都继续等待
+                    if launched[latest].policy.budget.try_acquire():
+                        logger.info(f"{launched[latest].name}超过{hedge_after:.0f}秒未返回，对冲请求{queue[0].name}")
+                        stage.add("hedges", 1)
+                        latest = launch()
+                        pending.add(latest)
+                    else:
+                        done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend = launched[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.warning(f"{backend.name}请求失败: {str(e)[:200]}")
+                        error = e
+                        continue
+                    return result
+                # 已返回的后端都失败，转到下一个后端
+                if not pending and queue:
+                    latest = launch()
+                    pending.add(latest)
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+            self.save_stats()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """路由策略和各后端状态，用于写入追踪文件"""
+        return {"policy": self.policy, "backends": {backend.name: backend.snapshot() for backend in self.backends}}
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """获取进程内共享的模型路由器，后端统计在多次运行之间累积"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -1,11 +1,14 @@
-import aiohttp
-import json
 import os
 import logging
 import traceback
 from datetime import datetime
 import time
 
+from src.utils.tracing import span
+from src.utils.http_client import get_async_session, build_timeout
+from src.utils.serialization import loads, dump_file, load_file
+from src.utils.resilience import get_policy, is_retryable_status, parse_retry_after, RetryableError, PermanentError
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -13,6 +16,9 @@ logger = logging.getLogger(__name__)
 class BaseDataCollector:
     """基础数据收集器，提供通用的数据获取和存储功能"""
     
+    # 容错策略名称，对应RESILIENCE['endpoints']中的配置
+    endpoint = "http"
+    
     def __init__(self, data_dir="data", proxy_url=None, use_proxy=True):
         """初始化基础数据收集器"""
         # 设置数据目录
@@ -28,40 +34,81 @@ class BaseDataCollector:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
     
-    async def fetch_data(self, url, params=None, use_proxy=None):
-        """通用数据获取方法，支持代理配置"""
+    def _resolve_proxy(self, use_proxy=None):
+        """返回本次请求使用的代理地址"""
         if use_proxy is None:
             use_proxy = self.use_proxy
-            
+        return self.proxy if use_proxy and self.proxy else None
+    
+    async def _request(self, url, params=None, proxy=None, headers=None):
+        """发送GET请求，按self.endpoint对应的容错策略重试、对冲和熔断
+        
+        Returns:
+            tuple: (状态码, 响应头, 响应体)，状态码为200或304
+        """
+        if proxy:
+            logger.info(f"使用代理 {proxy} 请求 {url}")
+        else:
+            logger.info(f"不使用代理请求 {url}")
+        
+        request_headers = {**self.headers, **(headers or {})}
+        
+        async def attempt(timeout):
+            with span("http_get", url=url, proxy=bool(proxy), endpoint=self.endpoint) as stage:
+                # 使用进程内共享的会话，复用连接池和DNS缓存
+                session = await get_async_session()
+                async with session.get(url, params=params, headers=request_headers, proxy=proxy,
+                                       timeout=build_timeout(timeout)) as response:
+                    stage.set("status_code", response.status)
+                    if response.status in (200, 304):
+                        body = await response.read()
+                        stage.set("bytes_in", len(body))
+                        return response.status, response.headers, body
+                    message = f"请求失败，状态码: {response.status}, URL: {url}"
+                    if is_retryable_status(response.status):
+                        raise RetryableError(message, parse_retry_after(response.headers.get("Retry-After")))
+                    raise PermanentError(message)
+        
+        return await get_policy(self.endpoint).call_async(attempt, idempotent=True)
+    
+    async def fetch_data(self, url, params=None, use_proxy=None):
+        """通用数据获取方法，支持代理配置，按self.endpoint对应的容错策略重试、对冲和熔断"""
+        try:
+            status, headers, body = await self._request(url, params, self._resolve_proxy(use_proxy))
+            return loads(body)
+        except Exception as e:
+            logger.error(f"获取数据出错: {url}, 错误: {str(e)}")
+            logger.debug(traceback.format_exc())
+            return None
+    
+    async def fetch_cached(self, url, cache, params=None, use_proxy=None):
+        """带条件请求的数据获取，响应未变化（304或内容摘要相同）时changed为False
+        
+        Args:
+            url: 请求地址
+            cache: 该数据源的HttpCache
+            params: 查询参数
+            use_proxy: 是否使用代理，默认使用初始化时的设置
+        
+        Returns:
+            Optional[CachedFetch]: 获取结果，失败时返回None
+        """
         try:
-            async with aiohttp.ClientSession(headers=self.headers) as session:
-                if use_proxy and self.proxy:
-                    logger.info(f"使用代理 {self.proxy} 请求 {url}")
-                    async with session.get(url, params=params, proxy=self.proxy, timeout=30) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            logger.error(f"请求失败，状态码: {response.status}, URL: {url}")
-                            return None
-                else:
-                    logger.info(f"不使用代理请求 {url}")
-                    async with session.get(url, params=params, timeout=30) as response:
-                        if response.status == 200:
-                            return await response.json()
-                        else:
-                            logger.error(f"请求失败，状态码: {response.status}, URL: {url}")
-                            return None
+            status, headers, body = await self._request(url, params, self._resolve_proxy(use_proxy),
+                                                        cache.conditional_headers())
         except Exception as e:
             logger.error(f"获取数据出错: {url}, 错误: {str(e)}")
             logger.debug(traceback.format_exc())
             return None
+        if status == 304:
+            return cache.not_modified()
+        return cache.store(body, headers)
     
     def save_to_json(self, data, filename):
         """保存数据到JSON文件"""
         file_path = os.path.join(self.data_dir, filename)
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            dump_file(file_path, data)
             logger.info(f"数据已保存到: {file_path}")
             return True
         except Exception as e:
@@ -73,8 +120,7 @@ class BaseDataCollector:
         file_path = os.path.join(self.data_dir, filename)
         try:
             if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = load_file(file_path)
                 logger.info(f"从{file_path}加载了数据")
                 return data
             else:
@@ -91,4 +137,4 @@ class BaseDataCollector:
             
         last_updated = data[timestamp_key]
         current_time = int(time.time())
-        return (current_time - last_updated) >= hours * 60 * 60 
\ No newline at end of file
+        return (current_time - last_updated) >= hours * 60 * 60 
\ No newline at end of file
@@ -2,12 +2,17 @@ import os
 import json
 import logging
 import requests
+import re
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
 from .base_collector import BaseDataCollector
 from config import MARKET_SENTIMENT
+from src.utils.http_cache import HttpCache
+
+# CMC响应中每次都会变化的status（timestamp、elapsed等）不参与内容摘要
+_STATUS_PATTERN = re.compile(rb'"status"\s*:\s*\{[^{}]*\}')
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,11 +21,14 @@ logger = logging.getLogger(__name__)
 class BinanceAlphaCollector(BaseDataCollector):
     """币安Alpha项目列表数据收集器"""
     
+    endpoint = "cmc"
+    
     def __init__(self, data_dir="data", proxy_url=None, use_proxy=True):
         """初始化币安Alpha项目列表数据收集器"""
         super().__init__(data_dir, proxy_url, use_proxy)
         self.data_file = os.path.join(data_dir, "binance_alpha_data.json")
         self.api_url = MARKET_SENTIMENT.get('binance_alpha_url', 'https://api.coinmarketcap.com/data-api/v3/cryptocurrency/listing')
+        self.cache = HttpCache("cmc_listing", normalize=lambda body: _STATUS_PATTERN.sub(b'', body, count=1))
     
     async def get_binance_alpha_data(self) -> Optional[Dict[str, Any]]:
         """获取币安Alpha项目列表数据"""
@@ -40,7 +48,23 @@ class BinanceAlphaCollector(BaseDataCollector):
         }
         
         try:
-            response_data = await self.fetch_data(self.api_url, params)
+            response = await self.fetch_cached(self.api_url, self.cache, params)
+            
+            if response is None:
+                logger.error("获取币安Alpha项目列表数据失败: 无效响应")
+                return None
+            
+            # 内容未变化时沿用上一次的结果，只刷新时间戳
+            if not response.changed:
+                previous = self.load_from_json("binance_alpha_data.json")
+                if previous and previous.get("data"):
+                    timestamp = int(time.time())
+                    previous["timestamp"] = timestamp
+                    previous["date"] = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+                    self.save_to_json(previous, "binance_alpha_data.json")
+                    return previous
+            
+            response_data = response.json()
             
             if not response_data or 'data' not in response_data:
                 logger.error("获取币安Alpha项目列表数据失败: 无效响应")
@@ -0,0 +1,584 @@
+"""
+投资建议分析索引
+将AI投资建议中的TOP3推荐解析为结构化记录，增量写入SQLite，
+用于推荐频率统计、首次推荐到现货上线的时间分析等查询；
+同时记录每个文件中加粗项目标记的出现次数，供extract.py按原有口径统计提及次数
+"""
+
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import DATA_DIRS, BLOCKCHAIN_PLATFORMS
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 默认索引数据库路径
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, DATA_DIRS.get('analytics', 'data/analytics'), 'advice_index.db')
+
+# 建议文件类型：单平台建议 / 所有平台汇总报告
+KIND_PLATFORM = "platform"
+KIND_COMBINED = "combined"
+
+# 单平台建议文件名：advice_20250520081016_solana.md
+PLATFORM_FILE_PATTERN = re.compile(r'^advice_(\d{14})_(.+)\.md$')
+# 汇总报告文件名：advice_20250520.md / advice_20250420(2).md / advice_20250601_fix_bug.md
+COMBINED_FILE_PATTERN = re.compile(r'^advice_(\d{8})\D*.*\.md$')
+# 汇总报告中的平台小节标题：## Solana平台投资建议 / ## Ethereum 平台
+SECTION_PATTERN = re.compile(r'^##\s+(.+?)\s*平台.*$', re.MULTILINE)
+# 兼容旧格式的加粗项目标记：**Ondo (ONDO)**
+BOLD_PROJECT_PATTERN = re.compile(r'(?:\d+\.\s+)?\*\*([^\*]+?)\s*\(([A-Z0-9\-]+)\)\*\*')
+# 早期无表格格式的项目标题：### 1. Grass (GRASS) / ### 推荐代币1：Grass (GRASS)
+HEADING_PROJECT_PATTERN = re.compile(
+    r'^#{2,4}\s+(?:推荐代币\d*[:：]?\s*)?(?:\d+[\.、]\s*)?\**([^\(\*\n]+?)\s*\(([A-Z0-9\-]+)\)\**\s*$',
+    re.MULTILINE
+)
+# 评分中的数值：**8.3** / 7.8 / 8.45
+SCORE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    indexed_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recommendations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    score REAL,
+    template TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recommendations_symbol ON recommendations(symbol);
+CREATE INDEX IF NOT EXISTS idx_recommendations_date ON recommendations(kind, date);
+CREATE INDEX IF NOT EXISTS idx_recommendations_path ON recommendations(path);
+CREATE TABLE IF NOT EXISTS mentions (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mentions_path ON mentions(path);
+"""
+
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    """打开索引数据库，如不存在则创建表结构
+
+    Args:
+        db_path: 数据库路径，默认为data/analytics/advice_index.db
+
+    Returns:
+        sqlite3.Connection: 数据库连接
+    """
+    db_path = db_path or DEFAULT_DB_PATH
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    has_mentions = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mentions'").fetchone()
+    conn.executescript(SCHEMA)
+
+    # 兼容旧版本索引：补充template列和mentions表，并清空文件记录以便下次刷新时重新解析
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(recommendations)")}
+    if 'template' not in columns:
+        conn.execute("ALTER TABLE recommendations ADD COLUMN template TEXT")
+        conn.execute("DELETE FROM files")
+        conn.commit()
+    elif not has_mentions:
+        conn.execute("DELETE FROM files")
+        conn.commit()
+
+    return conn
+
+
+def _platform_from_slug(slug: str) -> str:
+    """将文件名中的平台标识（如bnb_chain）还原为配置中的平台名称"""
+    for platform in BLOCKCHAIN_PLATFORMS.keys():
+        if platform.lower().replace(' ', '_') == slug.lower():
+            return platform
+    return slug
+
+
+def _clean_cell(cell: str) -> str:
+    """去除表格单元格中的markdown修饰"""
+    return cell.replace('*', '').replace('`', '').strip()
+
+
+def _parse_score(cell: str) -> Optional[float]:
+    """从总评分单元格中提取数值"""
+    match = SCORE_PATTERN.search(_clean_cell(cell))
+    return float(match.group(1)) if match else None
+
+
+def detect_template(content: str) -> str:
+    """根据建议文本结构推断生成它的提示词模板版本
+
+    v3提示词要求输出带"总评分"列的TOP3概览表格，v2提示词只要求推荐3个代币。
+    """
+    for line in content.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('|') and '代码' in stripped and '总评分' in stripped:
+            return "v3"
+    return "v2"
+
+
+def parse_top_recommendations(content: str, top_n: int = 3) -> List[Dict[str, Any]]:
+    """从一段建议文本中解析TOP推荐项目
+
+    优先解析包含"代码"与"总评分"列的概览表格；旧格式没有表格时，
+    按"名称 (代码)"形式的标题或加粗标记出现的先后顺序提取，此时评分为None。
+
+    Args:
+        content: 建议markdown文本
+        top_n: 最多提取的项目数量
+
+    Returns:
+        List[Dict[str, Any]]: 每项包含rank、symbol、name、score
+    """
+    lines = content.splitlines()
+
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped.startswith('|') or '代码' not in stripped or '总评分' not in stripped:
+            continue
+
+        header = [_clean_cell(c) for c in stripped.strip('|').split('|')]
+        try:
+            symbol_idx = header.index('代码')
+        except ValueError:
+            continue
+        score_idx = next((idx for idx, h in enumerate(header) if h.startswith('总评分')), len(header) - 1)
+        name_idx = next((idx for idx, h in enumerate(header) if '名称' in h), 0)
+
+        results = []
+        for row in lines[i + 1:]:
+            row = row.strip()
+            if not row.startswith('|'):
+                break
+            cells = row.strip('|').split('|')
+            # 跳过分隔行
+            if all(set(c.strip()) <= set('-: ') for c in cells):
+                continue
+            if len(cells) <= max(symbol_idx, score_idx, name_idx):
+                continue
+            symbol = _clean_cell(cells[symbol_idx]).upper()
+            if not symbol or not re.match(r'^[A-Z0-9\-]+$', symbol):
+                continue
+            results.append({
+                "rank": len(results) + 1,
+                "symbol": symbol,
+                "name": _clean_cell(cells[name_idx]),
+                "score": _parse_score(cells[score_idx]),
+            })
+            if len(results) >= top_n:
+                break
+
+        if results:
+            return results
+
+    # 旧格式：按项目标题或加粗标记的出现顺序提取
+    matches = sorted(
+        list(HEADING_PROJECT_PATTERN.finditer(content)) + list(BOLD_PROJECT_PATTERN.finditer(content)),
+        key=lambda m: m.start()
+    )
+
+    results = []
+    seen = set()
+    for name, symbol in (m.groups() for m in matches):
+        symbol = symbol.strip().upper()
+        if symbol in seen:
+            continue
+        seen.add(symbol)
+        results.append({
+            "rank": len(results) + 1,
+            "symbol": symbol,
+            "name": re.sub(r'^\d+\.\s+', '', name.strip()),
+            "score": None,
+        })
+        if len(results) >= top_n:
+            break
+
+    return results
+
+
+def parse_advice_file(file_path: str, kind: str, template: Optional[str] = None) -> List[Dict[str, Any]]:
+    """解析单个建议文件为推荐记录列表
+
+    Args:
+        file_path: 建议文件路径
+        kind: 文件类型，KIND_PLATFORM或KIND_COMBINED
+        template: 提示词模板版本，为None时根据文本结构推断
+
+    Returns:
+        List[Dict[str, Any]]: 推荐记录，每项包含run_at、date、platform、rank、symbol、name、score、template
+    """
+    filename = os.path.basename(file_path)
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    records = []
+
+    if kind == KIND_PLATFORM:
+        match = PLATFORM_FILE_PATTERN.match(filename)
+        if not match:
+            return []
+        run_at = datetime.strptime(match.group(1), '%Y%m%d%H%M%S')
+        platform = _platform_from_slug(match.group(2))
+        for item in parse_top_recommendations(content):
+            records.append({"run_at": run_at, "platform": platform,
+                            "template": template or detect_template(content), **item})
+    else:
+        match = COMBINED_FILE_PATTERN.match(filename)
+        if not match:
+            return []
+        run_at = datetime.strptime(match.group(1), '%Y%m%d')
+        sections = list(SECTION_PATTERN.finditer(content))
+        for idx, section in enumerate(sections):
+            end = sections[idx + 1].start() if idx + 1 < len(sections) else len(content)
+            platform = section.group(1).strip()
+            section_content = content[section.end():end]
+            for item in parse_top_recommendations(section_content):
+                records.append({"run_at": run_at, "platform": platform,
+                                "template": template or detect_template(section_content), **item})
+
+    for record in records:
+        record["date"] = record["run_at"].strftime('%Y-%m-%d')
+        record["run_at"] = record["run_at"].strftime('%Y-%m-%d %H:%M:%S')
+
+    return records
+
+
+def parse_mentions(file_path: str, kind: str) -> List[Dict[str, Any]]:
+    """统计建议文件中每个"**名称 (代码)**"加粗标记出现的次数（不限于TOP3，与旧版extract.py口径一致）
+
+    Args:
+        file_path: 建议文件路径
+        kind: 文件类型，KIND_PLATFORM或KIND_COMBINED
+
+    Returns:
+        List[Dict[str, Any]]: 每项包含date、symbol、name（文件中第一次出现的名称）、count
+    """
+    filename = os.path.basename(file_path)
+    pattern = PLATFORM_FILE_PATTERN if kind == KIND_PLATFORM else COMBINED_FILE_PATTERN
+    match = pattern.match(filename)
+    if not match:
+        return []
+    stamp = match.group(1)
+    date = datetime.strptime(stamp[:8], '%Y%m%d').strftime('%Y-%m-%d')
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    mentions: Dict[str, Dict[str, Any]] = {}
+    for name, symbol in BOLD_PROJECT_PATTERN.findall(content):
+        symbol = symbol.strip().upper()
+        if symbol not in mentions:
+            mentions[symbol] = {"date": date, "symbol": symbol,
+                                "name": re.sub(r'^\d+\.\s+', '', name.strip()), "count": 0}
+        mentions[symbol]["count"] += 1
+
+    return list(mentions.values())
+
+
+def _file_digest(file_path: str) -> str:
+    """计算文件内容的SHA-256摘要"""
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def index_advice_file(file_path: str, kind: str = KIND_PLATFORM, conn: Optional[sqlite3.Connection] = None,
+                      template: Optional[str] = None) -> Optional[int]:
+    """将单个建议文件写入索引（文件未变化时跳过）
+
+    Args:
+        file_path: 建议文件路径
+        kind: 文件类型，KIND_PLATFORM或KIND_COMBINED
+        conn: 数据库连接，为None时打开默认数据库
+        template: 生成该建议的提示词模板版本，为None时根据文本结构推断
+
+    Returns:
+        Optional[int]: 新写入的推荐记录数，文件未变化时返回None
+    """
+    own_conn = conn is None
+    conn = conn or connect()
+
+    try:
+        path = os.path.relpath(os.path.abspath(file_path), ROOT_DIR)
+        stat = os.stat(file_path)
+
+        row = conn.execute("SELECT mtime, size, digest FROM files WHERE path = ?", (path,)).fetchone()
+
+        # mtime和大小均未变化，直接跳过
+        if row and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            return None
+
+        digest = _file_digest(file_path)
+
+        # 仅mtime变化但内容相同，更新元数据后跳过解析
+        if row and row[2] == digest:
+            conn.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (stat.st_mtime, stat.st_size, path))
+            conn.commit()
+            return None
+
+        records = parse_advice_file(file_path, kind, template)
+        mentions = parse_mentions(file_path, kind)
+
+        conn.execute("DELETE FROM recommendations WHERE path = ?", (path,))
+        conn.execute("DELETE FROM mentions WHERE path = ?", (path,))
+        conn.executemany(
+            "INSERT INTO recommendations (path, kind, run_at, date, platform, rank, symbol, name, score, template) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path, kind, r["run_at"], r["date"], r["platform"], r["rank"], r["symbol"], r["name"], r["score"],
+              r["template"]) for r in records]
+        )
+        conn.executemany(
+            "INSERT INTO mentions (path, kind, date, symbol, name, count) VALUES (?, ?, ?, ?, ?, ?)",
+            [(path, kind, m["date"], m["symbol"], m["name"], m["count"]) for m in mentions]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, kind, mtime, size, digest, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (path, kind, stat.st_mtime, stat.st_size, digest, int(datetime.now().timestamp()))
+        )
+        conn.commit()
+
+        if not records:
+            logger.debug(f"建议文件中未解析到推荐项目: {path}")
+
+        return len(records)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def refresh_index(db_path: Optional[str] = None) -> Dict[str, int]:
+    """增量刷新索引，只解析新增或内容变化的建议文件
+
+    Args:
+        db_path: 数据库路径，默认为data/analytics/advice_index.db
+
+    Returns:
+        Dict[str, int]: 扫描文件数、新解析文件数和新写入的推荐记录数
+    """
+    sources = [
+        (os.path.join(ROOT_DIR, DATA_DIRS['advices']), KIND_PLATFORM),
+        (os.path.join(ROOT_DIR, DATA_DIRS['all-platforms']), KIND_COMBINED),
+    ]
+
+    stats = {"scanned": 0, "indexed": 0, "records": 0}
+    conn = connect(db_path)
+
+    try:
+        for folder, kind in sources:
+            if not os.path.isdir(folder):
+                continue
+            for filename in sorted(os.listdir(folder)):
+                if not filename.startswith('advice_') or not filename.endswith('.md'):
+                    continue
+                stats["scanned"] += 1
+                count = index_advice_file(os.path.join(folder, filename), kind, conn)
+                if count is not None:
+                    stats["indexed"] += 1
+                    stats["records"] += count
+    finally:
+        conn.close()
+
+    logger.info(f"建议索引刷新完成: 扫描{stats['scanned']}个文件，解析{stats['indexed']}个，写入{stats['records']}条推荐记录")
+    return stats
+
+
+def _window_filter(alias: str, kind: str, since: Optional[str], until: Optional[str],
+                   platform: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """统计查询的筛选条件（文件类型、日期窗口、平台）
+
+    Returns:
+        Tuple[str, List[Any]]: WHERE子句和参数
+    """
+    clause = f"{alias}.kind = ?"
+    params: List[Any] = [kind]
+    if since:
+        clause += f" AND {alias}.date >= ?"
+        params.append(since)
+    if until:
+        clause += f" AND {alias}.date <= ?"
+        params.append(until)
+    if platform:
+        clause += f" AND {alias}.platform = ?"
+        params.append(platform)
+    return clause, params
+
+
+def symbol_frequency(kind: str = KIND_PLATFORM, since: Optional[str] = None, until: Optional[str] = None,
+                     platform: Optional[str] = None, db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """统计时间窗口内各代币进入TOP推荐的次数
+
+    Args:
+        kind: 统计的文件类型
+        since: 起始日期（含），格式YYYY-MM-DD
+        until: 截止日期（含），格式YYYY-MM-DD
+        platform: 仅统计指定平台
+        db_path: 数据库路径
+
+    Returns:
+        List[Dict[str, Any]]: 按次数降序排列，每项包含symbol、name（窗口内最近一次推荐使用的名称）、
+            count、first_date、last_date、avg_score
+    """
+    outer, params = _window_filter("r", kind, since, until, platform)
+    inner, inner_params = _window_filter("l", kind, since, until, platform)
+    query = (f"SELECT r.symbol, (SELECT l.name FROM recommendations l WHERE l.symbol = r.symbol AND {inner} "
+             f"ORDER BY l.date DESC, l.run_at DESC, l.path DESC, l.rank LIMIT 1), "
+             f"COUNT(*), MIN(r.date), MAX(r.date), AVG(r.score) "
+             f"FROM recommendations r WHERE {outer} GROUP BY r.symbol ORDER BY COUNT(*) DESC, r.symbol")
+    params = inner_params + params
+
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    return [
+        {"symbol": r[0], "name": r[1], "count": r[2], "first_date": r[3], "last_date": r[4], "avg_score": r[5]}
+        for r in rows
+    ]
+
+
+def mention_frequency(kind: str = KIND_COMBINED, since: Optional[str] = None, until: Optional[str] = None,
+                      db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """统计时间窗口内各代币在建议文件中以加粗标记被提及的总次数
+
+    与symbol_frequency不同，这里计入正文中的每一次提及（含TOP3之外的候选和分析段落），
+    是alpha_frequency_stats.md一直使用的统计口径。
+
+    Args:
+        kind: 统计的文件类型
+        since: 起始日期（含），格式YYYY-MM-DD
+        until: 截止日期（含），格式YYYY-MM-DD
+        db_path: 数据库路径
+
+    Returns:
+        List[Dict[str, Any]]: 按次数降序排列，每项包含symbol、name（窗口内最近一次提及使用的名称）、
+            count、first_date、last_date
+    """
+    outer, params = _window_filter("m", kind, since, until)
+    inner, inner_params = _window_filter("l", kind, since, until)
+    query = (f"SELECT m.symbol, (SELECT l.name FROM mentions l WHERE l.symbol = m.symbol AND {inner} "
+             f"ORDER BY l.date DESC, l.path DESC LIMIT 1), "
+             f"SUM(m.count), MIN(m.date), MAX(m.date) "
+             f"FROM mentions m WHERE {outer} GROUP BY m.symbol ORDER BY SUM(m.count) DESC, m.symbol")
+    params = inner_params + params
+
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    return [
+        {"symbol": r[0], "name": r[1], "count": r[2], "first_date": r[3], "last_date": r[4]}
+        for r in rows
+    ]
+
+
+def load_recommendations(kind: str = KIND_PLATFORM, db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """按时间顺序加载全部推荐记录
+
+    Returns:
+        List[Dict[str, Any]]: 每项包含path、run_at、date、platform、rank、symbol、name、score、template
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT path, run_at, date, platform, rank, symbol, name, score, template "
+            "FROM recommendations WHERE kind = ? ORDER BY run_at, path, rank", (kind,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    keys = ("path", "run_at", "date", "platform", "rank", "symbol", "name", "score", "template")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def first_recommendations(kind: str = KIND_PLATFORM, db_path: Optional[str] = None) -> Dict[str, str]:
+    """获取每个代币第一次进入TOP推荐的日期
+
+    Returns:
+        Dict[str, str]: 代币符号 -> 首次推荐日期（YYYY-MM-DD）
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT symbol, MIN(date) FROM recommendations WHERE kind = ? GROUP BY symbol", (kind,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {symbol: date for symbol, date in rows}
+
+
+def load_listing_dates(raw_dir: Optional[str] = None) -> Dict[str, str]:
+    """每个token首次出现在币安现货的日期，来自由原始交易对快照序列增量构建的上币时间线索引
+
+    Args:
+        raw_dir: 原始快照目录，默认为symbols/raw
+
+    Returns:
+        Dict[str, str]: token -> 首次出现日期（YYYY-MM-DD），1000x形式同时登记原始代币名
+    """
+    from src.utils.listing_timeline import get_listing_timeline
+
+    return get_listing_timeline(raw_dir).listing_dates()
+
+
+def time_to_listing(kind: str = KIND_PLATFORM, listing_dates: Optional[Dict[str, str]] = None,
+                    db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """计算每个被推荐代币从首次推荐到现货上线的天数
+
+    listed_since等于第一份快照日期时，表示该代币在开始记录前已经上线；
+    days为负数表示推荐时已经上线。
+
+    Args:
+        kind: 统计的文件类型
+        listing_dates: token -> 上线日期映射，为None时从symbols/raw推算
+        db_path: 数据库路径
+
+    Returns:
+        List[Dict[str, Any]]: 每项包含symbol、first_recommended、listed_since、days（未上线时为None）
+    """
+    if listing_dates is None:
+        listing_dates = load_listing_dates()
+
+    results = []
+    for symbol, first_date in sorted(first_recommendations(kind, db_path).items()):
+        listed_since = listing_dates.get(symbol)
+        days = None
+        if listed_since:
+            days = (datetime.strptime(listed_since, '%Y-%m-%d') - datetime.strptime(first_date, '%Y-%m-%d')).days
+        results.append({
+            "symbol": symbol,
+            "first_recommended": first_date,
+            "listed_since": listed_since,
+            "days": days,
+        })
+
+    return results
@@ -0,0 +1,114 @@
+"""
+投资建议产物存储
+每个平台的建议以其精确输入的摘要为键保存：写入提示词的项目（按提示词中的格式和精度，含趋势特征）、近期上线现货的同平台参照项目、
+提示词模板版本和模型配置（路由策略和各模型后端的请求参数），
+输入摘要相同时直接复用已保存的建议，不再请求AI；提示词模板或模型配置变化时所有平台的建议随之失效
+"""
+
+import os
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import DATA_DIRS, PROMPT_TEMPLATE_VERSION, ADVICE_STORE
+from src.ai.model_router import get_model_router
+from src.utils.serialization import dumps, write_bytes
+from src.utils.alpha_project import AlphaProject
+from src.utils.crypto_formatter import format_project_detailed, format_recent_listing
+from src.utils.project_filters import select_prompt_projects
+from src.utils.trend_features import TrendFeatures
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+def inputs_digest(platform: str, projects: List[AlphaProject], template: Optional[str] = None,
+                  model_config: Optional[List[Dict[str, Any]]] = None,
+                  recent_listings: Optional[List[Tuple[AlphaProject, str, List[str]]]] = None,
+                  trend_features: Optional[Dict[int, TrendFeatures]] = None) -> str:
+    """计算平台建议输入的摘要
+
+    Args:
+        platform: 平台名称
+        projects: 平台的项目（过滤后），只有写入提示词的前N个项目参与计算
+        template: 提示词模板版本，默认为PROMPT_TEMPLATE_VERSION
+        model_config: 模型配置，默认为模型路由器的路由策略和各后端请求参数（不含地址、密钥和超时）
+        recent_listings: 写入提示词的近期上线现货的同平台项目，ListingTimeline.recent_peers()返回的平台分组
+        trend_features: 写入提示词的趋势特征，CMC ID -> TrendFeatures
+
+    Returns:
+        str: SHA-256摘要
+    """
+    model_config = model_config or get_model_router().signature()
+    sha = hashlib.sha256()
+    sha.update(dumps({
+        "platform": platform,
+        "template": template or PROMPT_TEMPLATE_VERSION,
+        "model": model_config,
+    }, pretty=False))
+    # 项目按提示词中的格式和精度参与计算，提示词中不可见的差异不会使建议失效
+    trend_features = trend_features or {}
+    for project in select_prompt_projects(projects):
+        sha.update(format_project_detailed(project, trend_features.get(project.id)).encode('utf-8'))
+    for project, listed_since, quotes in recent_listings or []:
+        sha.update(format_recent_listing(project, listed_since, quotes).encode('utf-8'))
+    return sha.hexdigest()
+
+
+class AdviceStore:
+    """按输入摘要保存各平台的建议（data/advice_store/<平台>/<摘要>.md）"""
+
+    def __init__(self, store_dir: Optional[str] = None, enabled: Optional[bool] = None,
+                 max_entries: Optional[int] = None):
+        """
+        Args:
+            store_dir: 存储目录，默认为DATA_DIRS['advice_store']
+            enabled: 是否启用，默认读取ADVICE_STORE['enabled']
+            max_entries: 每个平台保留的建议数量，默认读取ADVICE_STORE['max_entries']
+        """
+        self.store_dir = store_dir or DATA_DIRS.get('advice_store', 'data/advice_store')
+        self.enabled = ADVICE_STORE.get('enabled', True) if enabled is None else enabled
+        self.max_entries = max_entries or ADVICE_STORE.get('max_entries', 30)
+
+    def path(self, platform: str, digest: str) -> str:
+        return os.path.join(self.store_dir, platform.lower().replace(' ', '_'), f"{digest}.md")
+
+    def get(self, platform: str, digest: str) -> Optional[str]:
+        """读取输入摘要对应的建议，不存在时返回None"""
+        if not self.enabled:
+            return None
+        path = self.path(platform, digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                advice = f.read()
+            # 更新修改时间，清理时按最近使用保留
+            os.utime(path)
+        except OSError:
+            return None
+        return advice
+
+    def put(self, platform: str, digest: str, advice: str) -> Optional[str]:
+        """保存建议，超出保留数量时删除最久未使用的建议
+
+        Returns:
+            Optional[str]: 保存的路径，未启用或保存失败时返回None
+        """
+        if not self.enabled:
+            return None
+        try:
+            path = write_bytes(self.path(platform, digest), advice.encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"保存{platform}平台建议产物失败: {str(e)}")
+            return None
+        self._prune(os.path.dirname(path))
+        return path
+
+    def _prune(self, platform_dir: str) -> None:
+        try:
+            entries = [os.path.join(platform_dir, f) for f in os.listdir(platform_dir) if f.endswith('.md')]
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort(key=os.path.getmtime, reverse=True)
+            for path in entries[self.max_entries:]:
+                os.remove(path)
+        except OSError as e:
+            logger.debug(f"清理建议产物失败: {str(e)}")
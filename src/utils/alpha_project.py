@@ -0,0 +1,149 @@
+"""
+币安Alpha项目记录
+CMC列表中的每个项目在获取后解析一次为AlphaProject，只保留流水线用到的字段；
+代币符号、平台名称和标签经过字符串驻留，分类、过滤、格式化和渲染直接使用这些记录，不再复制原始字典
+"""
+
+import sys
+from typing import Dict, List, Any, Iterable, Optional, Tuple, Union
+
+
+def _number(value: Any) -> float:
+    """将CMC数值字段转换为float，缺失或无法转换时为0"""
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _intern(value: Any, default: str = "") -> str:
+    """驻留字符串，相同的代币符号、平台名称和标签在所有快照中共享同一对象"""
+    return sys.intern(value) if isinstance(value, str) else default
+
+
+class AlphaProject:
+    """单个币安Alpha项目的紧凑记录"""
+
+    __slots__ = (
+        "id", "name", "symbol", "rank", "platform_name", "tags",
+        "price", "percent_change_24h", "percent_change_7d", "percent_change_30d",
+        "volume_24h", "volume_7d", "volume_30d",
+        "usd_market_cap", "self_reported_market_cap", "fdv",
+    )
+
+    def __init__(self, id: Any, name: str, symbol: str, rank: Any, platform_name: str, tags: Tuple[str, ...],
+                 price: float = 0.0, percent_change_24h: float = 0.0, percent_change_7d: float = 0.0,
+                 percent_change_30d: float = 0.0, volume_24h: float = 0.0, volume_7d: float = 0.0,
+                 volume_30d: float = 0.0, usd_market_cap: float = 0.0, self_reported_market_cap: float = 0.0,
+                 fdv: float = 0.0):
+        self.id = id
+        self.name = name
+        self.symbol = symbol
+        self.rank = rank
+        self.platform_name = platform_name
+        self.tags = tags
+        self.price = price
+        self.percent_change_24h = percent_change_24h
+        self.percent_change_7d = percent_change_7d
+        self.percent_change_30d = percent_change_30d
+        self.volume_24h = volume_24h
+        self.volume_7d = volume_7d
+        self.volume_30d = volume_30d
+        self.usd_market_cap = usd_market_cap
+        self.self_reported_market_cap = self_reported_market_cap
+        self.fdv = fdv
+
+    @classmethod
+    def from_cmc(cls, crypto: Dict[str, Any]) -> "AlphaProject":
+        """从CMC列表中的项目字典解析
+
+        Args:
+            crypto: CMC返回的项目字典
+
+        Returns:
+            AlphaProject: 项目记录
+        """
+        # 提取USD报价，找不到名为"USD"的报价时使用索引2（假设这是USD）
+        quotes = crypto.get("quotes") or []
+        usd_quote = next((q for q in quotes if q.get("name") == "USD"), {})
+        if not usd_quote and len(quotes) > 2:
+            usd_quote = quotes[2]
+
+        platform_info = crypto.get("platform") or {}
+        tags = crypto.get("tags") or []
+        if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+            tags = []
+
+        return cls(
+            id=crypto.get("id"),
+            name=_intern(crypto.get("name"), "未知"),
+            symbol=_intern(crypto.get("symbol")),
+            rank=crypto.get("cmcRank", "未知"),
+            platform_name=_intern(platform_info.get("name")) if isinstance(platform_info, dict) else "",
+            tags=tuple(sys.intern(tag) for tag in tags),
+            price=_number(usd_quote.get("price")),
+            percent_change_24h=_number(usd_quote.get("percentChange24h")),
+            percent_change_7d=_number(usd_quote.get("percentChange7d")),
+            percent_change_30d=_number(usd_quote.get("percentChange30d")),
+            volume_24h=_number(usd_quote.get("volume24h")),
+            volume_7d=_number(usd_quote.get("volume7d")),
+            volume_30d=_number(usd_quote.get("volume30d")),
+            usd_market_cap=_number(usd_quote.get("marketCap")),
+            self_reported_market_cap=_number(usd_quote.get("selfReportedMarketCap")),
+            fdv=_number(usd_quote.get("fullyDilluttedMarketCap")),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AlphaProject":
+        """从to_dict()的输出（如调试产物中保存的平台项目列表）恢复记录，旧文件中的CMC原始字典按from_cmc解析"""
+        if "quotes" in data:
+            return cls.from_cmc(data)
+        fields = {field: data[field] for field in cls.__slots__ if field in data}
+        fields["tags"] = tuple(sys.intern(tag) for tag in fields.get("tags") or () if isinstance(tag, str))
+        return cls(**{"id": None, "name": "未知", "symbol": "", "rank": "未知", "platform_name": "", **fields})
+
+    @property
+    def market_cap(self) -> float:
+        """市值，CMC未提供时使用项目自报市值"""
+        return self.usd_market_cap or self.self_reported_market_cap
+
+    @property
+    def mc_fdv_ratio(self) -> float:
+        """MC/FDV比率，FDV为0时返回0"""
+        return self.market_cap / self.fdv if self.fdv > 0 else 0
+
+    @property
+    def vol_mc_ratio(self) -> float:
+        """24小时交易量/市值，市值为0时返回0"""
+        market_cap = self.market_cap
+        return self.volume_24h / market_cap if market_cap > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典，用于调试产物等JSON输出"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"AlphaProject({self.symbol!r}, rank={self.rank!r}, platform={self.platform_name!r})"
+
+
+def as_project(crypto: Union[AlphaProject, Dict[str, Any]]) -> AlphaProject:
+    """将CMC项目字典转换为AlphaProject，已是记录时原样返回"""
+    return crypto if isinstance(crypto, AlphaProject) else AlphaProject.from_cmc(crypto)
+
+
+def summarize_projects(crypto_list: Iterable[Union[AlphaProject, Dict[str, Any]]]) -> Dict[str, Any]:
+    """项目列表的摘要：数量和代币符号，用于summary级别的调试产物"""
+    symbols = [crypto.symbol if isinstance(crypto, AlphaProject) else crypto.get("symbol") for crypto in crypto_list]
+    return {"count": len(symbols), "symbols": symbols}
+
+
+def parse_projects(crypto_list: Optional[Iterable[Union[AlphaProject, Dict[str, Any]]]]) -> List[AlphaProject]:
+    """批量解析CMC项目列表
+
+    Args:
+        crypto_list: CMC项目字典或AlphaProject的列表
+
+    Returns:
+        List[AlphaProject]: 项目记录列表
+    """
+    return [as_project(crypto) for crypto in crypto_list or []]
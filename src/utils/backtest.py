@@ -0,0 +1,198 @@
+"""
+推荐命中率回测
+将建议索引中的TOP3推荐与symbols/raw快照推导出的上币时间线关联，
+批量计算各平台、各提示词模板的命中率、提前量和precision@k
+"""
+
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from src.utils.advice_index import KIND_PLATFORM, refresh_index, load_recommendations
+from src.utils.listing_timeline import get_listing_timeline
+from src.utils.serialization import dump_file
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+
+def load_listing_snapshots(raw_dir: Optional[str] = None) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """构建token在各原始交易对快照中的上线矩阵
+
+    由上币时间线索引中的上线区间还原，只有新增的快照需要解析；
+    1000x形式的token（如1000SATS）同时登记到原始代币名（SATS）下。
+
+    Args:
+        raw_dir: 原始快照目录，默认为symbols/raw
+
+    Returns:
+        Tuple: (快照时间数组(秒), token列表, 上线矩阵[token, 快照]的布尔数组)
+    """
+    return get_listing_timeline(raw_dir).presence_matrix()
+
+
+def _group_keys(*columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """将多列分组键合并为整数分组编号"""
+    combined = np.array(['\x1f'.join(map(str, row)) for row in zip(*columns)], dtype=object)
+    labels, inverse = np.unique(combined, return_inverse=True)
+    return labels, inverse
+
+
+def run_backtest(recommendations: List[Dict[str, Any]], snapshot_times: np.ndarray, token_list: List[str],
+                 presence: np.ndarray, horizon_days: int = 30, max_k: int = 3) -> List[Dict[str, Any]]:
+    """对推荐记录进行向量化回测
+
+    推荐时已在现货上线的代币不参与评估；早于第一份快照的推荐以第一份快照的上线状态为准。
+    命中定义为推荐后horizon_days天内首次出现在现货快照中。
+
+    Args:
+        recommendations: load_recommendations()返回的推荐记录
+        snapshot_times: 快照时间数组(秒)
+        token_list: token列表
+        presence: 上线矩阵[token, 快照]
+        horizon_days: 命中判定窗口（天）
+        max_k: 计算precision@1..max_k
+
+    Returns:
+        List[Dict[str, Any]]: 每个(平台, 模板)分组的统计结果
+    """
+    if not recommendations or len(snapshot_times) == 0:
+        return []
+
+    token_index = {t: i for i, t in enumerate(token_list)}
+
+    symbols = np.array([r["symbol"] for r in recommendations], dtype=object)
+    platforms = np.array([r["platform"] for r in recommendations], dtype=object)
+    templates = np.array([r["template"] or "unknown" for r in recommendations], dtype=object)
+    paths = np.array([r["path"] for r in recommendations], dtype=object)
+    ranks = np.array([r["rank"] for r in recommendations], dtype=np.int64)
+    rec_times = np.array(
+        [int(datetime.strptime(r["run_at"], '%Y-%m-%d %H:%M:%S').timestamp()) for r in recommendations],
+        dtype=np.int64
+    )
+    token_ids = np.array([token_index.get(s, -1) for s in symbols], dtype=np.int64)
+    known = token_ids >= 0
+
+    # 推荐时刻对应的最近一份快照（早于第一份快照时使用第一份）
+    snap_idx = np.clip(np.searchsorted(snapshot_times, rec_times, side='right') - 1, 0, len(snapshot_times) - 1)
+
+    listed_at_rec = np.zeros(len(recommendations), dtype=bool)
+    listed_at_rec[known] = presence[token_ids[known], snap_idx[known]]
+
+    # 推荐之后第一次出现在快照中的时间
+    after = snapshot_times[None, :] > rec_times[:, None]
+    present = np.zeros((len(recommendations), len(snapshot_times)), dtype=bool)
+    present[known] = presence[token_ids[known]]
+    listed_after = present & after
+    has_listing = listed_after.any(axis=1)
+    first_listing = np.where(has_listing, snapshot_times[listed_after.argmax(axis=1)], 0)
+
+    lead_days = (first_listing - rec_times) / SECONDS_PER_DAY
+    evaluable = ~listed_at_rec
+    hits = evaluable & has_listing & (lead_days <= horizon_days)
+
+    labels, groups = _group_keys(platforms, templates)
+    n_groups = len(labels)
+
+    picks = np.bincount(groups, minlength=n_groups)
+    evaluable_count = np.bincount(groups, weights=evaluable, minlength=n_groups)
+    hit_count = np.bincount(groups, weights=hits, minlength=n_groups)
+    lead_sum = np.bincount(groups, weights=np.where(hits, lead_days, 0.0), minlength=n_groups)
+
+    # precision@k：每次运行的前k个可评估推荐中命中的比例，再按分组求平均；
+    # 汇总报告的一个文件包含多个平台小节，每个(文件, 平台, 模板)视为一次运行
+    run_labels, runs = _group_keys(paths, platforms, templates)
+    run_group = np.zeros(len(run_labels), dtype=np.int64)
+    run_group[runs] = groups
+
+    # 在每次运行内按rank顺序对可评估的推荐重新编号（推荐时已上线的代币不占名次）
+    order = np.lexsort((ranks, runs))
+    evaluable_sorted = evaluable[order].astype(np.int64)
+    cumulative = np.cumsum(evaluable_sorted)
+    run_starts = np.searchsorted(runs[order], np.arange(len(run_labels)))
+    before_run = cumulative[run_starts] - evaluable_sorted[run_starts]
+    evaluable_rank = np.empty(len(recommendations), dtype=np.int64)
+    evaluable_rank[order] = cumulative - before_run[runs[order]]
+
+    precision = {}
+    for k in range(1, max_k + 1):
+        in_top_k = evaluable & (evaluable_rank <= k)
+        run_total = np.bincount(runs, weights=in_top_k, minlength=len(run_labels))
+        run_hits = np.bincount(runs, weights=in_top_k & hits, minlength=len(run_labels))
+        valid = run_total > 0
+        run_precision = np.divide(run_hits, run_total, out=np.zeros_like(run_hits), where=valid)
+        group_sum = np.bincount(run_group, weights=np.where(valid, run_precision, 0.0), minlength=n_groups)
+        group_runs = np.bincount(run_group, weights=valid, minlength=n_groups)
+        precision[k] = np.divide(group_sum, group_runs, out=np.full(n_groups, np.nan), where=group_runs > 0)
+
+    results = []
+    for g, label in enumerate(labels):
+        platform, template = label.split('\x1f')
+        group_hits = hits & (groups == g)
+        results.append({
+            "platform": platform,
+            "template": template,
+            "picks": int(picks[g]),
+            "evaluable": int(evaluable_count[g]),
+            "hits": int(hit_count[g]),
+            "hit_rate": float(hit_count[g] / evaluable_count[g]) if evaluable_count[g] else None,
+            "mean_lead_days": float(lead_sum[g] / hit_count[g]) if hit_count[g] else None,
+            "median_lead_days": float(np.median(lead_days[group_hits])) if hit_count[g] else None,
+            **{f"precision@{k}": (None if np.isnan(precision[k][g]) else float(precision[k][g]))
+               for k in range(1, max_k + 1)},
+            "hit_symbols": sorted(set(symbols[group_hits].tolist())),
+        })
+
+    return results
+
+
+def _format_value(value: Any) -> str:
+    """格式化表格中的数值"""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def format_report(results: List[Dict[str, Any]], horizon_days: int, max_k: int = 3) -> str:
+    """将回测结果格式化为markdown表格"""
+    columns = ["platform", "template", "picks", "evaluable", "hits", "hit_rate", "mean_lead_days",
+               "median_lead_days"] + [f"precision@{k}" for k in range(1, max_k + 1)]
+
+    report = f"# 推荐命中率回测 (命中窗口: {horizon_days}天)\n\n"
+    report += "| " + " | ".join(columns) + " | 命中代币 |\n"
+    report += "| " + " | ".join(["---"] * (len(columns) + 1)) + " |\n"
+    for row in results:
+        report += "| " + " | ".join(_format_value(row[c]) for c in columns)
+        report += f" | {', '.join(row['hit_symbols'])} |\n"
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="币安Alpha推荐命中率回测")
+    parser.add_argument("--kind", type=str, default=KIND_PLATFORM, choices=["platform", "combined"],
+                        help="回测的建议文件类型")
+    parser.add_argument("--horizon", type=int, default=30, help="命中判定窗口（天）")
+    parser.add_argument("--k", type=int, default=3, help="计算precision@1..k")
+    parser.add_argument("--output", type=str, help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    start = datetime.now()
+    refresh_index()
+    times, tokens, presence_matrix = load_listing_snapshots()
+    backtest_results = run_backtest(load_recommendations(args.kind), times, tokens, presence_matrix,
+                                    horizon_days=args.horizon, max_k=args.k)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    print(format_report(backtest_results, args.horizon, args.k))
+    print(f"回测完成，耗时: {elapsed:.2f}秒")
+
+    if args.output:
+        dump_file(args.output, backtest_results, pretty=True)
+        print(f"回测结果已保存到: {args.output}")
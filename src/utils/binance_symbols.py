@@ -1,33 +1,256 @@
-import requests
 import os
 import json
+import asyncio
 from datetime import datetime
 import re
 import logging
+from typing import FrozenSet
+
+from config import BINANCE_API
+from src.utils.tracing import span
+from src.utils.http_client import sync_request, get_async_session, build_timeout
+from src.utils.http_cache import HttpCache
+from src.utils.serialization import dump_file, load_file
+from src.utils.resilience import get_policy, is_retryable_status, parse_retry_after, RetryableError, PermanentError
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
-def fetch_symbols():
-    """从Binance获取所有交易对"""
-    response = requests.get('https://api.binance.com/api/v3/exchangeInfo')
-    data = response.json()
-    symbols = [s['symbol'] for s in data['symbols']]
-    return symbols
+# 默认的symbols目录（项目根目录下）
+DEFAULT_SYMBOLS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'symbols'))
+
+# exchangeInfo中每次都会变化的serverTime不参与内容摘要
+_SERVER_TIME_PATTERN = re.compile(rb'"serverTime"\s*:\s*\d+')
+
+# 读取响应体时的分块大小
+EXCHANGE_INFO_CHUNK_SIZE = 65536
+
+# exchangeInfo条件请求缓存；serverTime位于响应开头，只需规范化前4KB，响应体可以流式写入缓存文件
+_exchange_info_cache = HttpCache(
+    "binance_exchange_info",
+    normalize=lambda body: _SERVER_TIME_PATTERN.sub(b'', body, count=1),
+    normalize_prefix=4096
+)
+
+# exchangeInfo流式解析：以"symbol"键切分交易对，在每段内只提取需要的字段，
+# 不为filters、orderTypes、permissionSets等字段构建Python对象
+_SYMBOL_KEY_PATTERN = re.compile(rb'"symbol"\s*:\s*"([^"]*)"')
+_SYMBOL_FIELD_PATTERNS = {
+    "status": re.compile(rb'"status"\s*:\s*"([^"]*)"'),
+    "baseAsset": re.compile(rb'"baseAsset"\s*:\s*"([^"]*)"'),
+    "quoteAsset": re.compile(rb'"quoteAsset"\s*:\s*"([^"]*)"'),
+}
+SYMBOL_FIELDS = ("symbol",) + tuple(_SYMBOL_FIELD_PATTERNS)
+
+# 最近一次解析结果(内容摘要, 交易对记录)，内容未变化时复用
+_parsed_symbols = (None, None)
+
+# 常见的计价货币（按匹配顺序）
+QUOTE_CURRENCIES = ['BTC', 'ETH', 'USDT', 'BUSD', 'BNB', 'USDC', 'EUR', 'TRY', 'FDUSD', 'TUSD', 'JPY', 'ARS', 'MXN', 'BRL', 'AEUR', 'PLN', 'RUB', 'RON', 'VAI', 'EURI', 'CZK', 'COP']
+
+# 已知的特殊交易对 -> token
+SPECIAL_SYMBOLS = {
+    'BTCDOMUSDT': 'BTCDOM',  # 比特币主导地位指数
+    'BTCDOMBUSD': 'BTCDOM',
+    'DEFIUSDT': 'DEFI',      # DeFi指数
+    'DEFIBUSD': 'DEFI',
+    # 可以根据实际情况添加更多特殊情况
+}
+
+def _parse_symbol_segment(segment):
+    """从单个交易对片段中提取symbol、status、baseAsset、quoteAsset，缺少字段时返回None"""
+    record = {"symbol": _SYMBOL_KEY_PATTERN.match(segment).group(1).decode('utf-8')}
+    for field, pattern in _SYMBOL_FIELD_PATTERNS.items():
+        match = pattern.search(segment)
+        if match is None:
+            return None
+        record[field] = match.group(1).decode('utf-8')
+    return record
+
+def iter_exchange_symbols(chunks):
+    """流式解析exchangeInfo，逐个产出交易对记录
+    
+    缓冲区只保留当前交易对的片段，内存占用与交易对数量无关。
+    
+    Args:
+        chunks: 响应体字节块的可迭代对象
+    
+    Yields:
+        dict: 包含symbol、status、baseAsset、quoteAsset的记录
+    
+    Raises:
+        ValueError: 响应结构与预期不符（字段缺失或顺序不同）
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        starts = [m.start() for m in _SYMBOL_KEY_PATTERN.finditer(buffer)]
+        if not starts:
+            # 保留末尾，避免截断跨块的"symbol"键
+            buffer = buffer[-128:]
+            continue
+        # 相邻两个"symbol"键之间为一个完整的交易对
+        for begin, end in zip(starts, starts[1:]):
+            record = _parse_symbol_segment(buffer[begin:end])
+            if record is None:
+                raise ValueError("exchangeInfo交易对字段缺失")
+            yield record
+        buffer = buffer[starts[-1]:]
+    if _SYMBOL_KEY_PATTERN.match(buffer):
+        record = _parse_symbol_segment(buffer)
+        if record is None:
+            raise ValueError("exchangeInfo交易对字段缺失")
+        yield record
+
+def parse_exchange_symbols(exchange_info):
+    """解析exchangeInfo中的交易对记录，流式解析失败时回退为完整JSON解析
+    
+    Args:
+        exchange_info: fetch_exchange_info()返回的结果
+    
+    Returns:
+        list: 交易对记录列表
+    """
+    try:
+        records = list(iter_exchange_symbols(exchange_info.iter_chunks()))
+        if records:
+            return records
+        logger.warning("流式解析未找到交易对，改用完整JSON解析")
+    except ValueError as e:
+        logger.warning(f"流式解析exchangeInfo失败: {str(e)}，改用完整JSON解析")
+    return [{field: s.get(field) for field in SYMBOL_FIELDS} for s in exchange_info.json()['symbols']]
+
+def fetch_exchange_info(force_refresh=False):
+    """获取exchangeInfo，发送条件请求并比较内容摘要，按binance容错策略重试、对冲和熔断
+    
+    Args:
+        force_refresh: 是否忽略缓存有效期，总是发送（条件）请求
+    
+    Returns:
+        CachedFetch: changed为False时表示内容与上次相同，调用方可以跳过解析
+    """
+    cache = _exchange_info_cache
+    if not force_refresh and cache.is_fresh():
+        return cache.cached()
+    
+    def attempt(timeout):
+        with sync_request('GET', BINANCE_API['exchange_info_url'], timeout=timeout,
+                          headers=cache.conditional_headers(), stream=True) as response:
+            stage.set("status_code", response.status_code)
+            if response.status_code == 304:
+                return cache.not_modified()
+            if response.status_code != 200:
+                message = f"获取交易对失败，状态码: {response.status_code}"
+                if is_retryable_status(response.status_code):
+                    raise RetryableError(message, parse_retry_after(response.headers.get("Retry-After")))
+                raise PermanentError(message)
+            # 响应体边接收边写入缓存文件，不在内存中保留完整响应体
+            writer = cache.writer()
+            try:
+                for chunk in response.iter_content(EXCHANGE_INFO_CHUNK_SIZE):
+                    writer.write(chunk)
+            except BaseException:
+                writer.abort()
+                raise
+            stage.set("bytes_in", writer.size)
+            return writer.finish(response.headers)
+    
+    with span("exchange_info") as stage:
+        result = get_policy("binance").call(attempt, idempotent=True)
+        stage.set("cache_status", result.status)
+    return result
+
+async def fetch_exchange_info_async(force_refresh=False):
+    """fetch_exchange_info的异步版本：通过共享的aiohttp会话发送条件请求，
+    响应体分块写入缓存文件，摘要计算和文件写入在线程中执行，不阻塞事件循环
+    
+    Args:
+        force_refresh: 是否忽略缓存有效期，总是发送（条件）请求
+    
+    Returns:
+        CachedFetch: changed为False时表示内容与上次相同，调用方可以跳过解析
+    """
+    cache = _exchange_info_cache
+    if not force_refresh and await asyncio.to_thread(cache.is_fresh):
+        return cache.cached()
+    
+    async def attempt(timeout):
+        session = await get_async_session()
+        async with session.get(BINANCE_API['exchange_info_url'], headers=cache.conditional_headers(),
+                               timeout=build_timeout(timeout)) as response:
+            stage.set("status_code", response.status)
+            if response.status == 304:
+                return await asyncio.to_thread(cache.not_modified)
+            if response.status != 200:
+                message = f"获取交易对失败，状态码: {response.status}"
+                if is_retryable_status(response.status):
+                    raise RetryableError(message, parse_retry_after(response.headers.get("Retry-After")))
+                raise PermanentError(message)
+            writer = await asyncio.to_thread(cache.writer)
+            try:
+                async for chunk in response.content.iter_chunked(EXCHANGE_INFO_CHUNK_SIZE):
+                    await asyncio.to_thread(writer.write, chunk)
+            except BaseException:
+                writer.abort()
+                raise
+            stage.set("bytes_in", writer.size)
+            return await asyncio.to_thread(writer.finish, dict(response.headers))
+    
+    with span("exchange_info") as stage:
+        result = await get_policy("binance").call_async(attempt, idempotent=True)
+        stage.set("cache_status", result.status)
+    return result
+
+def fetch_symbol_records(exchange_info=None):
+    """从Binance获取所有交易对记录，内容未变化时复用上一次的解析结果
+    
+    Args:
+        exchange_info: 已获取的exchangeInfo结果，默认重新获取
+    
+    Returns:
+        list: 包含symbol、status、baseAsset、quoteAsset的记录列表
+    """
+    global _parsed_symbols
+    exchange_info = exchange_info or fetch_exchange_info()
+    digest, records = _parsed_symbols
+    if records is None or digest != exchange_info.digest:
+        with span("parse_exchange_info") as stage:
+            records = parse_exchange_symbols(exchange_info)
+            stage.set("symbol_count", len(records))
+        _parsed_symbols = (exchange_info.digest, records)
+    return records
+
+def fetch_symbols(exchange_info=None):
+    """从Binance获取所有交易对
+    
+    Args:
+        exchange_info: 已获取的exchangeInfo结果，默认重新获取
+    """
+    return [record['symbol'] for record in fetch_symbol_records(exchange_info)]
+
+def split_symbol(symbol):
+    """将交易对拆分为(token, 计价货币)，与extract_token_names的匹配规则一致
+    
+    Args:
+        symbol: 交易对，如ETHBTC
+    
+    Returns:
+        tuple: (token, 计价货币)，无法识别计价货币时为(symbol, None)
+    """
+    if symbol in SPECIAL_SYMBOLS:
+        token = SPECIAL_SYMBOLS[symbol]
+        return token, symbol[len(token):] or None
+    for quote in QUOTE_CURRENCIES:
+        if symbol.endswith(quote):
+            token = symbol[:-len(quote)]
+            if token and re.match(r'^[A-Z0-9]+$', token):
+                return token, quote
+    return symbol, None
 
 def extract_token_names(symbols):
     """从交易对中提取通证(token)名称"""
-    # 定义常见的计价货币
-    quote_currencies = ['BTC', 'ETH', 'USDT', 'BUSD', 'BNB', 'USDC', 'EUR', 'TRY', 'FDUSD', 'TUSD', 'JPY', 'ARS', 'MXN', 'BRL', 'AEUR', 'PLN', 'RUB', 'RON', 'VAI', 'EURI', 'CZK', 'COP']
-    
-    # 添加一些已知的特殊情况
-    special_cases = {
-        'BTCDOMUSDT': 'BTCDOM',  # 比特币主导地位指数
-        'BTCDOMBUSD': 'BTCDOM',
-        'DEFIUSDT': 'DEFI',      # DeFi指数
-        'DEFIBUSD': 'DEFI',
-        # 可以根据实际情况添加更多特殊情况
-    }
+    quote_currencies = QUOTE_CURRENCIES
+    special_cases = SPECIAL_SYMBOLS
     
     tokens = set()
     unmatched_symbols = []
@@ -77,11 +300,13 @@ def extract_token_names(symbols):
     
     return sorted(list(tokens))
 
-def get_existing_tokens():
-    """获取已存在的token列表"""
-    # 获取项目根目录
-    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    symbols_dir = os.path.join(root_dir, 'symbols')
+def get_existing_tokens(symbols_dir=None):
+    """获取已存在的token列表
+    
+    Args:
+        symbols_dir: symbols目录，默认为项目根目录下的symbols
+    """
+    symbols_dir = symbols_dir or DEFAULT_SYMBOLS_DIR
     
     # 创建symbols目录（如果不存在）
     if not os.path.exists(symbols_dir):
@@ -95,16 +320,17 @@ def get_existing_tokens():
     
     # 读取最新的symbols文件
     latest_file = sorted(symbol_files)[-1]
-    with open(os.path.join(symbols_dir, latest_file), 'r') as f:
-        existing_tokens = json.load(f)
+    existing_tokens = load_file(os.path.join(symbols_dir, latest_file))
     
     return existing_tokens
 
-def get_raw_symbols_file():
-    """获取最新的原始symbols文件路径，如果不存在则返回None"""
-    # 获取项目根目录
-    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    symbols_dir = os.path.join(root_dir, 'symbols', 'raw')
+def get_raw_symbols_file(symbols_dir=None):
+    """获取最新的原始symbols文件路径，如果不存在则返回None
+    
+    Args:
+        symbols_dir: symbols目录，默认为项目根目录下的symbols
+    """
+    symbols_dir = os.path.join(symbols_dir or DEFAULT_SYMBOLS_DIR, 'raw')
     
     # 如果目录不存在，返回None
     if not os.path.exists(symbols_dir):
@@ -147,6 +373,7 @@ def check_token_listing_status(token, listed_tokens=None):
             - is_listed (bool): 是否已上线
             - listing_type (str, optional): 上线类型，'standard'或'1000x'或None
             - listed_as (str, optional): 实际上线的符号名称
+            - listed_since (str, optional): 首次出现在原始快照中的日期（YYYY-MM-DD），来自上币时间线索引
     """
     # 确保token是大写
     token = token.upper() if token else ""
@@ -180,7 +407,7 @@ def check_token_listing_status(token, listed_tokens=None):
     
     # 检查是否是标准形式token
     if token in standard_tokens_set:
-        return {
+        status = {
             "is_listed": True,
             "listing_type": "standard",
             "listed_as": token
@@ -188,13 +415,21 @@ def check_token_listing_status(token, listed_tokens=None):
     
     # 检查是否是1000Token对应的代币
     elif token in thousand_tokens_map:
-        return {
+        status = {
             "is_listed": True,
             "listing_type": "1000x",
             "listed_as": thousand_tokens_map[token]
         }
     
-    return {"is_listed": False}
+    else:
+        return {"is_listed": False}
+    
+    # 上线时间来自上币时间线索引（内存中的字典查找，不读取快照文件）
+    from src.utils.listing_timeline import get_listing_timeline
+    listed_since = get_listing_timeline().listed_since(status["listed_as"])
+    if listed_since:
+        status["listed_since"] = listed_since
+    return status
 
 def prepare_token_listing_data(tokens_data):
     """预处理币安上线token数据，分离标准token和1000x形式token
@@ -259,11 +494,14 @@ def prepare_token_listing_data(tokens_data):
         "cex_info_message": cex_info
     }
 
-def update_tokens():
-    """更新token列表并返回新token，只有在交易对列表变化时才保存"""
-    # 获取项目根目录
-    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    symbols_dir = os.path.join(root_dir, 'symbols')
+def update_tokens(symbols_dir=None, exchange_info=None):
+    """更新token列表并返回新token，只有在交易对列表变化时才保存
+    
+    Args:
+        symbols_dir: symbols目录，默认为项目根目录下的symbols
+        exchange_info: 已获取的exchangeInfo结果，默认同步获取
+    """
+    symbols_dir = symbols_dir or DEFAULT_SYMBOLS_DIR
     raw_symbols_dir = os.path.join(symbols_dir, 'raw')
     
     # 确保目录存在
@@ -276,19 +514,40 @@ def update_tokens():
     current_datetime = datetime.now().strftime('%Y%m%d-%H%M%S')
     
     # 获取现有的tokens
-    existing_tokens = get_existing_tokens()
+    existing_tokens = get_existing_tokens(symbols_dir)
+    
+    # 获取exchangeInfo（条件请求）
+    exchange_info = exchange_info or fetch_exchange_info()
+    latest_raw_file = get_raw_symbols_file(symbols_dir)
+    
+    # 内容与上次相同且已对应最新的原始快照时，跳过解析和比对
+    if (not exchange_info.changed and latest_raw_file
+            and _exchange_info_cache.annotation("raw_snapshot") == os.path.abspath(latest_raw_file)):
+        logger.info(f"exchangeInfo未变化({exchange_info.status})，使用已有token列表")
+        # symbol.json即由该快照提取，与重新提取的CEX token一致
+        cex_tokens = existing_tokens
+        token_data = prepare_token_listing_data({"cex_tokens": cex_tokens})
+        return {
+            "all_tokens": existing_tokens,
+            "new_tokens": [],
+            "existing_tokens": existing_tokens,
+            "cex_tokens": cex_tokens,
+            "standard_tokens": token_data["standard_tokens"],
+            "thousand_tokens": token_data["thousand_tokens"],
+            "cex_info_message": token_data["cex_info_message"],
+            "file_path": latest_raw_file,
+            "symbols_changed": False
+        }
     
     # 获取所有交易对
-    all_symbols = fetch_symbols()
+    all_symbols = fetch_symbols(exchange_info)
     
     # 检查交易对列表是否有变化
     symbols_changed = True
-    latest_raw_file = get_raw_symbols_file()
     
     if latest_raw_file:
         try:
-            with open(latest_raw_file, 'r') as f:
-                previous_symbols = json.load(f)
+            previous_symbols = load_file(latest_raw_file)
             
             # 比较新旧交易对列表
             if set(all_symbols) == set(previous_symbols):
@@ -297,29 +556,30 @@ def update_tokens():
         except Exception as e:
             logger.warning(f"读取上一次的交易对列表时出错: {str(e)}，将重新保存")
     
+    # 提取token名称（同一份交易对即CEX上线的token，无需再次请求）
+    token_names = extract_token_names(all_symbols)
+    cex_tokens = token_names
+    logger.info(f"从币安获取到{len(cex_tokens)}个上线token")
+    
     # 如果交易对列表有变化，保存原始数据和提取的token
     if symbols_changed:
         # 保存原始交易对列表
         raw_filename = f"raw-symbols-{current_datetime}.json"
         raw_filepath = os.path.join(raw_symbols_dir, raw_filename)
-        with open(raw_filepath, 'w') as f:
-            json.dump(all_symbols, f, indent=2)
-        
-        # 提取token名称
-        token_names = extract_token_names(all_symbols)
+        # symbols目录纳入版本管理，始终缩进输出便于比对
+        dump_file(raw_filepath, all_symbols, pretty=True)
         
         # 保存提取的token列表
         filename = f"symbol.json"
         filepath = os.path.join(symbols_dir, filename)
-        with open(filepath, 'w') as f:
-            json.dump(token_names, f, indent=2)
+        dump_file(filepath, token_names, pretty=True)
+        
+        # 记录缓存内容对应的快照，下次内容未变化时可直接复用
+        _exchange_info_cache.annotate("raw_snapshot", os.path.abspath(raw_filepath))
         
         # 找出新增的token（不在已存在列表中的）
         new_tokens = [t for t in token_names if t not in existing_tokens]
         
-        # 获取CEX上线的token
-        cex_tokens = get_cex_tokens()
-        
         # 预处理token数据
         token_data = prepare_token_listing_data({"cex_tokens": cex_tokens})
         
@@ -335,9 +595,8 @@ def update_tokens():
             "symbols_changed": True
         }
     else:
-        # 如果交易对列表没有变化，返回已有的token列表
-        # 即使交易对列表没变，也要获取最新的CEX上线token
-        cex_tokens = get_cex_tokens()
+        # 交易对集合未变化（仅其他字段变化），记录对应快照后返回已有的token列表
+        _exchange_info_cache.annotate("raw_snapshot", os.path.abspath(latest_raw_file))
         
         # 预处理token数据
         token_data = prepare_token_listing_data({"cex_tokens": cex_tokens})
@@ -354,6 +613,15 @@ def update_tokens():
             "symbols_changed": False
         }
 
+async def update_tokens_async(symbols_dir=None):
+    """update_tokens的异步版本：exchangeInfo通过aiohttp获取，解析、比对和文件读写在线程中执行
+    
+    Args:
+        symbols_dir: symbols目录，默认为项目根目录下的symbols
+    """
+    exchange_info = await fetch_exchange_info_async()
+    return await asyncio.to_thread(update_tokens, symbols_dir, exchange_info)
+
 def is_token_listed(symbol: str, symbol_list_path: str = None) -> bool:
     """
     检查token是否已在币安上线，通过直接读取symbol.json文件
@@ -373,14 +641,11 @@ def is_token_listed(symbol: str, symbol_list_path: str = None) -> bool:
         
     # 如果没有指定路径，使用默认路径
     if not symbol_list_path:
-        # 获取项目根目录的symbols目录
-        root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-        symbol_list_path = os.path.join(root_dir, 'symbols', 'symbol.json')
+        symbol_list_path = os.path.join(DEFAULT_SYMBOLS_DIR, 'symbol.json')
     
     try:
         # 读取symbol.json文件
-        with open(symbol_list_path, 'r') as f:
-            listed_tokens = json.load(f)
+        listed_tokens = load_file(symbol_list_path)
             
         # 检查标准形式token
         if symbol in listed_tokens:
@@ -397,6 +662,31 @@ def is_token_listed(symbol: str, symbol_list_path: str = None) -> bool:
         print(f"检查token上线状态时出错: {str(e)}")
         return False
 
+def load_listed_symbols(symbol_list_path: str = None) -> FrozenSet[str]:
+    """
+    读取symbol.json，返回已上线token集合，用于批量判断是否上线
+    
+    与is_token_listed的判断一致：1000x形式的token同时以去掉"1000"前缀后的符号加入集合
+    
+    Args:
+        symbol_list_path: symbol.json文件路径，如果为None则使用默认路径
+        
+    Returns:
+        FrozenSet[str]: 大写的已上线token集合，读取失败时为空集合
+    """
+    if not symbol_list_path:
+        symbol_list_path = os.path.join(DEFAULT_SYMBOLS_DIR, 'symbol.json')
+    
+    try:
+        listed_tokens = load_file(symbol_list_path)
+    except Exception as e:
+        logger.warning(f"读取已上线token列表失败: {str(e)}")
+        return frozenset()
+    
+    symbols = set(listed_tokens)
+    symbols.update(token[4:] for token in listed_tokens if token.startswith('1000'))
+    return frozenset(symbols)
+
 if __name__ == "__main__":
     # 当作为独立脚本运行时执行的代码
     result = update_tokens()
@@ -0,0 +1,184 @@
+"""
+投资建议输入变化检测
+保存每个平台上一次生成投资建议时的输入快照（写入提示词的前N个项目的代码、24h交易量和市值），
+本次输入与快照相比的实质变化评分（项目进入或移出前N、排名变动、交易量变化超过阈值）未达到阈值的平台
+跳过AI建议和推送；快照只在建议生成成功后更新，多次小幅变化会累积到下一次达到阈值
+"""
+
+import os
+import time
+import logging
+from typing import Dict, List, Any, Optional
+
+from config import DATA_DIRS, CHANGE_DETECTION
+from src.utils.serialization import dump_file, load_file
+from src.utils.alpha_project import AlphaProject
+from src.utils.project_filters import select_prompt_projects
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 默认快照文件路径
+DEFAULT_SNAPSHOT_PATH = os.path.join(DATA_DIRS.get('snapshots', 'data/snapshots'), 'advice_inputs.json')
+
+
+def platform_snapshot(projects: List[AlphaProject]) -> Dict[str, Any]:
+    """平台输入快照：写入提示词的项目（按市值排序）的代码、24h交易量和市值"""
+    selected = select_prompt_projects(projects)
+    return {
+        "symbols": [p.symbol for p in selected],
+        "volumes": [round(p.volume_24h, 2) for p in selected],
+        "market_caps": [round(p.usd_market_cap, 2) for p in selected],
+        "recorded_at": time.time(),
+    }
+
+
+class PlatformChange:
+    """单个平台的输入相对上一次建议的变化"""
+
+    __slots__ = ("platform", "snapshot", "score", "material", "reason", "added", "removed", "moved", "volume_shifts")
+
+    def __init__(self, platform: str, snapshot: Dict[str, Any], score: float = 0.0, material: bool = True,
+                 reason: str = "", added: Optional[List[str]] = None, removed: Optional[List[str]] = None,
+                 moved: Optional[Dict[str, int]] = None, volume_shifts: Optional[Dict[str, float]] = None):
+        self.platform = platform
+        self.snapshot = snapshot        # 本次输入快照，建议生成成功后写入
+        self.score = score
+        self.material = material
+        self.reason = reason            # 不经评分直接判定时的原因（无快照、快照过期、未启用）
+        self.added = added or []        # 新进入前N的项目
+        self.removed = removed or []    # 移出前N的项目
+        self.moved = moved or {}        # 排名变动达到阈值的项目 -> 变动位数（正数表示上升）
+        self.volume_shifts = volume_shifts or {}  # 交易量变化达到阈值的项目 -> 相对变化
+
+    def describe(self) -> str:
+        """变化说明，用于控制台输出"""
+        if self.reason:
+            return self.reason
+        parts = []
+        if self.added:
+            parts.append(f"新增{','.join(self.added)}")
+        if self.removed:
+            parts.append(f"移出{','.join(self.removed)}")
+        if self.moved:
+            parts.append(f"排名变动{len(self.moved)}个")
+        if self.volume_shifts:
+            parts.append(f"交易量变化{len(self.volume_shifts)}个")
+        detail = "、".join(parts) if parts else "无变化"
+        return f"{detail}（评分{self.score:g}，{'实质变化' if self.material else '未达到阈值'}）"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"score": self.score, "material": self.material, "reason": self.reason, "added": self.added,
+                "removed": self.removed, "moved": self.moved, "volume_shifts": self.volume_shifts}
+
+
+def score_change(platform: str, previous: Dict[str, Any], current: Dict[str, Any],
+                 thresholds: Optional[Dict[str, Any]] = None) -> PlatformChange:
+    """计算两个输入快照之间的实质变化评分
+
+    Args:
+        platform: 平台名称
+        previous: 上一次生成建议时的快照
+        current: 本次的快照
+        thresholds: 权重和阈值，默认为CHANGE_DETECTION
+
+    Returns:
+        PlatformChange: 变化详情，评分达到min_score时material为True
+    """
+    thresholds = thresholds or CHANGE_DETECTION
+    previous_positions = {symbol: i for i, symbol in enumerate(previous.get("symbols", []))}
+    previous_volumes = dict(zip(previous.get("symbols", []), previous.get("volumes", [])))
+    current_symbols = current["symbols"]
+
+    added = [symbol for symbol in current_symbols if symbol not in previous_positions]
+    removed = [symbol for symbol in previous_positions if symbol not in set(current_symbols)]
+
+    moved = {}
+    volume_shifts = {}
+    rank_threshold = thresholds.get('rank_threshold', 3)
+    volume_threshold = thresholds.get('volume_threshold', 0.5)
+    for position, (symbol, volume) in enumerate(zip(current_symbols, current["volumes"])):
+        if symbol not in previous_positions:
+            continue
+        delta = previous_positions[symbol] - position
+        if abs(delta) >= rank_threshold:
+            moved[symbol] = delta
+        previous_volume = previous_volumes.get(symbol) or 0.0
+        if previous_volume > 0:
+            shift = (volume - previous_volume) / previous_volume
+            if abs(shift) >= volume_threshold:
+                volume_shifts[symbol] = round(shift, 4)
+
+    score = (len(added) + len(removed)) * thresholds.get('membership_weight', 3.0) \
+        + len(moved) * thresholds.get('rank_weight', 1.0) \
+        + len(volume_shifts) * thresholds.get('volume_weight', 1.0)
+    return PlatformChange(platform, current, score=score, material=score >= thresholds.get('min_score', 3.0),
+                          added=added, removed=removed, moved=moved, volume_shifts=volume_shifts)
+
+
+class ChangeDetector:
+    """比较各平台本次输入与上一次生成建议时的快照"""
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            path: 快照文件路径，默认为data/snapshots/advice_inputs.json
+            enabled: 是否启用，默认读取CHANGE_DETECTION['enabled']；未启用时所有平台都视为有实质变化
+        """
+        self.path = path or DEFAULT_SNAPSHOT_PATH
+        self.enabled = CHANGE_DETECTION.get('enabled', True) if enabled is None else enabled
+        try:
+            self.state = load_file(self.path)
+        except (OSError, ValueError):
+            self.state = {}
+        self.state.setdefault("platforms", {})
+
+    def evaluate(self, platform_projects: Dict[str, List[AlphaProject]]) -> Dict[str, PlatformChange]:
+        """评估各平台的输入变化（没有项目的平台不包含在内）
+
+        Args:
+            platform_projects: 按平台分类并过滤后的项目
+
+        Returns:
+            Dict[str, PlatformChange]: 各平台的变化详情
+        """
+        max_age = CHANGE_DETECTION.get('max_age_hours', 24) * 3600
+        changes = {}
+        for platform, projects in platform_projects.items():
+            if not projects:
+                continue
+            current = platform_snapshot(projects)
+            previous = self.state["platforms"].get(platform)
+            if not self.enabled:
+                changes[platform] = PlatformChange(platform, current, reason="未启用变化检测")
+            elif not previous:
+                changes[platform] = PlatformChange(platform, current, reason="没有上一次建议的输入快照")
+            elif max_age and current["recorded_at"] - previous.get("recorded_at", 0) >= max_age:
+                changes[platform] = PlatformChange(platform, current, reason="上一次建议已超过最长间隔")
+            else:
+                changes[platform] = score_change(platform, previous, current)
+        return changes
+
+    def record(self, change: PlatformChange, advice_file: Optional[str] = None) -> None:
+        """建议生成成功后保存该平台的输入快照
+
+        Args:
+            change: evaluate()返回的平台变化
+            advice_file: 本次生成的建议文件，跳过的平台在汇总报告中沿用
+        """
+        self.state["platforms"][change.platform] = {**change.snapshot, "advice_file": advice_file}
+        try:
+            dump_file(self.path, self.state)
+        except OSError as e:
+            logger.warning(f"保存输入快照失败: {str(e)}")
+
+    def previous_advice(self, platform: str) -> Optional[str]:
+        """读取平台上一次生成的建议，文件不存在时返回None"""
+        advice_file = self.state["platforms"].get(platform, {}).get("advice_file")
+        if not advice_file:
+            return None
+        try:
+            with open(advice_file, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
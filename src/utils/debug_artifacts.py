@@ -0,0 +1,255 @@
+"""
+调试产物管理
+筛选后的项目列表、各平台项目列表、提示词和表格图片等调试文件交给后台写线程落盘，
+按级别(off/summary/full)和采样率决定是否写入，写入时压缩，并按目录限制总大小、文件数和保留天数
+"""
+
+import os
+import time
+import queue
+import random
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional
+
+from config import DEBUG_ARTIFACTS
+from src.utils.serialization import dumps, write_bytes, resolve_compression, compress, COMPRESSION_SUFFIXES
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+LEVEL_OFF = "off"          # 不写入调试产物
+LEVEL_SUMMARY = "summary"  # 只写入摘要（数量、代币符号等）
+LEVEL_FULL = "full"        # 写入完整内容
+LEVELS = (LEVEL_OFF, LEVEL_SUMMARY, LEVEL_FULL)
+
+_STOP = object()
+
+
+def _to_serializable(obj: Any) -> Any:
+    """序列化提供to_dict()的对象（如AlphaProject）"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"无法序列化的对象类型: {type(obj).__name__}")
+
+
+class DebugArtifacts:
+    """调试产物管理器，写入在后台线程中完成，调用方不会因落盘而阻塞"""
+
+    def __init__(self, level: Optional[str] = None, sample_rate: Optional[float] = None,
+                 compression: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_files: Optional[int] = None, max_age_days: Optional[float] = None,
+                 queue_size: Optional[int] = None):
+        """初始化调试产物管理器
+
+        Args:
+            level: 写入级别，off / summary / full，默认读取DEBUG_ARTIFACTS配置
+            sample_rate: 采样率(0~1)，每次运行决定一次，未被采样的运行不写入任何调试产物
+            compression: 压缩方式，zstd / gzip / none，zstd未安装时回退为gzip
+            max_bytes: 每个目录的总大小上限（字节）
+            max_files: 每个目录的文件数上限
+            max_age_days: 文件保留天数
+            queue_size: 写入队列长度，队列已满时丢弃新的调试产物
+        """
+        level = (level or DEBUG_ARTIFACTS.get('level', LEVEL_FULL)).lower()
+        if level not in LEVELS:
+            logger.warning(f"未知的调试产物级别: {level}，使用{LEVEL_FULL}")
+            level = LEVEL_FULL
+        sample_rate = DEBUG_ARTIFACTS.get('sample_rate', 1.0) if sample_rate is None else sample_rate
+        self.sampled = random.random() < sample_rate
+        self.level = level if self.sampled else LEVEL_OFF
+        self.compression = resolve_compression(compression or DEBUG_ARTIFACTS.get('compression', 'gzip'))
+        self.max_bytes = DEBUG_ARTIFACTS.get('max_bytes', 0) if max_bytes is None else max_bytes
+        self.max_files = DEBUG_ARTIFACTS.get('max_files', 0) if max_files is None else max_files
+        self.max_age_days = DEBUG_ARTIFACTS.get('max_age_days', 0) if max_age_days is None else max_age_days
+
+        self.stats = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "bytes": 0, "rotated": 0}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or DEBUG_ARTIFACTS.get('queue_size', 64))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def wants(self, summary_available: bool = True) -> bool:
+        """当前级别下是否需要写入
+
+        Args:
+            summary_available: 该产物是否提供摘要，summary级别下没有摘要的产物不写入
+        """
+        if self.level == LEVEL_FULL:
+            return True
+        return self.level == LEVEL_SUMMARY and summary_available
+
+    def dump_json(self, directory: str, filename: str, obj: Any, summary: Any = None) -> Optional[str]:
+        """异步写入JSON调试产物
+
+        Args:
+            directory: 目标目录
+            filename: 文件名（不含压缩后缀）
+            obj: 完整内容，full级别写入
+            summary: 摘要内容，summary级别写入，为None时该级别下不写入
+
+        Returns:
+            Optional[str]: 文件将写入的路径（写入在后台完成），不写入时返回None
+        """
+        if not self.wants(summary is not None):
+            return None
+        content = obj if self.level == LEVEL_FULL else summary
+        return self._submit(directory, filename, lambda: dumps(content, default=_to_serializable), compressible=True)
+
+    def dump_text(self, directory: str, filename: str, text: str, summary: Optional[str] = None) -> Optional[str]:
+        """异步写入文本调试产物，参数含义同dump_json"""
+        if not self.wants(summary is not None):
+            return None
+        content = text if self.level == LEVEL_FULL else summary
+        return self._submit(directory, filename, lambda: content.encode('utf-8'), compressible=True)
+
+    def dump_bytes(self, directory: str, filename: str, data: bytes) -> Optional[str]:
+        """异步写入二进制调试产物（如PNG图片），只在full级别写入且不再压缩"""
+        if not self.wants(summary_available=False):
+            return None
+        return self._submit(directory, filename, lambda: data, compressible=False)
+
+    def _submit(self, directory: str, filename: str, render: Callable[[], bytes], compressible: bool) -> Optional[str]:
+        """将写入任务放入队列，队列已满时丢弃而不是阻塞调用方"""
+        suffix = COMPRESSION_SUFFIXES[self.compression] if compressible else ""
+        # 入队时解析为绝对路径，避免写线程执行时工作目录已改变
+        path = os.path.abspath(os.path.join(directory, filename + suffix))
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((path, render, compressible))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            logger.warning(f"调试产物写入队列已满，丢弃: {path}")
+            return None
+        self.stats["queued"] += 1
+        return path
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self.closed = False
+                self._thread = threading.Thread(target=self._writer_loop, name="debug-artifacts", daemon=True)
+                self._thread.start()
+
+    def _writer_loop(self) -> None:
+        """后台写线程：序列化、压缩、原子写入，然后轮转所在目录"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                path, render, compressible = item
+                data = render()
+                if compressible:
+                    data = compress(data, self.compression)
+                write_bytes(path, data)
+                self.stats["written"] += 1
+                self.stats["bytes"] += len(data)
+                self.rotate(os.path.dirname(path))
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning(f"写入调试产物失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def rotate(self, directory: str) -> int:
+        """按保留天数、文件数和总大小清理目录中最旧的文件
+
+        Args:
+            directory: 调试产物目录
+
+        Returns:
+            int: 删除的文件数
+        """
+        try:
+            entries = []
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return 0
+
+        # 从新到旧累计，超出任一限制的文件被删除
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        removed = 0
+        total = 0
+        for index, (mtime, size, path) in enumerate(entries):
+            total += size
+            expired = cutoff is not None and mtime < cutoff
+            too_many = bool(self.max_files) and index >= self.max_files
+            too_large = bool(self.max_bytes) and total > self.max_bytes and index > 0
+            if expired or too_many or too_large:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+        self.stats["rotated"] += removed
+        return removed
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的调试产物写完
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 是否已全部写完
+        """
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """写完剩余的调试产物并停止写线程，应在进程退出前调用"""
+        finished = self.flush(timeout)
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                self._queue.put(_STOP)
+                self._thread.join(timeout)
+            self._thread = None
+            self.closed = True
+        return finished
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回写入统计，用于写入追踪文件"""
+        return {"level": self.level, "compression": self.compression, **self.stats}
+
+
+_manager: Optional[DebugArtifacts] = None
+_manager_lock = threading.Lock()
+
+
+def get_debug_artifacts() -> DebugArtifacts:
+    """获取进程内共享的调试产物管理器，关闭后再次调用会创建新的管理器（重新采样）"""
+    global _manager
+    with _manager_lock:
+        if _manager is None or _manager.closed:
+            _manager = DebugArtifacts()
+        return _manager
+
+
+def close_debug_artifacts(timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """写完并关闭当前的调试产物管理器
+
+    Args:
+        timeout: 最长等待时间（秒），默认读取DEBUG_ARTIFACTS['flush_timeout']
+
+    Returns:
+        Optional[Dict[str, Any]]: 写入统计，管理器未创建或已关闭时返回None
+    """
+    with _manager_lock:
+        manager = _manager
+    if manager is None or manager.closed:
+        return None
+    manager.close(DEBUG_ARTIFACTS.get('flush_timeout', 30) if timeout is None else timeout)
+    return manager.snapshot()
+
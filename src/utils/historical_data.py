@@ -1,13 +1,13 @@
 import asyncio
 import os
-import json
 import logging
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
 from ..collectors import BinanceAlphaCollector
-from config import PROXY_URL, USE_PROXY
+from config import PROXY_URL, USE_PROXY, HTTP_CACHE
+from src.utils.serialization import dump_file, load_file
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -46,8 +46,7 @@ class BinanceAlphaDataCollector:
     def save_data(self, data: Dict[str, Any]) -> bool:
         """保存币安Alpha数据"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            dump_file(self.data_file, data)
             logger.info(f"币安Alpha数据已保存到: {self.data_file}")
             return True
         except Exception as e:
@@ -58,8 +57,7 @@ class BinanceAlphaDataCollector:
         """加载币安Alpha数据"""
         try:
             if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = load_file(self.data_file)
                 logger.info(f"从本地文件加载币安Alpha数据: {self.data_file}")
                 return data
             else:
@@ -86,15 +84,16 @@ class BinanceAlphaDataCollector:
         # 尝试加载本地数据
         local_data = self.load_data()
         
-        # 如果本地数据不存在，或者数据已过期（超过1小时），则获取最新数据
+        # 如果本地数据不存在，或者数据已过期（超过cmc_listing的缓存有效期），则获取最新数据
         if not local_data:
             logger.info("本地币安Alpha数据不存在，获取最新数据")
             return await self.collect_current_data()
         
-        # 检查数据是否过期（超过1小时）
+        # 检查数据是否过期（过期后发送条件请求，内容未变化时沿用本地数据）
+        max_age = HTTP_CACHE['sources']['cmc_listing']['max_age']
         timestamp = local_data.get("timestamp", 0)
         current_time = int(time.time())
-        if (current_time - timestamp) >= 60 * 60:  # 1小时 = 60分钟 * 60秒
+        if (current_time - timestamp) >= max_age:
             logger.info(f"币安Alpha数据已过期，上次更新时间: {datetime.fromtimestamp(timestamp)}")
             return await self.collect_current_data()
         else:
@@ -0,0 +1,306 @@
+"""
+HTTP条件请求缓存
+按数据源保存上一次响应的ETag/Last-Modified和内容摘要，发送条件请求；
+内容未变化时（304或摘要相同）调用方可以跳过解析和比对。
+大的响应体可以通过CacheWriter边接收边写入缓存文件并增量计算摘要，不在内存中保留完整响应体
+"""
+
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Callable, Iterator, Optional
+
+from config import DATA_DIRS, HTTP_CACHE
+from src.utils.serialization import loads, dump_file, load_file
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+STATUS_FRESH = "fresh"                # 仍在有效期内，未发送请求
+STATUS_NOT_MODIFIED = "not_modified"  # 服务端返回304
+STATUS_UNCHANGED = "unchanged"        # 返回200但内容摘要与上次相同
+STATUS_CHANGED = "changed"            # 内容发生变化（或首次获取）
+
+
+class CachedFetch:
+    """一次带缓存的获取结果，响应体在首次访问时才从缓存文件读取"""
+
+    __slots__ = ("status", "changed", "digest", "_cache", "_body")
+
+    def __init__(self, cache: "HttpCache", status: str, changed: bool, digest: Optional[str],
+                 body: Optional[bytes] = None):
+        self.status = status
+        self.changed = changed
+        self.digest = digest
+        self._cache = cache
+        self._body = body
+
+    @property
+    def body(self) -> bytes:
+        """响应体（未变化时从缓存文件读取）"""
+        if self._body is None:
+            self._body = self._cache.read_body() or b""
+        return self._body
+
+    def json(self) -> Any:
+        """将响应体解析为JSON"""
+        return loads(self.body)
+
+    def iter_chunks(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """分块读取响应体，未变化时直接从缓存文件流式读取，不整体载入内存"""
+        if self._body is not None:
+            for start in range(0, len(self._body), chunk_size):
+                yield self._body[start:start + chunk_size]
+            return
+        yield from self._cache.iter_body(chunk_size)
+
+
+class HttpCache:
+    """单个数据源的条件请求缓存"""
+
+    def __init__(self, source: str, normalize: Optional[Callable[[bytes], bytes]] = None,
+                 cache_dir: Optional[str] = None, max_age: Optional[float] = None,
+                 normalize_prefix: Optional[int] = None):
+        """初始化缓存
+
+        Args:
+            source: 数据源名称，对应HTTP_CACHE['sources']中的配置
+            normalize: 计算摘要前对响应体的规范化处理，用于去掉每次都会变化的字段（如serverTime）
+            cache_dir: 缓存目录，默认为DATA_DIRS['http_cache']
+            max_age: 有效期（秒），在有效期内可不发送请求，默认读取配置
+            normalize_prefix: 只对响应体的前N字节做规范化，其余部分按原样计算摘要，
+                设置后normalize不需要完整的响应体，可以使用writer()流式写入
+        """
+        settings = HTTP_CACHE.get('sources', {}).get(source, {})
+        self.source = source
+        self.normalize = normalize
+        self.normalize_prefix = normalize_prefix
+        self.cache_dir = cache_dir or DATA_DIRS.get('http_cache', 'data/http_cache')
+        self.max_age = max_age if max_age is not None else settings.get('max_age', 0)
+        self.enabled = HTTP_CACHE.get('enabled', True)
+        self._meta: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.source}.json")
+
+    @property
+    def body_path(self) -> str:
+        return os.path.join(self.cache_dir, f"{self.source}.body")
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """缓存元数据：etag、last_modified、digest、fetched_at、validated_at及调用方附加的标注"""
+        if self._meta is None:
+            try:
+                self._meta = load_file(self.meta_path)
+            except (OSError, ValueError):
+                self._meta = {}
+        return self._meta
+
+    def _save_meta(self) -> None:
+        dump_file(self.meta_path, self.meta)
+
+    def digest_of(self, body: bytes) -> str:
+        """计算（规范化后的）响应体摘要"""
+        if self.normalize and self.normalize_prefix:
+            sha = hashlib.sha256(self.normalize(body[:self.normalize_prefix]))
+            sha.update(body[self.normalize_prefix:])
+            return sha.hexdigest()
+        return hashlib.sha256(self.normalize(body) if self.normalize else body).hexdigest()
+
+    def writer(self) -> "CacheWriter":
+        """创建流式写入器，逐块写入200响应的响应体"""
+        if self.normalize and not self.normalize_prefix:
+            raise ValueError(f"{self.source}: 流式写入需要设置normalize_prefix")
+        return CacheWriter(self)
+
+    def is_fresh(self) -> bool:
+        """是否仍在有效期内（可以不发送请求）"""
+        if not self.enabled or not self.max_age:
+            return False
+        validated_at = self.meta.get("validated_at", 0)
+        return time.time() - validated_at < self.max_age and os.path.exists(self.body_path)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """条件请求头，缓存的响应体不存在时返回空字典"""
+        if not self.enabled or not os.path.exists(self.body_path):
+            return {}
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+    def read_body(self) -> Optional[bytes]:
+        """读取缓存的响应体"""
+        try:
+            with open(self.body_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def iter_body(self, chunk_size: int = 65536) -> Iterator[bytes]:
+        """分块读取缓存的响应体"""
+        try:
+            with open(self.body_path, 'rb') as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        except OSError:
+            return
+
+    def cached(self) -> CachedFetch:
+        """在有效期内直接使用缓存"""
+        return CachedFetch(self, STATUS_FRESH, False, self.meta.get("digest"))
+
+    def not_modified(self) -> CachedFetch:
+        """处理304响应：刷新验证时间，沿用缓存内容"""
+        with self._lock:
+            self.meta["validated_at"] = time.time()
+            self._save_meta()
+        return CachedFetch(self, STATUS_NOT_MODIFIED, False, self.meta.get("digest"))
+
+    def store(self, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedFetch:
+        """处理200响应：比较摘要，内容变化时写入缓存文件
+
+        Args:
+            body: 响应体
+            headers: 响应头，用于保存ETag和Last-Modified
+
+        Returns:
+            CachedFetch: changed表示内容是否与上次不同
+        """
+        def write_body(tmp_path: str) -> None:
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+
+        return self._commit(self.digest_of(body), len(body), headers, write_body, body)
+
+    def _commit(self, digest: str, size: int, headers: Optional[Dict[str, str]],
+                write_body: Optional[Callable[[str], None]], body: Optional[bytes],
+                written_path: Optional[str] = None) -> CachedFetch:
+        """比较摘要并更新缓存文件和元数据
+
+        Args:
+            digest: 响应体摘要
+            size: 响应体字节数
+            headers: 响应头
+            write_body: 将响应体写入指定临时文件的函数（响应体在内存中时使用）
+            body: 内存中的响应体，流式写入时为None
+            written_path: 已写好的临时文件（流式写入时使用），内容未变化时删除
+
+        Returns:
+            CachedFetch: changed表示内容是否与上次不同
+        """
+        headers = headers or {}
+        with self._lock:
+            changed = digest != self.meta.get("digest") or not os.path.exists(self.body_path)
+            now = time.time()
+            if changed and self.enabled:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = written_path or f"{self.body_path}.tmp"
+                if written_path is None:
+                    write_body(tmp_path)
+                os.replace(tmp_path, self.body_path)
+                written_path = None
+                self.meta["fetched_at"] = now
+                self.meta["size"] = size
+            self.meta.update({
+                "digest": digest,
+                "etag": headers.get("ETag") or headers.get("etag"),
+                "last_modified": headers.get("Last-Modified") or headers.get("last-modified"),
+                "validated_at": now,
+            })
+            if self.enabled:
+                self._save_meta()
+        if written_path is not None:
+            # 内容未变化，或缓存未启用时响应体读入内存后丢弃临时文件
+            if body is None and not self.enabled:
+                with open(written_path, 'rb') as f:
+                    body = f.read()
+            _remove_quietly(written_path)
+        if not changed:
+            logger.info(f"{self.source}: 响应内容未变化，跳过解析")
+        return CachedFetch(self, STATUS_CHANGED if changed else STATUS_UNCHANGED, changed, digest, body)
+
+    def annotation(self, key: str) -> Any:
+        """读取调用方附加的标注，如对应的快照文件"""
+        return self.meta.get("annotations", {}).get(key)
+
+    def annotate(self, key: str, value: Any) -> None:
+        """附加标注，与当前缓存内容绑定，内容变化后由调用方重新标注"""
+        with self._lock:
+            self.meta.setdefault("annotations", {})[key] = value
+            if self.enabled:
+                self._save_meta()
+
+
+class CacheWriter:
+    """流式写入200响应：响应体逐块写入缓存目录下的临时文件并增量计算摘要，
+    finish()时比较摘要，内容变化则替换缓存文件，返回的结果从缓存文件流式读取"""
+
+    __slots__ = ("cache", "size", "_sha", "_head", "_file", "_path")
+
+    def __init__(self, cache: HttpCache):
+        self.cache = cache
+        self.size = 0
+        self._sha = hashlib.sha256()
+        # 需要规范化的前缀部分先缓存在内存中，凑满normalize_prefix字节后再计入摘要
+        self._head: Optional[bytes] = b"" if cache.normalize else None
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        fd, self._path = tempfile.mkstemp(prefix=f"{cache.source}.", suffix=".tmp", dir=cache.cache_dir)
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        """写入一块响应体"""
+        self._file.write(chunk)
+        self.size += len(chunk)
+        if self._head is None:
+            self._sha.update(chunk)
+            return
+        self._head += chunk
+        prefix = self.cache.normalize_prefix
+        if len(self._head) >= prefix:
+            self._sha.update(self.cache.normalize(self._head[:prefix]))
+            self._sha.update(self._head[prefix:])
+            self._head = None
+
+    def finish(self, headers: Optional[Dict[str, str]] = None) -> CachedFetch:
+        """响应体接收完毕：比较摘要并更新缓存
+
+        Args:
+            headers: 响应头，用于保存ETag和Last-Modified
+
+        Returns:
+            CachedFetch: changed表示内容是否与上次不同
+        """
+        if self._head is not None:
+            self._sha.update(self.cache.normalize(self._head))
+            self._head = None
+        self._file.close()
+        try:
+            return self.cache._commit(self._sha.hexdigest(), self.size, headers, None, None,
+                                      written_path=self._path)
+        except Exception:
+            _remove_quietly(self._path)
+            raise
+
+    def abort(self) -> None:
+        """接收失败时丢弃临时文件"""
+        self._file.close()
+        _remove_quietly(self._path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
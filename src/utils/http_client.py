@@ -0,0 +1,181 @@
+"""
+进程级共享HTTP客户端
+为同步(requests)和异步(aiohttp)调用提供按主机复用的连接池、keep-alive、带TTL的DNS缓存，
+并统一代理和超时设置，避免每次请求都重新建立TCP/TLS连接
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Union, Tuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_CLIENT, PROXY_URL, USE_PROXY
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 每个事件循环一个aiohttp会话（会话不能跨事件循环使用）
+_async_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+# 每个线程一个requests会话（requests.Session不保证线程安全）
+_thread_local = threading.local()
+_sync_sessions = weakref.WeakSet()
+_lock = threading.Lock()
+
+# 连接统计，用于观察连接复用效果
+_stats = {"async_requests": 0, "async_connections": 0, "async_reused": 0, "sync_requests": 0}
+
+
+def resolve_proxy(use_proxy: Optional[bool] = None) -> Optional[str]:
+    """根据配置返回代理地址
+
+    Args:
+        use_proxy: 是否使用代理，默认读取USE_PROXY配置
+
+    Returns:
+        Optional[str]: 代理地址，不使用代理时返回None
+    """
+    use_proxy = USE_PROXY if use_proxy is None else use_proxy
+    return PROXY_URL if use_proxy and PROXY_URL else None
+
+
+def build_timeout(read_timeout: Optional[float] = None) -> aiohttp.ClientTimeout:
+    """构建aiohttp超时设置
+
+    Args:
+        read_timeout: 读取超时（秒），默认使用HTTP_CLIENT['read_timeout']
+
+    Returns:
+        aiohttp.ClientTimeout: 连接超时和读取超时分别生效，不限制总时长
+    """
+    return aiohttp.ClientTimeout(
+        total=None,
+        connect=HTTP_CLIENT.get('connect_timeout', 10),
+        sock_read=read_timeout if read_timeout is not None else HTTP_CLIENT.get('read_timeout', 30)
+    )
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """统计新建连接和复用连接的次数"""
+    async def on_request_start(session, context, params):
+        _stats["async_requests"] += 1
+
+    async def on_connection_create_end(session, context, params):
+        _stats["async_connections"] += 1
+
+    async def on_connection_reuseconn(session, context, params):
+        _stats["async_reused"] += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    return trace_config
+
+
+async def get_async_session() -> aiohttp.ClientSession:
+    """获取当前事件循环共享的aiohttp会话，首次调用时创建
+
+    Returns:
+        aiohttp.ClientSession: 共享会话，调用方不应关闭，统一由close_async_session()关闭
+    """
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CLIENT.get('pool_size', 32),
+            limit_per_host=HTTP_CLIENT.get('pool_per_host', 8),
+            keepalive_timeout=HTTP_CLIENT.get('keepalive_timeout', 60),
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_CLIENT.get('dns_ttl', 300),
+        )
+        session = aiohttp.ClientSession(connector=connector, timeout=build_timeout(),
+                                        trace_configs=[_trace_config()])
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session() -> None:
+    """关闭当前事件循环的共享aiohttp会话，应在事件循环结束前调用"""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def get_sync_session() -> requests.Session:
+    """获取当前线程共享的requests会话，首次调用时创建
+
+    Returns:
+        requests.Session: 挂载了连接池的会话
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_CLIENT.get('pool_size', 32),
+            pool_maxsize=HTTP_CLIENT.get('pool_per_host', 8),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _thread_local.session = session
+        with _lock:
+            _sync_sessions.add(session)
+    return session
+
+
+def sync_request(method: str, url: str, use_proxy: bool = False,
+                 timeout: Optional[Union[float, Tuple[float, float]]] = None, **kwargs) -> requests.Response:
+    """通过共享会话发送同步请求
+
+    Args:
+        method: HTTP方法
+        url: 请求地址
+        use_proxy: 是否使用配置的代理
+        timeout: 读取超时（秒）或(连接超时, 读取超时)，默认使用HTTP_CLIENT配置
+        **kwargs: 传给requests的其他参数，如params、json、headers
+
+    Returns:
+        requests.Response: 响应对象
+    """
+    if timeout is None:
+        timeout = HTTP_CLIENT.get('read_timeout', 30)
+    if not isinstance(timeout, tuple):
+        timeout = (HTTP_CLIENT.get('connect_timeout', 10), timeout)
+
+    proxy = resolve_proxy(use_proxy)
+    if proxy:
+        kwargs.setdefault("proxies", {"http": proxy, "https": proxy})
+
+    _stats["sync_requests"] += 1
+    return get_sync_session().request(method, url, timeout=timeout, **kwargs)
+
+
+def _sync_connection_count() -> int:
+    """统计所有requests会话中已建立的连接数"""
+    total = 0
+    with _lock:
+        sessions = list(_sync_sessions)
+    for session in sessions:
+        for adapter in set(session.adapters.values()):
+            managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+            for manager in managers:
+                if manager is None:
+                    continue
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    total += getattr(pool, "num_connections", 0) if pool is not None else 0
+    return total
+
+
+def connection_stats() -> Dict[str, int]:
+    """返回进程内的请求数和新建连接数
+
+    Returns:
+        Dict[str, int]: async_requests、async_connections、async_reused、sync_requests、sync_connections
+    """
+    return {**_stats, "sync_connections": _sync_connection_count()}
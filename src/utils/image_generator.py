@@ -7,83 +7,74 @@ import os
 import io
 import base64
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, AbstractSet, Optional, Tuple, Union
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')  # 使用非交互式后端
 import pandas as pd
 import numpy as np
 from config import DATA_DIRS
-from src.utils.binance_symbols import is_token_listed
+from src.utils.binance_symbols import load_listed_symbols
+from src.utils.debug_artifacts import get_debug_artifacts
+from src.utils.alpha_project import AlphaProject, as_project
 
-def create_alpha_table_image(crypto_list: List[Dict[str, Any]], date: str, 
-                            max_items: int = 100) -> Tuple[str, str]:
+# 差异视图中的变动说明列（↑n / ↓n / 新 / 上线 / 下线）
+DIFF_COLUMN = "变动"
+
+def build_table_rows(crypto_list: List[Union[AlphaProject, Dict[str, Any]]], max_items: int = 100,
+                     listed_symbols: Optional[AbstractSet[str]] = None) -> List[Dict[str, Any]]:
     """
-    将币安Alpha项目列表转换为表格图片
+    提取表格图片的行数据（可序列化，可交给渲染进程）
     
     Args:
-        crypto_list: 加密货币项目列表
-        date: 数据日期
+        crypto_list: 加密货币项目列表（AlphaProject记录或CMC项目字典）
         max_items: 最大项目数量
+        listed_symbols: 已上线token集合，为None时读取一次symbol.json
         
     Returns:
-        Tuple[str, str]: (图片路径, 图片base64编码)
+        List[Dict[str, Any]]: 表格行
     """
-    # 确保目录存在
-    image_dir = os.path.join(DATA_DIRS.get('data', 'data'), 'images')
-    os.makedirs(image_dir, exist_ok=True)
-    
-    # 准备数据
     data = []
+    if listed_symbols is None:
+        listed_symbols = load_listed_symbols()
     
     # 只处理最多max_items个项目
     for crypto in crypto_list[:max_items]:
         # 提取基本数据
-        name = crypto.get("name", "未知")
-        symbol = crypto.get("symbol", "未知")
-        rank = crypto.get("cmcRank", "未知")
-        
-        # 使用简化的函数直接检查symbol是否上线
-        is_listed = is_token_listed(symbol)
-        
-        # 提取价格和价格变化数据（USD）
-        quotes = crypto.get("quotes", [])
-        usd_quote = next((q for q in quotes if q.get("name") == "USD"), {})
+        project = as_project(crypto)
+        symbol = project.symbol or "未知"
         
-        # 如果找不到名为"USD"的报价，尝试使用索引2（假设这是USD）
-        if not usd_quote and len(quotes) > 2:
-            usd_quote = quotes[2]
-        
-        # 提取数据
-        price = usd_quote.get("price", 0)
-        percent_change_24h = usd_quote.get("percentChange24h", 0)
-        volume_24h = usd_quote.get("volume24h", 0)
-        
-        # 计算市值
-        market_cap = usd_quote.get("marketCap", 0)
-        if market_cap == 0:
-            market_cap = usd_quote.get("selfReportedMarketCap", 0)
-            
-        # 计算完全稀释估值(FDV)
-        fdv = usd_quote.get("fullyDilluttedMarketCap", 0)
-        
-        # 计算MC/FDV比率
-        mc_fdv_ratio = market_cap / fdv if fdv > 0 else 0
+        # 检查symbol是否上线
+        is_listed = symbol.upper() in listed_symbols
         
         # 数据格式化
         data.append({
-            "排名": rank,
-            "名称": name,
+            "排名": project.rank,
+            "名称": project.name,
             "代码": symbol,
             "是否上线": "是" if is_listed else "否",
-            "价格($)": round(price, 4),
-            "24h变化(%)": round(percent_change_24h, 2),
-            "交易量(M$)": round(volume_24h / 1000000, 2),
-            "市值(M$)": round(market_cap / 1000000, 2),
-            "FDV(M$)": round(fdv / 1000000, 2),
-            "MC/FDV": round(mc_fdv_ratio, 2)
+            "价格($)": round(project.price, 4),
+            "24h变化(%)": round(project.percent_change_24h, 2),
+            "交易量(M$)": round(project.volume_24h / 1000000, 2),
+            "市值(M$)": round(project.market_cap / 1000000, 2),
+            "FDV(M$)": round(project.fdv / 1000000, 2),
+            "MC/FDV": round(project.mc_fdv_ratio, 2)
         })
     
+    return data
+
+
+def render_table_png(data: List[Dict[str, Any]], max_items: int = 100) -> bytes:
+    """
+    将表格行渲染为PNG（CPU密集，可在渲染进程中执行）
+    
+    Args:
+        data: build_table_rows()返回的表格行
+        max_items: 最大项目数量
+        
+    Returns:
+        bytes: PNG图片数据
+    """
     # 创建DataFrame
     df = pd.DataFrame(data)
     
@@ -126,6 +117,10 @@ def create_alpha_table_image(crypto_list: List[Dict[str, Any]], date: str,
         
         if is_listed_value == "是":
             row_colors[listing_index] = '#d8f3dc'  # 浅绿色
+        
+        # 差异视图中高亮变动说明列
+        if DIFF_COLUMN in df.columns:
+            row_colors[df.columns.get_loc(DIFF_COLUMN)] = '#ffe8a3'  # 浅黄色
             
         cell_colors.append(row_colors)
     
@@ -153,16 +148,51 @@ def create_alpha_table_image(crypto_list: List[Dict[str, Any]], date: str,
         cell.set_text_props(weight='bold', color='white')
         cell.set_facecolor('#2a9d8f')
     
-    # 保存图片，增加分辨率
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    image_path = os.path.join(image_dir, f"alpha_list_{timestamp}.png")
+    # 渲染到内存，增加分辨率
+    buffer = io.BytesIO()
     # 减少图片边距，使得标题和表格间距更小
-    plt.savefig(image_path, bbox_inches='tight', dpi=210, pad_inches=0)  # 减小pad_inches参数
-    plt.close()
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=210, pad_inches=0)  # 减小pad_inches参数
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def save_table_image(image_data: bytes, prefix: str = "alpha_list") -> Tuple[Optional[str], str]:
+    """
+    保存表格图片并返回base64编码
+    
+    Args:
+        image_data: PNG图片数据
+        prefix: 图片文件名前缀
+        
+    Returns:
+        Tuple[Optional[str], str]: (图片路径，按DEBUG_ARTIFACTS级别未保存时为None, 图片base64编码)
+    """
+    # 图片保存目录（由调试产物管理器创建）
+    image_dir = os.path.join(DATA_DIRS.get('data', 'data'), 'images')
+    img_base64 = base64.b64encode(image_data).decode('utf-8')
+    
+    # 图片文件作为调试产物由后台线程写入，推送直接使用base64编码
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    image_path = get_debug_artifacts().dump_bytes(image_dir, f"{prefix}_{timestamp}.png", image_data)
     
-    # 返回图片路径和base64编码
-    with open(image_path, "rb") as img_file:
-        img_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+    print(f"已生成Alpha项目表格图片: {image_path or '(未保存)'}")
+    return image_path, img_base64
+
+
+def create_alpha_table_image(crypto_list: List[Union[AlphaProject, Dict[str, Any]]], date: str, 
+                            max_items: int = 100,
+                            listed_symbols: Optional[AbstractSet[str]] = None) -> Tuple[Optional[str], str]:
+    """
+    将币安Alpha项目列表转换为表格图片（在当前进程中同步渲染，异步流水线使用render_service）
     
-    print(f"已生成Alpha项目表格图片: {image_path}")
-    return image_path, img_base64 
\ No newline at end of file
+    Args:
+        crypto_list: 加密货币项目列表（AlphaProject记录或CMC项目字典）
+        date: 数据日期
+        max_items: 最大项目数量
+        listed_symbols: 已上线token集合，为None时读取一次symbol.json
+        
+    Returns:
+        Tuple[Optional[str], str]: (图片路径，按DEBUG_ARTIFACTS级别未保存时为None, 图片base64编码)
+    """
+    data = build_table_rows(crypto_list, max_items, listed_symbols)
+    return save_table_image(render_table_png(data, max_items))
@@ -0,0 +1,298 @@
+"""
+上币时间线索引
+按时间顺序扫描symbols/raw下的原始交易对快照，记录每个token在快照序列中出现的区间（首次和最后一次出现）
+及各计价货币交易对的首次和最后一次出现，保存为紧凑的索引文件；之后只处理新增的快照，
+查询时为内存中的字典查找，不再重复解析快照文件
+"""
+
+import os
+import re
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
+
+import numpy as np
+
+from config import DATA_DIRS, LISTING_TIMELINE
+from src.utils import binance_symbols
+from src.utils.binance_symbols import extract_token_names, split_symbol
+from src.utils.serialization import dump_file, load_file
+from src.utils.alpha_project import AlphaProject
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 默认索引文件路径
+DEFAULT_INDEX_PATH = os.path.join(ROOT_DIR, DATA_DIRS.get('analytics', 'data/analytics'), 'listing_timeline.json')
+
+# 原始快照文件名：raw-symbols-20250424-003002.json
+RAW_FILE_PATTERN = re.compile(r'^raw-symbols-(\d{8}-\d{6})\.json$')
+
+# 索引格式版本，格式变化时重建
+INDEX_VERSION = 1
+
+
+def _snapshot_tokens(symbols: List[str]) -> Tuple[set, Dict[str, set]]:
+    """单个快照中的token集合及各token的计价货币
+
+    1000x形式的token（如1000SATS）同时登记到原始代币名（SATS）下，与回测和上线判断一致。
+    """
+    tokens = set(extract_token_names(symbols))
+    tokens |= {t[4:] for t in tokens if t.startswith('1000') and len(t) > 4}
+    quotes: Dict[str, set] = {}
+    for symbol in symbols:
+        token, quote = split_symbol(symbol)
+        if quote is None:
+            continue
+        quotes.setdefault(token, set()).add(quote)
+        if token.startswith('1000') and len(token) > 4:
+            quotes.setdefault(token[4:], set()).add(quote)
+    return tokens, quotes
+
+
+class ListingTimeline:
+    """token在原始交易对快照序列中的上线时间线"""
+
+    def __init__(self, raw_dir: Optional[str] = None, index_path: Optional[str] = None):
+        """
+        Args:
+            raw_dir: 原始快照目录，默认为symbols/raw
+            index_path: 索引文件路径，默认为data/analytics/listing_timeline.json，为空字符串时只在内存中构建
+        """
+        self.raw_dir = os.path.abspath(raw_dir or os.path.join(binance_symbols.DEFAULT_SYMBOLS_DIR, 'raw'))
+        self.index_path = DEFAULT_INDEX_PATH if index_path is None else index_path
+        self._lock = threading.Lock()
+        self._times: Optional[List[datetime]] = None
+        self.index = self._empty_index()
+        if self.index_path:
+            try:
+                index = load_file(self.index_path)
+                if index.get("version") == INDEX_VERSION and index.get("raw_dir") == self.raw_dir:
+                    self.index = index
+            except (OSError, ValueError):
+                pass
+
+    def _empty_index(self) -> Dict[str, Any]:
+        # snapshots: 已处理的快照时间戳（升序）；tokens: token -> {"runs": [[起始快照, 结束快照], ...],
+        # "quotes": {计价货币: [首次快照, 最后快照]}}，快照以在snapshots中的位置表示
+        return {"version": INDEX_VERSION, "raw_dir": self.raw_dir, "snapshots": [], "tokens": {}}
+
+    def _snapshot_files(self) -> List[Tuple[str, str]]:
+        if not os.path.isdir(self.raw_dir):
+            return []
+        files = []
+        for filename in os.listdir(self.raw_dir):
+            match = RAW_FILE_PATTERN.match(filename)
+            if match:
+                files.append((match.group(1), filename))
+        return sorted(files)
+
+    def refresh(self) -> int:
+        """处理新增的快照；已处理的快照被删除或在其之前插入了快照时重建索引
+
+        Returns:
+            int: 本次处理的快照数量
+        """
+        with self._lock:
+            files = self._snapshot_files()
+            stamps = [stamp for stamp, _ in files]
+            processed = self.index["snapshots"]
+            if stamps[:len(processed)] != processed:
+                logger.info("原始快照序列与上币时间线索引不一致，重建索引")
+                self.index = self._empty_index()
+                processed = self.index["snapshots"]
+            pending = files[len(processed):]
+            if not pending:
+                return 0
+
+            tokens = self.index["tokens"]
+            for stamp, filename in pending:
+                position = len(processed)
+                snapshot_tokens, snapshot_quotes = _snapshot_tokens(load_file(os.path.join(self.raw_dir, filename)))
+                for token in snapshot_tokens:
+                    entry = tokens.setdefault(token, {"runs": [], "quotes": {}})
+                    runs = entry["runs"]
+                    # 上一份快照中也存在时延长当前区间，否则开始新的区间（首次上线或下架后重新上线）
+                    if runs and runs[-1][1] == position - 1:
+                        runs[-1][1] = position
+                    else:
+                        runs.append([position, position])
+                    for quote in snapshot_quotes.get(token, ()):
+                        entry["quotes"].setdefault(quote, [position, position])[1] = position
+                processed.append(stamp)
+
+            self._times = None
+            if self.index_path:
+                try:
+                    dump_file(self.index_path, self.index)
+                except OSError as e:
+                    logger.warning(f"保存上币时间线索引失败: {str(e)}")
+            logger.info(f"上币时间线索引已处理{len(pending)}份新快照，共{len(processed)}份快照、{len(tokens)}个token")
+            return len(pending)
+
+    @property
+    def times(self) -> List[datetime]:
+        """各快照的时间"""
+        if self._times is None:
+            self._times = [datetime.strptime(stamp, '%Y%m%d-%H%M%S') for stamp in self.index["snapshots"]]
+        return self._times
+
+    def lookup(self, token: str) -> Optional[Dict[str, Any]]:
+        """查询token的上线时间线
+
+        Args:
+            token: token名称（不区分大小写）
+
+        Returns:
+            Optional[Dict[str, Any]]: first_seen、last_seen（datetime）、listed（是否在最新快照中）、
+                before_records（第一份快照中已存在，实际上线时间早于记录）、relisted（下架后重新上线过）
+                和quotes（计价货币 -> (首次, 最后)出现时间），从未出现时返回None
+        """
+        entry = self.index["tokens"].get((token or "").upper())
+        if entry is None:
+            return None
+        times = self.times
+        runs = entry["runs"]
+        return {
+            "first_seen": times[runs[0][0]],
+            "last_seen": times[runs[-1][1]],
+            "listed": runs[-1][1] == len(times) - 1,
+            "before_records": runs[0][0] == 0,
+            "relisted": len(runs) > 1,
+            "quotes": {quote: (times[first], times[last]) for quote, (first, last) in entry["quotes"].items()},
+        }
+
+    def listed_since(self, token: str) -> Optional[str]:
+        """token首次出现在快照中的日期（YYYY-MM-DD），从未出现时返回None
+
+        等于第一份快照日期时，表示该token在开始记录前已经上线。
+        """
+        entry = self.index["tokens"].get((token or "").upper())
+        if entry is None:
+            return None
+        return self.times[entry["runs"][0][0]].strftime('%Y-%m-%d')
+
+    def listing_dates(self) -> Dict[str, str]:
+        """所有token的首次出现日期：token -> YYYY-MM-DD"""
+        dates = [t.strftime('%Y-%m-%d') for t in self.times]
+        return {token: dates[entry["runs"][0][0]] for token, entry in self.index["tokens"].items()}
+
+    def recently_listed(self, days: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, datetime]:
+        """最近days天内首次出现且仍在最新快照中的token（不含开始记录前已上线的token）
+
+        Args:
+            days: 天数，默认读取LISTING_TIMELINE['recent_days']
+            now: 当前时间，默认为datetime.now()
+
+        Returns:
+            Dict[str, datetime]: token -> 首次出现时间
+        """
+        days = days or LISTING_TIMELINE.get('recent_days', 30)
+        cutoff = (now or datetime.now()) - timedelta(days=days)
+        times = self.times
+        recent = {}
+        for token, entry in self.index["tokens"].items():
+            first, last = entry["runs"][0][0], entry["runs"][-1][1]
+            if first > 0 and last == len(times) - 1 and times[first] >= cutoff:
+                recent[token] = times[first]
+        return recent
+
+    def recent_peers(self, projects: Iterable[AlphaProject], classify: Callable[[AlphaProject], Optional[str]],
+                     days: Optional[int] = None, limit: Optional[int] = None
+                     ) -> Dict[str, List[Tuple[AlphaProject, str, List[str]]]]:
+        """按平台分组近期上线币安现货的Alpha项目，用作提示词中的参照
+
+        Args:
+            projects: 过滤前的Alpha项目（已上线的项目仍在其中）
+            classify: 项目 -> 平台，如PlatformClassifier.classify
+            days: 近期上线的天数，默认读取LISTING_TIMELINE['recent_days']
+            limit: 每个平台的最大项目数，默认读取LISTING_TIMELINE['peer_limit']
+
+        Returns:
+            Dict[str, List[Tuple]]: 平台 -> [(项目, 上线日期YYYY-MM-DD, 计价货币列表)]，按上线时间从近到远排序
+        """
+        limit = limit or LISTING_TIMELINE.get('peer_limit', 5)
+        recent = self.recently_listed(days)
+        if not recent:
+            return {}
+        peers: Dict[str, List[Tuple[AlphaProject, datetime]]] = {}
+        for project in projects:
+            first_seen = recent.get((project.symbol or "").upper())
+            platform = classify(project) if first_seen else None
+            if platform:
+                peers.setdefault(platform, []).append((project, first_seen))
+        result = {}
+        for platform, items in peers.items():
+            items.sort(key=lambda item: item[1], reverse=True)
+            result[platform] = [(project, first_seen.strftime('%Y-%m-%d'),
+                                 sorted(self.index["tokens"][project.symbol.upper()]["quotes"]))
+                                for project, first_seen in items[:limit]]
+        return result
+
+    def presence_matrix(self) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """由上线区间还原token在各快照中的上线矩阵
+
+        Returns:
+            Tuple: (快照时间数组(秒), token列表, 上线矩阵[token, 快照]的布尔数组)
+        """
+        token_list = sorted(self.index["tokens"])
+        presence = np.zeros((len(token_list), len(self.times)), dtype=bool)
+        for row, token in enumerate(token_list):
+            for start, end in self.index["tokens"][token]["runs"]:
+                presence[row, start:end + 1] = True
+        times = np.array([int(t.timestamp()) for t in self.times], dtype=np.int64)
+        return times, token_list, presence
+
+
+_timeline: Optional[ListingTimeline] = None
+_timeline_lock = threading.Lock()
+
+
+def get_listing_timeline(raw_dir: Optional[str] = None) -> ListingTimeline:
+    """获取上币时间线（首次调用时加载索引并处理新增的快照）
+
+    Args:
+        raw_dir: 原始快照目录，默认为symbols/raw；指定其他目录时在内存中单独构建，不读写索引文件
+
+    Returns:
+        ListingTimeline: 默认目录时为进程内共享的实例
+    """
+    global _timeline
+    default_dir = os.path.abspath(os.path.join(binance_symbols.DEFAULT_SYMBOLS_DIR, 'raw'))
+    if raw_dir and os.path.abspath(raw_dir) != default_dir:
+        timeline = ListingTimeline(raw_dir, index_path="")
+        timeline.refresh()
+        return timeline
+    with _timeline_lock:
+        if _timeline is None or _timeline.raw_dir != default_dir:
+            _timeline = ListingTimeline()
+            _timeline.refresh()
+        return _timeline
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="上币时间线索引")
+    parser.add_argument("tokens", nargs="*", help="查询的token，留空时列出最近上线的token")
+    parser.add_argument("--days", type=int, help="最近上线的天数")
+    args = parser.parse_args()
+
+    timeline = get_listing_timeline()
+    if args.tokens:
+        for token in args.tokens:
+            info = timeline.lookup(token)
+            if info is None:
+                print(f"{token.upper()}: 未出现在快照中")
+                continue
+            quotes = ", ".join(f"{q}({first:%Y-%m-%d}~{last:%Y-%m-%d})" for q, (first, last) in sorted(info["quotes"].items()))
+            print(f"{token.upper()}: {info['first_seen']:%Y-%m-%d %H:%M}{'（记录开始前）' if info['before_records'] else ''}"
+                  f" ~ {info['last_seen']:%Y-%m-%d %H:%M}，{'上线中' if info['listed'] else '已下架'}"
+                  f"{'，曾重新上线' if info['relisted'] else ''}；{quotes}")
+    else:
+        for token, first_seen in sorted(timeline.recently_listed(args.days).items(), key=lambda item: item[1]):
+            print(f"{first_seen:%Y-%m-%d %H:%M} {token}")
@@ -0,0 +1,116 @@
+"""
+事件循环延迟监控
+心跳协程按固定间隔休眠，唤醒时间超出预期的部分即事件循环的调度延迟（某个回调阻塞了事件循环）；
+看门狗线程检查心跳是否停滞，停滞超过阈值时记录事件循环线程当前的调用栈，定位阻塞事件循环的同步调用
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter
+from typing import Dict, Any, Optional
+
+from config import LOOP_MONITOR
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """监控当前事件循环的调度延迟，回调阻塞超过阈值时输出警告和阻塞位置"""
+
+    def __init__(self, threshold: Optional[float] = None, interval: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            threshold: 阻塞告警阈值（秒），默认读取LOOP_MONITOR['threshold']
+            interval: 心跳间隔（秒），默认读取LOOP_MONITOR['interval']
+            enabled: 是否启用，默认读取LOOP_MONITOR['enabled']
+        """
+        self.threshold = threshold or LOOP_MONITOR.get('threshold', 0.25)
+        self.interval = interval or LOOP_MONITOR.get('interval', 0.05)
+        self.enabled = LOOP_MONITOR.get('enabled', True) if enabled is None else enabled
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.blocked_sites: Counter = Counter()  # 看门狗观察到的阻塞位置 -> 次数
+        self._beat = 0.0
+        self._reported_beat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """在当前事件循环中启动心跳协程和看门狗线程，需在协程中调用"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> Dict[str, Any]:
+        """停止监控
+
+        Returns:
+            Dict[str, Any]: 监控结果，同snapshot()
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._stop.set()
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join, self.interval * 4)
+            self._watchdog = None
+        return self.snapshot()
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.stalls += 1
+                logger.warning(f"事件循环被阻塞{lag:.3f}秒（阈值{self.threshold:g}秒）")
+
+    def _watch(self) -> None:
+        """看门狗线程：心跳停滞超过阈值时记录事件循环线程的调用栈，每次停滞只记录一次"""
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            if beat == self._reported_beat or time.monotonic() - beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            self._reported_beat = beat
+            stack = traceback.extract_stack(frame)
+            # 阻塞位置取项目代码中最内层的调用（跳过标准库和第三方库）
+            site = next((f for f in reversed(stack) if 'site-packages' not in f.filename
+                         and not f.filename.startswith((sys.prefix, sys.base_prefix))), stack[-1])
+            self.blocked_sites[f"{site.filename}:{site.lineno} {site.name}"] += 1
+            logger.warning(f"事件循环阻塞超过{self.threshold:g}秒，当前调用栈:\n{''.join(traceback.format_list(stack[-8:]))}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """监控结果：心跳次数、平均和最大延迟、超过阈值的次数及阻塞位置"""
+        return {
+            "samples": self.samples,
+            "mean_lag": round(self.total_lag / self.samples, 4) if self.samples else 0.0,
+            "max_lag": round(self.max_lag, 4),
+            "stalls": self.stalls,
+            "blocked_sites": dict(self.blocked_sites.most_common(5)),
+        }
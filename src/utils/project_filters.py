@@ -0,0 +1,190 @@
+"""
+项目过滤流水线
+已上线过滤、屏蔽代币过滤和平台分类组合为基于生成器的阶段，项目列表只遍历一次，
+同时得到保留的项目、各平台的项目分组和各阶段的计数
+"""
+
+from typing import Dict, List, Any, AbstractSet, Callable, Iterable, Iterator, Optional
+
+from config import PROMPT_PROJECT_LIMIT
+from src.utils.alpha_project import AlphaProject
+
+# 过滤阶段：接收项目流和计数字典，产出通过该阶段的项目
+Stage = Callable[[Iterable[AlphaProject], Dict[str, int]], Iterator[AlphaProject]]
+
+
+def compile_block_list(block_list: Optional[Iterable[Any]]) -> AbstractSet[str]:
+    """将屏蔽列表（符号、名称或ID）预处理为大写集合"""
+    return frozenset(str(item).upper() for item in block_list or [])
+
+
+def is_blocked(project: AlphaProject, blocked: AbstractSet[str]) -> bool:
+    """项目的符号、名称或ID是否在屏蔽集合中"""
+    if not blocked:
+        return False
+    id_str = str(project.id).upper() if project.id is not None else ""
+    return project.symbol.upper() in blocked or project.name.upper() in blocked or id_str in blocked
+
+
+def select_prompt_projects(projects: Iterable[AlphaProject], limit: Optional[int] = None) -> List[AlphaProject]:
+    """按市值降序选出写入提示词的前N个项目
+
+    Args:
+        projects: 项目记录列表
+        limit: 项目数量，默认为PROMPT_PROJECT_LIMIT
+
+    Returns:
+        List[AlphaProject]: 按市值降序排列的项目
+    """
+    return sorted(projects, key=lambda x: x.usd_market_cap, reverse=True)[:limit or PROMPT_PROJECT_LIMIT]
+
+
+def listed_stage(listed_symbols: AbstractSet[str]) -> Stage:
+    """移除已在币安现货上线的项目（没有symbol的项目保留）
+
+    Args:
+        listed_symbols: binance_symbols.load_listed_symbols()返回的大写token集合
+    """
+    def stage(projects: Iterable[AlphaProject], counts: Dict[str, int]) -> Iterator[AlphaProject]:
+        for project in projects:
+            if project.symbol and project.symbol.upper() in listed_symbols:
+                counts["listed"] += 1
+                continue
+            yield project
+    return stage
+
+
+def blocked_stage(block_list: Optional[Iterable[Any]]) -> Stage:
+    """移除屏蔽列表中的项目，屏蔽列表只在创建阶段时预处理一次
+
+    Args:
+        block_list: 屏蔽列表，可以使用符号、名称或ID
+    """
+    blocked = compile_block_list(block_list)
+
+    def stage(projects: Iterable[AlphaProject], counts: Dict[str, int]) -> Iterator[AlphaProject]:
+        for project in projects:
+            if is_blocked(project, blocked):
+                counts["blocked"] += 1
+                continue
+            yield project
+    return stage
+
+
+class PlatformClassifier:
+    """按platform.name和生态系统标签将项目分配到区块链平台，映射和关键词只预处理一次"""
+
+    def __init__(self, platforms: Dict[str, List[str]], platforms_to_process: List[str]):
+        """
+        Args:
+            platforms: 平台关键词字典
+            platforms_to_process: 要处理的平台列表
+        """
+        self.platforms_to_process = list(platforms_to_process)
+
+        # 创建平台名称到标准名称的映射，完整平台名称也作为直接映射
+        self.platform_mapping = {}
+        for std_name, keywords in platforms.items():
+            for keyword in keywords:
+                self.platform_mapping[keyword.lower()] = std_name
+        for platform in platforms.keys():
+            self.platform_mapping[platform.lower()] = platform
+
+        # 标签匹配按platforms_to_process的顺序检查各平台的关键词
+        self.tag_keywords = [(platform, [keyword.lower() for keyword in platforms.get(platform, [])])
+                             for platform in self.platforms_to_process]
+
+    def classify(self, project: AlphaProject) -> Optional[str]:
+        """返回项目所属的平台，未匹配到要处理的平台时返回None"""
+        # 通过platform.name直接匹配平台
+        platform_name = project.platform_name
+        if platform_name and platform_name in self.platform_mapping:
+            mapped_platform = self.platform_mapping[platform_name]
+            if mapped_platform in self.platforms_to_process:
+                return mapped_platform
+
+        # 未通过platform.name匹配成功时，按生态系统标签匹配
+        for tag in project.tags:
+            tag = tag.lower()
+            if "ecosystem" not in tag:
+                continue
+            for platform, keywords in self.tag_keywords:
+                if any(keyword in tag for keyword in keywords):
+                    return platform
+        return None
+
+
+class FilterResult:
+    """一次过滤流水线的结果"""
+
+    __slots__ = ("kept", "platform_projects", "unclassified", "counts")
+
+    def __init__(self, kept: List[AlphaProject], platform_projects: Dict[str, List[AlphaProject]],
+                 unclassified: List[AlphaProject], counts: Dict[str, int]):
+        self.kept = kept
+        self.platform_projects = platform_projects
+        self.unclassified = unclassified
+        self.counts = counts
+
+
+class ProjectFilterPipeline:
+    """组合过滤阶段和平台分类，对项目列表做单次遍历"""
+
+    def __init__(self, platforms: Dict[str, List[str]], platforms_to_process: List[str],
+                 stages: Optional[List[Stage]] = None):
+        """
+        Args:
+            platforms: 平台关键词字典
+            platforms_to_process: 要处理的平台列表
+            stages: 按顺序应用的过滤阶段，如[listed_stage(...), blocked_stage(...)]
+        """
+        self.classifier = PlatformClassifier(platforms, platforms_to_process)
+        self.stages = list(stages or [])
+
+    def add_stage(self, stage: Stage) -> "ProjectFilterPipeline":
+        """追加过滤阶段，返回自身以便链式调用"""
+        self.stages.append(stage)
+        return self
+
+    def run(self, projects: Iterable[AlphaProject]) -> FilterResult:
+        """执行过滤和分类
+
+        Args:
+            projects: 项目记录列表
+
+        Returns:
+            FilterResult: 保留的项目、各平台的项目分组、未分类项目和计数
+                （counts包含total、listed、blocked、kept、unclassified及各平台的项目数）
+        """
+        counts = {"total": 0, "listed": 0, "blocked": 0}
+
+        def source() -> Iterator[AlphaProject]:
+            for project in projects:
+                counts["total"] += 1
+                yield project
+
+        stream: Iterable[AlphaProject] = source()
+        for stage in self.stages:
+            stream = stage(stream, counts)
+
+        platforms_to_process = self.classifier.platforms_to_process
+        platform_projects = {platform: [] for platform in platforms_to_process}
+        kept = []
+        unclassified = []
+        for project in stream:
+            kept.append(project)
+            platform = self.classifier.classify(project)
+            if platform is None:
+                unclassified.append(project)
+            else:
+                platform_projects[platform].append(project)
+
+        # 如果要处理"Other"平台，未分类的项目归入Other
+        if "Other" in platform_projects:
+            platform_projects["Other"].extend(unclassified)
+            unclassified = []
+
+        counts["kept"] = len(kept)
+        counts["unclassified"] = len(unclassified)
+        counts.update({platform: len(items) for platform, items in platform_projects.items()})
+        return FilterResult(kept, platform_projects, unclassified, counts)
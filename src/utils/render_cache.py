@@ -0,0 +1,191 @@
+"""
+表格图片渲染缓存
+以表格单元格内容（四舍五入后）的摘要为键保存上一次渲染的PNG，可见数据未变化时直接复用图片；
+同时记录上一次推送的表格，内容与已推送的相同时由调用方跳过推送或发送"无实质变化"通知，
+内容变化时可只渲染相对上次推送排名发生变动的行（差异视图）
+"""
+
+import os
+import time
+import asyncio
+import base64
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional
+
+from config import DATA_DIRS, RENDER_CACHE
+from src.utils.serialization import dumps, dump_file, load_file, write_bytes
+from src.utils.image_generator import DIFF_COLUMN
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+VIEW_FULL = "full"  # 完整表格
+VIEW_DIFF = "diff"  # 只包含排名变动、新增和上线状态变化的行
+
+ACTION_SKIP = "skip"      # 内容与已推送的相同时跳过推送
+ACTION_NOTICE = "notice"  # 发送"无实质变化"通知
+ACTION_PUSH = "push"      # 仍然推送（复用缓存的图片）
+
+
+def rows_digest(rows: List[Dict[str, Any]]) -> str:
+    """表格行的内容摘要（build_table_rows已按显示精度四舍五入）"""
+    return hashlib.sha256(dumps(rows, pretty=False)).hexdigest()
+
+
+def render_digest(digest: str, view: str, max_items: Optional[int]) -> str:
+    """渲染结果的缓存键：同样的表格行以不同视图或最大项目数量渲染出的图片不同"""
+    return hashlib.sha256(dumps({"rows": digest, "view": view, "max_items": max_items}, pretty=False)).hexdigest()
+
+
+def diff_table_rows(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """找出相对上一次排名发生变动的行
+
+    Args:
+        previous: 上一次推送的表格行
+        current: 本次的表格行
+
+    Returns:
+        List[Dict[str, Any]]: 变动的行，首列为变动说明（↑n / ↓n / 新 / 上线 / 下线）
+    """
+    previous_positions = {row["代码"]: (index, row) for index, row in enumerate(previous)}
+    diff = []
+    for index, row in enumerate(current):
+        previous_entry = previous_positions.get(row["代码"])
+        if previous_entry is None:
+            change = "新"
+        else:
+            previous_index, previous_row = previous_entry
+            if previous_index > index:
+                change = f"↑{previous_index - index}"
+            elif previous_index < index:
+                change = f"↓{index - previous_index}"
+            elif previous_row.get("是否上线") != row.get("是否上线"):
+                change = "上线" if row.get("是否上线") == "是" else "下线"
+            else:
+                continue
+        diff.append({DIFF_COLUMN: change, **row})
+    return diff
+
+
+class TableImage:
+    """一次（可能来自缓存的）表格渲染结果"""
+
+    __slots__ = ("key", "image_data", "digest", "path", "cached", "changed", "view")
+
+    def __init__(self, key: str, image_data: bytes, digest: str, path: Optional[str],
+                 cached: bool, changed: bool, view: str):
+        self.key = key
+        self.image_data = image_data
+        self.digest = digest
+        self.path = path        # 缓存中的图片路径，缓存未启用时为None
+        self.cached = cached    # 是否复用了缓存的图片（未重新渲染）
+        self.changed = changed  # 内容是否与上一次推送的不同
+        self.view = view
+
+    def base64(self) -> str:
+        return base64.b64encode(self.image_data).decode('utf-8')
+
+
+class RenderCache:
+    """按表格（全局表格、各平台表格）保存上一次渲染和推送的内容"""
+
+    def __init__(self, cache_dir: Optional[str] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            cache_dir: 缓存目录，默认为DATA_DIRS['render_cache']
+            enabled: 是否启用，默认读取RENDER_CACHE['enabled']
+        """
+        self.cache_dir = cache_dir or DATA_DIRS.get('render_cache', 'data/render_cache')
+        self.enabled = RENDER_CACHE.get('enabled', True) if enabled is None else enabled
+
+    def meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def image_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def meta(self, key: str) -> Dict[str, Any]:
+        """缓存元数据：digest、render_digest、view、diff_base、rendered_at，以及pushed_digest、pushed_rows、pushed_at"""
+        try:
+            return load_file(self.meta_path(key))
+        except (OSError, ValueError):
+            return {}
+
+    def _read_image(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.image_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    async def render(self, renderer: Any, key: str, rows: List[Dict[str, Any]],
+                     view: Optional[str] = None, max_items: Optional[int] = None) -> TableImage:
+        """渲染表格，内容与缓存相同时复用缓存的图片
+
+        Args:
+            renderer: 渲染服务（render_service.RenderService）
+            key: 表格名称，如alpha_list、alpha_list_solana
+            rows: build_table_rows()返回的表格行
+            view: 内容变化时的视图，full / diff，默认读取RENDER_CACHE['changed_view']
+            max_items: 最大项目数量
+
+        Returns:
+            TableImage: 渲染结果
+        """
+        digest = rows_digest(rows)
+        view = view or RENDER_CACHE.get('changed_view', VIEW_FULL)
+        cache_digest = render_digest(digest, view, max_items)
+        # 元数据和图片的读写在线程中执行，不阻塞事件循环
+        meta = await asyncio.to_thread(self.meta, key) if self.enabled else {}
+        changed = meta.get("pushed_digest") != digest
+
+        # 差异视图相对渲染时已推送的表格，之后又推送过其他内容时缓存的差异图片已过期
+        fresh = meta.get("render_digest") == cache_digest
+        if fresh and view == VIEW_DIFF and meta.get("diff_base") != meta.get("pushed_digest"):
+            fresh = False
+        if fresh:
+            image_data = await asyncio.to_thread(self._read_image, key)
+            if image_data is not None:
+                return TableImage(key, image_data, digest, self.image_path(key), cached=True,
+                                  changed=changed, view=meta.get("view", VIEW_FULL))
+
+        # 差异视图相对上一次推送的表格，没有推送记录或没有排名变动的行时使用完整表格
+        requested_view = view
+        render_rows = rows
+        if view == VIEW_DIFF and meta.get("pushed_rows"):
+            render_rows = diff_table_rows(meta["pushed_rows"], rows) or rows
+        if render_rows is rows:
+            view = VIEW_FULL
+
+        image_data = await renderer.render_rows(render_rows, max_items)
+        path = None
+        if self.enabled:
+            meta.update({"digest": digest, "render_digest": cache_digest, "view": view, "rows": rows,
+                         "diff_base": meta.get("pushed_digest") if requested_view == VIEW_DIFF else None,
+                         "rendered_at": time.time()})
+            path = await asyncio.to_thread(self._save, key, image_data, meta)
+        return TableImage(key, image_data, digest, path, cached=False, changed=changed, view=view)
+
+    def _save(self, key: str, image_data: bytes, meta: Dict[str, Any]) -> Optional[str]:
+        """保存渲染的图片和元数据，失败时返回None"""
+        try:
+            path = write_bytes(self.image_path(key), image_data)
+            dump_file(self.meta_path(key), meta)
+        except OSError as e:
+            logger.warning(f"保存渲染缓存失败: {str(e)}")
+            return None
+        return path
+
+    def mark_pushed(self, table: TableImage) -> None:
+        """记录已推送的表格内容，之后内容相同时不再视为变化"""
+        if not self.enabled:
+            return
+        meta = self.meta(table.key)
+        if meta.get("digest") != table.digest:
+            return
+        meta.update({"pushed_digest": table.digest, "pushed_rows": meta.get("rows", []), "pushed_at": time.time()})
+        try:
+            dump_file(self.meta_path(table.key), meta)
+        except OSError as e:
+            logger.warning(f"保存渲染缓存失败: {str(e)}")
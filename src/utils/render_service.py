@@ -0,0 +1,160 @@
+"""
+表格图片渲染服务
+matplotlib渲染是CPU密集操作，在进程中执行时会长时间持有GIL，阻塞事件循环上的网络请求；
+渲染交给预先导入matplotlib并完成字体缓存初始化的进程池，PNG数据经进程池的结果管道返回，
+全局表格和各平台表格可并行渲染
+"""
+
+import atexit
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, AbstractSet, Optional, Union
+
+from config import RENDERING
+from src.utils.alpha_project import AlphaProject
+from src.utils.image_generator import build_table_rows, render_table_png
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    """渲染进程初始化：导入matplotlib并渲染一张单行表格，加载字体缓存、完成首次绘制的初始化"""
+    import matplotlib
+    matplotlib.use('Agg')
+    render_table_png([{"排名": 1, "名称": "warmup", "代码": "W", "是否上线": "否", "价格($)": 0.0,
+                       "24h变化(%)": 0.0, "交易量(M$)": 0.0, "市值(M$)": 0.0, "FDV(M$)": 0.0, "MC/FDV": 0.0}], 1)
+
+
+def _ping() -> bool:
+    return True
+
+
+class RenderService:
+    """表格图片渲染服务，进程池不可用时回退为在线程中串行渲染"""
+
+    def __init__(self, workers: Optional[int] = None, start_method: Optional[str] = None,
+                 pool_enabled: Optional[bool] = None):
+        """
+        Args:
+            workers: 渲染进程数，默认读取RENDERING['workers']
+            start_method: 进程启动方式，默认读取RENDERING['start_method']
+            pool_enabled: 是否使用进程池，默认读取RENDERING['pool_enabled']
+        """
+        self.workers = max(1, workers or RENDERING.get('workers', 2))
+        self.start_method = start_method or RENDERING.get('start_method', 'spawn')
+        self.pool_enabled = RENDERING.get('pool_enabled', True) if pool_enabled is None else pool_enabled
+        self.stats = {"pool": 0, "thread": 0, "failed": 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # pyplot不是线程安全的，线程回退时串行渲染
+        self._thread_render_lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._pool is None and self.pool_enabled:
+                try:
+                    context = multiprocessing.get_context(self.start_method)
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                     initializer=_init_worker)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"创建渲染进程池失败，改为在线程中渲染: {str(e)}")
+                    self.pool_enabled = False
+            return self._pool
+
+    def prewarm(self) -> None:
+        """提前启动渲染进程（不等待），让进程启动和matplotlib导入与其他阶段重叠"""
+        pool = self._get_pool()
+        if pool is None:
+            return
+        try:
+            for _ in range(self.workers):
+                pool.submit(_ping)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning(f"预热渲染进程池失败: {str(e)}")
+
+    def _render_in_thread(self, data: List[Dict[str, Any]], max_items: int) -> bytes:
+        with self._thread_render_lock:
+            return render_table_png(data, max_items)
+
+    async def render_rows(self, data: List[Dict[str, Any]], max_items: Optional[int] = None) -> bytes:
+        """渲染表格行为PNG
+
+        Args:
+            data: build_table_rows()返回的表格行
+            max_items: 最大项目数量，默认读取RENDERING['max_items']
+
+        Returns:
+            bytes: PNG图片数据
+        """
+        max_items = max_items or RENDERING.get('max_items', 100)
+        pool = self._get_pool()
+        if pool is not None:
+            try:
+                image_data = await asyncio.get_running_loop().run_in_executor(pool, render_table_png, data, max_items)
+                self.stats["pool"] += 1
+                return image_data
+            except BrokenProcessPool as e:
+                # 渲染进程异常退出，之后的渲染改为在线程中执行
+                logger.warning(f"渲染进程池不可用，改为在线程中渲染: {str(e)}")
+                self.stats["failed"] += 1
+                self.shutdown(wait=False)
+                self.pool_enabled = False
+        image_data = await asyncio.to_thread(self._render_in_thread, data, max_items)
+        self.stats["thread"] += 1
+        return image_data
+
+    async def render_table(self, crypto_list: List[Union[AlphaProject, Dict[str, Any]]],
+                           max_items: Optional[int] = None,
+                           listed_symbols: Optional[AbstractSet[str]] = None) -> bytes:
+        """渲染项目列表的表格图片
+
+        Args:
+            crypto_list: 项目记录列表
+            max_items: 最大项目数量，默认读取RENDERING['max_items']
+            listed_symbols: 已上线token集合，为None时读取一次symbol.json
+
+        Returns:
+            bytes: PNG图片数据
+        """
+        max_items = max_items or RENDERING.get('max_items', 100)
+        return await self.render_rows(build_table_rows(crypto_list, max_items, listed_symbols), max_items)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭进程池，之后的渲染会重新创建进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回渲染统计，用于写入追踪文件"""
+        return {"workers": self.workers if self.pool_enabled else 0, **self.stats}
+
+
+_service: Optional[RenderService] = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> RenderService:
+    """获取进程内共享的渲染服务，进程池在多次运行之间保持预热"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService()
+        return _service
+
+
+def shutdown_render_service() -> None:
+    """关闭共享渲染服务的进程池（进程退出时自动调用）"""
+    with _service_lock:
+        service = _service
+    if service is not None:
+        service.shutdown()
+
+
+atexit.register(shutdown_render_service)
@@ -0,0 +1,505 @@
+"""
+容错策略
+为各外部依赖（Binance、CMC、DeepSeek、webhook）提供按接口配置的重试预算、去相关抖动退避、
+截止时间传递（整次运行的截止时间逐级分配给各阶段）、幂等GET的对冲请求以及带半开试探的熔断器
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+from typing import Dict, List, Any, Callable, Awaitable, Optional, TypeVar
+
+from config import RESILIENCE
+from src.utils.tracing import current_span, register_metrics_provider
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# 可重试的HTTP状态码
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class ResilienceError(Exception):
+    """容错策略相关异常的基类"""
+
+
+class CircuitOpenError(ResilienceError):
+    """熔断器处于打开状态，请求被直接拒绝"""
+
+
+class DeadlineExceeded(ResilienceError):
+    """剩余时间不足，放弃请求"""
+
+
+class RetryableError(ResilienceError):
+    """可重试的失败，如429、5xx或空响应"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(ResilienceError):
+    """不可重试的失败，如401、404，不计入熔断"""
+
+
+class AmbiguousOutcomeError(ResilienceError):
+    """非幂等请求发出后等待响应失败（如读取超时），对方可能已处理该请求：计入熔断但不重试，避免重复提交"""
+
+
+def is_retryable_status(status: int) -> bool:
+    """判断HTTP状态码是否值得重试"""
+    return status in RETRYABLE_STATUSES
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（仅支持秒数形式）"""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class Deadline:
+    """截止时间，可按秒数或剩余时间比例派生子截止时间"""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + max(seconds, 0.0)
+
+    def remaining(self) -> float:
+        """剩余秒数（不小于0）"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        """是否已到期"""
+        return self.remaining() <= 0
+
+    def child(self, seconds: Optional[float] = None, fraction: Optional[float] = None) -> "Deadline":
+        """派生不晚于自身的子截止时间
+
+        Args:
+            seconds: 子阶段的时长
+            fraction: 子阶段占剩余时间的比例
+
+        Returns:
+            Deadline: 子截止时间
+        """
+        remaining = self.remaining()
+        budget = remaining
+        if seconds is not None:
+            budget = min(budget, seconds)
+        if fraction is not None:
+            budget = min(budget, remaining * fraction)
+        return Deadline(budget)
+
+
+# 当前生效的截止时间（asyncio任务间相互隔离）
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """获取当前生效的截止时间，未设置时返回None"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float] = None, fraction: Optional[float] = None):
+    """在with块内生效一个截止时间，嵌套时不会晚于外层截止时间
+
+    Args:
+        seconds: 本阶段的时长
+        fraction: 本阶段占外层剩余时间的比例
+
+    Yields:
+        Deadline: 本阶段的截止时间
+    """
+    parent = _current_deadline.get()
+    if parent is not None:
+        deadline = parent.child(seconds, fraction)
+    else:
+        deadline = Deadline(seconds if seconds is not None else float("inf"))
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+class RetryBudget:
+    """滑动窗口内的重试预算：重试次数不超过 min_retries + ratio × 请求次数"""
+
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        """记录一次首次请求"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_acquire(self) -> bool:
+        """尝试占用一次重试（或对冲）额度"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，经过reset_timeout后半开，仅放行一个试探请求"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """判断是否放行请求"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = STATE_HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == STATE_HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """尝试未得出结果就结束（如被取消）时释放半开试探名额，不改变熔断状态"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    logger.warning(f"熔断器打开，连续失败{self.consecutive_failures}次，{self.reset_timeout}秒后半开试探")
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def is_open(self) -> bool:
+        """熔断器是否处于打开状态（尚未到半开时间）"""
+        with self._lock:
+            return self.state == STATE_OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+
+# 同步对冲请求使用的线程池
+_hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hedge")
+
+
+class ResiliencePolicy:
+    """单个外部依赖的容错策略"""
+
+    STAT_FIELDS = ("calls", "attempts", "retries", "hedges", "successes", "failures", "short_circuits",
+                   "budget_denied", "deadline_exceeded")
+
+    def __init__(self, name: str, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 10.0,
+                 timeout: float = 30.0, retry_ratio: float = 0.2, min_retries: int = 3,
+                 hedge_after: Optional[float] = None, failure_threshold: int = 5, reset_timeout: float = 60.0,
+                 retry_window: float = 300.0):
+        """初始化容错策略
+
+        Args:
+            name: 依赖名称，用于日志和指标
+            max_attempts: 最大尝试次数
+            base_delay: 退避的最小间隔（秒）
+            max_delay: 退避的最大间隔（秒）
+            timeout: 单次请求的读取超时（秒），实际值不超过当前截止时间的剩余时间
+            retry_ratio: 重试预算比例
+            min_retries: 窗口内始终允许的重试次数
+            hedge_after: 幂等请求超过该秒数未返回时发出对冲请求，None表示不对冲
+            failure_threshold: 熔断阈值
+            reset_timeout: 熔断后进入半开状态的等待时间（秒）
+            retry_window: 重试预算的统计窗口（秒）
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.budget = RetryBudget(retry_ratio, min_retries, retry_window)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = {field: 0 for field in self.STAT_FIELDS}
+        self._lock = threading.Lock()
+
+    def _count(self, field: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[field] += value
+
+    def _next_delay(self, previous: float, base_delay: float, retry_after: Optional[float]) -> float:
+        """去相关抖动退避：在[base, previous × 3]之间随机取值，不超过max_delay，且不短于Retry-After"""
+        delay = min(self.max_delay, random.uniform(base_delay, max(previous, base_delay) * 3))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def _attempt_timeout(self) -> float:
+        """本次尝试的超时时间，不超过截止时间的剩余时间"""
+        deadline = current_deadline()
+        if deadline is None:
+            return self.timeout
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"{self.name}: 截止时间已到")
+        return min(self.timeout, remaining)
+
+    def _before_attempt(self, attempt: int) -> None:
+        """尝试前检查熔断器并记录统计"""
+        if not self.breaker.allow():
+            self._count("short_circuits")
+            current_span().set("breaker_state", self.breaker.state)
+            raise CircuitOpenError(f"{self.name}: 熔断器已打开，跳过请求")
+        self._count("attempts")
+        span = current_span()
+        span.set("attempts", attempt + 1)
+        span.set("retries", attempt)
+
+    def _record(self, error: Optional[BaseException]) -> None:
+        """根据尝试结果更新熔断器"""
+        if error is None or isinstance(error, PermanentError):
+            self.breaker.record_success()
+            self._count("successes")
+        else:
+            self.breaker.record_failure()
+            self._count("failures")
+        current_span().set("breaker_state", self.breaker.state)
+
+    def _should_retry(self, error: BaseException, attempt: int, max_attempts: int, delay: float) -> bool:
+        """判断失败后是否继续重试"""
+        if isinstance(error, (PermanentError, AmbiguousOutcomeError, CircuitOpenError, DeadlineExceeded)):
+            return False
+        if attempt + 1 >= max_attempts:
+            return False
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() <= delay:
+            self._count("deadline_exceeded")
+            logger.warning(f"{self.name}: 剩余时间不足以等待{delay:.1f}秒后重试，放弃")
+            return False
+        if not self.budget.try_acquire():
+            self._count("budget_denied")
+            logger.warning(f"{self.name}: 重试预算已用尽，放弃重试")
+            return False
+        self._count("retries")
+        return True
+
+    def call(self, func: Callable[[float], T], idempotent: bool = False, max_attempts: Optional[int] = None,
+             base_delay: Optional[float] = None) -> T:
+        """以同步方式执行请求
+
+        Args:
+            func: 执行单次请求的函数，参数为本次尝试的超时（秒）；失败时抛出异常
+            idempotent: 是否为幂等请求，仅幂等请求会发出对冲请求
+            max_attempts: 覆盖最大尝试次数
+            base_delay: 覆盖退避的最小间隔
+
+        Returns:
+            func的返回值
+        """
+        max_attempts = max_attempts or self.max_attempts
+        base_delay = base_delay if base_delay is not None else self.base_delay
+        self._count("calls")
+        self.budget.record_request()
+
+        delay = base_delay
+        for attempt in range(max_attempts):
+            # 先计算超时再占用熔断器的半开试探名额，截止时间已到时不会占用名额
+            timeout = self._attempt_timeout()
+            self._before_attempt(attempt)
+            recorded = False
+            try:
+                if idempotent and self.hedge_after:
+                    result = self._hedged_call(func, timeout)
+                else:
+                    result = func(timeout)
+                recorded = True
+                self._record(None)
+                return result
+            except Exception as e:
+                recorded = True
+                self._record(e)
+                delay = self._next_delay(delay, base_delay, getattr(e, "retry_after", None))
+                if not self._should_retry(e, attempt, max_attempts, delay):
+                    raise
+                logger.info(f"{self.name}: 第{attempt + 1}次尝试失败({str(e)[:100]})，{delay:.2f}秒后重试")
+                time.sleep(delay)
+            finally:
+                # KeyboardInterrupt等未记录结果的情况下释放试探名额，避免半开的熔断器一直拒绝请求
+                if not recorded:
+                    self.breaker.release()
+        raise RuntimeError("unreachable")
+
+    async def call_async(self, func: Callable[[float], Awaitable[T]], idempotent: bool = False,
+                         max_attempts: Optional[int] = None, base_delay: Optional[float] = None) -> T:
+        """以异步方式执行请求，参数同call()"""
+        max_attempts = max_attempts or self.max_attempts
+        base_delay = base_delay if base_delay is not None else self.base_delay
+        self._count("calls")
+        self.budget.record_request()
+
+        delay = base_delay
+        for attempt in range(max_attempts):
+            timeout = self._attempt_timeout()
+            self._before_attempt(attempt)
+            recorded = False
+            try:
+                if idempotent and self.hedge_after:
+                    result = await self._hedged_call_async(func, timeout)
+                else:
+                    result = await func(timeout)
+                recorded = True
+                self._record(None)
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                recorded = True
+                self._record(e)
+                delay = self._next_delay(delay, base_delay, getattr(e, "retry_after", None))
+                if not self._should_retry(e, attempt, max_attempts, delay):
+                    raise
+                logger.info(f"{self.name}: 第{attempt + 1}次尝试失败({str(e)[:100]})，{delay:.2f}秒后重试")
+                await asyncio.sleep(delay)
+            finally:
+                # 被取消等未记录结果的情况下释放试探名额，避免半开的熔断器一直拒绝请求
+                if not recorded:
+                    self.breaker.release()
+        raise RuntimeError("unreachable")
+
+    def _hedged_call(self, func: Callable[[float], T], timeout: float) -> T:
+        """同步对冲：首个请求超过hedge_after未返回时，在线程池中再发一个，取先成功者"""
+        first = _hedge_executor.submit(contextvars.copy_context().run, func, timeout)
+        done, _ = wait_futures([first], timeout=self.hedge_after)
+        if done or not self.budget.try_acquire():
+            return first.result()
+
+        self._count("hedges")
+        current_span().add("hedges", 1)
+        second = _hedge_executor.submit(contextvars.copy_context().run, func, timeout)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _hedged_call_async(self, func: Callable[[float], Awaitable[T]], timeout: float) -> T:
+        """异步对冲：首个请求超过hedge_after未返回时再发一个，取先成功者并取消另一个"""
+        first = asyncio.ensure_future(func(timeout))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done or not self.budget.try_acquire():
+                return await first
+
+            self._count("hedges")
+            current_span().add("hedges", 1)
+            pending.add(asyncio.ensure_future(func(timeout)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回熔断器状态和统计信息"""
+        with self._lock:
+            stats = dict(self.stats)
+        return {"state": self.breaker.state, "consecutive_failures": self.breaker.consecutive_failures, **stats}
+
+
+_policies: Dict[str, ResiliencePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_policy(name: str) -> ResiliencePolicy:
+    """获取指定依赖的容错策略，按RESILIENCE['endpoints']中的配置创建，未配置的名称使用'http'的配置"""
+    with _policies_lock:
+        policy = _policies.get(name)
+        if policy is None:
+            endpoints = RESILIENCE.get('endpoints', {})
+            settings = endpoints.get(name, endpoints.get('http', {}))
+            policy = ResiliencePolicy(name, retry_window=RESILIENCE.get('retry_window', 300), **settings)
+            _policies[name] = policy
+        return policy
+
+
+def resilience_snapshot() -> Dict[str, Dict[str, Any]]:
+    """返回所有已使用依赖的容错状态"""
+    with _policies_lock:
+        policies = dict(_policies)
+    return {name: policy.snapshot() for name, policy in sorted(policies.items())}
+
+
+def _prometheus_lines() -> List[str]:
+    """输出熔断器状态和重试统计的Prometheus指标"""
+    snapshot = resilience_snapshot()
+    if not snapshot:
+        return []
+    state_values = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+    lines = ["# HELP binance_alpha_circuit_state 熔断器状态(0=关闭,1=半开,2=打开)",
+             "# TYPE binance_alpha_circuit_state gauge"]
+    lines += [f'binance_alpha_circuit_state{{endpoint="{name}"}} {state_values[s["state"]]}'
+              for name, s in snapshot.items()]
+    for field in ResiliencePolicy.STAT_FIELDS:
+        metric_name = f"binance_alpha_endpoint_{field}_total"
+        lines.append(f"# HELP {metric_name} 依赖请求{field}累计次数")
+        lines.append(f"# TYPE {metric_name} counter")
+        lines += [f'{metric_name}{{endpoint="{name}"}} {s[field]}' for name, s in snapshot.items()]
+    return lines
+
+
+register_metrics_provider(_prometheus_lines)
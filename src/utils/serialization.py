@@ -0,0 +1,191 @@
+"""
+JSON序列化
+按配置选择序列化后端（orjson > ujson > 标准库json），统一所有JSON文件的读写；
+写文件时先写同目录下的临时文件再原子替换，中断时不会留下写了一半的文件
+"""
+
+import os
+import gzip
+import json
+import logging
+import threading
+from typing import Any, Callable, Optional, Union
+
+from config import SERIALIZATION
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("orjson", "ujson", "json")
+
+# 压缩方式对应的文件后缀
+COMPRESSION_SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "none": ""}
+
+
+def _select_backend(name: str) -> str:
+    """根据配置和已安装的库选择后端
+
+    Args:
+        name: 配置的后端名称，auto表示按orjson、ujson、json的顺序选择第一个可用的
+
+    Returns:
+        str: 实际使用的后端名称
+    """
+    available = {"orjson": orjson is not None, "ujson": ujson is not None, "json": True}
+    name = (name or "auto").lower()
+    if name != "auto":
+        if available.get(name):
+            return name
+        logger.warning(f"JSON后端{name}不可用，自动选择可用的后端")
+    return next(backend for backend in BACKENDS if available[backend])
+
+
+BACKEND = _select_backend(SERIALIZATION.get('backend', 'auto'))
+
+
+def dumps(obj: Any, pretty: Optional[bool] = None, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """序列化为UTF-8编码的JSON
+
+    Args:
+        obj: 要序列化的对象
+        pretty: 是否缩进输出，默认取决于SERIALIZATION['compact']
+        default: 无法序列化的对象的转换函数
+
+    Returns:
+        bytes: JSON字节串（不转义非ASCII字符）
+    """
+    if pretty is None:
+        pretty = not SERIALIZATION.get('compact', False)
+
+    if BACKEND == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, default=default, option=option)
+    if BACKEND == "ujson":
+        kwargs = {"default": default} if default is not None else {}
+        return ujson.dumps(obj, ensure_ascii=False, indent=2 if pretty else 0, **kwargs).encode('utf-8')
+    if pretty:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, default=default)
+    else:
+        # 不缩进时标准库使用C实现的编码器
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default)
+    return text.encode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """解析JSON
+
+    Args:
+        data: JSON字节串或字符串
+
+    Returns:
+        Any: 解析结果
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "ujson":
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(path: str, obj: Any, pretty: Optional[bool] = None,
+              default: Optional[Callable[[Any], Any]] = None) -> str:
+    """写入JSON文件（经write_bytes原子替换）
+
+    Args:
+        path: 目标文件路径
+        obj: 要序列化的对象
+        pretty: 是否缩进输出，默认取决于SERIALIZATION['compact']
+        default: 无法序列化的对象的转换函数
+
+    Returns:
+        str: 目标文件路径
+    """
+    return write_bytes(path, dumps(obj, pretty=pretty, default=default))
+
+
+def write_bytes(path: str, data: bytes) -> str:
+    """原子写入文件：先写同目录下的临时文件，再用os.replace替换目标文件
+
+    Args:
+        path: 目标文件路径
+        data: 文件内容
+
+    Returns:
+        str: 目标文件路径
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # 临时文件名包含进程和线程标识，并发写同一文件时互不干扰
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def resolve_compression(method: str) -> str:
+    """返回可用的压缩方式，zstd未安装时回退为gzip"""
+    method = (method or "none").lower()
+    if method == "zstd" and zstandard is None:
+        return "gzip"
+    return method if method in COMPRESSION_SUFFIXES else "none"
+
+
+def compress(data: bytes, method: str) -> bytes:
+    """按指定方式压缩数据
+
+    Args:
+        data: 原始数据
+        method: 压缩方式，zstd / gzip / none，需先经resolve_compression确认可用
+
+    Returns:
+        bytes: 压缩后的数据
+    """
+    if method == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if method == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def decompress(data: bytes, path: str) -> bytes:
+    """根据文件后缀解压数据"""
+    if path.endswith(COMPRESSION_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"读取{path}需要安装zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if path.endswith(COMPRESSION_SUFFIXES["gzip"]):
+        return gzip.decompress(data)
+    return data
+
+
+def load_file(path: str) -> Any:
+    """读取JSON文件，.gz/.zst后缀的文件先解压
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        Any: 解析结果
+    """
+    with open(path, 'rb') as f:
+        return loads(decompress(f.read(), path))
@@ -0,0 +1,320 @@
+"""
+运行级链路追踪与阶段计时
+记录每个阶段的耗时、输入输出字节数、token用量和重试次数，
+输出为JSONL追踪文件，可选输出Prometheus文本格式指标和分阶段性能剖析文件
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Callable, Optional
+
+from config import TRACING
+from src.utils.serialization import dumps
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 累加型属性，在Prometheus指标中按阶段求和
+COUNTER_FIELDS = ("bytes_in", "bytes_out", "prompt_tokens", "completion_tokens", "retries")
+
+# 当前所在的span，用于建立父子关系（asyncio任务间相互隔离）
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+# 进程内同时只能有一个性能剖析器（Python 3.12起cProfile基于解释器级的sys.monitoring，重复启用会抛出ValueError），
+# 只有最外层需要剖析的span启动剖析器，嵌套的span和并发任务中的span不再启动
+_profiler_lock = threading.Lock()
+_profiler_active = False
+
+# 额外的Prometheus指标来源，每个函数返回若干行文本格式指标
+_metric_providers: List[Callable[[], List[str]]] = []
+
+
+class Span:
+    """单个阶段的追踪记录"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_time", "start_perf", "duration", "attributes", "status")
+
+    def __init__(self, name: str, parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self.start_perf = time.perf_counter()
+        self.duration = None
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+
+    def set(self, key: str, value: Any) -> None:
+        """设置属性"""
+        self.attributes[key] = value
+
+    def add(self, key: str, value: float = 1) -> None:
+        """累加数值属性，如bytes_in、retries"""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self, run_id: str) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return {
+            "run_id": run_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": datetime.fromtimestamp(self.start_time).isoformat(timespec='milliseconds'),
+            "duration_ms": round((self.duration or 0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NullSpan:
+    """追踪关闭时使用的空span"""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, value: float = 1) -> None:
+        pass
+
+
+class Tracer:
+    """运行级追踪器，每次运行生成一个追踪文件"""
+
+    def __init__(self, enabled: Optional[bool] = None, trace_dir: Optional[str] = None,
+                 prometheus_file: Optional[str] = None, profiler: Optional[str] = None,
+                 profile_stages: Optional[List[str]] = None):
+        """初始化追踪器
+
+        Args:
+            enabled: 是否启用追踪，默认读取TRACING配置
+            trace_dir: 追踪文件目录
+            prometheus_file: Prometheus文本格式指标文件路径，为空则不输出
+            profiler: 性能剖析器，'cprofile'或'pyinstrument'，为空则不剖析
+            profile_stages: 需要剖析的阶段名称列表，为空表示所有阶段
+        """
+        self.enabled = TRACING.get('enabled', True) if enabled is None else enabled
+        self.trace_dir = os.path.join(ROOT_DIR, trace_dir or TRACING.get('trace_dir', 'data/traces'))
+        self.prometheus_file = prometheus_file if prometheus_file is not None else TRACING.get('prometheus_file', '')
+        self.profiler = (profiler if profiler is not None else TRACING.get('profiler', '')).lower()
+        self.profile_stages = profile_stages if profile_stages is not None else TRACING.get('profile_stages', [])
+
+        self.run_id = datetime.now().strftime('%Y%m%d%H%M%S') + "-" + uuid.uuid4().hex[:6]
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._trace_file = None
+
+    @property
+    def trace_path(self) -> str:
+        """本次运行的追踪文件路径"""
+        return os.path.join(self.trace_dir, f"trace_{self.run_id}.jsonl")
+
+    def _write(self, span: Span) -> None:
+        """追加写入一条span记录"""
+        with self._lock:
+            self.spans.append(span)
+            try:
+                if self._trace_file is None:
+                    os.makedirs(self.trace_dir, exist_ok=True)
+                    self._trace_file = open(self.trace_path, 'a', encoding='utf-8')
+                self._trace_file.write(dumps(span.to_dict(self.run_id), pretty=False, default=str).decode('utf-8') + "\n")
+                self._trace_file.flush()
+            except Exception as e:
+                logger.warning(f"写入追踪文件失败: {str(e)}")
+
+    def _should_profile(self, name: str) -> bool:
+        """判断阶段是否需要性能剖析"""
+        return bool(self.profiler) and (not self.profile_stages or name in self.profile_stages)
+
+    def _start_profiler(self):
+        """启动性能剖析器，已有剖析器运行或启动失败时返回None（剖析失败不影响阶段本身）"""
+        global _profiler_active
+        with _profiler_lock:
+            if _profiler_active:
+                return None
+            _profiler_active = True
+        try:
+            if self.profiler == 'pyinstrument':
+                try:
+                    from pyinstrument import Profiler
+                    profiler = Profiler(async_mode='disabled')
+                    profiler.start()
+                    return profiler
+                except ImportError:
+                    logger.warning("未安装pyinstrument，改用cProfile进行性能剖析")
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            return profiler
+        except Exception as e:
+            logger.warning(f"启动性能剖析器失败: {str(e)}")
+            with _profiler_lock:
+                _profiler_active = False
+            return None
+
+    def _dump_profile(self, profiler, span: Span) -> None:
+        """停止性能剖析器并保存剖析结果"""
+        global _profiler_active
+        base_name = f"{self.run_id}_{span.name}_{span.span_id}"
+        try:
+            profile_dir = os.path.join(self.trace_dir, 'profiles')
+            os.makedirs(profile_dir, exist_ok=True)
+            if hasattr(profiler, 'output_html'):
+                profiler.stop()
+                profile_path = os.path.join(profile_dir, f"{base_name}.html")
+                with open(profile_path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.disable()
+                profile_path = os.path.join(profile_dir, f"{base_name}.prof")
+                profiler.dump_stats(profile_path)
+            span.set("profile", os.path.relpath(profile_path, ROOT_DIR))
+        except Exception as e:
+            logger.warning(f"保存性能剖析结果失败: {str(e)}")
+        finally:
+            with _profiler_lock:
+                _profiler_active = False
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """记录一个阶段，可嵌套使用，同步和异步代码中均可用with语句包裹
+
+        Args:
+            name: 阶段名称
+            **attributes: 初始属性，如platform
+
+        Yields:
+            Span: 可通过set()/add()补充字节数、token用量、重试次数等属性
+        """
+        if not self.enabled:
+            yield _NullSpan()
+            return
+
+        parent = _current_span.get()
+        span = Span(name, parent.span_id if parent else None, attributes)
+        token = _current_span.set(span)
+        profiler = self._start_profiler() if self._should_profile(name) else None
+
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set("error", f"{type(e).__name__}: {str(e)[:200]}")
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start_perf
+            if profiler is not None:
+                self._dump_profile(profiler, span)
+            _current_span.reset(token)
+            self._write(span)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """按阶段名称汇总次数、总耗时和累加属性"""
+        stages: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"count": 0, "duration_seconds": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["duration_seconds"] += span.duration or 0
+            stage["errors"] += 1 if span.status == "error" else 0
+            for field in COUNTER_FIELDS:
+                value = span.attributes.get(field)
+                if isinstance(value, (int, float)):
+                    stage[field] = stage.get(field, 0) + value
+        return stages
+
+    def write_prometheus(self, path: Optional[str] = None) -> Optional[str]:
+        """输出Prometheus文本格式指标文件（可由node_exporter textfile collector采集）
+
+        Args:
+            path: 输出路径，默认使用配置中的prometheus_file
+
+        Returns:
+            Optional[str]: 输出文件路径，未配置时返回None
+        """
+        path = path or self.prometheus_file
+        if not path:
+            return None
+
+        lines = []
+        metrics = [("duration_seconds", "gauge", "阶段累计耗时(秒)"),
+                   ("count", "gauge", "阶段执行次数"),
+                   ("errors", "gauge", "阶段失败次数")]
+        metrics += [(field, "gauge", f"阶段累计{field}") for field in COUNTER_FIELDS]
+
+        stages = self.summary()
+        for metric, metric_type, help_text in metrics:
+            metric_name = f"binance_alpha_stage_{metric}"
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            for stage, values in sorted(stages.items()):
+                if metric in values:
+                    lines.append(f'{metric_name}{{stage="{stage}"}} {values[metric]}')
+        for provider in list(_metric_providers):
+            try:
+                lines.extend(provider())
+            except Exception as e:
+                logger.warning(f"生成附加指标失败: {str(e)}")
+        lines.append("# HELP binance_alpha_last_run_timestamp_seconds 最近一次运行结束时间")
+        lines.append("# TYPE binance_alpha_last_run_timestamp_seconds gauge")
+        lines.append(f"binance_alpha_last_run_timestamp_seconds {int(time.time())}")
+
+        try:
+            path = path if os.path.isabs(path) else os.path.join(ROOT_DIR, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，避免采集到写了一半的文件
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+            os.replace(tmp_path, path)
+            return path
+        except Exception as e:
+            logger.warning(f"写入Prometheus指标文件失败: {str(e)}")
+            return None
+
+    def finish(self) -> None:
+        """结束本次运行：关闭追踪文件并输出指标"""
+        if not self.enabled:
+            return
+        self.write_prometheus()
+        with self._lock:
+            if self._trace_file is not None:
+                self._trace_file.close()
+                self._trace_file = None
+        if self.spans:
+            logger.info(f"本次运行追踪已保存到: {self.trace_path}")
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """获取进程内共享的追踪器"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """使用共享追踪器记录一个阶段"""
+    return get_tracer().span(name, **attributes)
+
+
+def current_span():
+    """获取当前所在的span，未启用追踪或不在任何span中时返回空span"""
+    return _current_span.get() or _NullSpan()
+
+
+def register_metrics_provider(provider: Callable[[], List[str]]) -> None:
+    """注册额外的Prometheus指标来源，在输出指标文件时调用"""
+    if provider not in _metric_providers:
+        _metric_providers.append(provider)
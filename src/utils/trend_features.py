@@ -0,0 +1,386 @@
+"""
+跨快照趋势特征
+每次获取CMC列表后把各Alpha项目的价格、24h交易量和排名追加到本地历史快照矩阵（按CMC ID对齐的[项目, 快照]数组），
+再用NumPy对所有项目一次性批量计算趋势特征：放量持续性、已实现波动率、纳入Alpha以来的最大回撤、排名变化速度和在Alpha的天数，
+并按各特征在当前项目中的分位数合成趋势预评分，写入提示词供AI参考
+"""
+
+import io
+import os
+import logging
+import threading
+from typing import Dict, Iterable, List, Any, Optional
+
+import numpy as np
+
+from config import DATA_DIRS, TREND_FEATURES
+from src.utils.serialization import write_bytes
+from src.utils.alpha_project import AlphaProject
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 默认历史快照文件路径
+DEFAULT_HISTORY_PATH = os.path.join(ROOT_DIR, DATA_DIRS.get('analytics', 'data/analytics'), 'alpha_history.npz')
+
+# 历史快照中保存的字段（AlphaProject属性）
+HISTORY_FIELDS = ("price", "volume_24h", "rank")
+
+# 预评分的默认权重，与提示词中交易量45%、价格稳定性35%的权重对应；波动率和回撤越低越好
+DEFAULT_SCORE_WEIGHTS = {
+    "volume_persistence": 0.45,
+    "realized_volatility": 0.2,
+    "max_drawdown": 0.15,
+    "rank_velocity": 0.2,
+}
+
+# 越低越好的特征，计算分位数时取反
+LOWER_IS_BETTER = ("realized_volatility", "max_drawdown")
+
+DAY = 86400.0
+
+
+def _rank_value(rank: Any) -> float:
+    """CMC排名转换为float，"未知"等无法转换的值为NaN"""
+    try:
+        return float(rank)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _percentile(values: np.ndarray) -> np.ndarray:
+    """各值在有效值中的分位数（0~1，相同值取平均位置），NaN保持为NaN"""
+    result = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    count = int(valid.sum())
+    if count == 0:
+        return result
+    if count == 1:
+        result[valid] = 0.5
+        return result
+    ordered = np.sort(values[valid])
+    # 左右插入位置的平均值即相同值的平均排名
+    position = (np.searchsorted(ordered, values[valid], 'left') + np.searchsorted(ordered, values[valid], 'right') - 1) / 2
+    result[valid] = position / (count - 1)
+    return result
+
+
+class TrendFeatures:
+    """单个项目的趋势特征，数据不足的特征为None"""
+
+    __slots__ = ("snapshots", "days_on_alpha", "before_records", "volume_persistence", "realized_volatility",
+                 "max_drawdown", "rank_velocity", "pre_score")
+
+    def __init__(self, snapshots: int, days_on_alpha: float, before_records: bool,
+                 volume_persistence: Optional[float] = None, realized_volatility: Optional[float] = None,
+                 max_drawdown: Optional[float] = None, rank_velocity: Optional[float] = None,
+                 pre_score: Optional[float] = None):
+        self.snapshots = snapshots                      # 统计窗口内的快照数
+        self.days_on_alpha = days_on_alpha              # 首次出现在历史快照中至今的天数
+        self.before_records = before_records            # 首次出现在第一份快照中（实际纳入时间早于记录开始）
+        self.volume_persistence = volume_persistence    # 窗口内24h交易量不低于窗口均值一定比例的快照占比
+        self.realized_volatility = realized_volatility  # 窗口内按日折算的已实现波动率（%）
+        self.max_drawdown = max_drawdown                # 首次出现以来的最大回撤（%）
+        self.rank_velocity = rank_velocity              # 窗口内CMC排名每天上升的名次（负数为下降）
+        self.pre_score = pre_score                      # 趋势预评分（0~10）
+
+    def describe(self) -> str:
+        """提示词中的趋势特征文本，与提示词中其他数值保持相同的精度"""
+        days = f"{'≥' if self.before_records else ''}{self.days_on_alpha:.1f}天"
+        parts = [f"在Alpha {days}"]
+        if self.volume_persistence is not None:
+            parts.append(f"放量持续性 {self.volume_persistence:.2f}")
+        if self.realized_volatility is not None:
+            parts.append(f"日波动率 {self.realized_volatility:.2f}%")
+        if self.max_drawdown is not None:
+            parts.append(f"最大回撤 {self.max_drawdown:.2f}%")
+        if self.rank_velocity is not None:
+            # 四舍五入后为0时不显示为-0.0
+            parts.append(f"排名变化 {round(self.rank_velocity, 1) + 0.0:+.1f}名/天")
+        if self.pre_score is not None:
+            parts.append(f"趋势预评分 {self.pre_score:.1f}/10")
+        else:
+            parts.append(f"快照不足（{self.snapshots}份）")
+        return " | ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class AlphaHistory:
+    """Alpha项目的历史快照矩阵：ids[N]（CMC ID升序）、times[T]（秒）、各字段[N, T]的float32数组，未出现为NaN"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 历史快照文件路径，默认为data/analytics/alpha_history.npz，为空字符串时只在内存中保存
+        """
+        self.path = DEFAULT_HISTORY_PATH if path is None else path
+        self._lock = threading.Lock()
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.times = np.zeros(0, dtype=np.float64)
+        self.fields = {field: np.zeros((0, 0), dtype=np.float32) for field in HISTORY_FIELDS}
+        if self.path and os.path.exists(self.path):
+            try:
+                with np.load(self.path, allow_pickle=False) as data:
+                    ids, times = data["ids"], data["times"]
+                    fields = {field: data[field] for field in HISTORY_FIELDS}
+                if all(values.shape == (len(ids), len(times)) for values in fields.values()):
+                    self.ids, self.times, self.fields = ids, times, fields
+                else:
+                    logger.warning("Alpha历史快照文件格式不一致，重新开始记录")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"加载Alpha历史快照失败: {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def append(self, projects: Iterable[AlphaProject], timestamp: float) -> bool:
+        """追加一份快照，与上一份快照间隔不足TREND_FEATURES['min_interval']时跳过；超出保留天数的快照被移除
+
+        Args:
+            projects: CMC列表中的项目（过滤前）
+            timestamp: 数据获取时间（秒）
+
+        Returns:
+            bool: 是否追加
+        """
+        projects = [p for p in projects if isinstance(p.id, int)]
+        if not projects:
+            return False
+        with self._lock:
+            if len(self.times) and timestamp - self.times[-1] < TREND_FEATURES.get('min_interval', 3600):
+                return False
+
+            snapshot_ids = np.array([p.id for p in projects], dtype=np.int64)
+            snapshot_ids, first = np.unique(snapshot_ids, return_index=True)
+            columns = {
+                "price": np.array([projects[i].price or np.nan for i in first], dtype=np.float32),
+                "volume_24h": np.array([projects[i].volume_24h for i in first], dtype=np.float32),
+                "rank": np.array([_rank_value(projects[i].rank) for i in first], dtype=np.float32),
+            }
+
+            # 新出现的项目插入新行，已有各行按ID升序重新排列
+            ids = np.union1d(self.ids, snapshot_ids)
+            rows = np.searchsorted(ids, self.ids)
+            snapshot_rows = np.searchsorted(ids, snapshot_ids)
+            for field, values in self.fields.items():
+                matrix = np.full((len(ids), len(self.times) + 1), np.nan, dtype=np.float32)
+                matrix[rows, :-1] = values
+                matrix[snapshot_rows, -1] = columns[field]
+                self.fields[field] = matrix
+            self.ids = ids
+            self.times = np.append(self.times, float(timestamp))
+
+            # 移除超出保留天数的快照和不再出现的项目
+            keep_columns = self.times >= timestamp - TREND_FEATURES.get('max_days', 90) * DAY
+            if not keep_columns.all():
+                self.times = self.times[keep_columns]
+                self.fields = {field: values[:, keep_columns] for field, values in self.fields.items()}
+                keep_rows = ~np.isnan(self.fields["volume_24h"]).all(axis=1)
+                self.ids = self.ids[keep_rows]
+                self.fields = {field: values[keep_rows] for field, values in self.fields.items()}
+
+            if self.path:
+                buffer = io.BytesIO()
+                np.savez(buffer, ids=self.ids, times=self.times, **self.fields)
+                try:
+                    write_bytes(self.path, buffer.getvalue())
+                except OSError as e:
+                    logger.warning(f"保存Alpha历史快照失败: {str(e)}")
+            return True
+
+    def features(self, projects: Iterable[AlphaProject], now: Optional[float] = None
+                 ) -> Dict[int, TrendFeatures]:
+        """一次性批量计算项目的趋势特征
+
+        Args:
+            projects: 需要计算特征的项目
+            now: 计算时间（秒），默认为最后一份快照的时间，相同的历史得到相同的特征
+
+        Returns:
+            Dict[int, TrendFeatures]: CMC ID -> 趋势特征，历史快照中没有的项目不包含在内
+        """
+        with self._lock:
+            ids, times = self.ids, self.times
+            fields = dict(self.fields)
+        wanted = np.unique(np.array([p.id for p in projects if isinstance(p.id, int)], dtype=np.int64))
+        if not len(wanted) or not len(times):
+            return {}
+        positions = np.searchsorted(ids, wanted)
+        found = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == wanted)
+        wanted, rows = wanted[found], positions[found]
+        if not len(rows):
+            return {}
+        values = compute_features(times, fields["price"][rows], fields["volume_24h"][rows], fields["rank"][rows],
+                                  now=now)
+        result = {}
+        for i, project_id in enumerate(wanted.tolist()):
+            optional = {name: None if np.isnan(values[name][i]) else float(values[name][i])
+                        for name in ("volume_persistence", "realized_volatility", "max_drawdown", "rank_velocity",
+                                     "pre_score")}
+            result[project_id] = TrendFeatures(int(values["snapshots"][i]), float(values["days_on_alpha"][i]),
+                                               bool(values["before_records"][i]), **optional)
+        return result
+
+
+def compute_features(times: np.ndarray, price: np.ndarray, volume: np.ndarray, rank: np.ndarray,
+                     now: Optional[float] = None, window_days: Optional[float] = None,
+                     min_snapshots: Optional[int] = None, weights: Optional[Dict[str, float]] = None
+                     ) -> Dict[str, np.ndarray]:
+    """按[项目, 快照]矩阵批量计算趋势特征
+
+    Args:
+        times: 快照时间（秒，升序）[T]
+        price: 价格[N, T]，未出现为NaN
+        volume: 24h交易量[N, T]
+        rank: CMC排名[N, T]
+        now: 计算时间（秒），默认为最后一份快照的时间
+        window_days: 放量持续性、波动率和排名变化的统计窗口（天），默认读取TREND_FEATURES['window_days']
+        min_snapshots: 窗口内少于该快照数的项目不计算窗口特征，默认读取TREND_FEATURES['min_snapshots']
+        weights: 预评分的特征权重，默认读取TREND_FEATURES['score_weights']
+
+    Returns:
+        Dict[str, np.ndarray]: 特征名 -> [N]数组，数据不足为NaN
+    """
+    window_days = window_days or TREND_FEATURES.get('window_days', 7)
+    min_snapshots = min_snapshots or TREND_FEATURES.get('min_snapshots', 3)
+    weights = weights or TREND_FEATURES.get('score_weights') or DEFAULT_SCORE_WEIGHTS
+    now = float(times[-1]) if now is None else now
+    # 全部历史只用于在Alpha的天数和最大回撤，按float32计算；窗口内的特征转换为float64
+    price = np.where(price > 0, price, np.nan)
+    # 项目出现在快照中时24h交易量总有记录（可能为0），价格缺失或为0时不参与收益率和回撤
+    listed = ~np.isnan(volume)
+    count = len(price)
+
+    # 在Alpha的天数：首次出现在历史快照中至今
+    seen = listed.any(axis=1)
+    first = np.argmax(listed, axis=1)
+    days_on_alpha = np.where(seen, (now - times[first]) / DAY, np.nan)
+    before_records = seen & (first == 0)
+
+    # 最大回撤：首次出现以来的价格相对历史最高价的最大跌幅（NaN不影响累计最大值）
+    priced = ~np.isnan(price).all(axis=1)
+    running_max = np.fmax.accumulate(price, axis=1)
+    with np.errstate(invalid='ignore'):
+        drawdown = 1 - price / running_max
+    max_drawdown = np.full(count, np.nan)
+    max_drawdown[priced] = np.nanmax(drawdown[priced], axis=1) * 100
+
+    window = times >= now - window_days * DAY
+    window_listed = listed[:, window]
+    snapshots = window_listed.sum(axis=1)
+    enough = snapshots >= min_snapshots
+    days = (times[window] - now) / DAY
+    window_price = price[:, window].astype(np.float64)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 放量持续性：窗口内24h交易量不低于窗口均值一定比例的快照占比，单次放量拉高均值时占比低
+        window_volume = np.where(window_listed, volume[:, window].astype(np.float64), 0.0)
+        mean_volume = window_volume.sum(axis=1) / snapshots
+        floor = TREND_FEATURES.get('persistence_floor', 0.5) * mean_volume
+        sustained = (window_volume >= floor[:, None]) & window_listed
+        volume_persistence = np.where(enough & (mean_volume > 0), sustained.sum(axis=1) / snapshots, np.nan)
+
+        # 已实现波动率：相邻快照对数收益率的平方和按时间间隔折算为日波动率，缺失快照前后的收益率不计入
+        log_price = np.log(window_price)
+        returns = np.diff(log_price, axis=1)
+        intervals = np.diff(times[window]) / DAY
+        valid = ~np.isnan(returns)
+        elapsed = (valid * intervals).sum(axis=1)
+        variance = np.where(valid, returns ** 2, 0.0).sum(axis=1) / elapsed
+        realized_volatility = np.where(enough & (elapsed > 0), np.sqrt(variance) * 100, np.nan)
+
+        # 排名变化速度：窗口内排名对时间的最小二乘斜率，取反后正数表示排名上升
+        window_rank = np.where(window_listed, rank[:, window].astype(np.float64), np.nan)
+        ranked = ~np.isnan(window_rank)
+        ranked_count = ranked.sum(axis=1)
+        mean_day = (ranked * days).sum(axis=1) / ranked_count
+        mean_rank = np.where(ranked, window_rank, 0.0).sum(axis=1) / ranked_count
+        centered_day = np.where(ranked, days - mean_day[:, None], 0.0)
+        covariance = (centered_day * np.where(ranked, window_rank - mean_rank[:, None], 0.0)).sum(axis=1)
+        spread = (centered_day ** 2).sum(axis=1)
+        rank_velocity = np.where(enough & (ranked_count >= 2) & (spread > 0), -covariance / spread, np.nan)
+
+    features = {
+        "volume_persistence": volume_persistence,
+        "realized_volatility": realized_volatility,
+        "max_drawdown": np.where(enough, max_drawdown, np.nan),
+        "rank_velocity": rank_velocity,
+    }
+
+    # 趋势预评分：各特征在本批项目中的分位数按权重加权平均，缺失的特征不参与
+    total = np.zeros(count)
+    weight_sum = np.zeros(count)
+    for name, weight in weights.items():
+        if name not in features or weight <= 0:
+            continue
+        percentile = _percentile(-features[name] if name in LOWER_IS_BETTER else features[name])
+        available = ~np.isnan(percentile)
+        total += np.where(available, percentile * weight, 0.0)
+        weight_sum += available * weight
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pre_score = np.where(enough & (weight_sum > 0), total / weight_sum * 10, np.nan)
+
+    return {
+        "snapshots": snapshots,
+        "days_on_alpha": days_on_alpha,
+        "before_records": before_records,
+        **features,
+        "pre_score": pre_score,
+    }
+
+
+_history: Optional[AlphaHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_alpha_history() -> AlphaHistory:
+    """获取进程内共享的Alpha历史快照（首次调用时加载文件）"""
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = AlphaHistory()
+        return _history
+
+
+def record_and_compute(projects: List[AlphaProject], timestamp: float) -> Dict[int, TrendFeatures]:
+    """追加当前快照并计算所有项目的趋势特征
+
+    Args:
+        projects: CMC列表中的项目（过滤前）
+        timestamp: 数据获取时间（秒）
+
+    Returns:
+        Dict[int, TrendFeatures]: CMC ID -> 趋势特征
+    """
+    history = get_alpha_history()
+    history.append(projects, timestamp)
+    return history.features(projects)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Alpha项目跨快照趋势特征")
+    parser.add_argument("--top", type=int, default=20, help="按趋势预评分列出的项目数量")
+    args = parser.parse_args()
+
+    history = get_alpha_history()
+    if not len(history):
+        print("尚无Alpha历史快照")
+    else:
+        from src.utils.historical_data import BinanceAlphaDataCollector
+        from src.utils.alpha_project import parse_projects
+
+        data = BinanceAlphaDataCollector(data_dir=os.path.join(ROOT_DIR, DATA_DIRS['data'])).load_data() or {}
+        projects = parse_projects(data.get("data", {}).get("cryptoCurrencyList", []))
+        features = history.features(projects)
+        print(f"{len(history)}份快照、{len(history.ids)}个项目")
+        scored = sorted(((p, features[p.id]) for p in projects if p.id in features),
+                        key=lambda item: -1 if item[1].pre_score is None else item[1].pre_score, reverse=True)
+        for project, trend in scored[:args.top]:
+            print(f"{project.symbol}: {trend.describe()}")
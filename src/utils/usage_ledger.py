@@ -0,0 +1,273 @@
+"""
+AI调用用量账本
+每次AI建议请求（平台、后端、模型、提示词摘要、token用量、推理内容长度、耗时、尝试次数、结果、费用）写入SQLite，
+用于按日、按平台统计费用和每条已推送建议消耗的token；每日token或费用上限将被超出时，
+预算检查将请求降级到备用模型或本地模型，仍不满足时跳过该平台
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from config import DATA_DIRS, USAGE_LEDGER
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+# 项目根目录
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 默认账本数据库路径
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, DATA_DIRS.get('analytics', 'data/analytics'), 'usage_ledger.db')
+
+# 调用结果
+OUTCOME_SUCCESS = "success"
+OUTCOME_TRUNCATED = "truncated"
+OUTCOME_CONTINUED = "continued"            # 被截断的回答经续写后完整
+OUTCOME_FAILED = "failed"
+OUTCOME_REUSED = "reused"                  # 复用已保存的建议，没有请求AI
+OUTCOME_BUDGET_SKIPPED = "budget_skipped"  # 超出每日预算，跳过
+
+# 预算检查结果
+BUDGET_OK = "ok"
+BUDGET_DOWNGRADE = "downgrade"
+BUDGET_SKIP = "skip"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    called_at REAL NOT NULL,
+    date TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    backend TEXT,
+    model TEXT,
+    prompt_hash TEXT,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    metered_tokens INTEGER NOT NULL DEFAULT 0,
+    reasoning_chars INTEGER NOT NULL DEFAULT 0,
+    latency REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    outcome TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    delivered INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_date ON ai_calls(date);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_platform ON ai_calls(platform, model);
+"""
+
+
+def prompt_hash(prompt: str) -> str:
+    """提示词的SHA-256摘要（前16位）"""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+
+
+class BudgetDecision:
+    """预算检查结果"""
+
+    __slots__ = ("action", "backends", "reason")
+
+    def __init__(self, action: str, backends: Optional[List[str]] = None, reason: str = ""):
+        self.action = action
+        self.backends = backends  # 降级时只使用的后端，None表示不限制
+        self.reason = reason
+
+
+class UsageLedger:
+    """AI调用用量账本（data/analytics/usage_ledger.db）"""
+
+    def __init__(self, db_path: Optional[str] = None, enabled: Optional[bool] = None):
+        """
+        Args:
+            db_path: 数据库路径，默认为data/analytics/usage_ledger.db
+            enabled: 是否启用，默认读取USAGE_LEDGER['enabled']；未启用时不记录，预算检查始终通过
+        """
+        self.db_path = db_path or DEFAULT_DB_PATH
+        self.enabled = USAGE_LEDGER.get('enabled', True) if enabled is None else enabled
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """打开账本数据库，如不存在则创建表结构"""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            # 主流程在工作线程中记录调用（不阻塞事件循环），连接不绑定创建它的线程
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def record(self, platform: str, outcome: str, prompt: Optional[str] = None, response: Any = None,
+               usage: Any = None, latency: Optional[float] = None, delivered: bool = False) -> Optional[int]:
+        """记录一次调用
+
+        Args:
+            platform: 平台名称
+            outcome: 调用结果，success / continued / truncated / failed / reused / budget_skipped
+            prompt: 提示词，记录其摘要
+            response: 路由器返回的ModelResponse，失败时为None
+            usage: 本次调用累计的CallUsage（包括失败和对冲的请求）
+            latency: 整次调用的耗时（秒）
+            delivered: 建议是否已推送
+
+        Returns:
+            Optional[int]: 记录ID，未启用或写入失败时返回None
+        """
+        if not self.enabled:
+            return None
+        row = {
+            "called_at": time.time(),
+            "date": datetime.now().strftime('%Y-%m-%d'),
+            "platform": platform,
+            "backend": response.backend if response is not None else None,
+            "model": response.model if response is not None else None,
+            "prompt_hash": prompt_hash(prompt) if prompt else None,
+            "prompt_tokens": usage.prompt_tokens if usage is not None else 0,
+            "completion_tokens": usage.completion_tokens if usage is not None else 0,
+            "metered_tokens": usage.metered_tokens if usage is not None else 0,
+            "reasoning_chars": len(response.reasoning_content) if response is not None else 0,
+            "latency": latency,
+            "attempts": usage.attempts if usage is not None else 0,
+            "outcome": outcome,
+            "cost": usage.cost if usage is not None else 0.0,
+            "delivered": int(delivered),
+        }
+        try:
+            conn = self.connect()
+            cursor = conn.execute(f"INSERT INTO ai_calls ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                                  list(row.values()))
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            logger.warning(f"写入用量账本失败: {str(e)}")
+            return None
+
+    def mark_delivered(self, call_id: Optional[int]) -> None:
+        """标记调用生成的建议已推送"""
+        if not self.enabled or call_id is None:
+            return
+        try:
+            conn = self.connect()
+            conn.execute("UPDATE ai_calls SET delivered = 1 WHERE id = ?", (call_id,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"更新用量账本失败: {str(e)}")
+
+    def daily_usage(self, date: Optional[str] = None) -> Dict[str, float]:
+        """某天（默认今天）计入上限的token用量、费用和调用次数"""
+        date = date or datetime.now().strftime('%Y-%m-%d')
+        row = self.connect().execute(
+            "SELECT COALESCE(SUM(metered_tokens), 0) AS tokens, COALESCE(SUM(cost), 0) AS cost, "
+            "SUM(outcome NOT IN (?, ?)) AS calls FROM ai_calls WHERE date = ?",
+            (OUTCOME_REUSED, OUTCOME_BUDGET_SKIPPED, date)
+        ).fetchone()
+        return {"tokens": row["tokens"], "cost": row["cost"], "calls": row["calls"] or 0}
+
+    def cost_by_day(self, days: int = 30) -> List[Dict[str, Any]]:
+        """最近N天每天的调用次数、token用量、费用和已推送建议数量"""
+        rows = self.connect().execute(
+            "SELECT date, SUM(outcome NOT IN (?, ?)) AS calls, SUM(prompt_tokens + completion_tokens) AS tokens, "
+            "SUM(cost) AS cost, SUM(delivered) AS delivered FROM ai_calls GROUP BY date ORDER BY date DESC LIMIT ?",
+            (OUTCOME_REUSED, OUTCOME_BUDGET_SKIPPED, days)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def cost_by_platform(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """各平台（自since日期起）的调用次数、token用量和费用，按费用从高到低排列"""
+        rows = self.connect().execute(
+            "SELECT platform, SUM(outcome NOT IN (?, ?)) AS calls, SUM(prompt_tokens + completion_tokens) AS tokens, "
+            "SUM(cost) AS cost FROM ai_calls WHERE date >= ? GROUP BY platform ORDER BY cost DESC",
+            (OUTCOME_REUSED, OUTCOME_BUDGET_SKIPPED, since or "")
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def tokens_per_advice(self, since: Optional[str] = None) -> Dict[str, float]:
+        """每条已推送建议平均消耗的token和费用（包括失败、截断的调用，复用的建议计为0）"""
+        row = self.connect().execute(
+            "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS tokens, COALESCE(SUM(cost), 0) AS cost, "
+            "COALESCE(SUM(delivered), 0) AS delivered FROM ai_calls WHERE date >= ?",
+            (since or "",)
+        ).fetchone()
+        delivered = row["delivered"]
+        return {"delivered": delivered,
+                "tokens": row["tokens"] / delivered if delivered else 0.0,
+                "cost": row["cost"] / delivered if delivered else 0.0}
+
+    def estimate(self, platform: str, backend: Any) -> Dict[str, float]:
+        """预估平台在某个后端上一次调用的token和费用：该平台在该模型上最近几次成功调用的平均值，
+        没有记录时按USAGE_LEDGER['prompt_tokens_estimate']和后端的max_tokens估算"""
+        row = self.connect().execute(
+            "SELECT AVG(tokens) AS tokens, AVG(cost) AS cost FROM ("
+            "SELECT prompt_tokens + completion_tokens AS tokens, cost FROM ai_calls "
+            "WHERE platform = ? AND model = ? AND outcome IN (?, ?) ORDER BY id DESC LIMIT ?)",
+            (platform, backend.model, OUTCOME_SUCCESS, OUTCOME_CONTINUED, USAGE_LEDGER.get('history', 10))
+        ).fetchone()
+        if row["tokens"] is not None:
+            return {"tokens": row["tokens"], "cost": row["cost"]}
+        prompt_tokens = USAGE_LEDGER.get('prompt_tokens_estimate', 6000)
+        completion_tokens = backend.generation_config()['max_tokens'] or 0
+        return {"tokens": prompt_tokens + completion_tokens, "cost": backend.cost(prompt_tokens, completion_tokens)}
+
+    def check_budget(self, platform: str, router: Any) -> BudgetDecision:
+        """检查平台的下一次调用是否会超出每日token或费用上限
+
+        按路由顺序预估首选后端的用量，超出上限时依次尝试USAGE_LEDGER['downgrade_backends']中的后端
+        （不计入上限的本地后端总是满足），都不满足时跳过
+
+        Args:
+            platform: 平台名称
+            router: 模型路由器
+
+        Returns:
+            BudgetDecision: ok / downgrade（只使用backends中的后端）/ skip
+        """
+        token_cap = USAGE_LEDGER.get('daily_token_cap', 0)
+        cost_cap = USAGE_LEDGER.get('daily_cost_cap', 0)
+        if not self.enabled or (not token_cap and not cost_cap):
+            return BudgetDecision(BUDGET_OK)
+
+        try:
+            used = self.daily_usage()
+
+            def fits(backend: Any) -> bool:
+                if not backend.metered:
+                    return True
+                expected = self.estimate(platform, backend)
+                return (not token_cap or used["tokens"] + expected["tokens"] <= token_cap) and \
+                    (not cost_cap or used["cost"] + expected["cost"] <= cost_cap)
+
+            ranked = router.ranked("")
+            if ranked and fits(ranked[0]):
+                return BudgetDecision(BUDGET_OK)
+            for name in USAGE_LEDGER.get('downgrade_backends', []):
+                backend = router.backend(name)
+                if backend is not None and fits(backend):
+                    return BudgetDecision(BUDGET_DOWNGRADE, [name], f"今日已用{used['tokens']:.0f} tokens/"
+                                                                   f"${used['cost']:.4f}，降级到{name}({backend.model})")
+        except sqlite3.Error as e:
+            logger.warning(f"读取用量账本失败，跳过预算检查: {str(e)}")
+            return BudgetDecision(BUDGET_OK)
+        return BudgetDecision(BUDGET_SKIP, reason=f"今日已用{used['tokens']:.0f} tokens/${used['cost']:.4f}，"
+                                                  f"下一次调用将超出每日上限")
+
+
+if __name__ == "__main__":
+    ledger = UsageLedger(enabled=True)
+    print("每日用量:")
+    for day in ledger.cost_by_day():
+        print(f"  {day['date']}: {day['calls']}次调用，{day['tokens']} tokens，${day['cost']:.4f}，"
+              f"推送{day['delivered']}条建议")
+    print("各平台用量:")
+    for item in ledger.cost_by_platform():
+        print(f"  {item['platform']}: {item['calls']}次调用，{item['tokens']} tokens，${item['cost']:.4f}")
+    per_advice = ledger.tokens_per_advice()
+    print(f"每条已推送建议: {per_advice['tokens']:.0f} tokens，${per_advice['cost']:.4f}"
+          f"（共{per_advice['delivered']}条）")
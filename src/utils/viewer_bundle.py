@@ -0,0 +1,477 @@
+"""
+文档查看器数据包
+写入汇总报告时增量发布docs-viewer使用的静态数据：
+只追加的清单（每份报告各平台的TOP3代码和评分）、以内容摘要命名并预压缩的HTML片段，以及代码和名称的倒排搜索索引，
+查看器启动时只需加载清单和索引，选中报告时再加载对应的HTML片段
+"""
+
+import os
+import re
+import gzip
+import html
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from config import DATA_DIRS, VIEWER_BUNDLE
+from src.utils.serialization import dumps, loads, dump_file, load_file, write_bytes
+from src.utils.advice_index import (
+    ROOT_DIR, KIND_COMBINED, COMBINED_FILE_PATTERN, BOLD_PROJECT_PATTERN, HEADING_PROJECT_PATTERN,
+    parse_advice_file
+)
+
+try:
+    import markdown
+except ImportError:
+    markdown = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 设置日志
+logger = logging.getLogger(__name__)
+
+BUNDLE_VERSION = 2
+
+MANIFEST_FILE = "manifest.jsonl"
+SEARCH_FILE = "search.json"
+# 合并状态：上次合并时清单的字节数，发布时只读取该文件和清单末尾追加的行
+STATE_FILE = "state.json"
+HTML_DIR = "html"
+# 片段文件名中内容摘要的长度
+HASH_LENGTH = 12
+# 旧版本数据包每次整体重写的清单
+LEGACY_FILES = ("manifest.json",)
+
+# 行内标记：代码、加粗、斜体、链接
+_INLINE_CODE = re.compile(r'`([^`]+)`')
+_BOLD = re.compile(r'\*\*(.+?)\*\*|__(.+?)__')
+_ITALIC = re.compile(r'(?<![\*\w])\*(?!\s)(.+?)(?<!\s)\*(?![\*\w])')
+_LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+_LIST_ITEM = re.compile(r'^(\s*)([-*+]|\d+[.)])\s+(.*)$')
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_HR = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+# 搜索词：名称中的单词
+_WORD = re.compile(r'[0-9a-z]+')
+
+
+def _render_inline(text: str) -> str:
+    """渲染行内markdown（先转义HTML，代码片段内容不再处理）"""
+    codes = []
+
+    def stash(match: re.Match) -> str:
+        codes.append(f"<code>{html.escape(match.group(1))}</code>")
+        return f"\x00{len(codes) - 1}\x00"
+
+    text = html.escape(_INLINE_CODE.sub(stash, text), quote=False)
+    text = _LINK.sub(lambda m: f'<a href="{html.escape(m.group(2))}">{m.group(1)}</a>', text)
+    text = _BOLD.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    text = _ITALIC.sub(r'<em>\1</em>', text)
+    return re.sub(r'\x00(\d+)\x00', lambda m: codes[int(m.group(1))], text)
+
+
+def _split_row(line: str) -> List[str]:
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def _render_table(lines: List[str]) -> str:
+    header = _split_row(lines[0])
+    parts = ["<table>", "<thead><tr>"]
+    parts.extend(f"<th>{_render_inline(cell)}</th>" for cell in header)
+    parts.append("</tr></thead><tbody>")
+    for line in lines[2:]:
+        cells = _split_row(line)
+        parts.append("<tr>" + "".join(f"<td>{_render_inline(cell)}</td>" for cell in cells) + "</tr>")
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _render_list(lines: List[str]) -> str:
+    """渲染（可嵌套的）列表，按缩进确定层级"""
+    parts = []
+    stack = []  # (缩进, 标签)
+    for line in lines:
+        match = _LIST_ITEM.match(line)
+        if not match:
+            # 列表项的续行
+            if parts:
+                parts[-1] += "<br>" + _render_inline(line.strip())
+            continue
+        indent = len(match.group(1).replace('\t', '    '))
+        tag = "ol" if match.group(2)[0].isdigit() else "ul"
+        while stack and indent < stack[-1][0]:
+            parts.append(f"</li></{stack.pop()[1]}>")
+        if not stack or indent > stack[-1][0]:
+            stack.append((indent, tag))
+            parts.append(f"<{tag}><li>")
+        else:
+            parts.append("</li><li>")
+        parts.append(_render_inline(match.group(3)))
+    while stack:
+        parts.append(f"</li></{stack.pop()[1]}>")
+    return "".join(parts)
+
+
+def render_markdown(content: str) -> str:
+    """将建议markdown渲染为HTML片段
+
+    安装了markdown包时使用它（tables、fenced_code、nl2br扩展），否则使用内置的渲染器，
+    覆盖建议文件用到的标题、列表、表格、引用、代码块、分隔线和行内标记，换行规则与查看器的marked（breaks）一致
+
+    Args:
+        content: markdown文本
+
+    Returns:
+        str: HTML片段
+    """
+    if markdown is not None:
+        return markdown.markdown(content, extensions=["tables", "fenced_code", "nl2br", "sane_lists"])
+
+    lines = content.splitlines()
+    blocks = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        if not stripped:
+            i += 1
+            continue
+
+        if stripped.startswith("```"):
+            language = stripped[3:].strip()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith("```"):
+                code.append(lines[i])
+                i += 1
+            i += 1
+            css = f' class="language-{html.escape(language)}"' if language else ""
+            blocks.append(f"<pre><code{css}>{html.escape(chr(10).join(code))}</code></pre>")
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            level = len(heading.group(1))
+            blocks.append(f"<h{level}>{_render_inline(heading.group(2))}</h{level}>")
+            i += 1
+            continue
+
+        if _HR.match(stripped):
+            blocks.append("<hr>")
+            i += 1
+            continue
+
+        if stripped.startswith('|') and i + 1 < len(lines) and _TABLE_SEPARATOR.match(lines[i + 1]):
+            table = [line, lines[i + 1]]
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith('|'):
+                table.append(lines[i])
+                i += 1
+            blocks.append(_render_table(table))
+            continue
+
+        if stripped.startswith('>'):
+            quote = []
+            while i < len(lines) and lines[i].strip().startswith('>'):
+                quote.append(lines[i].strip()[1:].lstrip())
+                i += 1
+            blocks.append(f"<blockquote>{render_markdown(chr(10).join(quote))}</blockquote>")
+            continue
+
+        if _LIST_ITEM.match(line):
+            items = []
+            while i < len(lines) and lines[i].strip():
+                if not _LIST_ITEM.match(lines[i]) and (_HEADING.match(lines[i].strip()) or lines[i].strip().startswith('|')):
+                    break
+                items.append(lines[i])
+                i += 1
+            blocks.append(_render_list(items))
+            continue
+
+        paragraph = []
+        while i < len(lines) and lines[i].strip():
+            next_stripped = lines[i].strip()
+            if paragraph and (_HEADING.match(next_stripped) or _LIST_ITEM.match(lines[i])
+                              or next_stripped.startswith(('|', '>', '```')) or _HR.match(next_stripped)):
+                break
+            paragraph.append(_render_inline(next_stripped))
+            i += 1
+        blocks.append(f"<p>{'<br>'.join(paragraph)}</p>")
+
+    return "\n".join(blocks)
+
+
+def _search_terms(records: List[Dict[str, Any]], content: str) -> Set[str]:
+    """报告的搜索词：TOP推荐及正文中以"名称 (代码)"形式出现的项目的代码、名称和名称中的单词"""
+    projects = {(r["symbol"], r.get("name") or "") for r in records}
+    for match in list(BOLD_PROJECT_PATTERN.finditer(content)) + list(HEADING_PROJECT_PATTERN.finditer(content)):
+        name, symbol = match.groups()
+        # 去掉"1. "、"项目1："之类的序号前缀
+        name = re.sub(r'^\d+\.\s+', '', name.strip())
+        projects.add((symbol.strip(), re.split(r'[:：]', name)[-1].strip()))
+
+    terms = set()
+    for symbol, name in projects:
+        if symbol:
+            terms.add(symbol.lower())
+        name = name.lower()
+        if name and len(name) <= 40:
+            terms.add(name)
+            terms.update(word for word in _WORD.findall(name) if len(word) > 1)
+    return terms
+
+
+class ViewerBundle:
+    """docs-viewer静态数据包发布器
+
+    - html/<id>.<摘要>.html：以内容摘要命名的不可变HTML片段，附带预压缩的.gz/.br文件，可长期缓存
+    - manifest.jsonl：只追加的清单，每发布一份新增或变化的报告追加一行（同一报告以最后一行为准），
+      合并之后追加的行带有该报告的搜索词
+    - search.json：合并清单时生成的倒排索引，覆盖清单前manifest_bytes字节中的报告
+    - state.json：合并状态（manifest_bytes），发布时据此统计追加的行数，不需要加载倒排索引
+
+    发布单份报告只做一次摘要计算、渲染和追加写入，与历史报告数量无关；
+    追加的行数达到compact_after时合并清单（同一报告只保留最后一行，移除已删除的报告和不再引用的片段）并重建索引
+    """
+
+    def __init__(self, source_dir: Optional[str] = None, output_dir: Optional[str] = None,
+                 compression: Optional[List[str]] = None, compact_after: Optional[int] = None):
+        """
+        Args:
+            source_dir: 汇总报告目录，默认为DATA_DIRS['all-platforms']
+            output_dir: 数据包输出目录，默认为DATA_DIRS['viewer_bundle']
+            compression: 预压缩格式（gzip、brotli），默认读取VIEWER_BUNDLE['compression']
+            compact_after: 追加多少行后合并清单，默认读取VIEWER_BUNDLE['compact_after']
+        """
+        self.source_dir = source_dir or os.path.join(ROOT_DIR, DATA_DIRS['all-platforms'])
+        self.output_dir = output_dir or os.path.join(ROOT_DIR, DATA_DIRS.get('viewer_bundle', 'docs-viewer/public/advices'))
+        self.compression = VIEWER_BUNDLE.get('compression', ['gzip', 'brotli']) if compression is None else compression
+        self.compact_after = compact_after or VIEWER_BUNDLE.get('compact_after', 100)
+        if 'brotli' in self.compression and brotli is None:
+            logger.debug("未安装brotli，跳过.br预压缩")
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_FILE)
+
+    def _load_search(self) -> Dict[str, Any]:
+        try:
+            data = load_file(os.path.join(self.output_dir, SEARCH_FILE))
+        except (OSError, ValueError):
+            return {}
+        return data if data.get("version") == BUNDLE_VERSION else {}
+
+    def _load_state(self) -> Dict[str, Any]:
+        """读取合并状态，尚未合并过时返回空字典"""
+        state_path = os.path.join(self.output_dir, STATE_FILE)
+        try:
+            state = load_file(state_path)
+        except (OSError, ValueError):
+            state = {}
+        if state.get("version") == BUNDLE_VERSION:
+            return state
+
+        # 没有状态文件的数据包：从search.json迁移一次
+        search = self._load_search()
+        if not search:
+            return {}
+        state = {"version": BUNDLE_VERSION, "manifest_bytes": search.get("manifest_bytes", 0)}
+        dump_file(state_path, state, pretty=False)
+        return state
+
+    def _read_manifest(self, offset: int = 0) -> List[Dict[str, Any]]:
+        """读取清单中offset字节之后的行"""
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return []
+        return [loads(line) for line in data.splitlines() if line.strip()]
+
+    def _write_artifact(self, relative_path: str, data: bytes) -> None:
+        """写入片段及其预压缩文件（压缩文件不含时间戳，相同内容的输出相同）"""
+        path = os.path.join(self.output_dir, relative_path)
+        write_bytes(path, data)
+        if 'gzip' in self.compression:
+            write_bytes(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+        if 'brotli' in self.compression and brotli is not None:
+            write_bytes(f"{path}.br", brotli.compress(data))
+
+    def _remove_artifact(self, relative_path: str) -> None:
+        path = os.path.join(self.output_dir, relative_path)
+        for suffix in ("", ".gz", ".br"):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+
+    def _build_entry(self, file_path: str, content: str, digest: str) -> Dict[str, Any]:
+        """解析并渲染单份报告，写入片段，返回清单行（含搜索词）"""
+        filename = os.path.basename(file_path)
+        report_id = filename[:-len('.md')]
+        html_path = f"{HTML_DIR}/{report_id}.{digest[:HASH_LENGTH]}.html"
+        records = parse_advice_file(file_path, KIND_COMBINED)
+        self._write_artifact(html_path, render_markdown(content).encode('utf-8'))
+
+        top: Dict[str, List[List[Any]]] = {}
+        for record in records:
+            top.setdefault(record["platform"], []).append([record["symbol"], record["name"], record["score"]])
+
+        title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+        date_match = COMBINED_FILE_PATTERN.match(filename)
+        return {
+            "id": report_id,
+            "name": filename,
+            "title": title_match.group(1).strip() if title_match else report_id.replace('_', ' '),
+            "date": datetime.strptime(date_match.group(1), '%Y%m%d').strftime('%Y-%m-%d') if date_match else "",
+            "top": top,
+            "hash": digest,
+            "html": html_path,
+            "terms": sorted(_search_terms(records, content)),
+        }
+
+    def _read_report(self, file_path: str) -> Tuple[str, str, str]:
+        """返回报告id、内容和内容摘要"""
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        report_id = os.path.basename(file_path)[:-len('.md')]
+        return report_id, raw.decode('utf-8'), hashlib.sha256(raw).hexdigest()
+
+    def publish(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """发布单份报告：内容摘要对应的片段已存在时跳过，否则写入片段并在清单末尾追加一行
+
+        Args:
+            file_path: 汇总报告路径
+
+        Returns:
+            Optional[Dict[str, Any]]: 追加的清单行，内容未变化时返回None
+        """
+        report_id, content, digest = self._read_report(file_path)
+        if os.path.exists(os.path.join(self.output_dir, HTML_DIR, f"{report_id}.{digest[:HASH_LENGTH]}.html")):
+            return None
+
+        entry = self._build_entry(file_path, content, digest)
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.manifest_path, 'ab') as f:
+            f.write(dumps(entry, pretty=False) + b"\n")
+        logger.info(f"已发布查看器报告: {entry['name']} ({digest[:HASH_LENGTH]})")
+        return entry
+
+    def pending_lines(self) -> Optional[int]:
+        """上次合并之后追加的清单行数（只读取合并状态和清单末尾追加的部分），尚未生成索引时返回None"""
+        state = self._load_state()
+        if not state:
+            return None
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                f.seek(state.get("manifest_bytes", 0))
+                return sum(1 for line in f if line.strip())
+        except OSError:
+            return 0
+
+    def compact(self) -> Dict[str, int]:
+        """合并清单并重建倒排索引
+
+        同一报告只保留最后一行，补发布清单中缺失或内容已变化的报告（中断的发布在此补齐），
+        移除源文件已删除的报告和不再被引用的片段
+
+        Returns:
+            Dict[str, int]: 报告总数、新发布数和移除的片段数
+        """
+        search = self._load_search()
+        latest = {entry["id"]: entry for entry in self._read_manifest()}
+
+        # 合并前的行不带搜索词，由倒排索引还原
+        indexed_terms: Dict[str, List[str]] = {}
+        for term, report_ids in search.get("index", {}).items():
+            for report_id in report_ids:
+                indexed_terms.setdefault(report_id, []).append(term)
+
+        stats = {"reports": 0, "published": 0, "removed": 0}
+        entries = []
+        filenames = [f for f in os.listdir(self.source_dir) if f.startswith('advice_') and f.endswith('.md')] \
+            if os.path.isdir(self.source_dir) else []
+        for filename in sorted(filenames, reverse=True):
+            file_path = os.path.join(self.source_dir, filename)
+            report_id, content, digest = self._read_report(file_path)
+            entry = latest.get(report_id)
+            if entry and entry.get("hash") == digest and os.path.exists(os.path.join(self.output_dir, entry["html"])):
+                entry = {**entry, "terms": entry.get("terms", indexed_terms.get(report_id, []))}
+            else:
+                entry = self._build_entry(file_path, content, digest)
+                stats["published"] += 1
+            entries.append(entry)
+
+        # 移除不再被引用的片段（被新版本替换的、源文件已删除的）
+        referenced = {entry["html"] for entry in entries}
+        html_dir = os.path.join(self.output_dir, HTML_DIR)
+        if os.path.isdir(html_dir):
+            for filename in os.listdir(html_dir):
+                relative_path = f"{HTML_DIR}/{filename}"
+                if filename.endswith('.html') and relative_path not in referenced:
+                    self._remove_artifact(relative_path)
+                    stats["removed"] += 1
+
+        # 倒排索引：搜索词 -> 报告id列表（与清单顺序一致，最新的在前）
+        index: Dict[str, List[str]] = {}
+        for entry in entries:
+            for term in entry.pop("terms"):
+                index.setdefault(term, []).append(entry["id"])
+
+        manifest = b"".join(dumps(entry, pretty=False) + b"\n" for entry in entries)
+        write_bytes(self.manifest_path, manifest)
+        dump_file(os.path.join(self.output_dir, SEARCH_FILE),
+                  {"version": BUNDLE_VERSION, "generated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                   "manifest_bytes": len(manifest), "index": index}, pretty=False)
+        # 状态文件在索引之后写入，存在即表示索引已生成
+        dump_file(os.path.join(self.output_dir, STATE_FILE),
+                  {"version": BUNDLE_VERSION, "manifest_bytes": len(manifest)}, pretty=False)
+
+        # 旧版本数据包的整体清单
+        for legacy in LEGACY_FILES:
+            try:
+                os.remove(os.path.join(self.output_dir, legacy))
+            except OSError:
+                pass
+
+        stats["reports"] = len(entries)
+        logger.info(f"查看器数据包合并完成: 共{stats['reports']}份报告，新发布{stats['published']}份，"
+                    f"移除{stats['removed']}个片段")
+        return stats
+
+
+def publish_report(file_path: str, bundle: Optional[ViewerBundle] = None) -> Optional[Dict[str, Any]]:
+    """按VIEWER_BUNDLE配置发布一份汇总报告，尚未生成索引或追加的行数达到阈值时合并清单
+
+    Args:
+        file_path: 汇总报告路径
+        bundle: 数据包发布器，默认使用配置中的目录
+
+    Returns:
+        Optional[Dict[str, Any]]: 追加的清单行，未启用或内容未变化时返回None
+    """
+    if not VIEWER_BUNDLE.get('enabled', True):
+        return None
+
+    bundle = bundle or ViewerBundle()
+    pending = bundle.pending_lines()
+    if pending is None:
+        # 首次发布：一次性发布全部历史报告并生成索引
+        bundle.compact()
+        return None
+
+    entry = bundle.publish(file_path)
+    if entry is not None and pending + 1 >= bundle.compact_after:
+        bundle.compact()
+    return entry
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(ViewerBundle().compact())
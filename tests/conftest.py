@@ -0,0 +1,10 @@
+"""
+测试公共配置：将项目根目录加入模块搜索路径（config、src等按顶层模块导入）
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,121 @@
+"""
+建议索引：TOP3解析、汇总报告分节和加粗提及次数统计
+"""
+
+import os
+
+from src.utils.advice_index import (parse_top_recommendations, parse_advice_file, parse_mentions, refresh_index,
+                                    index_advice_file, mention_frequency, symbol_frequency, connect,
+                                    KIND_COMBINED, KIND_PLATFORM)
+
+TABLE_ADVICE = """## TOP3概览
+
+| 排名 | 项目名称 | 代码 | 总评分 |
+| --- | --- | --- | --- |
+| 1 | **Plume** | `PLUME` | **8.5** |
+| 2 | Safe | SAFE | 7.9 |
+| 3 | Aethir | ATH | 7.2 |
+| 4 | Grass | GRASS | 6.8 |
+
+**Plume (PLUME)** 具备RWA叙事，**Plume (PLUME)** 社区活跃。
+"""
+
+LEGACY_ADVICE = """### 1. Grass (GRASS)
+分析……提到 **Popcat (POPCAT)** 作为对比。
+### 2. Safe (SAFE)
+### 3. Grass (GRASS)
+### 4. Aethir (ATH)
+"""
+
+
+def test_table_rows_are_limited_to_top3_with_scores():
+    items = parse_top_recommendations(TABLE_ADVICE)
+    assert [(i["rank"], i["symbol"], i["name"], i["score"]) for i in items] == [
+        (1, "PLUME", "Plume", 8.5), (2, "SAFE", "Safe", 7.9), (3, "ATH", "Aethir", 7.2)]
+
+
+def test_legacy_format_uses_first_three_distinct_projects_in_order():
+    items = parse_top_recommendations(LEGACY_ADVICE)
+    assert [i["symbol"] for i in items] == ["GRASS", "POPCAT", "SAFE"]
+    assert all(i["score"] is None for i in items)
+
+
+def write(folder, name, content):
+    path = os.path.join(folder, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return path
+
+
+def test_combined_report_is_parsed_per_platform_section(tmp_path):
+    path = write(tmp_path, "advice_20250601.md",
+                 "# 汇总\n\n## Solana平台投资建议\n\n" + TABLE_ADVICE + "\n## Ethereum 平台\n\n" + LEGACY_ADVICE)
+    records = parse_advice_file(str(path), KIND_COMBINED)
+    assert [(r["platform"], r["symbol"]) for r in records] == [
+        ("Solana", "PLUME"), ("Solana", "SAFE"), ("Solana", "ATH"),
+        ("Ethereum", "GRASS"), ("Ethereum", "POPCAT"), ("Ethereum", "SAFE")]
+    assert {r["date"] for r in records} == {"2025-06-01"}
+    assert {r["template"] for r in records} == {"v3", "v2"}
+
+
+def test_mentions_count_every_bold_marker(tmp_path):
+    path = write(tmp_path, "advice_20250601.md", "**1. Plume (PLUME)**\n" + TABLE_ADVICE + LEGACY_ADVICE)
+    mentions = {m["symbol"]: (m["name"], m["count"]) for m in parse_mentions(str(path), KIND_COMBINED)}
+    assert mentions == {"PLUME": ("Plume", 3), "POPCAT": ("Popcat", 1)}
+    assert parse_mentions(str(path), KIND_PLATFORM) == []
+
+
+def test_index_refresh_is_incremental_and_keeps_both_counts(tmp_path, monkeypatch):
+    import src.utils.advice_index as advice_index
+
+    advices = tmp_path / "advices"
+    combined = advices / "all-platforms"
+    combined.mkdir(parents=True)
+    monkeypatch.setattr(advice_index, "ROOT_DIR", str(tmp_path))
+    monkeypatch.setitem(advice_index.DATA_DIRS, "advices", "advices")
+    monkeypatch.setitem(advice_index.DATA_DIRS, "all-platforms", "advices/all-platforms")
+    db_path = str(tmp_path / "index.db")
+
+    write(combined, "advice_20250601.md", "## Solana平台\n\n" + TABLE_ADVICE)
+    write(combined, "advice_20250602.md", "## Solana平台\n\n" + TABLE_ADVICE)
+    write(combined, "alpha_frequency_stats.md", "| Plume (PLUME) | 4 |")
+
+    assert refresh_index(db_path) == {"scanned": 2, "indexed": 2, "records": 6}
+    assert refresh_index(db_path)["indexed"] == 0
+
+    top3 = {r["symbol"]: r["count"] for r in symbol_frequency(KIND_COMBINED, db_path=db_path)}
+    assert top3 == {"PLUME": 2, "SAFE": 2, "ATH": 2}
+    mentions = mention_frequency(KIND_COMBINED, db_path=db_path)
+    assert [(m["symbol"], m["count"]) for m in mentions] == [("PLUME", 4)]
+    assert mention_frequency(KIND_COMBINED, since="2025-06-02", db_path=db_path)[0]["count"] == 2
+
+    # 内容变化的文件重新解析，旧的提及记录被替换
+    changed = write(combined, "advice_20250602.md", "## Solana平台\n\n" + LEGACY_ADVICE)
+    conn = connect(db_path)
+    try:
+        assert index_advice_file(changed, KIND_COMBINED, conn) == 3
+    finally:
+        conn.close()
+    counts = {m["symbol"]: m["count"] for m in mention_frequency(KIND_COMBINED, db_path=db_path)}
+    assert counts == {"PLUME": 2, "POPCAT": 1}
+
+
+def test_frequency_uses_latest_spelling_of_name(tmp_path):
+    db_path = str(tmp_path / "index.db")
+    old = write(tmp_path, "advice_20250601.md", "## Solana平台\n\n" + TABLE_ADVICE.replace("Plume", "PLUME"))
+    new = write(tmp_path, "advice_20250602.md", "## Solana平台\n\n" + TABLE_ADVICE)
+    conn = connect(db_path)
+    try:
+        for path in (new, old):
+            index_advice_file(path, KIND_COMBINED, conn)
+    finally:
+        conn.close()
+
+    def names(frequency, **window):
+        return {r["symbol"]: r["name"] for r in frequency(KIND_COMBINED, db_path=db_path, **window)}
+
+    assert names(symbol_frequency)["PLUME"] == "Plume"
+    assert names(mention_frequency)["PLUME"] == "Plume"
+    # 名称取窗口内最近的一次
+    assert names(symbol_frequency, until="2025-06-01")["PLUME"] == "PLUME"
+    assert names(mention_frequency, until="2025-06-01")["PLUME"] == "PLUME"
@@ -0,0 +1,68 @@
+"""
+推荐命中率回测：汇总报告按平台小节分别计算precision@k
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from src.utils.backtest import run_backtest, SECONDS_PER_DAY
+
+RUN_AT = "2025-06-01 00:00:00"
+START = int(datetime.strptime(RUN_AT, '%Y-%m-%d %H:%M:%S').timestamp())
+
+
+def rec(platform, rank, symbol, path="advices/all-platforms/advice_20250601.md", template="v3"):
+    return {"path": path, "run_at": RUN_AT, "date": RUN_AT[:10], "platform": platform, "rank": rank,
+            "symbol": symbol, "name": symbol, "score": None, "template": template}
+
+
+def listings(**listed_after_days):
+    """快照：推荐前一天、推荐后10天；参数为token -> 首次出现的快照序号"""
+    times = np.array([START - SECONDS_PER_DAY, START + 10 * SECONDS_PER_DAY])
+    tokens = sorted(listed_after_days)
+    presence = np.zeros((len(tokens), len(times)), dtype=bool)
+    for i, token in enumerate(tokens):
+        presence[i, listed_after_days[token]:] = True
+    return times, tokens, presence
+
+
+def by_platform(results):
+    return {row["platform"]: row for row in results}
+
+
+def test_combined_report_sections_are_separate_runs():
+    # 同一份汇总报告中：BNB Chain小节的TOP1命中，Ethereum小节无命中
+    recommendations = [
+        rec("BNB Chain", 1, "HIT"), rec("BNB Chain", 2, "B2"), rec("BNB Chain", 3, "B3"),
+        rec("Ethereum", 1, "E1"), rec("Ethereum", 2, "E2"), rec("Ethereum", 3, "E3"),
+    ]
+    results = by_platform(run_backtest(recommendations, *listings(HIT=1)))
+
+    assert results["BNB Chain"]["hits"] == 1
+    assert results["BNB Chain"]["precision@1"] == 1.0
+    assert results["BNB Chain"]["precision@3"] == 1 / 3
+    assert results["Ethereum"]["hits"] == 0
+    assert results["Ethereum"]["precision@1"] == 0.0
+    assert results["Ethereum"]["precision@3"] == 0.0
+
+
+def test_precision_ranks_within_evaluable_recommendations():
+    # TOP1推荐时已上线，不可评估；TOP2成为第一个可评估推荐
+    recommendations = [rec("Solana", 1, "OLD"), rec("Solana", 2, "HIT"), rec("Solana", 3, "S3")]
+    row = run_backtest(recommendations, *listings(OLD=0, HIT=1))[0]
+
+    assert row["evaluable"] == 2
+    assert row["precision@1"] == 1.0
+    assert row["precision@2"] == 0.5
+    assert row["precision@3"] == 0.5
+
+
+def test_runs_are_averaged_per_group():
+    recommendations = [
+        rec("Solana", 1, "HIT", path="a.md"), rec("Solana", 2, "S2", path="a.md"),
+        rec("Solana", 1, "S3", path="b.md"), rec("Solana", 2, "S4", path="b.md"),
+    ]
+    row = run_backtest(recommendations, *listings(HIT=1))[0]
+    assert row["precision@1"] == 0.5
+    assert row["precision@2"] == 0.25
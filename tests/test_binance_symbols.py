@@ -0,0 +1,131 @@
+"""
+exchangeInfo流式解析：任意分块边界下与完整JSON解析的结果一致，结构异常时回退；
+响应体流式写入缓存文件
+"""
+
+import json
+import os
+
+import pytest
+
+from src.utils.binance_symbols import (iter_exchange_symbols, parse_exchange_symbols, SYMBOL_FIELDS,
+                                       _SERVER_TIME_PATTERN)
+from src.utils.http_cache import HttpCache
+
+SYMBOLS = [
+    {"symbol": "ETHBTC", "status": "TRADING", "baseAsset": "ETH", "baseAssetPrecision": 8, "quoteAsset": "BTC",
+     "orderTypes": ["LIMIT", "MARKET"], "filters": [{"filterType": "PRICE_FILTER", "minPrice": "0.00001000"}],
+     "permissionSets": [["SPOT", "MARGIN"]]},
+    {"symbol": "1000SATSUSDT", "status": "TRADING", "baseAsset": "1000SATS", "quoteAsset": "USDT",
+     "filters": [{"filterType": "LOT_SIZE", "minQty": "1.00", "maxQty": "92141578.00"}]},
+    {"symbol": "LUNABUSD", "status": "BREAK", "baseAsset": "LUNA", "quoteAsset": "BUSD", "filters": []},
+]
+
+EXCHANGE_INFO = {
+    "timezone": "UTC",
+    "serverTime": 1748822400000,
+    "rateLimits": [{"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "limit": 6000}] * 8,
+    "exchangeFilters": [],
+    "symbols": SYMBOLS,
+}
+
+EXPECTED = [{field: s[field] for field in SYMBOL_FIELDS} for s in SYMBOLS]
+
+
+def chunked(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 17, 64, 1 << 20])
+def test_chunk_sizes_match_full_parse(indent, size):
+    body = json.dumps(EXCHANGE_INFO, indent=indent).encode()
+    assert list(iter_exchange_symbols(chunked(body, size))) == EXPECTED
+
+
+def test_every_two_chunk_split_point():
+    body = json.dumps(EXCHANGE_INFO, separators=(",", ":")).encode()
+    for split in range(1, len(body)):
+        records = list(iter_exchange_symbols([body[:split], body[split:]]))
+        assert records == EXPECTED, f"split at {split}: {body[split - 10:split + 10]!r}"
+
+
+def test_missing_field_raises():
+    broken = json.loads(json.dumps(EXCHANGE_INFO))
+    del broken["symbols"][1]["quoteAsset"]
+    body = json.dumps(broken).encode()
+    with pytest.raises(ValueError):
+        list(iter_exchange_symbols(chunked(body, 64)))
+
+
+class FakeExchangeInfo:
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode()
+
+    def iter_chunks(self, chunk_size: int = 65536):
+        return iter(chunked(self.body, 7))
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def test_parse_falls_back_to_json_when_stream_parse_fails():
+    assert parse_exchange_symbols(FakeExchangeInfo(EXCHANGE_INFO)) == EXPECTED
+
+    # 字段顺序不同（baseAsset在symbol之前）时流式解析会把字段归到错误的交易对，结构检查失败后回退
+    reordered = {"symbols": [{"baseAsset": s["baseAsset"], **{k: v for k, v in s.items() if k != "baseAsset"}}
+                             for s in SYMBOLS]}
+    assert parse_exchange_symbols(FakeExchangeInfo(reordered)) == EXPECTED
+    assert parse_exchange_symbols(FakeExchangeInfo({"symbols": []})) == []
+
+
+def make_cache(tmp_path):
+    cache = HttpCache("test_exchange_info", normalize=lambda body: _SERVER_TIME_PATTERN.sub(b'', body, count=1),
+                      cache_dir=str(tmp_path), normalize_prefix=4096)
+    cache.enabled = True
+    return cache
+
+
+def stream(cache, body, size=1000):
+    writer = cache.writer()
+    for chunk in chunked(body, size):
+        writer.write(chunk)
+    return writer.finish({"ETag": '"v1"'})
+
+
+def test_streamed_body_is_cached_on_disk_not_in_memory(tmp_path):
+    cache = make_cache(tmp_path)
+    body = json.dumps(EXCHANGE_INFO).encode()
+    fetch = stream(cache, body)
+
+    assert fetch.changed and fetch.digest == cache.digest_of(body)
+    assert fetch._body is None
+    assert parse_exchange_symbols(fetch) == EXPECTED
+    with open(cache.body_path, "rb") as f:
+        assert f.read() == body
+    assert cache.meta["size"] == len(body) and cache.meta["etag"] == '"v1"'
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_streamed_body_ignores_server_time_and_discards_unchanged(tmp_path):
+    cache = make_cache(tmp_path)
+    stream(cache, json.dumps(EXCHANGE_INFO).encode())
+    mtime = os.stat(cache.body_path).st_mtime_ns
+
+    later = dict(EXCHANGE_INFO, serverTime=EXCHANGE_INFO["serverTime"] + 60000)
+    fetch = stream(cache, json.dumps(later).encode(), size=3)
+    assert not fetch.changed
+    assert os.stat(cache.body_path).st_mtime_ns == mtime
+    assert sorted(os.listdir(tmp_path)) == ["test_exchange_info.body", "test_exchange_info.json"]
+
+    # 流式摘要与一次性计算的摘要一致（包括响应体短于规范化前缀的情况）
+    assert stream(cache, b'{"serverTime":1}').digest == cache.digest_of(b'{"serverTime":2}')
+
+
+def test_aborted_stream_leaves_cache_untouched(tmp_path):
+    cache = make_cache(tmp_path)
+    writer = cache.writer()
+    writer.write(b'{"symbols": [')
+    writer.abort()
+    assert os.listdir(tmp_path) == []
+    assert cache.meta == {}
@@ -0,0 +1,104 @@
+"""
+投资建议输入变化检测：实质变化评分、快照记录，以及被截断的建议不更新快照
+"""
+
+import importlib
+
+import pytest
+
+from src.ai.alpha_advisor import TRUNCATED_MARKER
+from src.utils.alpha_project import AlphaProject
+from src.utils.change_detection import ChangeDetector, platform_snapshot, score_change
+
+THRESHOLDS = {'min_score': 3.0, 'membership_weight': 3.0, 'rank_threshold': 3, 'rank_weight': 1.0,
+              'volume_threshold': 0.5, 'volume_weight': 1.0}
+
+
+def project(symbol: str, market_cap: float, volume: float = 1000.0) -> AlphaProject:
+    return AlphaProject(hash(symbol) % 100000, symbol, symbol, 1, "BNB Smart Chain (BEP20)", (),
+                        price=1.0, volume_24h=volume, usd_market_cap=market_cap)
+
+
+def snapshot(symbols, volumes=None):
+    return {"symbols": list(symbols), "volumes": list(volumes or [1000.0] * len(symbols))}
+
+
+def test_membership_change_is_material():
+    change = score_change("BSC", snapshot("ABC"), snapshot("ABD"), THRESHOLDS)
+    assert change.added == ["D"] and change.removed == ["C"]
+    assert change.score == 6.0 and change.material
+
+
+def test_small_volume_drift_is_not_material():
+    change = score_change("BSC", snapshot("ABC", [100, 100, 100]), snapshot("ABC", [120, 90, 100]), THRESHOLDS)
+    assert change.score == 0 and not change.material
+
+
+def test_rank_moves_and_volume_shifts_accumulate():
+    previous = snapshot("ABCDE", [100] * 5)
+    current = snapshot("EBCDA", [100, 100, 100, 100, 300])
+    change = score_change("BSC", previous, current, THRESHOLDS)
+    assert change.moved == {"E": 4, "A": -4}
+    assert change.volume_shifts == {"A": 2.0}
+    assert change.score == 3.0 and change.material
+
+
+def test_record_and_previous_advice(tmp_path):
+    advice_file = tmp_path / "advice.md"
+    advice_file.write_text("# 建议", encoding="utf-8")
+    path = str(tmp_path / "inputs.json")
+    projects = {"BSC": [project("AAA", 3e6), project("BBB", 2e6)]}
+
+    detector = ChangeDetector(path=path, enabled=True)
+    change = detector.evaluate(projects)["BSC"]
+    assert change.material and change.reason
+    detector.record(change, str(advice_file))
+
+    reloaded = ChangeDetector(path=path, enabled=True)
+    assert not reloaded.evaluate(projects)["BSC"].material
+    assert reloaded.previous_advice("BSC") == "# 建议"
+    assert reloaded.state["platforms"]["BSC"]["symbols"] == platform_snapshot(projects["BSC"])["symbols"]
+
+
+class _Ledger:
+    def __init__(self):
+        self.delivered = []
+
+    def mark_delivered(self, call_id):
+        self.delivered.append(call_id)
+
+
+@pytest.fixture
+def main_module(tmp_path, monkeypatch):
+    # main模块导入时在当前目录创建日志文件
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("main")
+
+
+def test_truncated_advice_is_not_saved_or_recorded(tmp_path, main_module):
+    detector = ChangeDetector(path=str(tmp_path / "inputs.json"), enabled=True)
+    change = detector.evaluate({"BSC": [project("AAA", 3e6)]})["BSC"]
+    ledger = _Ledger()
+
+    advice_file = main_module.save_platform_advice(str(tmp_path), "bsc", f"{TRUNCATED_MARKER}，请稍后重试",
+                                                   7, ledger, detector, change)
+
+    assert advice_file is None
+    assert not list(tmp_path.glob("advice_*.md"))
+    assert ledger.delivered == []
+    assert "BSC" not in detector.state["platforms"]
+    # 下一次运行仍视为有实质变化
+    assert detector.evaluate({"BSC": [project("AAA", 3e6)]})["BSC"].material
+
+
+def test_complete_advice_is_saved_and_recorded(tmp_path, main_module, monkeypatch):
+    monkeypatch.setattr(main_module, "index_advice_file", lambda *args, **kwargs: None)
+    detector = ChangeDetector(path=str(tmp_path / "inputs.json"), enabled=True)
+    change = detector.evaluate({"BSC": [project("AAA", 3e6)]})["BSC"]
+    ledger = _Ledger()
+
+    advice_file = main_module.save_platform_advice(str(tmp_path), "bsc", "# 完整建议", 7, ledger, detector, change)
+
+    assert advice_file and open(advice_file, encoding="utf-8").read() == "# 完整建议"
+    assert ledger.delivered == [7]
+    assert detector.previous_advice("BSC") == "# 完整建议"
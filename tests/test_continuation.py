@@ -0,0 +1,111 @@
+"""
+截断回答的续写与max_tokens自适应
+"""
+
+from src.ai.alpha_advisor import AlphaAdvisor
+from src.ai.continuation import (MaxTokensTuner, condense_reasoning, continuation_prompt, merge_responses,
+                                 CONTINUE_INSTRUCTION)
+from src.ai.model_router import ModelBackend, ModelResponse, CallUsage
+from src.utils.serialization import dump_file
+from src.utils.tracing import _NullSpan
+
+
+def backend(name: str, model: str, max_tokens: int) -> ModelBackend:
+    return ModelBackend({"name": name, "api_url": "http://localhost", "model": model, "max_tokens": max_tokens})
+
+
+def response(tokens: int, finish_reason: str = "stop", model: str = "deepseek-chat", content: str = "答案",
+             reasoning: str = "") -> ModelResponse:
+    return ModelResponse("deepseek_fallback", model, content, reasoning, {"completion_tokens": tokens}, 1.0,
+                         finish_reason)
+
+
+def test_tuned_max_tokens_never_exceeds_backend_limit():
+    tuner = MaxTokensTuner(path="", enabled=True)
+    fallback = backend("deepseek_fallback", "deepseek-chat", 8000)
+    for tokens in (3000, 3500, 4000):
+        tuner.observe("BSC", response(tokens))
+    assert tuner.max_tokens("BSC", fallback) == 8000
+
+
+def test_tuned_max_tokens_follows_p95_within_floor_and_cap():
+    tuner = MaxTokensTuner(path="", enabled=True)
+    reasoner = backend("deepseek", "deepseek-reasoner", 32000)
+    assert tuner.max_tokens("BSC", reasoner) == 32000  # 样本不足
+    for tokens in (12000, 14000, 20000):
+        tuner.observe("BSC", response(tokens, model="deepseek-reasoner"))
+    assert tuner.max_tokens("BSC", reasoner) == 26000  # 20000 * 1.3
+    small = MaxTokensTuner(path="", enabled=True)
+    for tokens in (1000, 1200, 1500):
+        small.observe("BSC", response(tokens, model="deepseek-reasoner"))
+    assert small.max_tokens("BSC", reasoner) == 16000  # 下限
+
+
+def test_truncated_samples_record_actual_usage_and_keep_cap():
+    tuner = MaxTokensTuner(path="", enabled=True)
+    reasoner = backend("deepseek", "deepseek-reasoner", 32000)
+    for tokens in (12000, 13000):
+        tuner.observe("BSC", response(tokens, model="deepseek-reasoner"))
+    tuner.observe("BSC", response(32000, "length", model="deepseek-reasoner"))
+    entry = tuner.samples["BSC|deepseek-reasoner"]
+    assert entry == {"tokens": [12000, 13000, 32000], "truncated": [False, False, True]}
+    assert tuner.max_tokens("BSC", reasoner) == 32000
+
+
+def test_samples_persist_and_legacy_format_loads(tmp_path):
+    path = str(tmp_path / "max_tokens.json")
+    dump_file(path, {"BSC|deepseek-chat": [3000, 3500, 4000]})
+    tuner = MaxTokensTuner(path=path, enabled=True)
+    assert tuner.samples["BSC|deepseek-chat"]["truncated"] == [False, False, False]
+    tuner.observe("BSC", response(5000, "length"))
+    reloaded = MaxTokensTuner(path=path, enabled=True)
+    assert reloaded.samples["BSC|deepseek-chat"]["tokens"][-1] == 5000
+    assert reloaded.samples["BSC|deepseek-chat"]["truncated"][-1] is True
+
+
+def test_continuation_prompt_uses_partial_answer_or_reasoning_summary():
+    partial = continuation_prompt("提示词", response(100, "length", content="一、总结"))
+    assert partial[-2] == {"role": "assistant", "content": "一、总结"}
+    assert partial[-1]["content"] == CONTINUE_INSTRUCTION
+
+    reasoning_only = continuation_prompt("提示词", response(100, "length", content="", reasoning="推理" * 10))
+    assert isinstance(reasoning_only, str) and "推理推理" in reasoning_only
+
+    long_reasoning = "开头" + "x" * 10000 + "结论"
+    condensed = condense_reasoning(long_reasoning, limit=400)
+    assert condensed.startswith("开头") and condensed.endswith("结论") and len(condensed) < 420
+
+
+def test_merge_responses_concatenates_content():
+    merged = merge_responses(response(100, "length", content="前半"), response(50, "stop", content="后半"))
+    assert merged.content == "前半后半"
+    assert not merged.truncated
+    assert merged.latency == 2.0
+
+
+class _Router:
+    """按顺序返回预设响应的路由器"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def backend(self, name):
+        return object() if name == "deepseek_fallback" else None
+
+    def complete(self, prompt, backends=None, usage=None, max_tokens=None, **kwargs):
+        self.calls.append((prompt, backends, max_tokens))
+        return self.responses.pop(0)
+
+
+def test_truncated_answer_is_continued_not_regenerated():
+    advisor = AlphaAdvisor.__new__(AlphaAdvisor)
+    advisor.router = _Router([response(100, "length", content="中段"), response(100, "stop", content="结尾")])
+    first = response(8000, "length", content="开头")
+
+    merged, continued = advisor._continue_truncated("提示词", first, CallUsage(), _NullSpan())
+
+    assert continued and merged.content == "开头中段结尾" and not merged.truncated
+    assert len(advisor.router.calls) == 2
+    # 第二轮续写带上合并后的部分回答
+    assert advisor.router.calls[1][0][-2]["content"] == "开头中段"
@@ -0,0 +1,93 @@
+"""
+模型路由：后端排序、错误率衰减和截断响应的处理
+"""
+
+import itertools
+import time
+
+from src.ai.model_router import (ModelRouter, ModelResponse, BackendStats, ROUTE_PRIORITY, ROUTE_FASTEST)
+from src.utils.resilience import PermanentError
+
+_names = itertools.count()
+
+
+def make_router(policy: str, *names: str) -> ModelRouter:
+    # 每个测试使用独立的容错策略名称，熔断器状态互不影响
+    suffix = next(_names)
+    settings = [{"name": name, "endpoint": f"test_{name}_{suffix}", "api_url": "http://localhost", "model": name}
+                for name in names]
+    return ModelRouter(backends=settings, policy=policy, stats_path="")
+
+
+def fake(backend, content="x" * 200, finish_reason="stop", fail=False, calls=None):
+    def request(prompt, timeout, usage=None, max_tokens=None):
+        if calls is not None:
+            calls.append(backend.name)
+        if fail:
+            backend._observe(0.1, False)
+            raise PermanentError("http_error_400")
+        backend._observe(0.1, True, 100)
+        return ModelResponse(backend.name, backend.model, content, "", {"completion_tokens": 100}, 0.1, finish_reason)
+    backend.request = request
+
+
+def test_priority_keeps_configured_order_despite_faster_fallback():
+    router = make_router(ROUTE_PRIORITY, "reasoner", "fallback")
+    router.backend("reasoner").stats.observe(120.0, True, 0.3)
+    router.backend("fallback").stats.observe(5.0, True, 0.3)
+    assert [b.name for b in router.ranked("提示词")] == ["reasoner", "fallback"]
+
+    fastest = make_router(ROUTE_FASTEST, "reasoner", "fallback")
+    fastest.backend("reasoner").stats.observe(120.0, True, 0.3)
+    fastest.backend("fallback").stats.observe(5.0, True, 0.3)
+    assert [b.name for b in fastest.ranked("提示词")] == ["fallback", "reasoner"]
+
+
+def test_unhealthy_backend_is_demoted_then_recovers_as_error_rate_decays():
+    router = make_router(ROUTE_PRIORITY, "reasoner", "fallback")
+    stats = router.backend("reasoner").stats
+    now = time.time()
+    for _ in range(3):
+        stats.observe(1.0, False, 0.3, now=now - 7200)
+    assert stats.error_ewma > 0.5
+    # 失败发生在两小时前（4个半衰期），衰减后重新视为健康
+    assert stats.error_rate(now) < 0.1
+    assert [b.name for b in router.ranked("提示词")] == ["reasoner", "fallback"]
+
+    for _ in range(3):
+        stats.observe(1.0, False, 0.3)
+    assert [b.name for b in router.ranked("提示词")] == ["fallback", "reasoner"]
+
+
+def test_error_rate_decay_continues_from_decayed_value_and_persists():
+    stats = BackendStats()
+    stats.observe(1.0, False, 0.5, now=1000.0)
+    assert stats.error_ewma == 0.5
+    assert stats.error_rate(1000.0 + 1800) == 0.25
+    stats.observe(1.0, True, 0.5, now=1000.0 + 1800)
+    assert stats.error_ewma == 0.125
+
+    restored = BackendStats()
+    restored.load(stats.to_dict())
+    assert restored.last_attempt == stats.last_attempt
+    assert restored.error_rate(5000.0) == stats.error_rate(5000.0)
+
+
+def test_failure_falls_through_to_next_backend():
+    router = make_router(ROUTE_PRIORITY, "reasoner", "fallback")
+    calls = []
+    fake(router.backend("reasoner"), fail=True, calls=calls)
+    fake(router.backend("fallback"), calls=calls)
+    result = router.complete("提示词", max_attempts=1)
+    assert result.backend == "fallback"
+    assert calls == ["reasoner", "fallback"]
+
+
+def test_truncated_response_is_returned_without_regenerating():
+    router = make_router(ROUTE_PRIORITY, "reasoner", "fallback")
+    calls = []
+    fake(router.backend("reasoner"), content="一、总结", finish_reason="length", calls=calls)
+    fake(router.backend("fallback"), calls=calls)
+    result = router.complete("提示词", max_attempts=1)
+    assert result.truncated and result.backend == "reasoner"
+    assert calls == ["reasoner"]
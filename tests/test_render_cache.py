@@ -0,0 +1,58 @@
+"""
+渲染缓存：缓存键包含视图和最大项目数量，推送后差异视图的缓存失效
+"""
+
+import asyncio
+
+from src.utils.render_cache import RenderCache, VIEW_FULL, VIEW_DIFF
+
+
+class FakeRenderer:
+    def __init__(self):
+        self.calls = []
+
+    async def render_rows(self, rows, max_items=None):
+        self.calls.append((len(rows), max_items))
+        return f"{len(self.calls)}".encode()
+
+
+def row(symbol, listed="否"):
+    return {"代码": symbol, "是否上线": listed}
+
+
+def render(cache, renderer, rows, view=VIEW_FULL, max_items=None):
+    return asyncio.run(cache.render(renderer, "alpha_list", rows, view=view, max_items=max_items))
+
+
+def test_same_rows_reuse_image_only_for_same_view_and_max_items(tmp_path):
+    cache = RenderCache(str(tmp_path), enabled=True)
+    renderer = FakeRenderer()
+    rows = [row("A"), row("B")]
+
+    assert not render(cache, renderer, rows, max_items=100).cached
+    assert render(cache, renderer, rows, max_items=100).cached
+    assert not render(cache, renderer, rows, max_items=10).cached
+    assert renderer.calls == [(2, 100), (2, 10)]
+
+    # 没有推送记录时差异视图退化为完整表格，但与完整视图的缓存键不同
+    table = render(cache, renderer, rows, view=VIEW_DIFF, max_items=10)
+    assert not table.cached and table.view == VIEW_FULL
+
+
+def test_diff_image_is_stale_after_push(tmp_path):
+    cache = RenderCache(str(tmp_path), enabled=True)
+    renderer = FakeRenderer()
+    first, second = [row("A"), row("B")], [row("B"), row("A")]
+
+    cache.mark_pushed(render(cache, renderer, first, view=VIEW_DIFF))
+    diff = render(cache, renderer, second, view=VIEW_DIFF)
+    assert diff.view == VIEW_DIFF and diff.changed
+    assert render(cache, renderer, second, view=VIEW_DIFF).cached
+
+    # 差异图片是相对first渲染的，推送second后不能再复用
+    cache.mark_pushed(diff)
+    again = render(cache, renderer, second, view=VIEW_DIFF)
+    assert not again.cached and not again.changed
+    assert again.view == VIEW_FULL
+    assert render(cache, renderer, second, view=VIEW_DIFF).cached
+    assert len(renderer.calls) == 3
@@ -0,0 +1,167 @@
+"""
+容错策略：熔断器状态转换、半开试探名额的释放和非幂等请求超时不重试
+"""
+
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+import webhook
+from src.utils.resilience import (ResiliencePolicy, CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+                                  RetryableError, AmbiguousOutcomeError, deadline_scope,
+                                  STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN)
+
+
+def make_policy(**kwargs) -> ResiliencePolicy:
+    options = dict(max_attempts=3, base_delay=0.0, max_delay=0.0, failure_threshold=2, reset_timeout=0.05)
+    options.update(kwargs)
+    return ResiliencePolicy("test", **options)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_and_half_opens_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == STATE_HALF_OPEN
+    # 半开状态只放行一个试探请求
+    assert not breaker.allow()
+
+
+def test_half_open_probe_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+    assert breaker.allow() and breaker.allow()
+
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == STATE_OPEN
+    assert not breaker.allow()
+
+
+def test_expired_deadline_does_not_take_half_open_probe():
+    policy = make_policy()
+    trip(policy.breaker)
+    time.sleep(0.06)
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            policy.call(lambda timeout: "ok")
+    # 截止时间已到的调用没有占用试探名额，下一次调用可以正常试探
+    assert policy.call(lambda timeout: "ok") == "ok"
+    assert policy.breaker.state == STATE_CLOSED
+
+
+def test_cancelled_probe_is_released():
+    policy = make_policy()
+    trip(policy.breaker)
+    time.sleep(0.06)
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    async def ok(timeout):
+        return "ok"
+
+    async def run():
+        task = asyncio.create_task(policy.call_async(hang))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await policy.call_async(ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert policy.breaker.state == STATE_CLOSED
+
+
+def test_interrupted_sync_probe_is_released():
+    policy = make_policy()
+    trip(policy.breaker)
+    time.sleep(0.06)
+
+    def interrupted(timeout):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        policy.call(interrupted)
+    assert policy.call(lambda timeout: "ok") == "ok"
+
+
+def test_retryable_errors_are_retried_and_open_breaker_short_circuits():
+    policy = make_policy(failure_threshold=5)
+    calls = []
+
+    def flaky(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise RetryableError("503")
+        return "ok"
+
+    assert policy.call(flaky) == "ok"
+    assert len(calls) == 3
+
+    trip(policy.breaker)
+    with pytest.raises(CircuitOpenError):
+        policy.call(flaky)
+
+
+def test_ambiguous_outcome_counts_as_failure_without_retry():
+    policy = make_policy()
+    calls = []
+
+    async def sent_then_timed_out(timeout):
+        calls.append(timeout)
+        raise AmbiguousOutcomeError("read timeout")
+
+    with pytest.raises(AmbiguousOutcomeError):
+        asyncio.run(policy.call_async(sent_then_timed_out))
+    assert len(calls) == 1
+    assert policy.breaker.consecutive_failures == 1
+
+
+class _TimeoutSession:
+    def __init__(self, error):
+        self.error = error
+        self.posts = 0
+
+    def post(self, *args, **kwargs):
+        self.posts += 1
+        raise self.error
+
+
+async def _handle(response):
+    return True
+
+
+def test_webhook_read_timeout_is_not_retried():
+    session = _TimeoutSession(asyncio.TimeoutError())
+    with pytest.raises(AmbiguousOutcomeError):
+        asyncio.run(webhook._post_once(session, {}, {}, None, 1.0, _handle))
+
+
+@pytest.mark.skipif(not hasattr(aiohttp, "ConnectionTimeoutError"), reason="aiohttp未区分连接超时")
+def test_webhook_connect_timeout_stays_retryable():
+    session = _TimeoutSession(aiohttp.ConnectionTimeoutError())
+    with pytest.raises(aiohttp.ConnectionTimeoutError):
+        asyncio.run(webhook._post_once(session, {}, {}, None, 1.0, _handle))
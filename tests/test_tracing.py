@@ -0,0 +1,63 @@
+"""
+运行追踪：嵌套和并发span中的性能剖析
+"""
+
+import asyncio
+
+from src.utils.tracing import Tracer
+
+
+def make_tracer(tmp_path, **kwargs) -> Tracer:
+    return Tracer(enabled=True, trace_dir=str(tmp_path), prometheus_file="", **kwargs)
+
+
+def test_nested_spans_profile_only_outermost(tmp_path):
+    tracer = make_tracer(tmp_path, profiler="cprofile", profile_stages=[])
+    with tracer.span("run") as outer:
+        with tracer.span("token_refresh") as inner:
+            with tracer.span("exchange_info"):
+                sum(range(1000))
+    assert "profile" in outer.attributes
+    assert "profile" not in inner.attributes
+    assert all(span.status == "ok" for span in tracer.spans)
+    assert len(list((tmp_path / "profiles").glob("*.prof"))) == 1
+
+    # 最外层结束后剖析器已释放，下一个阶段可以再次剖析
+    with tracer.span("render") as again:
+        pass
+    assert "profile" in again.attributes
+
+
+def test_concurrent_tasks_share_single_profiler(tmp_path):
+    tracer = make_tracer(tmp_path, profiler="cprofile", profile_stages=["stage"])
+
+    async def stage(index: int):
+        with tracer.span("stage", index=index) as span:
+            await asyncio.sleep(0.01)
+            return span
+
+    async def run():
+        return await asyncio.gather(*(stage(i) for i in range(3)))
+
+    spans = asyncio.run(run())
+    assert sum("profile" in span.attributes for span in spans) == 1
+    assert all(span.status == "ok" for span in spans)
+
+
+def test_profiler_start_failure_does_not_fail_stage(tmp_path, monkeypatch):
+    import cProfile
+
+    def broken_enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile.Profile, "enable", broken_enable)
+    tracer = make_tracer(tmp_path, profiler="cprofile")
+    with tracer.span("run") as span:
+        pass
+    assert span.status == "ok"
+    assert "profile" not in span.attributes
+
+    monkeypatch.undo()
+    with tracer.span("run") as span:
+        pass
+    assert "profile" in span.attributes
@@ -0,0 +1,82 @@
+"""
+趋势特征：分位数计算、窗口特征和趋势预评分
+"""
+
+import numpy as np
+
+from src.utils.trend_features import _percentile, compute_features, TrendFeatures, DAY
+
+nan = np.nan
+
+
+def test_percentile_orders_values_and_averages_ties():
+    result = _percentile(np.array([3.0, 1.0, 1.0, nan, 2.0]))
+    np.testing.assert_allclose(result[[0, 1, 2, 4]], [1.0, 1 / 6, 1 / 6, 2 / 3])
+    assert np.isnan(result[3])
+
+
+def test_percentile_single_and_empty_inputs():
+    np.testing.assert_array_equal(_percentile(np.array([nan, 5.0])), [nan, 0.5])
+    assert np.isnan(_percentile(np.array([nan, nan]))).all()
+
+
+def make_history():
+    times = np.arange(5) * DAY
+    price = np.array([
+        [10.0, 10.1, 10.0, 10.1, 10.0],   # 稳定
+        [10.0, 14.0, 8.0, 12.0, 7.0],     # 剧烈波动
+        [nan, nan, nan, 5.0, 5.0],        # 快照不足
+    ])
+    volume = np.array([
+        [100.0, 100.0, 100.0, 100.0, 100.0],
+        [10.0, 10.0, 10.0, 10.0, 1000.0],  # 单次放量
+        [nan, nan, nan, 50.0, 50.0],
+    ])
+    rank = np.array([
+        [100.0, 90.0, 80.0, 70.0, 60.0],
+        [50.0, 55.0, 60.0, 65.0, 70.0],
+        [nan, nan, nan, 300.0, 300.0],
+    ])
+    return times, price, volume, rank
+
+
+def test_window_features():
+    values = compute_features(*make_history(), window_days=7, min_snapshots=3)
+    np.testing.assert_array_equal(values["snapshots"], [5, 5, 2])
+    np.testing.assert_allclose(values["days_on_alpha"], [4.0, 4.0, 1.0])
+    np.testing.assert_array_equal(values["before_records"], [True, True, False])
+
+    np.testing.assert_allclose(values["volume_persistence"][:2], [1.0, 0.2])
+    np.testing.assert_allclose(values["rank_velocity"][:2], [10.0, -5.0])
+    np.testing.assert_allclose(values["max_drawdown"][:2], [(1 - 10.0 / 10.1) * 100, 50.0], rtol=1e-6)
+    assert values["realized_volatility"][0] < values["realized_volatility"][1]
+
+    # 快照不足的项目不计算窗口特征和预评分
+    for name in ("volume_persistence", "realized_volatility", "max_drawdown", "rank_velocity", "pre_score"):
+        assert np.isnan(values[name][2])
+
+
+def test_pre_score_uses_percentiles_with_lower_is_better_features_inverted():
+    values = compute_features(*make_history(), window_days=7, min_snapshots=3)
+    # 稳定项目的每个特征都优于波动项目：分位数均为1和0
+    np.testing.assert_allclose(values["pre_score"][:2], [10.0, 0.0])
+
+    weights = {"realized_volatility": 1.0, "max_drawdown": 0.0}
+    only_volatility = compute_features(*make_history(), window_days=7, min_snapshots=3, weights=weights)
+    np.testing.assert_allclose(only_volatility["pre_score"][:2], [10.0, 0.0])
+
+
+def test_window_excludes_old_snapshots():
+    times, price, volume, rank = make_history()
+    values = compute_features(times, price, volume, rank, window_days=1.5, min_snapshots=2)
+    np.testing.assert_array_equal(values["snapshots"], [2, 2, 2])
+    # 窗口外的历史仍用于在Alpha天数和最大回撤
+    np.testing.assert_allclose(values["days_on_alpha"], [4.0, 4.0, 1.0])
+    np.testing.assert_allclose(values["max_drawdown"][1], 50.0)
+
+
+def test_describe_formats_features():
+    trend = TrendFeatures(5, 4.0, True, 1.0, 0.5, 0.99, -0.04, 7.25)
+    assert trend.describe() == ("在Alpha ≥4.0天 | 放量持续性 1.00 | 日波动率 0.50% | 最大回撤 0.99% | "
+                                "排名变化 +0.0名/天 | 趋势预评分 7.2/10")
+    assert TrendFeatures(2, 1.0, False).describe() == "在Alpha 1.0天 | 快照不足（2份）"
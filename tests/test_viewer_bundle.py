@@ -0,0 +1,63 @@
+"""
+查看器数据包：发布时只读取合并状态和清单末尾，不加载倒排索引
+"""
+
+import os
+
+from src.utils.serialization import load_file
+from src.utils.viewer_bundle import ViewerBundle, publish_report, SEARCH_FILE, STATE_FILE
+
+REPORT = """# 币安Alpha项目投资建议 ({date})
+
+## Solana平台投资建议
+
+| 排名 | 项目名称 | 代码 | 总评分 |
+| --- | --- | --- | --- |
+| 1 | Plume | PLUME | 8.5 |
+"""
+
+
+def write_report(source_dir, date):
+    path = os.path.join(source_dir, f"advice_{date.replace('-', '')}.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(REPORT.format(date=date))
+    return path
+
+
+def make_bundle(tmp_path):
+    source_dir = tmp_path / "all-platforms"
+    source_dir.mkdir()
+    return ViewerBundle(str(source_dir), str(tmp_path / "bundle"), compression=[], compact_after=3)
+
+
+def test_publish_reads_state_instead_of_search_index(tmp_path, monkeypatch):
+    bundle = make_bundle(tmp_path)
+    assert publish_report(write_report(bundle.source_dir, "2025-06-01"), bundle) is None
+    assert bundle.pending_lines() == 0
+    state = load_file(os.path.join(bundle.output_dir, STATE_FILE))
+    assert state["manifest_bytes"] == os.path.getsize(bundle.manifest_path)
+
+    def fail():
+        raise AssertionError("发布时不应加载search.json")
+
+    monkeypatch.setattr(bundle, "_load_search", fail)
+    assert publish_report(write_report(bundle.source_dir, "2025-06-02"), bundle)["id"] == "advice_20250602"
+    assert publish_report(write_report(bundle.source_dir, "2025-06-03"), bundle) is not None
+    assert bundle.pending_lines() == 2
+    monkeypatch.undo()
+
+    # 达到compact_after后合并，状态随之更新
+    publish_report(write_report(bundle.source_dir, "2025-06-04"), bundle)
+    assert bundle.pending_lines() == 0
+    search = load_file(os.path.join(bundle.output_dir, SEARCH_FILE))
+    assert search["index"]["plume"] == ["advice_20250604", "advice_20250603", "advice_20250602", "advice_20250601"]
+
+
+def test_bundle_without_state_file_is_migrated_from_search_index(tmp_path):
+    bundle = make_bundle(tmp_path)
+    publish_report(write_report(bundle.source_dir, "2025-06-01"), bundle)
+    bundle.publish(write_report(bundle.source_dir, "2025-06-02"))
+    os.remove(os.path.join(bundle.output_dir, STATE_FILE))
+
+    assert bundle.pending_lines() == 1
+    assert os.path.exists(os.path.join(bundle.output_dir, STATE_FILE))
@@ -1,15 +1,48 @@
-import aiohttp
 import asyncio
 import base64
 import os
 import hashlib
-from config import WEBHOOK_URL, PROXY_URL, USE_PROXY
+import aiohttp
+from config import WEBHOOK_URL
+from src.utils.tracing import span
+from src.utils.http_client import get_async_session, resolve_proxy, build_timeout
+from src.utils.resilience import (get_policy, is_retryable_status, parse_retry_after, ResilienceError,
+                                  RetryableError, PermanentError, AmbiguousOutcomeError)
+
+# 连接阶段的超时（请求尚未发出，可以安全重试）；旧版aiohttp没有单独的连接超时异常，所有超时都不重试
+CONNECT_TIMEOUT_ERRORS = getattr(aiohttp, "ConnectionTimeoutError", ())
+
+def _raise_for_status(status, message, retry_after=None):
+    """按状态码抛出可重试或不可重试的异常"""
+    if is_retryable_status(status):
+        raise RetryableError(f"{status}, {message}", parse_retry_after(retry_after))
+    raise PermanentError(f"{status}, {message}")
+
+async def _post_once(session, payload, headers, proxy, timeout, handle):
+    """发送一次webhook推送，推送不是幂等的：请求发出后等待响应超时不再重试，避免重复消息
+    
+    Args:
+        session: 共享的aiohttp会话
+        payload: 请求体
+        headers: 请求头
+        proxy: 代理设置
+        timeout: 读取超时（秒）
+        handle: 处理响应的协程函数
+    """
+    try:
+        async with session.post(WEBHOOK_URL, json=payload, headers=headers, proxy=proxy,
+                                timeout=build_timeout(timeout)) as response:
+            return await handle(response)
+    except asyncio.TimeoutError as e:
+        if isinstance(e, CONNECT_TIMEOUT_ERRORS):
+            raise
+        raise AmbiguousOutcomeError(f"等待响应超时，消息可能已送达，不再重试: {type(e).__name__}") from e
 
 async def _send_single_message(session, content, headers, proxy, msg_type="text"):
     """发送单条消息
     
     Args:
-        session: aiohttp会话
+        session: 共享的aiohttp会话
         content: 消息内容
         headers: 请求头
         proxy: 代理设置
@@ -33,14 +66,21 @@ async def _send_single_message(session, content, headers, proxy, msg_type="text"
         print(f"不支持的消息类型: {msg_type}")
         return False
     
+    async def handle(response):
+        if response.status == 200:
+            return True
+        _raise_for_status(response.status, await response.text(), response.headers.get("Retry-After"))
+    
+    async def attempt(timeout):
+        return await _post_once(session, payload, headers, proxy, timeout, handle)
+    
     try:
-        async with session.post(WEBHOOK_URL, json=payload, headers=headers, proxy=proxy) as response:
-            if response.status == 200:
-                print(f"消息片段发送成功! (长度: {len(content)})")
-                return True
-            else:
-                print(f"消息片段发送失败: {response.status}, {await response.text()}")
-                return False
+        await get_policy("webhook").call_async(attempt)
+        print(f"消息片段发送成功! (长度: {len(content)})")
+        return True
+    except ResilienceError as e:
+        print(f"消息片段发送失败: {str(e)}")
+        return False
     except Exception as e:
         print(f"消息片段发送出错: {str(e)}")
         return False
@@ -49,7 +89,7 @@ async def _send_image(session, image_path=None, image_base64=None, headers=None,
     """发送图片消息
     
     Args:
-        session: aiohttp会话
+        session: 共享的aiohttp会话
         image_path: 图片路径
         image_base64: 图片base64编码，优先使用
         headers: 请求头
@@ -97,21 +137,32 @@ async def _send_image(session, image_path=None, image_base64=None, headers=None,
         }
     }
     
+    async def handle(response):
+        response_text = await response.text()
+        if response.status != 200:
+            _raise_for_status(response.status, f"响应: {response_text}",
+                              response.headers.get("Retry-After"))
+        response_json = await response.json()
+        errcode = response_json.get("errcode")
+        if errcode == 0:
+            return True
+        message = f"错误码 {errcode}, 错误信息: {response_json.get('errmsg')}"
+        # 45009: 接口调用超过频率限制
+        if errcode == 45009:
+            raise RetryableError(message)
+        raise PermanentError(message)
+    
+    async def attempt(timeout):
+        return await _post_once(session, payload, headers, proxy, timeout, handle)
+    
     # 尝试发送
     try:
-        async with session.post(WEBHOOK_URL, json=payload, headers=headers, proxy=proxy) as response:
-            response_text = await response.text()
-            if response.status == 200:
-                response_json = await response.json()
-                if response_json.get("errcode") == 0:
-                    print(f"图片消息发送成功!")
-                    return True
-                else:
-                    print(f"图片消息发送失败: 错误码 {response_json.get('errcode')}, 错误信息: {response_json.get('errmsg')}")
-                    return False
-            else:
-                print(f"图片消息发送失败: 状态码 {response.status}, 响应: {response_text}")
-                return False
+        await get_policy("webhook").call_async(attempt)
+        print(f"图片消息发送成功!")
+        return True
+    except ResilienceError as e:
+        print(f"图片消息发送失败: {str(e)}")
+        return False
     except Exception as e:
         print(f"图片消息发送出错: {str(e)}")
         return False
@@ -180,20 +231,24 @@ async def send_message_async(message_content, msg_type="text"):
         print(f"消息将被分成 {total_segments} 段发送")
     
     headers = {'Content-Type': 'application/json'}
-    proxy = PROXY_URL if USE_PROXY else None
+    proxy = resolve_proxy()
     
-    async with aiohttp.ClientSession() as session:
+    with span("webhook_push", msg_type=msg_type, segments=total_segments) as stage:
+        session = await get_async_session()
         for i, segment in enumerate(segments):
             # 发送消息片段
             success = await _send_single_message(session, segment, headers, proxy, msg_type)
+            stage.add("bytes_out", len(segment.encode('utf-8')))
             
             if not success:
                 print(f"第 {i+1}/{total_segments} 段消息发送失败")
+                stage.set("success", False)
                 return
             
             # 如果不是最后一段，等待一小段时间以避免触发频率限制
             if i < total_segments - 1:
                 await asyncio.sleep(0.5)  # 500ms 延迟
+        stage.set("success", True)
     
     if total_segments > 1:
         print(f"所有 {total_segments} 段消息发送完成")
@@ -212,7 +267,7 @@ async def send_image_async(image_path=None, image_base64=None, title=None):
         bool: 是否发送成功
     """
     headers = {'Content-Type': 'application/json'}
-    proxy = PROXY_URL if USE_PROXY else None
+    proxy = resolve_proxy()
     
     # 先发送标题消息（如果有）
     if title:
@@ -221,6 +276,9 @@ async def send_image_async(image_path=None, image_base64=None, title=None):
         await asyncio.sleep(0.5)
     
     # 发送图片
-    async with aiohttp.ClientSession() as session:
+    with span("webhook_push", msg_type="image") as stage:
+        session = await get_async_session()
         success = await _send_image(session, image_path, image_base64, headers, proxy)
+        stage.set("bytes_out", len(image_base64) if image_base64 else 0)
+        stage.set("success", success)
         return success
\ No newline at end of file